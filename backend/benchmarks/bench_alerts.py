@@ -0,0 +1,121 @@
+"""Benchmark alert fan-out to many WebSocket subscribers.
+
+Usage (from backend/):
+    python benchmarks/bench_alerts.py [--connections C] [--regions R] [--updates U] [--slow S]
+
+C in-memory connections each subscribe R random boxes over India; U prediction updates at
+random points are published. Routing is checked against a brute-force scan of every
+region. S of the connections send at a crawl, and one never completes a send, to show
+that overflowing and stalled consumers are dropped without delaying the rest.
+"""
+import os
+import sys
+import json
+import time
+import random
+import asyncio
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+import src.services.alert_hub as hub_module
+from src.services.alert_hub import AlertHub
+
+BOUNDS = (8.0, 68.0, 35.0, 97.0)
+
+
+class FakeSocket:
+    def __init__(self, delay: float = 0.0, stall: bool = False):
+        self.delay = delay
+        self.stall = stall
+        self.received = 0
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stall:
+            await asyncio.Event().wait()
+        if self.delay:
+            await asyncio.sleep(self.delay)
+        self.received += 1
+
+    async def close(self, code: int = 1000):
+        self.closed = code
+
+
+async def run(args):
+    rng = random.Random(5)
+    hub_module.ALERT_SEND_TIMEOUT = 0.5
+    hub = AlertHub()
+    sockets, subscribers = [], []
+    started = time.perf_counter()
+    for i in range(args.connections):
+        socket = FakeSocket(delay=0.05 if i < args.slow else 0.0, stall=i == args.slow)
+        subscriber = await hub.connect(socket, "full" if i % 10 == 0 else "summary")
+        for r in range(args.regions):
+            lat = rng.uniform(BOUNDS[0], BOUNDS[2] - 2)
+            lon = rng.uniform(BOUNDS[1], BOUNDS[3] - 2)
+            size = rng.choice([0.1, 0.5, 2.0])
+            hub.subscribe(subscriber, f"r{r}", [lat, lon, lat + size, lon + size])
+        sockets.append(socket)
+        subscribers.append(subscriber)
+    connect_ms = (time.perf_counter() - started) * 1000
+
+    points = [(rng.uniform(BOUNDS[0], BOUNDS[2]), rng.uniform(BOUNDS[1], BOUNDS[3])) for _ in range(args.updates)]
+    detail = {"prediction": {"disaster_name": "Flood", "narrative": "x" * 2000}}
+    expected = 0
+    regions = [(s, region.bbox) for s in subscribers for region in s.regions.values()]
+    for lat, lon in points[:200]:
+        brute = {s for s, (a, b, c, d) in regions if a <= lat <= c and b <= lon <= d}
+        assert brute == hub.subscribers_at(lat, lon), "index disagrees with brute force"
+
+    publish_times = []
+    for k, (lat, lon) in enumerate(points):
+        started = time.perf_counter()
+        expected += hub.publish(lat, lon, {"type": "prediction", "change": "severity", "latitude": lat,
+                                           "longitude": lon, "severity": "High"}, lambda: detail)
+        publish_times.append(time.perf_counter() - started)
+        if k % 50 == 0:
+            # Let writers drain between bursts, as the event loop would between requests
+            await asyncio.sleep(0)
+    drain_started = time.perf_counter()
+    while any(not s.queue.empty() for s in subscribers[args.slow + 1:]):
+        await asyncio.sleep(0.001)
+    drain_ms = (time.perf_counter() - drain_started) * 1000
+    await asyncio.sleep(0.6)
+
+    fast = sockets[args.slow + 1:]
+    results = {
+        "connections": args.connections,
+        "regions": args.connections * args.regions,
+        "connect_and_subscribe_ms": round(connect_ms, 1),
+        "updates": args.updates,
+        "publish_median_us": round(float(np.median(publish_times)) * 1e6, 1),
+        "publish_p99_us": round(float(np.percentile(publish_times, 99)) * 1e6, 1),
+        "deliveries": expected,
+        "deliveries_per_s": round(expected / sum(publish_times)),
+        "drain_ms": round(drain_ms, 1),
+        "fast_received": sum(s.received for s in fast),
+        "slow_closed": sum(1 for s in sockets[:args.slow + 1] if s.closed is not None),
+        "stats": hub.stats()
+    }
+    await hub.close()
+    print(json.dumps(results, indent=2))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--connections", type=int, default=5000)
+    parser.add_argument("--regions", type=int, default=4)
+    parser.add_argument("--updates", type=int, default=5000)
+    parser.add_argument("--slow", type=int, default=10)
+    args = parser.parse_args()
+    asyncio.run(run(args))
+
+
+if __name__ == "__main__":
+    main()
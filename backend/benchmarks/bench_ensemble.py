@@ -0,0 +1,75 @@
+"""Benchmark Monte Carlo ensemble forecasts and check that they are reproducible.
+
+Usage (from backend/):
+    python benchmarks/bench_ensemble.py [--members 100,1000,10000] [--simulations 0,16,64] [--csv PATH]
+
+Times one ensemble per (members, simulations) pair for a flood prediction, with a fresh
+forecaster each time so nothing is served from cache, then runs the same ensemble again
+and reports whether the percentiles match exactly. Pass --csv to fit the impact spread
+to a historical events file instead of using the default spreads.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.historical_data import historical_store
+from src.services.historical_retrieval import historical_retriever
+from src.services.baseline_model import baseline_model
+from src.services.ensemble_forecast import EnsembleForecaster
+from src.services.hazard_spread import SpreadSimulator
+
+
+def prediction(hazard: str) -> DisasterPredictionResponse:
+    return DisasterPredictionResponse(
+        disaster_name=hazard, severity="High", country="India", state="Maharashtra", location="Pune",
+        latitude=18.52, longitude=73.85, start_day="2026-07-01", end_day="2026-07-10",
+        evacuations=20_000, affected_population=150_000,
+        disaster_details={"description": "", "primary_risks": [], "vulnerable_areas": [], "expected_impact": "",
+                          "historical_context": "", "contributing_factors": []},
+        evacuation_plan={"preparation_phase": [], "immediate_actions": [], "during_disaster": [], "evacuation_routes": [],
+                         "post_disaster": [], "emergency_contacts": [], "essential_supplies": []}
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--members", default="100,1000,10000")
+    parser.add_argument("--simulations", default="0,16,64")
+    parser.add_argument("--hazard", default="Flood")
+    parser.add_argument("--csv", default=None)
+    args = parser.parse_args()
+
+    if args.csv:
+        historical_store.load_csv(args.csv)
+        historical_retriever.build()
+        baseline_model.build()
+
+    simulator = SpreadSimulator()
+    simulator.start()
+    response = prediction(args.hazard)
+    results = []
+    for simulations in (int(s) for s in args.simulations.split(",")):
+        for members in (int(m) for m in args.members.split(",")):
+            started = time.perf_counter()
+            first = EnsembleForecaster(simulator, members=members, simulations=simulations).forecast(response)
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            again = EnsembleForecaster(simulator, members=members, simulations=simulations).forecast(response)
+            results.append({
+                "members": members,
+                "simulations": simulations,
+                "ms": round(elapsed_ms, 1),
+                "reproducible": first == again,
+                "affected_population": first.affected_population.model_dump(),
+                "history_events": first.history_events
+            })
+    simulator.close()
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
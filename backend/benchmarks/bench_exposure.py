@@ -0,0 +1,106 @@
+"""Benchmark population exposure queries over a memory-mapped summed-area table.
+
+Usage (from backend/):
+    python benchmarks/bench_exposure.py [--size N] [--span-deg D] [--repeat R] [--dir PATH]
+
+Writes a synthetic N x N population raster covering D x D degrees (a handful of dense
+city cores over a sparse rural background), builds and memory-maps its table, then
+times radius, box and footprint queries. Each query type is checked against a brute
+force sum over the raster.
+"""
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import tempfile
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.population_exposure import PopulationExposure
+
+CENTER = (18.52, 73.85)
+
+
+def synthetic_raster(size: int, seed: int = 5) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    raster = rng.gamma(0.5, 4.0, (size, size)).astype(np.float32)
+    y, x = np.ogrid[:size, :size]
+    for _ in range(6):
+        r, c = rng.integers(0, size, 2)
+        width = rng.uniform(0.01, 0.04) * size
+        raster += (2000 * np.exp(-((y - r) ** 2 + (x - c) ** 2) / (2 * width ** 2))).astype(np.float32)
+    return raster
+
+
+def timed(fn, repeat: int):
+    timings = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        value = fn()
+        timings.append((time.perf_counter() - started) * 1000)
+    return value, round(float(np.median(timings)), 3)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=8192)
+    parser.add_argument("--span-deg", type=float, default=4.0)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--dir", default=None)
+    args = parser.parse_args()
+
+    directory = args.dir or tempfile.mkdtemp(prefix="population-")
+    half = args.span_deg / 2
+    bounds = {"min_lat": CENTER[0] - half, "min_lon": CENTER[1] - half, "max_lat": CENTER[0] + half, "max_lon": CENTER[1] + half}
+    raster = synthetic_raster(args.size)
+    np.save(os.path.join(directory, "synthetic.npy"), raster)
+    with open(os.path.join(directory, "synthetic.json"), "w", encoding="utf-8") as f:
+        json.dump(bounds, f)
+
+    started = time.perf_counter()
+    PopulationExposure().load(directory)
+    build_ms = (time.perf_counter() - started) * 1000
+    exposure = PopulationExposure()
+    started = time.perf_counter()
+    exposure.load(directory)
+    map_ms = (time.perf_counter() - started) * 1000
+
+    step = args.span_deg / args.size
+    lat_centres = bounds["max_lat"] - (np.arange(args.size) + 0.5) * step
+    lon_centres = bounds["min_lon"] + (np.arange(args.size) + 0.5) * step
+    results = {"cells": args.size * args.size, "build_ms": round(build_ms, 1), "map_ms": round(map_ms, 1), "queries": {}}
+
+    for radius_km in (1, 5, 25, 100):
+        value, ms = timed(lambda: exposure.circle(CENTER[0], CENTER[1], radius_km), args.repeat)
+        # Brute force: whole cells whose centre lies inside the circle
+        dy = ((lat_centres - CENTER[0]) * 111.0)[:, None]
+        dx = ((lon_centres - CENTER[1]) * 111.0 * np.cos(np.radians(CENTER[0])))[None, :]
+        brute = float(raster[(dy * dy + dx * dx) <= radius_km ** 2].sum())
+        results["queries"][f"circle_{radius_km}km"] = {"ms": ms, "population": round(value), "brute_force": round(brute)}
+
+    r0, r1, c0, c1 = args.size // 4, args.size // 2, args.size // 3, 2 * args.size // 3
+    value, ms = timed(lambda: exposure.box(bounds["max_lat"] - r1 * step, bounds["min_lon"] + c0 * step,
+                                           bounds["max_lat"] - r0 * step, bounds["min_lon"] + c1 * step), args.repeat)
+    results["queries"]["box_cell_aligned"] = {"ms": ms, "population": round(value), "brute_force": round(float(raster[r0:r1, c0:c1].sum()))}
+
+    # A 512 x 512 footprint mask laid over the raster's central 512 x 512 cells
+    rng = np.random.default_rng(1)
+    mask = rng.random((512, 512)) < 0.5
+    start = args.size // 2 - 256
+    box = (bounds["max_lat"] - (start + 512) * step, bounds["min_lon"] + start * step,
+           bounds["max_lat"] - start * step, bounds["min_lon"] + (start + 512) * step)
+    value, ms = timed(lambda: exposure.footprint(mask, box), max(1, args.repeat // 4))
+    brute = float(raster[start:start + 512, start:start + 512][mask].sum())
+    results["queries"]["footprint_512"] = {"ms": ms, "population": round(value), "brute_force": round(brute)}
+
+    if args.dir is None:
+        shutil.rmtree(directory)
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
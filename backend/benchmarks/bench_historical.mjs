@@ -0,0 +1,33 @@
+// Times mern-backend's DisasterDataProcessor on the same workload as bench_historical.py
+// Usage: node bench_historical.mjs <csv> <repeat> <queries-json>
+import { performance } from 'perf_hooks';
+import DisasterDataProcessor from '../../mern-backend/csvprocessor.js';
+
+const [csvPath, repeatArg, queriesArg] = process.argv.slice(2);
+const repeat = parseInt(repeatArg || '20');
+const queries = JSON.parse(queriesArg);
+
+const log = console.log;
+console.log = () => {};
+
+const processor = new DisasterDataProcessor();
+let start = performance.now();
+await processor.loadData(csvPath);
+const loadMs = performance.now() - start;
+
+start = performance.now();
+for (let i = 0; i < repeat; i++) {
+  for (const [location, type] of queries) {
+    processor.getRiskAssessment(location, type);
+    processor.getTrends(type);
+  }
+}
+const queriesMs = (performance.now() - start) / repeat;
+
+console.log = log;
+console.log(JSON.stringify({
+  records: processor.data.length,
+  load_ms: Math.round(loadMs * 10) / 10,
+  queries_ms: Math.round(queriesMs * 100) / 100,
+  risk: queries.map(([location, type]) => processor.getRiskAssessment(location, type).riskScore)
+}));
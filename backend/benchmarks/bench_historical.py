@@ -0,0 +1,129 @@
+"""Benchmark the NumPy historical engine against mern-backend's DisasterDataProcessor.
+
+Usage (from backend/):
+    python benchmarks/bench_historical.py [--csv PATH] [--synthetic N] [--repeat R]
+
+With --synthetic, an EM-DAT-shaped CSV of N rows is generated first (useful when the
+real export is not checked out). The JS side runs through bench_historical.mjs with Node.
+"""
+import os
+import sys
+import csv
+import json
+import time
+import random
+import argparse
+import subprocess
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.historical_data import HistoricalDataStore, file_checksum, STRING_COLUMNS, INT_COLUMNS, FLOAT_COLUMNS
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+QUERIES = [
+    ({"city": "Mumbai", "state": "Maharashtra", "district": "Mumbai"}, "Flood"),
+    ({"city": "Chennai", "state": "Tamil Nadu", "district": ""}, "Cyclone"),
+    ({"city": "Bhuj", "state": "Gujarat", "district": "Kachchh"}, "Earthquake"),
+    ({"city": "Shimla", "state": "Himachal Pradesh", "district": ""}, "Landslide"),
+]
+
+TYPES = ["Flood", "Storm", "Earthquake", "Drought", "Wildfire", "Mass movement (wet)", "Extreme temperature", "Epidemic"]
+COUNTRIES = ["IND", "BGD", "PAK", "NPL", "CHN", "IDN", "PHL", "USA"]
+STATES = ["Maharashtra", "Tamil Nadu", "Gujarat", "Himachal Pradesh", "Assam", "Odisha", "Kerala", "Bihar"]
+CITIES = ["Mumbai", "Chennai", "Bhuj", "Shimla", "Guwahati", "Puri", "Kochi", "Patna", "Pune", "Surat"]
+
+
+def write_synthetic_csv(path: str, rows: int, seed: int = 7):
+    rng = random.Random(seed)
+    headers = list(STRING_COLUMNS.values()) + list(INT_COLUMNS.values()) + list(FLOAT_COLUMNS.values())
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=headers)
+        writer.writeheader()
+        for i in range(rows):
+            year = rng.randint(1960, 2025)
+            places = rng.sample(CITIES, rng.randint(1, 3))
+            writer.writerow({
+                "DisNo.": f"{year}-{i:04d}-IND",
+                "Disaster Type": rng.choice(TYPES),
+                "ISO": rng.choice(COUNTRIES),
+                "Region": "Asia",
+                "Subregion": rng.choice(["Southern Asia", "South-eastern Asia", rng.choice(STATES)]),
+                "Location": ", ".join(places) + f" ({rng.choice(STATES)})",
+                "Start Year": year,
+                "Start Month": rng.randint(1, 12),
+                "End Year": year,
+                "Total Deaths": rng.choice(["", rng.randint(0, 5000)]),
+                "No. Injured": rng.choice(["", rng.randint(0, 2000)]),
+                "No. Affected": rng.choice(["", rng.randint(0, 2_000_000)]),
+                "No. Homeless": rng.choice(["", rng.randint(0, 50000)]),
+                "Total Damage ('000 US$)": rng.choice(["", rng.randint(0, 5_000_000)]),
+                "Latitude": rng.choice(["", round(rng.uniform(6, 36), 4)]),
+                "Longitude": rng.choice(["", round(rng.uniform(68, 97), 4)]),
+            })
+
+
+def timed(fn, repeat: int) -> float:
+    start = time.perf_counter()
+    for _ in range(repeat):
+        fn()
+    return (time.perf_counter() - start) / repeat * 1000
+
+
+def bench_python(path: str, repeat: int) -> dict:
+    store = HistoricalDataStore()
+    load_ms = timed(lambda: store.load_csv(path), 1)
+
+    snapshot_dir = f"{path}.snapshot"
+    store.save_snapshot(snapshot_dir, file_checksum(path))
+    mapped = HistoricalDataStore()
+    snapshot_ms = timed(lambda: mapped.load(path, snapshot_dir), 1)
+
+    def queries():
+        for location, disaster_type in QUERIES:
+            store.get_risk_assessment(location, disaster_type)
+            store.get_trends(disaster_type)
+
+    return {
+        "records": len(store),
+        "load_ms": round(load_ms, 1),
+        "snapshot_load_ms": round(snapshot_ms, 1),
+        "queries_ms": round(timed(queries, repeat), 2),
+        "nearby_ms": round(timed(lambda: store.nearby(19.07, 72.88, 200), repeat), 3),
+        "risk": [store.get_risk_assessment(loc, t)["risk_score"] for loc, t in QUERIES]
+    }
+
+
+def bench_node(path: str, repeat: int) -> dict:
+    output = subprocess.run(
+        ["node", os.path.join(HERE, "bench_historical.mjs"), path, str(repeat), json.dumps(QUERIES)],
+        check=True, capture_output=True, text=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--csv", default=os.getenv("HISTORICAL_DATA_PATH", "../mern-backend/disaster_data.csv"))
+    parser.add_argument("--synthetic", type=int, default=0, help="generate a synthetic CSV with this many rows")
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    path = args.csv
+    if args.synthetic:
+        path = os.path.join(HERE, f"synthetic_{args.synthetic}.csv")
+        write_synthetic_csv(path, args.synthetic)
+
+    python = bench_python(path, args.repeat)
+    print("python:", json.dumps(python))
+    try:
+        node = bench_node(path, args.repeat)
+        print("node:  ", json.dumps(node))
+        print(f"speedup (queries): {node['queries_ms'] / python['queries_ms']:.1f}x")
+        if node["risk"] != python["risk"]:
+            print(f"⚠️ risk scores differ: node={node['risk']} python={python['risk']}")
+    except (OSError, subprocess.CalledProcessError) as e:
+        print(f"⚠️ Skipping Node comparison: {e}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Benchmark evacuation route queries and the capacity-aware flow solver on a synthetic grid city.
+
+Usage (from backend/):
+    python benchmarks/bench_routing.py [--size N] [--spacing-m M] [--osm PATH] [--repeat R] [--flow-cells C]
+
+The synthetic city is an N x N street grid with an arterial every tenth street and a
+scattering of assembly points; pass --osm to time a real extract instead. The flow
+solver is timed on C random population cells, then re-solved after closing its worst
+bottleneck.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.road_graph import RoadGraph, HIGHWAY_CLASSES
+from src.services.evacuation_router import EvacuationRouter
+from src.services.evacuation_flow import EvacuationFlowSolver
+
+CENTER = (19.07, 72.88)
+
+
+def grid_city(size: int, spacing_m: float, seed: int = 7) -> RoadGraph:
+    rng = random.Random(seed)
+    step_lat = spacing_m / 111_000
+    step_lon = spacing_m / (111_000 * np.cos(np.radians(CENTER[0])))
+    rows, cols = np.meshgrid(np.arange(size), np.arange(size), indexing="ij")
+    lat = CENTER[0] + (rows.ravel() - size / 2) * step_lat
+    lon = CENTER[1] + (cols.ravel() - size / 2) * step_lon
+
+    ids = np.arange(size * size).reshape(size, size)
+    horizontal = np.stack([ids[:, :-1].ravel(), ids[:, 1:].ravel()], axis=1)
+    vertical = np.stack([ids[:-1, :].ravel(), ids[1:, :].ravel()], axis=1)
+    pairs = np.concatenate([horizontal, vertical])
+    arterial = (rows.ravel()[pairs[:, 0]] % 10 == 0) | (cols.ravel()[pairs[:, 0]] % 10 == 0)
+    classes = np.where(arterial, HIGHWAY_CLASSES.index("primary"), HIGHWAY_CLASSES.index("residential"))
+
+    sources = np.concatenate([pairs[:, 0], pairs[:, 1]])
+    targets = np.concatenate([pairs[:, 1], pairs[:, 0]])
+    highway = np.concatenate([classes, classes])
+    assembly = [
+        {"name": f"Shelter {i}", "kind": "shelter", "node": rng.randrange(size * size)}
+        for i in range(max(10, size * size // 2000))
+    ]
+    graph = RoadGraph()
+    graph.set_arrays(lat, lon, sources, targets, highway, assembly)
+    return graph
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--size", type=int, default=300)
+    parser.add_argument("--spacing-m", type=float, default=100)
+    parser.add_argument("--osm", default=None)
+    parser.add_argument("--repeat", type=int, default=20)
+    parser.add_argument("--flow-cells", type=int, default=20000)
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    if args.osm:
+        graph = RoadGraph()
+        graph.load_osm(args.osm)
+    else:
+        graph = grid_city(args.size, args.spacing_m)
+    build_ms = (time.perf_counter() - started) * 1000
+
+    router = EvacuationRouter(graph)
+    lat0, lon0, lat1, lon1 = graph.bounds
+    center = ((lat0 + lat1) / 2, (lon0 + lon1) / 2)
+    results = {"nodes": graph.n, "edges": len(graph.edge_source), "build_ms": round(build_ms, 1)}
+    for severity in ("Moderate", "High", "Severe"):
+        timings = []
+        for _ in range(args.repeat):
+            started = time.perf_counter()
+            routes, stranded = router.plan(center[0], center[1], severity)
+            timings.append((time.perf_counter() - started) * 1000)
+        results[severity] = {
+            "median_ms": round(float(np.median(timings)), 2),
+            "p95_ms": round(float(np.percentile(timings, 95)), 2),
+            "routes": len(routes),
+            "stranded_cells": stranded,
+            "best_minutes": routes[0].travel_time_min if routes else None
+        }
+
+    if args.flow_cells:
+        rng = random.Random(11)
+        cells = [
+            {"latitude": center[0] + rng.uniform(-0.04, 0.04), "longitude": center[1] + rng.uniform(-0.04, 0.04),
+             "population": rng.randint(0, 40)}
+            for _ in range(args.flow_cells)
+        ]
+        solver = EvacuationFlowSolver(graph)
+        plan = solver.solve([{"latitude": center[0], "longitude": center[1], "severity": "High"}], cells=cells)
+        worst = plan["bottlenecks"][0]
+        resolved = solver.close_roads(plan["plan_id"], [{"latitude": worst["latitude"], "longitude": worst["longitude"], "radius_m": 60}])
+        results["flow"] = {
+            "cells": len(plan["cells"]),
+            "evacuees": plan["evacuees"],
+            "solve_ms": plan["solve_ms"],
+            "clearance_min": plan["clearance_time_min"],
+            "resolve_ms": resolved["solve_ms"],
+            "rerouted_cells": resolved["rerouted_cells"],
+            "clearance_after_closure_min": resolved["clearance_time_min"]
+        }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
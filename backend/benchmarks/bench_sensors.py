@@ -0,0 +1,88 @@
+"""Benchmark sensor ingestion throughput and check the rolling aggregates.
+
+Usage (from backend/):
+    python benchmarks/bench_sensors.py [--sensors N] [--readings R] [--frame F]
+
+N synthetic sensors (a third each of rain gauges, river levels and thermometers) report
+R readings in frames of F, sent as reading objects and again as columnar frames. Running
+sums are then compared with a full recomputation of every window, and the cost of
+building the MongoDB documents for one flush is timed separately.
+"""
+import os
+import sys
+import json
+import time
+import random
+import argparse
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.sensor_ingest import SensorIngestor, KIND_NAMES, SENSOR_FLUSH_SIZE
+
+
+def frames(sensors: int, readings: int, frame: int, seed: int = 3):
+    rng = random.Random(seed)
+    start = time.time()
+    for offset in range(0, readings, frame):
+        rows = []
+        for k in range(offset, min(offset + frame, readings)):
+            i = rng.randrange(sensors)
+            kind = KIND_NAMES[i % 3]
+            value = {"rain_gauge": rng.expovariate(1.0), "river_level": rng.uniform(0, 6),
+                     "temperature": rng.gauss(30, 5)}[kind]
+            rows.append({"sensor_id": f"s{i}", "value": value, "ts": start + k * 1e-4, "kind": kind,
+                         "latitude": 18.4 + (i % 100) * 0.003, "longitude": 73.7 + (i // 100) * 0.003})
+        yield rows
+
+
+def run(ingestor: SensorIngestor, batches, columnar: bool) -> float:
+    elapsed = 0.0
+    for rows in batches:
+        if columnar:
+            rows = {key: [row[key] for row in rows] for key in rows[0]}
+        started = time.perf_counter()
+        ingestor.ingest(rows)
+        elapsed += time.perf_counter() - started
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sensors", type=int, default=10000)
+    parser.add_argument("--readings", type=int, default=500000)
+    parser.add_argument("--frame", type=int, default=5000)
+    args = parser.parse_args()
+
+    batches = list(frames(args.sensors, args.readings, args.frame))
+    payload_bytes = sum(len(json.dumps(rows)) for rows in batches)
+    results = {"sensors": args.sensors, "readings": args.readings, "frame": args.frame}
+    for columnar in (False, True):
+        ingestor = SensorIngestor()
+        ingestor.collection = None
+        elapsed = run(ingestor, batches, columnar)
+        results["columnar" if columnar else "rows"] = {
+            "readings_per_s": round(args.readings / elapsed),
+            "ms_per_frame": round(elapsed * 1000 / len(batches), 2),
+            "crossings": ingestor.crossings
+        }
+
+    parse_started = time.perf_counter()
+    for rows in batches:
+        json.loads(json.dumps(rows))
+    results["json_roundtrip_mb_per_s"] = round(payload_bytes * 2 / 1e6 / (time.perf_counter() - parse_started), 1)
+
+    n = ingestor.n
+    exact = ingestor.values[:n].sum(axis=1)
+    results["max_sum_drift"] = float(np.abs(exact - ingestor.sums[:n]).max())
+
+    ids = np.random.default_rng(0).integers(0, n, SENSOR_FLUSH_SIZE)
+    started = time.perf_counter()
+    ingestor._documents(ids, np.ones(len(ids)), np.full(len(ids), time.time()))
+    results["documents_per_s"] = round(len(ids) / (time.perf_counter() - started))
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Benchmark the hazard spread simulator across grid sizes and in process-pool mode.
+
+Usage (from backend/):
+    python benchmarks/bench_spread.py [--sizes 256,512,...] [--hours H] [--scenarios S] [--pool-size N]
+
+Every model runs over the same bounding box at each grid size, so finer grids mean
+smaller cells and more steps. Pool mode runs S wildfire scenarios with different seeds,
+first one after another and then across SPREAD_WORKERS processes.
+"""
+import os
+import sys
+import json
+import time
+import argparse
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+from src.services.hazard_spread import simulate, SpreadSimulator, SPREAD_WORKERS
+
+CENTER = (18.52, 73.85)
+HALF_SPAN_DEG = 0.15
+
+
+def scenario(hazard: str, grid_size: int, hours: float, seed: int = 1) -> dict:
+    return {
+        "hazard": hazard, "severity": "High", "latitude": CENTER[0], "longitude": CENTER[1],
+        "bbox": [CENTER[0] - HALF_SPAN_DEG, CENTER[1] - HALF_SPAN_DEG, CENTER[0] + HALF_SPAN_DEG, CENTER[1] + HALF_SPAN_DEG],
+        "grid_size": grid_size, "hours": hours, "slices": 6, "seed": seed, "images": False
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", default="256,512,1024,2048,4096")
+    parser.add_argument("--hours", type=float, default=12)
+    parser.add_argument("--scenarios", type=int, default=8)
+    parser.add_argument("--pool-size", type=int, default=512)
+    args = parser.parse_args()
+
+    results = {"workers": SPREAD_WORKERS, "grids": {}}
+    for size in (int(s) for s in args.sizes.split(",")):
+        row = {}
+        for hazard in ("Flood", "Wildfire", "Heat Wave"):
+            result = simulate(scenario(hazard, size, args.hours))
+            row[result["model"]] = {
+                "ms": result["elapsed_ms"],
+                "cell_m": result["cell_size_m"],
+                "final_area_km2": result["slices"][-1]["area_km2"]
+            }
+        results["grids"][f"{size}x{size}"] = row
+
+    batch = [scenario("Wildfire", args.pool_size, args.hours, seed) for seed in range(1, args.scenarios + 1)]
+    started = time.perf_counter()
+    for item in batch:
+        simulate(item)
+    serial_ms = (time.perf_counter() - started) * 1000
+    simulator = SpreadSimulator()
+    simulator.start()
+    started = time.perf_counter()
+    simulator.run_many(batch)
+    pool_ms = (time.perf_counter() - started) * 1000
+    simulator.close()
+    results["pool"] = {
+        "scenarios": args.scenarios,
+        "grid": f"{args.pool_size}x{args.pool_size}",
+        "serial_ms": round(serial_ms, 1),
+        "pool_ms": round(pool_ms, 1)
+    }
+    print(json.dumps(results, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+import json
+from fastapi import WebSocket, WebSocketDisconnect
+from pydantic import ValidationError
+
+from src.schemas.alert_schema import AlertSubscription
+from src.services.alert_hub import alert_hub
+
+class AlertController:
+    def __init__(self):
+        self.hub = alert_hub
+
+    async def subscribe_controller(self, websocket: WebSocket, detail: str):
+        """Controller for the alert WebSocket: reads subscribe/unsubscribe messages while the
+        hub pushes updates for the subscribed regions"""
+        subscriber = await self.hub.connect(websocket, detail)
+        if subscriber is None:
+            return
+        sequence = 0
+        try:
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    request = AlertSubscription.model_validate_json(message)
+                    if request.action == "subscribe":
+                        sequence += 1
+                        region_id = request.id or f"region-{sequence}"
+                        self.hub.subscribe(subscriber, region_id, request.bbox, request.polygon)
+                        reply = {"type": "subscribed", "id": region_id, "regions": len(subscriber.regions)}
+                    else:
+                        removed = self.hub.unsubscribe(subscriber, request.id)
+                        reply = {"type": "unsubscribed" if removed else "error", "id": request.id,
+                                 "regions": len(subscriber.regions)}
+                        if not removed:
+                            reply["detail"] = "no region with this id"
+                except ValidationError as e:
+                    reply = {"type": "error", "detail": e.errors(include_url=False, include_context=False)}
+                except ValueError as e:
+                    reply = {"type": "error", "detail": str(e)}
+                # Replies share the push queue so a single writer owns the socket
+                subscriber.offer(json.dumps(reply, default=str))
+        except (WebSocketDisconnect, RuntimeError):
+            # RuntimeError: the hub closed a slow consumer underneath the receive
+            pass
+        finally:
+            await self.hub.disconnect(subscriber)
+
+alert_controller = AlertController()
@@ -0,0 +1,58 @@
+import asyncio
+from fastapi import HTTPException
+
+from src.schemas.evacuation_schema import EvacuationFlowRequest, EvacuationFlowResult, RoadClosureRequest
+from src.services.evacuation_flow import evacuation_flow
+
+class EvacuationController:
+    def __init__(self):
+        self.solver = evacuation_flow
+
+    def _require_graph(self):
+        if not self.solver.graph.loaded:
+            raise HTTPException(
+                status_code=503,
+                detail="Evacuation planning unavailable. No road graph is loaded (set ROAD_GRAPH_PATH)."
+            )
+
+    async def plan_controller(self, request: EvacuationFlowRequest) -> EvacuationFlowResult:
+        """Controller for capacity-aware evacuation planning"""
+        print("Evacuation Plan Controller")
+        self._require_graph()
+
+        hazards = [hazard.model_dump() for hazard in request.hazards]
+        cells = [cell.model_dump() for cell in request.cells] if request.cells is not None else None
+        try:
+            result = await asyncio.to_thread(self.solver.solve, hazards, cells)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Evacuation planning failed: {str(e)}"
+            )
+        return EvacuationFlowResult(**result)
+
+    async def closures_controller(self, plan_id: str, request: RoadClosureRequest) -> EvacuationFlowResult:
+        """Controller for closing roads in a solved plan and re-solving the affected cells"""
+        print("Evacuation Closures Controller")
+        self._require_graph()
+
+        closures = [closure.model_dump() for closure in request.closures]
+        try:
+            result = await asyncio.to_thread(self.solver.close_roads, plan_id, closures)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Evacuation re-planning failed: {str(e)}"
+            )
+        if result is None:
+            raise HTTPException(status_code=404, detail="Plan not found. It may have been evicted; solve it again.")
+        return EvacuationFlowResult(**result)
+
+    async def getplan_controller(self, plan_id: str) -> EvacuationFlowResult:
+        """Controller for retrieving a solved plan"""
+        result = self.solver.result(plan_id)
+        if result is None:
+            raise HTTPException(status_code=404, detail="Plan not found. It may have been evicted; solve it again.")
+        return EvacuationFlowResult(**result)
+
+evacuation_controller = EvacuationController()
@@ -1,23 +1,68 @@
 import json
 import re
+import os
 import asyncio
 from datetime import datetime, timezone
-from typing import List, Dict, Any
+from typing import List, Dict, Any, AsyncIterator, Optional
 from fastapi import HTTPException
 
 from src.schemas.prediction_schema import (
     DisasterPredictionRequest, 
     DisasterPredictionResponse,
     PredictionResult,
-    CoordinateRequest
+    CoordinateRequest,
+    AreaPredictionRequest,
+    AreaPredictionResult
 )
 
 # Import your existing RAG functions
-from src.services.disaster_prediction import predict_disaster, validate_prediction
+from src.services.disaster_prediction import (
+    apredict_disaster,
+    apredict_disaster_fast,
+    apredict_disaster_hybrid,
+    resilience_stats
+)
+from src.services.resilience import deadline_scope, is_transient, CircuitOpenError, DeadlineExceeded
+from src.services.output_parser import parse_stats
+from src.services.geocode_cache import geocode_cache
+from src.services.result_store import result_store, make_result_id
+from src.services.prediction_cache import prediction_cache
+from src.services.single_flight import SingleFlight
+from src.services.job_queue import JobQueue
+from src.services.prediction_batcher import prediction_batcher
+from src.services.historical_data import historical_store
+from src.services.historical_retrieval import historical_retriever
+from src.services.baseline_model import baseline_model
+from src.services.risk_grid import risk_grid
+from src.services.area_sampler import AdaptiveAreaSampler, polygon_rings, polygon_bbox
+from src.services.road_graph import road_graph
+from src.services.evacuation_router import evacuation_router
+from src.services.evacuation_flow import evacuation_flow, FLOW_ON_PREDICTION
+from src.services.hazard_spread import spread_simulator
+from src.services.ensemble_forecast import ensemble_forecaster, ENSEMBLE_CONCURRENCY
+from src.services.population_exposure import population_exposure
+from src.services.sensor_ingest import sensor_ingestor, SENSOR_REPREDICT_MODE
+from src.services.alert_hub import alert_hub
+
+# Time budget (seconds) shared by all coordinates of one synchronous request
+PREDICTION_REQUEST_BUDGET = float(os.getenv("PREDICTION_REQUEST_BUDGET", "90"))
 
 class PredictionController:
     def __init__(self):
-        self.results_cache = {}
+        self.result_store = result_store
+        # Caps in-flight predictions so large batches don't flood the geocoder/LLM
+        # Shared with the batcher so batch calls and their per-item fallbacks count against the same bound
+        self.semaphore = prediction_batcher.semaphore
+        # Bounds ensemble work so a large ensemble request can't queue thousands of simulations at once
+        self.ensemble_semaphore = asyncio.Semaphore(ENSEMBLE_CONCURRENCY)
+        # Identical in-flight coordinates (same prediction cache cell) share one call
+        self.single_flight = SingleFlight()
+        # Background queue for batches too large to hold a request open for
+        self.job_queue = JobQueue(
+            self._process_single_prediction,
+            self._error_prediction,
+            on_complete=self._store_job_result
+        )
     
     async def predictdisaster_controller(self, request: DisasterPredictionRequest) -> PredictionResult:
         """Controller for disaster prediction endpoint"""
@@ -26,55 +71,22 @@ class PredictionController:
         try:
             predictions = []
             
-            # Process each coordinate asynchronously
-            tasks = []
-            for coord in request.coordinates:
-                task = asyncio.to_thread(
-                    self._process_single_prediction, 
-                    coord.latitude, 
-                    coord.longitude
-                )
-                tasks.append(task)
-            
-            # Wait for all predictions to complete
-            results = await asyncio.gather(*tasks, return_exceptions=True)
+            # Every coordinate shares the request's time budget
+            with deadline_scope(PREDICTION_REQUEST_BUDGET):
+                # Process each coordinate asynchronously
+                tasks = []
+                for coord in request.coordinates:
+                    task = self._process_single_prediction(coord.latitude, coord.longitude, request.mode, request.ensemble)
+                    tasks.append(task)
+                
+                # Wait for all predictions to complete
+                results = await asyncio.gather(*tasks, return_exceptions=True)
             
             # Process results
-            for i, result in enumerate(results):
+            for coord, result in zip(request.coordinates, results):
                 if isinstance(result, Exception):
                     # Create error response for failed predictions
-                    error_prediction = DisasterPredictionResponse(
-                        disaster_name="Prediction Failed",
-                        severity="Unknown",
-                        country="Unknown",
-                        state="Unknown",
-                        location=f"Coordinates: {request.coordinates[i].latitude}, {request.coordinates[i].longitude}",
-                        latitude=request.coordinates[i].latitude,
-                        longitude=request.coordinates[i].longitude,
-                        start_day=None,
-                        end_day=None,
-                        evacuations=0,
-                        affected_population=0,
-                        disaster_details={
-                            "description": "Failed to generate prediction",
-                            "primary_risks": [],
-                            "vulnerable_areas": [],
-                            "expected_impact": "Unknown",
-                            "historical_context": "Unknown",
-                            "contributing_factors": []
-                        },
-                        evacuation_plan={
-                            "preparation_phase": [],
-                            "immediate_actions": [],
-                            "during_disaster": [],
-                            "evacuation_routes": [],
-                            "post_disaster": [],
-                            "emergency_contacts": [],
-                            "essential_supplies": []
-                        },
-                        error=f"Prediction failed: {str(result)}"
-                    )
-                    predictions.append(error_prediction)
+                    predictions.append(self._error_prediction(coord, result))
                 else:
                     predictions.append(result)
             
@@ -82,12 +94,12 @@ class PredictionController:
             result = PredictionResult(
                 predictions=predictions,
                 timestamp=datetime.now(timezone.utc).isoformat(),
-                total_locations=len(request.coordinates)
+                total_locations=len(request.coordinates),
+                result_id=make_result_id(request.coordinates, request.mode, request.ensemble)
             )
             
-            # Cache the result (optional)
-            result_id = str(hash(str(request.coordinates)))
-            self.results_cache[result_id] = result
+            # Store the result so it can be fetched again via /disaster/result/{result_id}
+            await self.result_store.put(result.result_id, result)
             
             return result
             
@@ -97,30 +109,275 @@ class PredictionController:
                 detail=f"Prediction processing failed: {str(e)}"
             )
     
-    def _process_single_prediction(self, latitude: float, longitude: float) -> DisasterPredictionResponse:
-        """Process prediction for a single coordinate (synchronous)"""
+    async def stream_predictdisaster_controller(self, request: DisasterPredictionRequest) -> AsyncIterator[str]:
+        """Controller for the streaming prediction endpoint.
+
+        Yields one NDJSON frame per coordinate as soon as it completes, then a summary frame.
+        """
+        print("Stream Predict Disaster Controller")
+
+        async def run(index: int, coord: CoordinateRequest):
+            try:
+                return index, await self._process_single_prediction(coord.latitude, coord.longitude, request.mode, request.ensemble)
+            except Exception as e:
+                return index, self._error_prediction(coord, e)
+
+        with deadline_scope(PREDICTION_REQUEST_BUDGET):
+            tasks = [asyncio.ensure_future(run(i, coord)) for i, coord in enumerate(request.coordinates)]
+        predictions = [None] * len(tasks)
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                index, prediction = await next_done
+                predictions[index] = prediction
+                yield json.dumps({
+                    "type": "prediction",
+                    "index": index,
+                    "prediction": prediction.model_dump()
+                }) + "\n"
+
+            result = PredictionResult(
+                predictions=predictions,
+                timestamp=datetime.now(timezone.utc).isoformat(),
+                total_locations=len(request.coordinates),
+                result_id=make_result_id(request.coordinates, request.mode, request.ensemble)
+            )
+            await self.result_store.put(result.result_id, result)
+
+            yield json.dumps({
+                "type": "summary",
+                "result_id": result.result_id,
+                "timestamp": result.timestamp,
+                "total_locations": result.total_locations,
+                "failed": sum(1 for p in predictions if p.error)
+            }) + "\n"
+        finally:
+            # Client went away mid-stream: stop waiting; flights no other caller is waiting on are cancelled too
+            for task in tasks:
+                task.cancel()
+
+    def _error_prediction(self, coord: CoordinateRequest, error: Exception) -> DisasterPredictionResponse:
+        """Placeholder response for a coordinate whose prediction failed"""
+        return DisasterPredictionResponse(
+            disaster_name="Prediction Failed",
+            severity="Unknown",
+            country="Unknown",
+            state="Unknown",
+            location=f"Coordinates: {coord.latitude}, {coord.longitude}",
+            latitude=coord.latitude,
+            longitude=coord.longitude,
+            start_day=None,
+            end_day=None,
+            evacuations=0,
+            affected_population=0,
+            disaster_details={
+                "description": "Failed to generate prediction",
+                "primary_risks": [],
+                "vulnerable_areas": [],
+                "expected_impact": "Unknown",
+                "historical_context": "Unknown",
+                "contributing_factors": []
+            },
+            evacuation_plan={
+                "preparation_phase": [],
+                "immediate_actions": [],
+                "during_disaster": [],
+                "evacuation_routes": [],
+                "post_disaster": [],
+                "emergency_contacts": [],
+                "essential_supplies": []
+            },
+            error=f"Prediction failed: {str(error)}"
+        )
+
+    async def _process_single_prediction(self, latitude: float, longitude: float, mode: str = "llm",
+                                         ensemble: bool = False) -> DisasterPredictionResponse:
+        """Process prediction for a single coordinate (bounded by PREDICTION_CONCURRENCY)"""
+        response = prediction_cache.get(latitude, longitude, mode)
+        if response is None:
+            response = await self.single_flight.do(
+                prediction_cache.key(latitude, longitude, mode),
+                lambda: self._predict_cell(latitude, longitude, mode)
+            )
+            response = response.model_copy(update={"latitude": latitude, "longitude": longitude})
+        if ensemble:
+            # Bands are derived from the (possibly cached) point prediction and seeded, so they are reproducible
+            async with self.ensemble_semaphore:
+                response = await asyncio.to_thread(ensemble_forecaster.attach, response)
+        return response
+
+    async def _predict_cell(self, latitude: float, longitude: float, mode: str = "llm",
+                            notes: Optional[List[str]] = None) -> DisasterPredictionResponse:
+        """Run the prediction pipeline for one cache cell, cache the outcome and push it to subscribers"""
+        # A sensor refresh that invalidates the cell meanwhile bumps this, so the older result isn't cached
+        generation = prediction_cache.generation(latitude, longitude, mode)
         try:
             # Use your existing RAG functions
-            prediction = predict_disaster(latitude, longitude)
-            validated_prediction = validate_prediction(prediction)
-            
-            # Convert to Pydantic model
-            return DisasterPredictionResponse(**validated_prediction)
+            # Predictions come back already validated into DisasterPredictionResponse
+            if mode == "fast":
+                # In-process statistical baseline: no LLM call to bound
+                response = await apredict_disaster_fast(latitude, longitude)
+            elif mode == "hybrid":
+                async with self.semaphore:
+                    response = await apredict_disaster_hybrid(latitude, longitude)
+            elif prediction_batcher.enabled:
+                # The batcher takes self.semaphore around the batch call and each fallback
+                response = await prediction_batcher.submit(latitude, longitude)
+            else:
+                async with self.semaphore:
+                    response = await apredict_disaster(latitude, longitude)
+
+            if road_graph.covers(latitude, longitude):
+                # Real routes over the road network replace guesswork for covered areas
+                response = await asyncio.to_thread(evacuation_router.attach, response)
+                if FLOW_ON_PREDICTION and mode != "fast":
+                    # Ties the predicted evacuation count to what the roads and shelters can take
+                    response = await asyncio.to_thread(evacuation_flow.attach, response)
             
+            if notes:
+                # Live sensor readings that triggered this refresh travel with the prediction
+                response = response.model_copy(update={"warnings": list(response.warnings or []) + notes})
+            prediction_cache.set(latitude, longitude, response, mode, generation)
+            alert_hub.publish_prediction(response, mode, notes)
+            return response
+
         except Exception as e:
-            raise Exception(f"Failed to process coordinate ({latitude}, {longitude}): {str(e)}")
+            reason = str(e) or type(e).__name__
+            if isinstance(e, (CircuitOpenError, DeadlineExceeded)) or is_transient(e):
+                # Provider degraded or out of time: fall back to an earlier prediction for this cell
+                fallback = prediction_cache.get_stale(latitude, longitude, reason, mode)
+                if fallback is None and mode == "hybrid":
+                    # The baseline figures don't need the LLM; only the narrative is lost
+                    fallback = await self._baseline_fallback(latitude, longitude, reason)
+                if fallback is not None:
+                    return fallback
+            raise Exception(f"Failed to process coordinate ({latitude}, {longitude}): {reason}")
     
+    async def repredict_cell(self, latitude: float, longitude: float, notes: List[str]) -> DisasterPredictionResponse:
+        """Refresh a cell's cached prediction after live sensors in it crossed their thresholds"""
+        for mode in ("fast", "llm", "hybrid"):
+            prediction_cache.invalidate(latitude, longitude, mode)
+        # Later requests for the cell are served the refreshed prediction with the live readings attached.
+        # Own single-flight key, so a sensor refresh never joins an ordinary request that predates the readings
+        return await self.single_flight.do(
+            prediction_cache.key(latitude, longitude, SENSOR_REPREDICT_MODE) + ":sensor",
+            lambda: self._predict_cell(latitude, longitude, SENSOR_REPREDICT_MODE, notes)
+        )
+
+    async def _baseline_fallback(self, latitude: float, longitude: float, reason: str):
+        try:
+            baseline = await apredict_disaster_fast(latitude, longitude)
+        except Exception:
+            return None
+        warnings = list(baseline.warnings or []) + [f"⚠️ Narrative unavailable, baseline figures only: {reason}"]
+        return baseline.model_copy(update={"warnings": warnings})
+
+    async def predictarea_controller(self, request: AreaPredictionRequest) -> AreaPredictionResult:
+        """Controller for bounding-box / polygon prediction with adaptive sampling"""
+        print("Predict Area Controller")
+
+        rings = None
+        if request.polygon is not None:
+            try:
+                rings = polygon_rings(request.polygon)
+            except (ValueError, KeyError, IndexError, TypeError) as e:
+                raise HTTPException(status_code=400, detail=f"Invalid polygon: {e}")
+            bounds = polygon_bbox(rings)
+        else:
+            box = request.bbox
+            bounds = (box.min_lat, box.min_lon, box.max_lat, box.max_lon)
+
+        sampler = AdaptiveAreaSampler(
+            lambda lat, lon: self._process_single_prediction(lat, lon, request.mode),
+            lambda lat, lon: prediction_cache.key(lat, lon, request.mode),
+            request.budget,
+            rings
+        )
+        try:
+            with deadline_scope(PREDICTION_REQUEST_BUDGET):
+                leaves = await sampler.run(*bounds)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Area prediction failed: {str(e)}"
+            )
+
+        keys = list(sampler.by_cell)
+        position = {key: index for index, key in enumerate(keys)}
+        samples = [
+            {"latitude": lat, "longitude": lon, "prediction_index": position[key]}
+            for (lat, lon), key in sampler.samples.items()
+            if key in position
+        ]
+        return AreaPredictionResult(
+            predictions=[sampler.by_cell[key] for key in keys],
+            samples=samples,
+            summary=sampler.summarize(leaves),
+            timestamp=datetime.now(timezone.utc).isoformat(),
+            budget=request.budget,
+            cells_predicted=len(keys),
+            refinement_rounds=sampler.rounds
+        )
+
     async def getresult_controller(self, result_id: str) -> PredictionResult:
         """Controller for retrieving cached results"""
         print("Get Result Controller")
         
-        if result_id not in self.results_cache:
+        result = await self.result_store.get(result_id)
+        if result is None:
+            # Not a finished synchronous result: it may be a background job still in progress
+            try:
+                result = await self.job_queue.get_result(result_id)
+            except Exception as e:
+                print(f"⚠️ Job lookup failed: {e}")
+        if result is None:
             raise HTTPException(
                 status_code=404,
                 detail="Result not found. The prediction may have expired or never existed."
             )
         
-        return self.results_cache[result_id]
+        return result
+
+    async def submitjob_controller(self, request: DisasterPredictionRequest) -> Dict[str, Any]:
+        """Controller for queueing a large prediction batch as a background job"""
+        print("Submit Job Controller")
+
+        try:
+            return await self.job_queue.submit(request.coordinates, request.mode, request.ensemble)
+        except Exception as e:
+            raise HTTPException(
+                status_code=503,
+                detail=f"Job store unavailable: {str(e)}"
+            )
+
+    async def _store_job_result(self, result: PredictionResult):
+        """Cache a finished job's result alongside synchronous results"""
+        await self.result_store.put(result.result_id, result)
+
+    async def stats_controller(self) -> Dict[str, Any]:
+        """Controller for cache and store metrics"""
+        return {
+            "result_store": self.result_store.stats(),
+            "prediction_cache": prediction_cache.stats(),
+            "single_flight": self.single_flight.stats(),
+            "job_queue": self.job_queue.stats(),
+            "batcher": prediction_batcher.stats(),
+            "parse_failures": parse_stats(),
+            "resilience": resilience_stats(),
+            "geocode_cache": geocode_cache.stats(),
+            "historical": historical_store.stats(),
+            "historical_retrieval": historical_retriever.stats(),
+            "baseline": baseline_model.stats(),
+            "risk_grid": risk_grid.stats(),
+            "road_graph": road_graph.stats(),
+            "evacuation_router": evacuation_router.stats(),
+            "evacuation_flow": evacuation_flow.stats(),
+            "hazard_spread": spread_simulator.stats(),
+            "ensemble": ensemble_forecaster.stats(),
+            "population_exposure": population_exposure.stats(),
+            "sensors": sensor_ingestor.stats(),
+            "alerts": alert_hub.stats()
+        }
 
 # Create controller instance
 prediction_controller = PredictionController()
\ No newline at end of file
@@ -0,0 +1,96 @@
+import json
+import asyncio
+import time
+import hashlib
+from typing import Optional
+from fastapi import HTTPException, Response
+
+from src.services.risk_grid import risk_grid, RISK_TILE_MAX_AGE, RISK_TILE_MAX_ZOOM
+from src.services.population_exposure import population_exposure
+
+class RiskController:
+    def __init__(self):
+        self.grid = risk_grid
+
+    def _require_grid(self):
+        if not self.grid.loaded:
+            raise HTTPException(
+                status_code=503,
+                detail="Risk grid unavailable. Historical disaster data has not been loaded."
+            )
+
+    async def _cached_response(self, etag: str, if_none_match: Optional[str], build) -> Response:
+        """304 when the client already holds this version, otherwise the body from `build` (run off the event loop)"""
+        headers = {
+            "ETag": etag,
+            "Cache-Control": f"public, max-age={RISK_TILE_MAX_AGE}"
+        }
+        if if_none_match and etag in [tag.strip() for tag in if_none_match.split(",")]:
+            return Response(status_code=304, headers=headers)
+        content, media_type = await asyncio.to_thread(build)
+        return Response(content=content, media_type=media_type, headers=headers)
+
+    async def tile_controller(self, z: int, x: int, y: int, if_none_match: Optional[str]) -> Response:
+        """Controller for XYZ risk tiles"""
+        self._require_grid()
+        if not 0 <= z <= RISK_TILE_MAX_ZOOM or not (0 <= x < 2 ** z and 0 <= y < 2 ** z):
+            raise HTTPException(status_code=404, detail="Tile out of range")
+
+        etag = f'"{self.grid.version}-{z}-{x}-{y}"'
+        return await self._cached_response(etag, if_none_match, lambda: (self.grid.tile(z, x, y), "image/png"))
+
+    async def bbox_controller(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float,
+                              if_none_match: Optional[str]) -> Response:
+        """Controller for raw risk cells inside a bounding box"""
+        self._require_grid()
+        if min_lon > max_lon:
+            raise HTTPException(
+                status_code=400,
+                detail="Bounding boxes crossing the antimeridian are not supported; request each side of 180° separately"
+            )
+        if min_lat >= max_lat or min_lon >= max_lon:
+            raise HTTPException(status_code=400, detail="Bounding box minimums must be below maximums")
+
+        key = f"{self.grid.version}:{min_lat}:{min_lon}:{max_lat}:{max_lon}"
+        etag = f'"{hashlib.sha256(key.encode("utf-8")).hexdigest()[:24]}"'
+
+        def build():
+            try:
+                cells = self.grid.bbox(min_lat, min_lon, max_lat, max_lon)
+            except ValueError as e:
+                raise HTTPException(status_code=413, detail=str(e))
+            return json.dumps(cells, separators=(",", ":")), "application/json"
+
+        return await self._cached_response(etag, if_none_match, build)
+
+    async def meta_controller(self) -> dict:
+        """Controller for grid metadata and the hazard legend"""
+        return self.grid.metadata()
+
+    async def exposure_controller(self, latitude: Optional[float], longitude: Optional[float], radius_km: Optional[float],
+                                  bbox: Optional[tuple]) -> dict:
+        """Controller for the population living within a radius or bounding box"""
+        if not population_exposure.tiles:
+            raise HTTPException(
+                status_code=503,
+                detail="Population exposure unavailable. No population raster is loaded (set POPULATION_RASTER_DIR)."
+            )
+        started = time.perf_counter()
+        if latitude is not None and longitude is not None and radius_km is not None:
+            covered = population_exposure.covers(latitude, longitude)
+            population = population_exposure.circle(latitude, longitude, radius_km)
+        elif bbox is not None and all(v is not None for v in bbox):
+            if bbox[0] >= bbox[2] or bbox[1] >= bbox[3]:
+                raise HTTPException(status_code=400, detail="Bounding box minimums must be below maximums")
+            covered = population_exposure.covers_box(*bbox)
+            population = population_exposure.box(*bbox)
+        else:
+            raise HTTPException(status_code=400, detail="Provide latitude, longitude and radius_km, or a full bounding box")
+        return {
+            "population": int(round(population)),
+            "fully_covered": covered,
+            "elapsed_ms": round((time.perf_counter() - started) * 1000, 3)
+        }
+
+# Create controller instance
+risk_controller = RiskController()
@@ -0,0 +1,99 @@
+import os
+import json
+import time
+from typing import List
+from fastapi import HTTPException, Request, WebSocket, WebSocketDisconnect
+
+from src.schemas.sensor_schema import SensorIngestResult, SensorState, SensorAlert
+from src.services.sensor_ingest import sensor_ingestor
+
+# Parsed NDJSON readings applied per batch while a chunked upload is still arriving
+SENSOR_PARSE_BATCH = int(os.getenv("SENSOR_PARSE_BATCH", "5000"))
+SENSOR_MAX_LINE_BYTES = int(os.getenv("SENSOR_MAX_LINE_BYTES", str(4 * 1024 * 1024)))
+
+class SensorController:
+    def __init__(self):
+        self.ingestor = sensor_ingestor
+
+    async def ingest_controller(self, request: Request) -> SensorIngestResult:
+        """Controller for a chunked NDJSON upload: one reading (or frame of readings) per line"""
+        started = time.perf_counter()
+        totals = {"accepted": 0, "rejected": 0, "crossed": 0}
+        cells: List[str] = []
+        errors: List[str] = []
+        rows: list = []
+
+        def apply(frame):
+            result = self.ingestor.ingest(frame)
+            for key in totals:
+                totals[key] += result[key]
+            cells.extend(result["cells"])
+
+        def parse(line: bytes, number: int):
+            if not line.strip():
+                return
+            try:
+                frame = json.loads(line)
+                if isinstance(frame, dict) and not isinstance(frame.get("sensor_id"), list):
+                    rows.append(frame)
+                    return
+                if rows:
+                    apply(rows[:])
+                    rows.clear()
+                apply(frame)
+            except ValueError as e:
+                totals["rejected"] += 1
+                if len(errors) < 10:
+                    errors.append(f"line {number}: {e}")
+
+        buffer = b""
+        number = 0
+        async for chunk in request.stream():
+            buffer += chunk
+            *lines, buffer = buffer.split(b"\n")
+            if len(buffer) > SENSOR_MAX_LINE_BYTES:
+                raise HTTPException(status_code=400, detail=f"Line {number + len(lines) + 1} exceeds {SENSOR_MAX_LINE_BYTES} bytes")
+            for line in lines:
+                number += 1
+                parse(line, number)
+                if len(rows) >= SENSOR_PARSE_BATCH:
+                    apply(rows[:])
+                    rows.clear()
+        parse(buffer, number + 1)
+        if rows:
+            apply(rows)
+
+        return SensorIngestResult(
+            **totals,
+            repredicted_cells=cells,
+            errors=errors,
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+    async def stream_controller(self, websocket: WebSocket):
+        """Controller for the ingest WebSocket: each text frame is applied and acknowledged"""
+        await websocket.accept()
+        try:
+            while True:
+                message = await websocket.receive_text()
+                try:
+                    result = self.ingestor.ingest(json.loads(message))
+                except ValueError as e:
+                    await websocket.send_json({"error": str(e)})
+                    continue
+                await websocket.send_json(result)
+        except WebSocketDisconnect:
+            pass
+
+    async def sensor_controller(self, sensor_id: str) -> SensorState:
+        """Controller for one sensor's rolling window and alert state"""
+        state = self.ingestor.sensor(sensor_id)
+        if state is None:
+            raise HTTPException(status_code=404, detail="Sensor not found. It registers with its first reading.")
+        return SensorState(**state)
+
+    async def alerts_controller(self) -> List[SensorAlert]:
+        """Controller for the most recent threshold crossings, newest first"""
+        return [SensorAlert(**alert) for alert in reversed(self.ingestor.recent)]
+
+sensor_controller = SensorController()
@@ -0,0 +1,53 @@
+import time
+import asyncio
+from fastapi import HTTPException
+
+from src.schemas.simulation_schema import SpreadRequest, SpreadResult, SpreadBatchRequest, SpreadBatchResult
+from src.services.hazard_spread import spread_simulator, hazard_model
+
+class SimulationController:
+    def __init__(self):
+        self.simulator = spread_simulator
+
+    @staticmethod
+    def _result(result: dict) -> SpreadResult:
+        if result["terrain_source"] == "synthetic":
+            result["warnings"] = ["⚠️ No elevation raster covers this area; spread ran over synthetic terrain"]
+        return SpreadResult(**result)
+
+    async def spread_controller(self, request: SpreadRequest) -> SpreadResult:
+        """Controller for simulating how a predicted hazard spreads over time"""
+        print("Hazard Spread Controller")
+        if hazard_model(request.hazard) is None:
+            raise HTTPException(
+                status_code=400,
+                detail=f"No spread model for '{request.hazard}'. Supported: flood, wildfire, heat wave."
+            )
+        try:
+            result = await asyncio.to_thread(self.simulator.run, request.model_dump())
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Spread simulation failed: {str(e)}"
+            )
+        return self._result(result)
+
+    async def batch_controller(self, request: SpreadBatchRequest) -> SpreadBatchResult:
+        """Controller for running many spread scenarios in parallel worker processes"""
+        print("Hazard Spread Batch Controller")
+        started = time.perf_counter()
+        scenarios = [scenario.model_dump() for scenario in request.scenarios]
+        try:
+            results = await asyncio.to_thread(self.simulator.run_many, scenarios)
+        except Exception as e:
+            raise HTTPException(
+                status_code=500,
+                detail=f"Spread simulation failed: {str(e)}"
+            )
+        return SpreadBatchResult(
+            results=[None if "error" in result else self._result(result) for result in results],
+            errors=[result.get("error") for result in results],
+            elapsed_ms=round((time.perf_counter() - started) * 1000, 1)
+        )
+
+simulation_controller = SimulationController()
@@ -1,10 +1,58 @@
+import asyncio
+from contextlib import asynccontextmanager
 from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 from src.routes import auth_routes
 from src.routes import prediction_routes
+from src.routes import risk_routes
+from src.routes import evacuation_routes
+from src.routes import simulation_routes
+from src.routes import sensor_routes
+from src.routes import alert_routes
 from src.config.db import client
+from src.services.disaster_prediction import warm_up
+from src.services.http_clients import close_http_clients
+from src.services.offline_geocoder import load_offline_geocoder
+from src.services.historical_data import load_historical_data
+from src.services.historical_retrieval import build_historical_retrieval
+from src.services.baseline_model import build_baseline_model
+from src.services.risk_grid import load_risk_grid
+from src.services.road_graph import load_road_graph
+from src.services.evacuation_flow import evacuation_flow
+from src.services.hazard_spread import load_terrain_rasters, spread_simulator
+from src.services.population_exposure import load_population_exposure
+from src.services.result_store import result_store
+from src.services.sensor_ingest import sensor_ingestor
+from src.services.alert_hub import alert_hub
+from src.controllers.prediction_controller import prediction_controller
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # Load local indexes, build the LLM chain and open pooled connections before serving traffic
+    await asyncio.to_thread(load_offline_geocoder)
+    await asyncio.to_thread(load_historical_data)
+    await asyncio.to_thread(build_historical_retrieval)
+    await asyncio.to_thread(build_baseline_model)
+    await asyncio.to_thread(load_risk_grid)
+    await asyncio.to_thread(load_road_graph)
+    await asyncio.to_thread(load_terrain_rasters)
+    await asyncio.to_thread(load_population_exposure)
+    # Worker pools start their processes from a forkserver, never by forking this process
+    spread_simulator.start()
+    evacuation_flow.start()
+    await warm_up()
+    await result_store.ensure_indexes()
+    await prediction_controller.job_queue.start()
+    await sensor_ingestor.start(prediction_controller.repredict_cell)
+    yield
+    await alert_hub.close()
+    await sensor_ingestor.stop()
+    await prediction_controller.job_queue.stop()
+    evacuation_flow.close()
+    spread_simulator.close()
+    await close_http_clients()
+
+app = FastAPI(lifespan=lifespan)
 
 
 app.add_middleware(
@@ -18,6 +66,11 @@ app.add_middleware(
 
 app.include_router(auth_routes.router)
 app.include_router(prediction_routes.router)
+app.include_router(risk_routes.router)
+app.include_router(evacuation_routes.router)
+app.include_router(simulation_routes.router)
+app.include_router(sensor_routes.router)
+app.include_router(alert_routes.router)
 
 print(client)
 
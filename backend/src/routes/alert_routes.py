@@ -0,0 +1,10 @@
+from fastapi import APIRouter, WebSocket, Query
+from typing import Literal
+from src.controllers.alert_controller import alert_controller
+
+router = APIRouter(prefix="/alerts", tags=["Alerts"])
+
+@router.websocket("/subscribe")
+async def call_subscribe(websocket: WebSocket, detail: Literal["summary", "full"] = Query("summary")):
+    """Endpoint for pushed prediction and sensor alerts inside subscribed bounding boxes or polygons"""
+    await alert_controller.subscribe_controller(websocket, detail)
@@ -0,0 +1,20 @@
+from fastapi import APIRouter
+from src.schemas.evacuation_schema import EvacuationFlowRequest, EvacuationFlowResult, RoadClosureRequest
+from src.controllers.evacuation_controller import evacuation_controller
+
+router = APIRouter(prefix="/evacuation", tags=["Evacuation Planning"])
+
+@router.post("/plan", response_model=EvacuationFlowResult)
+async def call_plan(request: EvacuationFlowRequest):
+    """Endpoint for assigning population cells to shelters and roads under capacity limits"""
+    return await evacuation_controller.plan_controller(request)
+
+@router.post("/plan/{plan_id}/closures", response_model=EvacuationFlowResult)
+async def call_closures(plan_id: str, request: RoadClosureRequest):
+    """Endpoint for closing roads in a solved plan; only cells routed over them are re-solved"""
+    return await evacuation_controller.closures_controller(plan_id, request)
+
+@router.get("/plan/{plan_id}", response_model=EvacuationFlowResult)
+async def call_getplan(plan_id: str):
+    """Endpoint for retrieving a solved plan"""
+    return await evacuation_controller.getplan_controller(plan_id)
@@ -1,5 +1,12 @@
 from fastapi import APIRouter, Request, Response, HTTPException
-from src.schemas.prediction_schema import DisasterPredictionRequest, PredictionResult
+from fastapi.responses import StreamingResponse
+from src.schemas.prediction_schema import (
+    DisasterPredictionRequest,
+    PredictionResult,
+    JobSubmission,
+    AreaPredictionRequest,
+    AreaPredictionResult
+)
 from src.controllers.prediction_controller import prediction_controller
 
 router = APIRouter(prefix="/disaster", tags=["Disaster Prediction"])
@@ -9,7 +16,30 @@ async def call_predictdisaster(request: DisasterPredictionRequest):
     """Endpoint for disaster prediction"""
     return await prediction_controller.predictdisaster_controller(request)
 
+@router.post("/predictdisaster/stream")
+async def call_streampredictdisaster(request: DisasterPredictionRequest):
+    """Endpoint for disaster prediction streamed as NDJSON, one line per completed coordinate"""
+    return StreamingResponse(
+        prediction_controller.stream_predictdisaster_controller(request),
+        media_type="application/x-ndjson"
+    )
+
+@router.post("/predictarea", response_model=AreaPredictionResult)
+async def call_predictarea(request: AreaPredictionRequest):
+    """Endpoint for predicting a bounding box or GeoJSON polygon under a sampling budget"""
+    return await prediction_controller.predictarea_controller(request)
+
+@router.post("/jobs", response_model=JobSubmission, status_code=202)
+async def call_submitjob(request: DisasterPredictionRequest):
+    """Endpoint for queueing a large batch; poll /disaster/result/{job_id} for progress"""
+    return await prediction_controller.submitjob_controller(request)
+
 @router.get("/result/{result_id}", response_model=PredictionResult)
 async def call_getresult(result_id: str):
-    """Endpoint for retrieving cached results"""
-    return await prediction_controller.getresult_controller(result_id)
\ No newline at end of file
+    """Endpoint for retrieving cached results and background job progress"""
+    return await prediction_controller.getresult_controller(result_id)
+
+@router.get("/stats")
+async def call_getstats():
+    """Endpoint for cache and result store metrics"""
+    return await prediction_controller.stats_controller()
@@ -0,0 +1,39 @@
+from fastapi import APIRouter, Header, Query
+from typing import Optional
+from src.controllers.risk_controller import risk_controller
+
+router = APIRouter(prefix="/risk", tags=["Risk Grid"])
+
+@router.get("/tiles/{z}/{x}/{y}.png")
+async def call_gettile(z: int, x: int, y: int, if_none_match: Optional[str] = Header(None)):
+    """Endpoint for XYZ (Web Mercator) heatmap tiles of the precomputed risk grid"""
+    return await risk_controller.tile_controller(z, x, y, if_none_match)
+
+@router.get("/grid")
+async def call_getgrid(
+    min_lat: float = Query(..., ge=-90, le=90),
+    min_lon: float = Query(..., ge=-180, le=180),
+    max_lat: float = Query(..., ge=-90, le=90),
+    max_lon: float = Query(..., ge=-180, le=180),
+    if_none_match: Optional[str] = Header(None)
+):
+    """Endpoint for raw risk and dominant-hazard cells inside a bounding box"""
+    return await risk_controller.bbox_controller(min_lat, min_lon, max_lat, max_lon, if_none_match)
+
+@router.get("/meta")
+async def call_getmeta():
+    """Endpoint for risk grid version, resolution and hazard legend"""
+    return await risk_controller.meta_controller()
+
+@router.get("/exposure")
+async def call_getexposure(
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    min_lat: Optional[float] = Query(None, ge=-90, le=90),
+    min_lon: Optional[float] = Query(None, ge=-180, le=180),
+    max_lat: Optional[float] = Query(None, ge=-90, le=90),
+    max_lon: Optional[float] = Query(None, ge=-180, le=180)
+):
+    """Endpoint for the population living within a radius of a point or inside a bounding box"""
+    return await risk_controller.exposure_controller(latitude, longitude, radius_km, (min_lat, min_lon, max_lat, max_lon))
@@ -0,0 +1,26 @@
+from fastapi import APIRouter, Request, WebSocket
+from typing import List
+from src.schemas.sensor_schema import SensorIngestResult, SensorState, SensorAlert
+from src.controllers.sensor_controller import sensor_controller
+
+router = APIRouter(prefix="/sensors", tags=["Sensor Ingestion"])
+
+@router.post("/ingest", response_model=SensorIngestResult)
+async def call_ingest(request: Request):
+    """Endpoint for streaming sensor readings as chunked NDJSON"""
+    return await sensor_controller.ingest_controller(request)
+
+@router.websocket("/stream")
+async def call_stream(websocket: WebSocket):
+    """Endpoint for pushing sensor reading frames over a WebSocket"""
+    await sensor_controller.stream_controller(websocket)
+
+@router.get("/alerts", response_model=List[SensorAlert])
+async def call_alerts():
+    """Endpoint for recent sensor threshold crossings"""
+    return await sensor_controller.alerts_controller()
+
+@router.get("/{sensor_id}", response_model=SensorState)
+async def call_sensor(sensor_id: str):
+    """Endpoint for a sensor's rolling window aggregates"""
+    return await sensor_controller.sensor_controller(sensor_id)
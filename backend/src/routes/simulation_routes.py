@@ -0,0 +1,15 @@
+from fastapi import APIRouter
+from src.schemas.simulation_schema import SpreadRequest, SpreadResult, SpreadBatchRequest, SpreadBatchResult
+from src.controllers.simulation_controller import simulation_controller
+
+router = APIRouter(prefix="/simulation", tags=["Hazard Simulation"])
+
+@router.post("/spread", response_model=SpreadResult)
+async def call_spread(request: SpreadRequest):
+    """Endpoint for time-sliced footprints of a flood, wildfire or heat wave spreading from a point"""
+    return await simulation_controller.spread_controller(request)
+
+@router.post("/spread/batch", response_model=SpreadBatchResult)
+async def call_spread_batch(request: SpreadBatchRequest):
+    """Endpoint for running many spread scenarios in parallel"""
+    return await simulation_controller.batch_controller(request)
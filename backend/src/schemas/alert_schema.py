@@ -0,0 +1,17 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional, Dict, Any, Literal
+
+class AlertSubscription(BaseModel):
+    """Client message on the alert WebSocket"""
+    action: Literal["subscribe", "unsubscribe"]
+    id: Optional[str] = Field(None, max_length=64, description="Region name; subscribing again under it replaces the region")
+    bbox: Optional[List[float]] = Field(None, min_length=4, max_length=4, description="min_lat, min_lon, max_lat, max_lon")
+    polygon: Optional[Dict[str, Any]] = Field(None, description="GeoJSON Polygon, MultiPolygon or Feature")
+
+    @model_validator(mode="after")
+    def check_region(self):
+        if self.action == "subscribe" and (self.bbox is None) == (self.polygon is None):
+            raise ValueError("subscribe needs exactly one of bbox or polygon")
+        if self.action == "unsubscribe" and self.id is None:
+            raise ValueError("unsubscribe needs the region id")
+        return self
@@ -0,0 +1,66 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+from src.schemas.prediction_schema import BottleneckEdge
+
+class HazardZone(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    severity: Optional[str] = Field(None, description="Sets the zone radius when radius_km is omitted")
+    radius_km: Optional[float] = Field(None, gt=0, le=100)
+    evacuees: int = Field(0, ge=0, description="People to evacuate; spread over the zone when no cells are given")
+
+class PopulationCell(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    population: int = Field(..., ge=0)
+
+class EvacuationFlowRequest(BaseModel):
+    hazards: List[HazardZone] = Field(..., min_length=1)
+    cells: Optional[List[PopulationCell]] = Field(None, description="Explicit population cells; cells outside every zone are ignored")
+
+    @model_validator(mode="after")
+    def check_demand(self):
+        if self.cells is None and not any(h.evacuees for h in self.hazards):
+            raise ValueError("provide population cells or evacuees for at least one hazard")
+        return self
+
+class RoadClosure(BaseModel):
+    latitude: float = Field(..., ge=-90, le=90)
+    longitude: float = Field(..., ge=-180, le=180)
+    radius_m: float = Field(50, gt=0, le=5000, description="Every road segment touching this circle is closed")
+
+class RoadClosureRequest(BaseModel):
+    closures: List[RoadClosure] = Field(..., min_length=1)
+
+class ShelterLoad(BaseModel):
+    name: str
+    kind: str
+    latitude: Optional[float] = None
+    longitude: Optional[float] = None
+    capacity: Optional[int] = Field(None, description="None for the unbounded hazard zone perimeter")
+    assigned: int
+
+class CellAssignment(BaseModel):
+    latitude: float
+    longitude: float
+    population: int
+    shelter: Optional[int] = Field(None, description="Index into shelters; None when no route exists")
+    travel_time_min: Optional[float] = None
+    clearance_time_min: Optional[float] = None
+
+class EvacuationFlowResult(BaseModel):
+    plan_id: str
+    timestamp: str
+    evacuees: int
+    assigned_evacuees: int
+    unassigned_evacuees: int
+    clearance_time_min: float
+    iterations: int
+    components: int
+    closed_edges: int
+    rerouted_cells: int
+    solve_ms: float
+    shelters: List[ShelterLoad]
+    bottlenecks: List[BottleneckEdge]
+    cells: List[CellAssignment]
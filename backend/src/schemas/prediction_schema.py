@@ -1,5 +1,5 @@
-from pydantic import BaseModel, Field
-from typing import List, Optional, Dict, Any
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional, Dict, Any, Literal
 from datetime import datetime
 
 class CoordinateRequest(BaseModel):
@@ -8,6 +8,32 @@ class CoordinateRequest(BaseModel):
 
 class DisasterPredictionRequest(BaseModel):
     coordinates: List[CoordinateRequest] = Field(..., min_items=1, description="List of coordinates")
+    mode: Literal["fast", "llm", "hybrid"] = Field("llm", description="fast: statistical baseline only; llm: full LLM prediction; hybrid: baseline figures with LLM narrative")
+    ensemble: bool = Field(False, description="Add P10/P50/P90 bands from a seeded Monte Carlo ensemble around each prediction")
+
+class BoundingBox(BaseModel):
+    min_lat: float = Field(..., ge=-90, le=90)
+    min_lon: float = Field(..., ge=-180, le=180)
+    max_lat: float = Field(..., ge=-90, le=90)
+    max_lon: float = Field(..., ge=-180, le=180)
+
+    @model_validator(mode="after")
+    def check_order(self):
+        if self.min_lat >= self.max_lat or self.min_lon >= self.max_lon:
+            raise ValueError("bbox minimums must be below maximums")
+        return self
+
+class AreaPredictionRequest(BaseModel):
+    bbox: Optional[BoundingBox] = Field(None, description="Area as a bounding box")
+    polygon: Optional[Dict[str, Any]] = Field(None, description="Area as a GeoJSON Polygon, MultiPolygon or Feature")
+    budget: int = Field(25, ge=1, le=500, description="Maximum number of distinct cells predicted")
+    mode: Literal["fast", "llm", "hybrid"] = Field("llm", description="Prediction mode used for every sample")
+
+    @model_validator(mode="after")
+    def check_area(self):
+        if (self.bbox is None) == (self.polygon is None):
+            raise ValueError("provide exactly one of bbox or polygon")
+        return self
 
 class DisasterDetails(BaseModel):
     description: str
@@ -26,6 +52,52 @@ class EvacuationPlan(BaseModel):
     emergency_contacts: List[str]
     essential_supplies: List[str]
 
+class EvacuationRoute(BaseModel):
+    rank: int
+    assembly_point: str
+    assembly_kind: str
+    assembly_latitude: float
+    assembly_longitude: float
+    distance_km: float
+    travel_time_min: float
+    population_cells: int = Field(..., description="Population cells in the hazard zone whose best route ends here")
+    population: Optional[int] = Field(None, description="People living in those cells, where a population raster covers the zone")
+    path: List[List[float]] = Field(..., description="Route geometry as [latitude, longitude] pairs")
+
+class BottleneckEdge(BaseModel):
+    latitude: float
+    longitude: float
+    highway: str
+    lanes: int
+    vehicles: float
+    capacity_vph: float
+    clearance_min: float = Field(..., description="Time for the assigned vehicles to pass at capacity")
+
+class EvacuationClearance(BaseModel):
+    clearance_time_min: Optional[float] = Field(None, description="None when no evacuee has a route out")
+    assigned_evacuees: int
+    sheltered_evacuees: int
+    shelter_capacity: int
+    bottleneck: Optional[BottleneckEdge] = None
+
+class PopulationExposure(BaseModel):
+    radius_km: float
+    population: int = Field(..., description="People living within radius_km, from the population raster")
+
+class PercentileBand(BaseModel):
+    p10: float
+    p50: float
+    p90: float
+
+class EnsembleForecast(BaseModel):
+    members: int
+    seed: int
+    affected_population: PercentileBand
+    evacuations: PercentileBand
+    duration_days: PercentileBand
+    spread_simulations: int = Field(..., description="Perturbed hazard spread runs behind the members; 0 when the hazard has no spread model")
+    history_events: int = Field(..., description="Local historical events the impact spread was fitted to; 0 means default spreads")
+
 class DisasterPredictionResponse(BaseModel):
     disaster_name: str
     severity: str
@@ -42,11 +114,45 @@ class DisasterPredictionResponse(BaseModel):
     evacuation_plan: EvacuationPlan
     warnings: Optional[List[str]] = None
     error: Optional[str] = None
+    source: Optional[str] = None
+    optimized_routes: Optional[List[EvacuationRoute]] = None
+    evacuation_clearance: Optional[EvacuationClearance] = None
+    ensemble: Optional[EnsembleForecast] = None
+    population_exposure: Optional[PopulationExposure] = None
 
 class PredictionResult(BaseModel):
     predictions: List[DisasterPredictionResponse]
     timestamp: str
     total_locations: int
+    result_id: Optional[str] = None
+    status: Optional[str] = None
+    completed_locations: Optional[int] = None
+
+class AreaSample(BaseModel):
+    latitude: float
+    longitude: float
+    prediction_index: int
+
+class AreaSummary(BaseModel):
+    hazard_share: Dict[str, float]
+    severity_share: Dict[str, float]
+    dominant_hazard: Optional[str]
+    worst_case: Optional[DisasterPredictionResponse]
+    max_affected_population: int
+
+class AreaPredictionResult(BaseModel):
+    predictions: List[DisasterPredictionResponse]
+    samples: List[AreaSample]
+    summary: AreaSummary
+    timestamp: str
+    budget: int
+    cells_predicted: int
+    refinement_rounds: int
+
+class JobSubmission(BaseModel):
+    job_id: str
+    status: str
+    total_locations: int
 
 class ErrorResponse(BaseModel):
     error: str
@@ -0,0 +1,35 @@
+from pydantic import BaseModel, Field
+from typing import List, Optional
+
+class SensorIngestResult(BaseModel):
+    accepted: int
+    rejected: int = Field(..., description="Readings with an unknown sensor, missing kind/location or a non-numeric value")
+    crossed: int = Field(..., description="Sensors whose rolling aggregate newly crossed their threshold")
+    repredicted_cells: List[str] = Field(..., description="Prediction cache cells scheduled for re-prediction")
+    errors: List[str] = Field(default_factory=list, description="First few malformed lines")
+    elapsed_ms: float
+
+class SensorState(BaseModel):
+    sensor_id: str
+    kind: str
+    unit: str
+    latitude: float
+    longitude: float
+    cell: str
+    readings: int = Field(..., description="Readings currently in the rolling window")
+    last_value: Optional[float] = None
+    last_ts: Optional[float] = None
+    sum: float
+    mean: Optional[float] = None
+    std: Optional[float] = None
+    min: Optional[float] = None
+    max: Optional[float] = None
+    aggregate: str = Field(..., description="Aggregate the threshold applies to: sum or mean")
+    threshold: float
+    alerting: bool
+
+class SensorAlert(BaseModel):
+    cell: str
+    sensors: List[str]
+    notes: List[str]
+    at: str
@@ -0,0 +1,55 @@
+from pydantic import BaseModel, Field, model_validator
+from typing import List, Optional
+
+class SpreadRequest(BaseModel):
+    hazard: str = Field(..., description="Predicted disaster, e.g. 'Flood', 'Wildfire' or 'Heat Wave'")
+    severity: str = Field("High", description="Low, Moderate, High, Severe or Catastrophic")
+    latitude: float = Field(..., ge=-90, le=90, description="Where the hazard starts")
+    longitude: float = Field(..., ge=-180, le=180)
+    bbox: List[float] = Field(..., min_length=4, max_length=4, description="min_lat, min_lon, max_lat, max_lon")
+    grid_size: int = Field(256, ge=16, le=4096, description="Cells per side of the simulation grid")
+    hours: float = Field(24, gt=0, le=168)
+    slices: int = Field(6, ge=1, le=48, description="Footprints returned, evenly spaced over the run")
+    wind_speed_kmh: float = Field(15, ge=0, le=200)
+    wind_direction_deg: float = Field(90, ge=0, lt=360, description="Direction the wind blows towards")
+    seed: int = Field(0, description="Seed for the stochastic fire model")
+    images: bool = Field(True, description="Include a base64 PNG mask per slice")
+
+    @model_validator(mode="after")
+    def check_bbox(self):
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lon < max_lon <= 180):
+            raise ValueError("bbox must be min_lat, min_lon, max_lat, max_lon with min < max")
+        if not (min_lat <= self.latitude <= max_lat and min_lon <= self.longitude <= max_lon):
+            raise ValueError("the hazard origin must lie inside bbox")
+        return self
+
+class SpreadBatchRequest(BaseModel):
+    scenarios: List[SpreadRequest] = Field(..., min_length=1, max_length=64)
+
+class SpreadSlice(BaseModel):
+    hour: float
+    cells: int
+    area_km2: float
+    max_intensity: float
+    mean_intensity: float
+    population: Optional[int] = Field(None, description="People living under the footprint, when a population raster covers it")
+    bounds: Optional[List[float]] = Field(None, description="Footprint extent: min_lat, min_lon, max_lat, max_lon")
+    image: Optional[str] = Field(None, description="Base64 PNG, north up; brighter pixels are more intense")
+
+class SpreadResult(BaseModel):
+    hazard: str
+    model: str
+    severity: str
+    terrain_source: str
+    grid_size: int
+    cell_size_m: float
+    intensity_unit: str
+    slices: List[SpreadSlice]
+    elapsed_ms: float
+    warnings: Optional[List[str]] = None
+
+class SpreadBatchResult(BaseModel):
+    results: List[Optional[SpreadResult]]
+    errors: List[Optional[str]]
+    elapsed_ms: float
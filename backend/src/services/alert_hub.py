@@ -0,0 +1,310 @@
+import os
+import json
+import math
+import asyncio
+from typing import Callable, Dict, List, Optional, Set, Tuple
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.ttl_cache import TTLCache
+from src.services.prediction_cache import prediction_cache, PREDICTION_CACHE_TTL
+from src.services.area_sampler import polygon_rings, polygon_bbox, points_in_polygon
+
+# --- CONFIGURATION ---
+ALERT_MAX_CONNECTIONS = int(os.getenv("ALERT_MAX_CONNECTIONS", "10000"))
+ALERT_MAX_REGIONS = int(os.getenv("ALERT_MAX_REGIONS", "32"))
+# Messages buffered per connection; a slow consumer loses its oldest ones first
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "64"))
+# A connection is closed once it has lost this many messages or a single send stalls this long
+ALERT_MAX_DROPPED = int(os.getenv("ALERT_MAX_DROPPED", "256"))
+ALERT_SEND_TIMEOUT = float(os.getenv("ALERT_SEND_TIMEOUT", "10"))
+# Spatial index buckets are ALERT_INDEX_DEG degrees square; regions spanning more than
+# ALERT_INDEX_MAX_BUCKETS buckets are kept in a short list checked for every update
+ALERT_INDEX_DEG = float(os.getenv("ALERT_INDEX_DEG", "1.0"))
+ALERT_INDEX_MAX_BUCKETS = int(os.getenv("ALERT_INDEX_MAX_BUCKETS", "1024"))
+ALERT_STATE_SIZE = int(os.getenv("ALERT_STATE_SIZE", "100000"))
+# Also push re-predictions whose hazard and severity did not change
+ALERT_PUSH_UNCHANGED = os.getenv("ALERT_PUSH_UNCHANGED", "false").lower() == "true"
+
+# WebSocket close code for "try again later", used for capacity and slow-consumer closes
+CLOSE_TRY_AGAIN = 1013
+
+
+class Region:
+    """One subscribed bounding box or polygon of a connection"""
+
+    __slots__ = ("subscriber", "region_id", "bbox", "rings", "buckets")
+
+    def __init__(self, subscriber: "Subscriber", region_id: str, bbox: Tuple[float, float, float, float], rings=None):
+        self.subscriber = subscriber
+        self.region_id = region_id
+        self.bbox = bbox
+        self.rings = rings
+        self.buckets: List[Tuple[int, int]] = []
+
+    def contains(self, latitude: float, longitude: float) -> bool:
+        min_lat, min_lon, max_lat, max_lon = self.bbox
+        if not min_lat <= latitude <= max_lat:
+            return False
+        if min_lon <= max_lon:
+            if not min_lon <= longitude <= max_lon:
+                return False
+        elif max_lon < longitude < min_lon:
+            # Box crossing the antimeridian
+            return False
+        return self.rings is None or bool(points_in_polygon([(latitude, longitude)], self.rings)[0])
+
+
+class Subscriber:
+    """A connected client: its regions and a bounded queue of pre-serialised messages"""
+
+    __slots__ = ("websocket", "detail", "queue", "regions", "writer", "dropped", "overflow", "sent", "closing")
+
+    def __init__(self, websocket, detail: str):
+        self.websocket = websocket
+        self.detail = detail
+        self.queue: asyncio.Queue = asyncio.Queue(ALERT_QUEUE_SIZE)
+        self.regions: Dict[str, Region] = {}
+        self.writer: Optional[asyncio.Task] = None
+        self.dropped = 0
+        self.overflow = 0
+        self.sent = 0
+        self.closing = False
+
+    def offer(self, text: str) -> bool:
+        """Queue a message, dropping the oldest when full; False once the consumer is too far behind"""
+        if self.queue.full():
+            self.queue.get_nowait()
+            self.dropped += 1
+            self.overflow += 1
+        self.queue.put_nowait(text)
+        return self.dropped <= ALERT_MAX_DROPPED
+
+
+class AlertHub:
+    """Pushes prediction and sensor updates to WebSocket clients subscribed to regions.
+
+    Regions sit in a dict keyed by ALERT_INDEX_DEG buckets, so routing an update costs one
+    lookup plus exact tests against the regions of that bucket. Each update is serialised
+    once per detail level and shared by every recipient; a writer task per connection
+    drains its bounded queue, so one slow client never holds up the others.
+    """
+
+    def __init__(self):
+        self.connections: Set[Subscriber] = set()
+        self.buckets: Dict[Tuple[int, int], Set[Region]] = {}
+        self.wide: Set[Region] = set()
+        # Last pushed (hazard, severity) per prediction cache cell and mode, to detect changes
+        self.state = TTLCache(max_entries=ALERT_STATE_SIZE, ttl=PREDICTION_CACHE_TTL)
+        self.rejected = 0
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.evicted = 0
+        self.timeouts = 0
+
+    @staticmethod
+    def _bucket(latitude: float, longitude: float) -> Tuple[int, int]:
+        return math.floor(latitude / ALERT_INDEX_DEG), math.floor(longitude / ALERT_INDEX_DEG)
+
+    @staticmethod
+    def _bucket_keys(bbox: Tuple[float, float, float, float]) -> Optional[List[Tuple[int, int]]]:
+        """Buckets a box overlaps, or None when there are too many to index"""
+        min_lat, min_lon, max_lat, max_lon = bbox
+        spans = [(min_lon, max_lon)] if min_lon <= max_lon else [(min_lon, 180.0), (-180.0, max_lon)]
+        rows = range(math.floor(min_lat / ALERT_INDEX_DEG), math.floor(max_lat / ALERT_INDEX_DEG) + 1)
+        columns = [c for lo, hi in spans
+                   for c in range(math.floor(lo / ALERT_INDEX_DEG), math.floor(hi / ALERT_INDEX_DEG) + 1)]
+        if len(rows) * len(columns) > ALERT_INDEX_MAX_BUCKETS:
+            return None
+        return [(r, c) for r in rows for c in columns]
+
+    async def connect(self, websocket, detail: str = "summary") -> Optional[Subscriber]:
+        """Accept a connection, or refuse it when the worker is at capacity"""
+        if len(self.connections) >= ALERT_MAX_CONNECTIONS:
+            self.rejected += 1
+            await websocket.close(code=CLOSE_TRY_AGAIN)
+            return None
+        await websocket.accept()
+        subscriber = Subscriber(websocket, detail)
+        subscriber.writer = asyncio.create_task(self._writer(subscriber))
+        self.connections.add(subscriber)
+        return subscriber
+
+    async def disconnect(self, subscriber: Subscriber):
+        for region_id in list(subscriber.regions):
+            self.unsubscribe(subscriber, region_id)
+        self.connections.discard(subscriber)
+        if subscriber.writer is not None:
+            subscriber.writer.cancel()
+            await asyncio.gather(subscriber.writer, return_exceptions=True)
+
+    def subscribe(self, subscriber: Subscriber, region_id: str, bbox: Optional[List[float]] = None,
+                  polygon: Optional[dict] = None) -> Region:
+        """Index a bounding box (min_lat, min_lon, max_lat, max_lon; min_lon > max_lon crosses
+        the antimeridian) or a GeoJSON polygon under region_id, replacing any region of that id"""
+        if region_id not in subscriber.regions and len(subscriber.regions) >= ALERT_MAX_REGIONS:
+            raise ValueError(f"at most {ALERT_MAX_REGIONS} regions per connection")
+        rings = None
+        if polygon is not None:
+            try:
+                rings = polygon_rings(polygon)
+            except (KeyError, IndexError, TypeError) as e:
+                raise ValueError(f"invalid polygon: {e}")
+            bbox = polygon_bbox(rings)
+        min_lat, min_lon, max_lat, max_lon = bbox
+        if not (-90 <= min_lat < max_lat <= 90 and -180 <= min_lon <= 180 and -180 <= max_lon <= 180
+                and min_lon != max_lon):
+            raise ValueError("bbox must be min_lat, min_lon, max_lat, max_lon within range with min_lat < max_lat")
+
+        self.unsubscribe(subscriber, region_id)
+        region = Region(subscriber, region_id, (min_lat, min_lon, max_lat, max_lon), rings)
+        keys = self._bucket_keys(region.bbox)
+        if keys is None:
+            self.wide.add(region)
+        else:
+            region.buckets = keys
+            for key in keys:
+                self.buckets.setdefault(key, set()).add(region)
+        subscriber.regions[region_id] = region
+        return region
+
+    def unsubscribe(self, subscriber: Subscriber, region_id: str) -> bool:
+        region = subscriber.regions.pop(region_id, None)
+        if region is None:
+            return False
+        self.wide.discard(region)
+        for key in region.buckets:
+            bucket = self.buckets.get(key)
+            if bucket is not None:
+                bucket.discard(region)
+                if not bucket:
+                    del self.buckets[key]
+        return True
+
+    def subscribers_at(self, latitude: float, longitude: float) -> Set[Subscriber]:
+        """Connections with at least one region containing the point"""
+        matched = set()
+        for regions in (self.buckets.get(self._bucket(latitude, longitude), ()), self.wide):
+            for region in regions:
+                if region.subscriber not in matched and region.contains(latitude, longitude):
+                    matched.add(region.subscriber)
+        return matched
+
+    def publish(self, latitude: float, longitude: float, summary: dict,
+                details: Optional[Callable[[], dict]] = None) -> int:
+        """Route one update to the connections watching its location; returns the recipients.
+
+        Summary subscribers get `summary`; full subscribers also get the fields of `details()`,
+        built at most once and only if someone asked for them.
+        """
+        self.published += 1
+        matched = self.subscribers_at(latitude, longitude)
+        if not matched:
+            return 0
+        texts: Dict[str, str] = {}
+        for subscriber in matched:
+            text = texts.get(subscriber.detail)
+            if text is None:
+                message = {**summary, **details()} if subscriber.detail == "full" and details else summary
+                text = texts[subscriber.detail] = json.dumps(message, default=str)
+            if subscriber.queue.full():
+                self.dropped += 1
+            if not subscriber.offer(text) and not subscriber.closing:
+                self._evict(subscriber)
+        self.delivered += len(matched)
+        return len(matched)
+
+    def publish_prediction(self, response: DisasterPredictionResponse, mode: str,
+                           notes: Optional[List[str]] = None) -> int:
+        """Push a freshly computed prediction to subscribers when its hazard or severity changed"""
+        key = prediction_cache.cell_key(response.latitude, response.longitude, mode)
+        previous = self.state.get(key)
+        self.state.set(key, (response.disaster_name, response.severity))
+        if previous is None:
+            change = "new"
+        elif previous[0] != response.disaster_name:
+            change = "hazard"
+        elif previous[1] != response.severity:
+            change = "severity"
+        elif notes:
+            change = "sensor"
+        elif ALERT_PUSH_UNCHANGED:
+            change = "unchanged"
+        else:
+            return 0
+
+        summary = {
+            "type": "prediction",
+            "change": change,
+            "cell": prediction_cache.cell(response.latitude, response.longitude),
+            "mode": mode,
+            "latitude": response.latitude,
+            "longitude": response.longitude,
+            "disaster_name": response.disaster_name,
+            "severity": response.severity,
+            "previous": {"disaster_name": previous[0], "severity": previous[1]} if previous else None,
+            "affected_population": response.affected_population,
+            "notes": notes or []
+        }
+        return self.publish(response.latitude, response.longitude, summary,
+                            lambda: {"prediction": response.model_dump(mode="json")})
+
+    def _evict(self, subscriber: Subscriber):
+        """Close a consumer that fell too far behind; its reader loop then disconnects it"""
+        subscriber.closing = True
+        self.evicted += 1
+        if subscriber.writer is not None:
+            subscriber.writer.cancel()
+        asyncio.ensure_future(self._close(subscriber))
+
+    async def _close(self, subscriber: Subscriber, code: int = CLOSE_TRY_AGAIN):
+        try:
+            await asyncio.wait_for(subscriber.websocket.close(code=code), ALERT_SEND_TIMEOUT)
+        except Exception:
+            pass
+
+    async def _writer(self, subscriber: Subscriber):
+        websocket = subscriber.websocket
+        try:
+            while True:
+                text = await subscriber.queue.get()
+                if subscriber.overflow:
+                    # Tell the client it missed updates so it can re-fetch its regions
+                    notice = json.dumps({"type": "overflow", "dropped": subscriber.overflow})
+                    subscriber.overflow = 0
+                    await asyncio.wait_for(websocket.send_text(notice), ALERT_SEND_TIMEOUT)
+                await asyncio.wait_for(websocket.send_text(text), ALERT_SEND_TIMEOUT)
+                subscriber.sent += 1
+        except asyncio.TimeoutError:
+            self.timeouts += 1
+            subscriber.closing = True
+            await self._close(subscriber)
+        except asyncio.CancelledError:
+            raise
+        except Exception:
+            # Client already gone; the reader loop cleans up
+            subscriber.closing = True
+
+    async def close(self):
+        """Close every connection at shutdown"""
+        subscribers = list(self.connections)
+        await asyncio.gather(*(self._close(s, 1001) for s in subscribers), return_exceptions=True)
+        await asyncio.gather(*(self.disconnect(s) for s in subscribers), return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "connections": len(self.connections),
+            "regions": sum(len(s.regions) for s in self.connections),
+            "indexed_buckets": len(self.buckets),
+            "wide_regions": len(self.wide),
+            "rejected_connections": self.rejected,
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "evicted": self.evicted,
+            "send_timeouts": self.timeouts,
+            "tracked_cells": len(self.state)
+        }
+
+
+alert_hub = AlertHub()
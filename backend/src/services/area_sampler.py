@@ -0,0 +1,203 @@
+import os
+import math
+import asyncio
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+
+# --- CONFIGURATION ---
+# Initial coarse grid is AREA_INITIAL_DIVISIONS x AREA_INITIAL_DIVISIONS cells
+AREA_INITIAL_DIVISIONS = int(os.getenv("AREA_INITIAL_DIVISIONS", "2"))
+AREA_MAX_DEPTH = int(os.getenv("AREA_MAX_DEPTH", "8"))
+
+SEVERITY_RANK = {"Low": 1, "Moderate": 2, "High": 3, "Severe": 4, "Catastrophic": 5}
+
+Point = Tuple[float, float]
+Predictor = Callable[[float, float], Awaitable[DisasterPredictionResponse]]
+
+
+def polygon_rings(geometry: dict) -> List[List[np.ndarray]]:
+    """GeoJSON Polygon / MultiPolygon -> list of polygons, each a list of (lon, lat) rings"""
+    kind = geometry.get("type")
+    if kind == "Feature":
+        return polygon_rings(geometry.get("geometry") or {})
+    if kind == "Polygon":
+        polygons = [geometry["coordinates"]]
+    elif kind == "MultiPolygon":
+        polygons = geometry["coordinates"]
+    else:
+        raise ValueError("polygon must be a GeoJSON Polygon or MultiPolygon")
+
+    rings = []
+    for polygon in polygons:
+        parsed = [np.asarray(ring, dtype=np.float64)[:, :2] for ring in polygon if len(ring) >= 4]
+        if not parsed:
+            raise ValueError("polygon rings need at least four positions")
+        rings.append(parsed)
+    return rings
+
+def _in_ring(lons: np.ndarray, lats: np.ndarray, ring: np.ndarray) -> np.ndarray:
+    """Even-odd ray casting, vectorized over points"""
+    inside = np.zeros(len(lons), dtype=bool)
+    x1, y1 = ring[:-1, 0], ring[:-1, 1]
+    x2, y2 = ring[1:, 0], ring[1:, 1]
+    for ax, ay, bx, by in zip(x1, y1, x2, y2):
+        crosses = (ay > lats) != (by > lats)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            x_at = ax + (lats - ay) * (bx - ax) / (by - ay)
+        inside ^= crosses & (lons < x_at)
+    return inside
+
+def points_in_polygon(points: List[Point], rings: List[List[np.ndarray]]) -> np.ndarray:
+    lats = np.asarray([p[0] for p in points], dtype=np.float64)
+    lons = np.asarray([p[1] for p in points], dtype=np.float64)
+    inside = np.zeros(len(points), dtype=bool)
+    for polygon in rings:
+        shell = _in_ring(lons, lats, polygon[0])
+        for hole in polygon[1:]:
+            shell &= ~_in_ring(lons, lats, hole)
+        inside |= shell
+    return inside
+
+def polygon_bbox(rings: List[List[np.ndarray]]) -> Tuple[float, float, float, float]:
+    shells = np.concatenate([polygon[0] for polygon in rings])
+    return float(shells[:, 1].min()), float(shells[:, 0].min()), float(shells[:, 1].max()), float(shells[:, 0].max())
+
+
+class AdaptiveAreaSampler:
+    """Quadtree sampling of an area under a prediction budget.
+
+    Predicts the corners of a coarse grid, then repeatedly splits the largest cells whose
+    corners disagree (different hazard or severity) or straddle the polygon edge. Points
+    that fall in an already-predicted cache cell reuse that prediction, so the budget
+    counts distinct cells, which is the number of underlying predictions.
+    """
+
+    def __init__(self, predict: Predictor, cell_key: Callable[[float, float], str], budget: int,
+                 rings: Optional[List[List[np.ndarray]]] = None):
+        self.predict = predict
+        self.cell_key = cell_key
+        self.budget = budget
+        self.rings = rings
+        self.by_cell: Dict[str, DisasterPredictionResponse] = {}
+        self.samples: Dict[Point, Optional[str]] = {}  # point -> cache cell (None when outside the polygon)
+        self.rounds = 0
+
+    def _inside(self, points: List[Point]) -> List[bool]:
+        if self.rings is None:
+            return [True] * len(points)
+        return points_in_polygon(points, self.rings).tolist()
+
+    async def _sample(self, points: List[Point]):
+        """Predict the new points, one call per distinct cache cell, within the remaining budget"""
+        fresh = [p for p in dict.fromkeys(points) if p not in self.samples]
+        pending: Dict[str, Point] = {}
+        for point, inside in zip(fresh, self._inside(fresh)):
+            if not inside:
+                self.samples[point] = None
+                continue
+            key = self.cell_key(*point)
+            if key not in self.by_cell and key not in pending:
+                if len(self.by_cell) + len(pending) >= self.budget:
+                    continue
+                pending[key] = point
+            self.samples[point] = key
+
+        results = await asyncio.gather(*(self.predict(lat, lon) for lat, lon in pending.values()), return_exceptions=True)
+        for key, result in zip(pending, results):
+            if isinstance(result, Exception):
+                print(f"⚠️ Area sample {pending[key]} failed: {result}")
+                continue
+            self.by_cell[key] = result
+
+    def prediction_at(self, point: Point) -> Optional[DisasterPredictionResponse]:
+        key = self.samples.get(point)
+        return self.by_cell.get(key) if key else None
+
+    def _needs_split(self, cell: tuple) -> bool:
+        corners = [self.prediction_at(p) for p in self._corners(cell)]
+        statuses = [self.samples.get(p, "unsampled") for p in self._corners(cell)]
+        if any(s is None for s in statuses):
+            if any(s for s in statuses):
+                return True  # straddles the polygon boundary
+            if all(s is None for s in statuses):
+                lat0, lon0, lat1, lon1, _ = cell
+                return bool(self._inside([((lat0 + lat1) / 2, (lon0 + lon1) / 2)])[0])
+        known = {(c.disaster_name, c.severity) for c in corners if c is not None and not c.error}
+        return len(known) > 1
+
+    @staticmethod
+    def _corners(cell: tuple) -> List[Point]:
+        lat0, lon0, lat1, lon1, _ = cell
+        return [(lat0, lon0), (lat0, lon1), (lat1, lon0), (lat1, lon1)]
+
+    @staticmethod
+    def _children(cell: tuple) -> List[tuple]:
+        lat0, lon0, lat1, lon1, depth = cell
+        mid_lat, mid_lon = (lat0 + lat1) / 2, (lon0 + lon1) / 2
+        return [
+            (lat0, lon0, mid_lat, mid_lon, depth + 1),
+            (lat0, mid_lon, mid_lat, lon1, depth + 1),
+            (mid_lat, lon0, lat1, mid_lon, depth + 1),
+            (mid_lat, mid_lon, lat1, lon1, depth + 1)
+        ]
+
+    async def run(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> List[tuple]:
+        """Sample the area; returns the leaf cells of the final quadtree"""
+        n = AREA_INITIAL_DIVISIONS
+        lats = np.linspace(min_lat, max_lat, n + 1)
+        lons = np.linspace(min_lon, max_lon, n + 1)
+        leaves = [(float(lats[i]), float(lons[j]), float(lats[i + 1]), float(lons[j + 1]), 0) for i in range(n) for j in range(n)]
+        await self._sample([p for cell in leaves for p in self._corners(cell)])
+
+        while len(self.by_cell) < self.budget:
+            split = [cell for cell in leaves if cell[4] < AREA_MAX_DEPTH and self._needs_split(cell)]
+            if not split:
+                break
+            # Largest disagreements first; a round never asks for more points than the budget has left
+            split.sort(key=lambda cell: cell[4])
+            room = self.budget - len(self.by_cell)
+            chosen = split[:max(1, room // 3)]
+
+            children = {cell: self._children(cell) for cell in chosen}
+            new_points = [p for kids in children.values() for kid in kids for p in self._corners(kid)]
+            before = len(self.by_cell)
+            await self._sample(new_points)
+            self.rounds += 1
+
+            leaves = [kid for cell in leaves for kid in (children.get(cell) or [cell])]
+            if len(self.by_cell) == before:
+                break  # refinement only revisits known cache cells or leaves the polygon
+        return leaves
+
+    def summarize(self, leaves: List[tuple]) -> dict:
+        """Area-weighted hazard and severity shares: each leaf's area is split among its predicted corners"""
+        hazard_area: Dict[str, float] = {}
+        severity_area: Dict[str, float] = {}
+        total = 0.0
+        for cell in leaves:
+            lat0, lon0, lat1, lon1, _ = cell
+            area = abs(lat1 - lat0) * abs(lon1 - lon0) * math.cos(math.radians((lat0 + lat1) / 2))
+            corners = [c for c in (self.prediction_at(p) for p in self._corners(cell)) if c is not None and not c.error]
+            if not corners:
+                continue
+            share = area / len(corners)
+            for prediction in corners:
+                hazard_area[prediction.disaster_name] = hazard_area.get(prediction.disaster_name, 0.0) + share
+                severity_area[prediction.severity] = severity_area.get(prediction.severity, 0.0) + share
+            total += area
+
+        def normalise(shares: Dict[str, float]) -> Dict[str, float]:
+            return {k: round(v / total, 4) for k, v in sorted(shares.items(), key=lambda item: -item[1])} if total else {}
+
+        predictions = list(self.by_cell.values())
+        worst = max(predictions, key=lambda p: (SEVERITY_RANK.get(p.severity, 0), p.affected_population), default=None)
+        return {
+            "hazard_share": normalise(hazard_area),
+            "severity_share": normalise(severity_area),
+            "dominant_hazard": next(iter(normalise(hazard_area)), None),
+            "worst_case": worst,
+            "max_affected_population": max((p.affected_population for p in predictions), default=0)
+        }
@@ -0,0 +1,339 @@
+import os
+import math
+from datetime import date, datetime, timedelta, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.historical_data import HistoricalDataStore, historical_store, match_disaster_type
+from src.services.historical_retrieval import historical_retriever
+
+# --- CONFIGURATION ---
+BASELINE_GRID_DEGREES = float(os.getenv("BASELINE_GRID_DEGREES", "1.0"))
+# Events within this radius of the coordinate feed the estimate
+BASELINE_RADIUS_KM = float(os.getenv("BASELINE_RADIUS_KM", "200"))
+# Fewer events than this and the baseline declines to answer
+BASELINE_MIN_EVENTS = int(os.getenv("BASELINE_MIN_EVENTS", "3"))
+# Upper bound on place-matched events used when nothing geolocated is nearby
+BASELINE_PLACE_EVENTS = int(os.getenv("BASELINE_PLACE_EVENTS", "1000"))
+# Share of the affected population assumed evacuated when displacement was not recorded
+BASELINE_EVACUATION_SHARE = float(os.getenv("BASELINE_EVACUATION_SHARE", "0.1"))
+DEFAULT_DURATION_DAYS = 7
+
+# Impact histograms use decade bins: 0, [1, 10), [10, 100), ... up to 10^8+
+IMPACT_BINS = 10
+_BIN_ESTIMATE = np.concatenate(([0.0], 10 ** (np.arange(IMPACT_BINS - 1) + 0.5)))
+
+MONTHS = ["January", "February", "March", "April", "May", "June",
+          "July", "August", "September", "October", "November", "December"]
+
+
+def _impact_bins(values: np.ndarray) -> np.ndarray:
+    values = np.asarray(values, dtype=np.float64)
+    bins = 1 + np.floor(np.log10(np.maximum(values, 1))).astype(np.int64)
+    return np.where(values > 0, np.minimum(bins, IMPACT_BINS - 1), 0)
+
+def _median_estimate(histogram: np.ndarray) -> int:
+    """Geometric midpoint of the decade bin holding the median event.
+
+    Blank figures are parsed as 0, so bin 0 means "not recorded" and is left out.
+    """
+    recorded = histogram[1:]
+    total = recorded.sum()
+    if total == 0:
+        return 0
+    index = int(np.searchsorted(np.cumsum(recorded), total / 2))
+    return int(round(_BIN_ESTIMATE[index + 1]))
+
+def _log_sigma(histogram: np.ndarray) -> Optional[float]:
+    """Natural-log spread of recorded impacts from their decade bins (Sheppard-corrected), None if too few"""
+    recorded = histogram[1:].astype(np.float64)
+    total = recorded.sum()
+    if total < 2:
+        return None
+    bins = np.arange(len(recorded))
+    mean = (bins * recorded).sum() / total
+    variance = ((bins - mean) ** 2 * recorded).sum() / total - 1 / 12
+    return math.log(10) * math.sqrt(max(variance, 0.0))
+
+def _severity(deaths: int, affected: int) -> str:
+    if deaths >= 1000 or affected >= 1_000_000:
+        return "Catastrophic"
+    if deaths >= 100 or affected >= 100_000:
+        return "Severe"
+    if deaths >= 10 or affected >= 10_000:
+        return "High"
+    if deaths >= 1 or affected >= 1_000:
+        return "Moderate"
+    return "Low"
+
+def _next_month_start(month: int, today: date) -> date:
+    candidate = date(today.year, month, 1)
+    return candidate if candidate > today else date(today.year + 1, month, 1)
+
+
+class HazardTables:
+    """Per-group, per-disaster-type event counts, month histograms, impact histograms and durations"""
+
+    def __init__(self, counts, months, deaths, affected, homeless, duration_sum, duration_sq, duration_n):
+        self.counts = counts
+        self.months = months
+        self.deaths = deaths
+        self.affected = affected
+        self.homeless = homeless
+        self.duration_sum = duration_sum
+        self.duration_sq = duration_sq
+        self.duration_n = duration_n
+
+    @classmethod
+    def build(cls, groups: np.ndarray, n_groups: int, features: dict, n_types: int) -> "HazardTables":
+        """One vectorized pass of bincounts over (group, type[, bin]) flat indices"""
+        cell_type = groups * n_types + features["type"]
+        size = n_groups * n_types
+
+        def histogram(bins: np.ndarray, width: int) -> np.ndarray:
+            flat = np.bincount(cell_type * width + bins, minlength=size * width)
+            return flat.reshape(n_groups, n_types, width)
+
+        known_month = features["month"] > 0
+        month_hist = np.bincount(
+            cell_type[known_month] * 12 + features["month"][known_month] - 1, minlength=size * 12
+        ).reshape(n_groups, n_types, 12)
+
+        has_duration = features["duration"] > 0
+        durations = np.where(has_duration, features["duration"], 0).astype(np.float64)
+        return cls(
+            counts=np.bincount(cell_type, minlength=size).reshape(n_groups, n_types),
+            months=month_hist,
+            deaths=histogram(features["deaths_bin"], IMPACT_BINS),
+            affected=histogram(features["affected_bin"], IMPACT_BINS),
+            homeless=histogram(features["homeless_bin"], IMPACT_BINS),
+            duration_sum=np.bincount(cell_type, weights=durations, minlength=size).reshape(n_groups, n_types),
+            duration_sq=np.bincount(cell_type, weights=durations ** 2, minlength=size).reshape(n_groups, n_types),
+            duration_n=np.bincount(cell_type, weights=has_duration, minlength=size).reshape(n_groups, n_types)
+        )
+
+    def total(self, groups) -> "HazardTables":
+        """Sum a set of groups into a single-group table"""
+        return HazardTables(*(table[groups].sum(axis=0, keepdims=True) for table in (
+            self.counts, self.months, self.deaths, self.affected, self.homeless, self.duration_sum, self.duration_sq, self.duration_n
+        )))
+
+
+class BaselineModel:
+    """Deterministic hazard estimates from historical frequency, seasonality and severity.
+
+    Geolocated events are aggregated once into per-grid-cell tables; a query sums the
+    cells within BASELINE_RADIUS_KM. Where no geolocated events are nearby, the same
+    tables are computed on the fly from events recorded for the geocoded place.
+    """
+
+    def __init__(self, store: HistoricalDataStore = historical_store, grid_degrees: float = BASELINE_GRID_DEGREES):
+        self.store = store
+        self.grid_degrees = grid_degrees
+        self.ready = False
+        self.answered = 0
+        self.declined = 0
+
+    def build(self):
+        c = self.store.columns
+        self.n_types = len(self.store.vocab["disaster_type"])
+        self.features = self._features()
+
+        years = np.asarray(c["start_year"])
+        known_years = years[years > 0]
+        self.first_year = int(known_years.min()) if len(known_years) else datetime.now(timezone.utc).year
+        self.span_years = max(1, datetime.now(timezone.utc).year - self.first_year + 1)
+
+        lats = np.asarray(c["latitude"], dtype=np.float64)
+        lons = np.asarray(c["longitude"], dtype=np.float64)
+        located = np.flatnonzero(~np.isnan(lats) & ~np.isnan(lons))
+        self.n_cols = int(math.ceil(360 / self.grid_degrees))
+        keys = self._cell_key(lats[located], lons[located])
+        cell_keys, groups = np.unique(keys, return_inverse=True)
+        self.cells: Dict[int, int] = {int(key): index for index, key in enumerate(cell_keys)}
+        self.tables = HazardTables.build(
+            groups, len(cell_keys), {name: values[located] for name, values in self.features.items()}, self.n_types
+        )
+        self.ready = True
+        print(f"✓ Baseline model: {len(located)} geolocated events in {len(cell_keys)} grid cells")
+
+    def _features(self) -> dict:
+        c = self.store.columns
+        start = self._dates(c["start_year"], c["start_month"], c["start_day"])
+        end = self._dates(c["end_year"], c["end_month"], c["end_day"])
+        duration = (end - start).astype(np.int64) + 1
+        valid = ~np.isnat(start) & ~np.isnat(end) & (duration > 0)
+        return {
+            "type": np.asarray(c["disaster_type"], dtype=np.int64),
+            "month": np.asarray(c["start_month"], dtype=np.int64).clip(0, 12),
+            "deaths_bin": _impact_bins(c["total_deaths"]),
+            "affected_bin": _impact_bins(c["affected"]),
+            "homeless_bin": _impact_bins(c["homeless"]),
+            "duration": np.where(valid, duration, 0)
+        }
+
+    @staticmethod
+    def _dates(years, months, days) -> np.ndarray:
+        years, months, days = (np.asarray(v, dtype=np.int64) for v in (years, months, days))
+        valid = (years > 0) & (months >= 1) & (months <= 12) & (days >= 1) & (days <= 31)
+        dates = (
+            (np.where(valid, years, 1970) - 1970).astype("datetime64[Y]").astype("datetime64[M]")
+            + (np.where(valid, months, 1) - 1).astype("timedelta64[M]")
+        ).astype("datetime64[D]") + (np.where(valid, days, 1) - 1).astype("timedelta64[D]")
+        return np.where(valid, dates, np.datetime64("NaT"))
+
+    def _cell_key(self, lats, lons):
+        rows = np.floor((np.asarray(lats) + 90) / self.grid_degrees).astype(np.int64)
+        cols = np.floor((np.asarray(lons) + 180) / self.grid_degrees).astype(np.int64) % self.n_cols
+        return rows * self.n_cols + cols
+
+    def _nearby_cells(self, latitude: float, longitude: float) -> List[int]:
+        row = int(math.floor((latitude + 90) / self.grid_degrees))
+        col = int(math.floor((longitude + 180) / self.grid_degrees))
+        lat_span = int(math.ceil(BASELINE_RADIUS_KM / 111.0 / self.grid_degrees))
+        cos_edge = max(math.cos(math.radians(min(89.0, abs(latitude) + lat_span * self.grid_degrees))), 0.01)
+        lon_span = min(int(math.ceil(BASELINE_RADIUS_KM / (111.0 * cos_edge) / self.grid_degrees)), self.n_cols // 2)
+        return [
+            self.cells[key]
+            for r in range(row - lat_span, row + lat_span + 1)
+            for c in range(col - lon_span, col + lon_span + 1)
+            if (key := r * self.n_cols + c % self.n_cols) in self.cells
+        ]
+
+    def _place_tables(self, location_info: dict) -> Optional[HazardTables]:
+        rows = historical_retriever.by_place(location_info, BASELINE_PLACE_EVENTS, np.empty(0, dtype=np.int64)) \
+            if historical_retriever.ready else np.empty(0, dtype=np.int64)
+        if len(rows) == 0:
+            return None
+        features = {name: values[rows] for name, values in self.features.items()}
+        return HazardTables.build(np.zeros(len(rows), dtype=np.int64), 1, features, self.n_types)
+
+    def _local_tables(self, latitude: float, longitude: float, location_info: dict):
+        """Tables for the events near a coordinate, or for its place when none are nearby, with a description"""
+        basis = f"within {BASELINE_RADIUS_KM:g} km"
+        tables = self.tables.total(self._nearby_cells(latitude, longitude))
+        if tables.counts.sum() < BASELINE_MIN_EVENTS:
+            tables, basis = self._place_tables(location_info), f"recorded for {location_info.get('location')}"
+        if tables is None or tables.counts.sum() < BASELINE_MIN_EVENTS:
+            return None, basis
+        return tables, basis
+
+    def dispersion(self, latitude: float, longitude: float, location_info: dict, disaster_name: str) -> Optional[dict]:
+        """How much local events of this hazard varied: log-scale spread of affected, displaced and duration"""
+        if not self.ready:
+            return None
+        tables, _ = self._local_tables(latitude, longitude, location_info)
+        if tables is None:
+            return None
+        types = [t for t, name in enumerate(self.store.vocab["disaster_type"]) if t and match_disaster_type(name, disaster_name)]
+        events = int(tables.counts[0, types].sum()) if types else 0
+        if events < BASELINE_MIN_EVENTS:
+            return None
+
+        duration_n = float(tables.duration_n[0, types].sum())
+        duration_sigma, duration_days = None, None
+        if duration_n >= 2:
+            duration_days = float(tables.duration_sum[0, types].sum()) / duration_n
+            variance = max(float(tables.duration_sq[0, types].sum()) / duration_n - duration_days ** 2, 0.0)
+            # Log-normal with the recorded mean and coefficient of variation
+            duration_sigma = math.sqrt(math.log1p(variance / duration_days ** 2))
+        return {
+            "events": events,
+            "affected_sigma": _log_sigma(tables.affected[0, types].sum(axis=0)),
+            "evacuations_sigma": _log_sigma(tables.homeless[0, types].sum(axis=0)),
+            "duration_sigma": duration_sigma,
+            "duration_days": duration_days
+        }
+
+    # --- PREDICTION ---
+    def predict(self, latitude: float, longitude: float, location_info: dict) -> Optional[DisasterPredictionResponse]:
+        """Baseline prediction, or None when there is too little history to answer"""
+        if not self.ready:
+            return None
+
+        tables, basis = self._local_tables(latitude, longitude, location_info)
+        if tables is None:
+            self.declined += 1
+            return None
+
+        counts = tables.counts[0].copy()
+        counts[0] = 0  # events without a disaster type
+        if counts.sum() == 0:
+            self.declined += 1
+            return None
+        hazard = int(np.argmax(counts))
+        hazard_name = self.store.vocab["disaster_type"][hazard]
+        events = int(counts[hazard])
+        annual_rate = events / self.span_years
+
+        today = datetime.now(timezone.utc).date()
+        months = tables.months[0, hazard]
+        peak_month = int(np.argmax(months)) + 1 if months.sum() else None
+        start = _next_month_start(peak_month, today) if peak_month else today + timedelta(days=90)
+        duration_n = tables.duration_n[0, hazard]
+        duration = int(round(tables.duration_sum[0, hazard] / duration_n)) if duration_n else DEFAULT_DURATION_DAYS
+        end = start + timedelta(days=max(duration, 1) - 1)
+
+        deaths = _median_estimate(tables.deaths[0, hazard])
+        affected = _median_estimate(tables.affected[0, hazard])
+        evacuations = _median_estimate(tables.homeless[0, hazard]) or int(round(affected * BASELINE_EVACUATION_SHARE))
+
+        others = [int(t) for t in np.argsort(-counts, kind="stable") if counts[t] > 0][:4]
+        probability = 1 - math.exp(-annual_rate)
+        self.answered += 1
+
+        return DisasterPredictionResponse(
+            disaster_name=hazard_name,
+            severity=_severity(deaths, affected),
+            country=location_info["country"],
+            state=location_info["state"],
+            location=location_info["location"],
+            latitude=latitude,
+            longitude=longitude,
+            start_day=start.isoformat(),
+            end_day=end.isoformat(),
+            evacuations=evacuations,
+            affected_population=affected,
+            disaster_details={
+                "description": (
+                    f"{hazard_name} is the most frequently recorded hazard {basis}: {events} events since "
+                    f"{self.first_year} (about {annual_rate:.2f} per year)"
+                    + (f", most often starting in {MONTHS[peak_month - 1]}." if peak_month else ".")
+                ),
+                "primary_risks": [f"{self.store.vocab['disaster_type'][t]} ({counts[t]} recorded events)" for t in others],
+                "vulnerable_areas": [location_info["location"], location_info["state"]],
+                "expected_impact": f"A typical recorded event caused about {deaths} deaths and affected about {affected} people.",
+                "historical_context": historical_retriever.context(latitude, longitude, location_info),
+                "contributing_factors": [
+                    f"{probability:.0%} chance of at least one {hazard_name.lower()} event in the next 12 months"
+                ] + ([f"Seasonal peak in {MONTHS[peak_month - 1]}"] if peak_month else [])
+            },
+            evacuation_plan={
+                "preparation_phase": [],
+                "immediate_actions": [],
+                "during_disaster": [],
+                "evacuation_routes": [],
+                "post_disaster": [],
+                "emergency_contacts": [],
+                "essential_supplies": []
+            },
+            source="baseline"
+        )
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "cells": len(self.cells) if self.ready else 0,
+            "answered": self.answered,
+            "declined": self.declined
+        }
+
+
+baseline_model = BaselineModel()
+
+def build_baseline_model():
+    """Build the baseline tables once the historical store has been loaded"""
+    if historical_store.loaded:
+        baseline_model.build()
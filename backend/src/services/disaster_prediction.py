@@ -1,14 +1,70 @@
 import json
-import re
+import asyncio
+import contextlib
+from collections import Counter
 from datetime import datetime, timezone
+import httpx
 from langchain_openai import ChatOpenAI
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_core.output_parsers import StrOutputParser
 from geopy.geocoders import Nominatim
 from geopy.exc import GeocoderTimedOut
 import os
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.http_clients import get_http_client, get_async_http_client
+from src.services.geocode_cache import geocode_cache, nominatim_rate_limiter
+from src.services.offline_geocoder import offline_geocoder, OFFLINE_GEOCODER_FALLBACK
+from src.services.historical_retrieval import historical_retriever
+from src.services.baseline_model import baseline_model
+from src.services.population_exposure import population_exposure
+from src.services.evacuation_router import EvacuationRouter
+from src.services.resilience import (
+    CircuitBreaker,
+    with_timeout,
+    retry_async,
+    hedged
+)
+from src.services.output_parser import (
+    JSONObjectScanner,
+    PredictionParseError,
+    extract_json_object,
+    extract_json_array,
+    to_prediction_response,
+    record_failure
+)
 
 openrouter_apikey=os.getenv("OPENROUTER_API_KEY")
+
+# Maximum number of coordinates predicted concurrently per worker
+PREDICTION_CONCURRENCY = int(os.getenv("PREDICTION_CONCURRENCY", "8"))
+# Extra attempts when the LLM reply can't be parsed into a prediction
+PREDICTION_PARSE_RETRIES = int(os.getenv("PREDICTION_PARSE_RETRIES", "1"))
+# Locations packed into one LLM call (1 disables batched prompting)
+PREDICTION_BATCH_SIZE = int(os.getenv("PREDICTION_BATCH_SIZE", "1"))
+
+OPENROUTER_BASE_URL = "https://openrouter.ai/api/v1"
+PREDICTION_MODEL = os.getenv("PREDICTION_MODEL", "z-ai/glm-4.5-air:free")
+
+# --- RESILIENCE ---
+# Per-attempt ceiling on one LLM call (also clipped to the request's remaining budget)
+LLM_CALL_TIMEOUT = float(os.getenv("LLM_CALL_TIMEOUT", "60"))
+# Upper bound on one multi-location call, however many locations it carries
+LLM_BATCH_TIMEOUT = float(os.getenv("LLM_BATCH_TIMEOUT", "180"))
+LLM_MAX_ATTEMPTS = int(os.getenv("LLM_MAX_ATTEMPTS", "3"))
+LLM_RETRY_BASE_DELAY = float(os.getenv("LLM_RETRY_BASE_DELAY", "0.5"))
+LLM_RETRY_MAX_DELAY = float(os.getenv("LLM_RETRY_MAX_DELAY", "8"))
+LLM_BREAKER_THRESHOLD = int(os.getenv("LLM_BREAKER_THRESHOLD", "5"))
+LLM_BREAKER_RESET = float(os.getenv("LLM_BREAKER_RESET", "30"))
+# Second model raced against the primary when it is slow (empty disables hedging)
+PREDICTION_HEDGE_MODEL = os.getenv("PREDICTION_HEDGE_MODEL", "")
+PREDICTION_HEDGE_DELAY = float(os.getenv("PREDICTION_HEDGE_DELAY", "20"))
+
+llm_breaker = CircuitBreaker("LLM provider", LLM_BREAKER_THRESHOLD, LLM_BREAKER_RESET)
+resilience_counters = Counter()
+
+NOMINATIM_REVERSE_URL = "https://nominatim.openstreetmap.org/reverse"
+GEOCODER_USER_AGENT = "disaster_predictor_v2"
+GEOCODER_TIMEOUT = 10
 # --- SYSTEM PROMPT ---
 
 # --- SYSTEM PROMPT ---
@@ -26,6 +82,7 @@ Important rules:
 6. Consider the location's historical disaster patterns, geography, climate, and season
 7. Provide detailed disaster information including severity, impact areas, and risk factors
 8. Provide comprehensive evacuation steps specific to the predicted disaster type
+9. Ground historical_context in the recorded events supplied with the location; do not invent past events
 
 Return the prediction strictly as a JSON object with the following fields:
 
@@ -92,35 +149,167 @@ Return the prediction strictly as a JSON object with the following fields:
 Do not include any text outside the JSON. Be specific and realistic with all predictions.
 """
 
+# --- BATCH PROMPT ---
+BATCH_SYSTEM_MSG = SYSTEM_MSG.strip() + """
+
+BATCH MODE: you will receive several numbered locations at once. Predict each one independently
+and return a JSON array with exactly one object per location. Every object uses the schema above
+plus an integer "index" field matching the location's number. Return only the JSON array.
+"""
+
+# --- NARRATIVE PROMPT ---
+# Hybrid mode: the statistical baseline fixes the figures, the LLM only writes the narrative fields
+NARRATIVE_SYSTEM_MSG = """
+You are an expert disaster management planner.
+
+A statistical model has already predicted the next likely disaster for a location from historical
+records. Do not change its figures. Write the narrative for that prediction: a description, risks,
+vulnerable areas, expected impact, historical context grounded in the recorded events supplied,
+contributing factors, and a comprehensive evacuation plan specific to the disaster type and location.
+
+Return strictly a JSON object with exactly these two fields:
+
+{{
+  "disaster_details": {{
+    "description": "...",
+    "primary_risks": ["..."],
+    "vulnerable_areas": ["..."],
+    "expected_impact": "...",
+    "historical_context": "...",
+    "contributing_factors": ["..."]
+  }},
+  "evacuation_plan": {{
+    "preparation_phase": ["..."],
+    "immediate_actions": ["..."],
+    "during_disaster": ["..."],
+    "evacuation_routes": ["..."],
+    "post_disaster": ["..."],
+    "emergency_contacts": ["..."],
+    "essential_supplies": ["..."]
+  }}
+}}
+
+Do not include any text outside the JSON.
+"""
+
 # --- REVERSE GEOCODING ---
+def _location_from_address(address: dict, display_name: str) -> dict:
+    """Map a Nominatim address block to our location fields"""
+    return {
+        "location": address.get('city') or address.get('town') or address.get('village') or address.get('suburb', 'Unknown'),
+        "state": address.get('state', 'Unknown'),
+        "country": address.get('country', 'Unknown'),
+        "display_name": display_name
+    }
+
+def _fallback_location(latitude: float, longitude: float) -> dict:
+    """Location fields used when the geocoder cannot resolve a coordinate"""
+    return {
+        "location": f"Coordinates: {latitude}, {longitude}",
+        "state": "Unknown",
+        "country": "Unknown",
+        "display_name": f"Location at {latitude}, {longitude}"
+    }
+
+def _offline_location(latitude: float, longitude: float) -> dict | None:
+    """Answer from the local gazetteer when offline mode is loaded; None means ask Nominatim"""
+    if not offline_geocoder.loaded:
+        return None
+
+    location_info = offline_geocoder.lookup(latitude, longitude)
+    if location_info is None and not OFFLINE_GEOCODER_FALLBACK:
+        # Air-gapped: settle for the nearest known place, however far
+        location_info = offline_geocoder.lookup(latitude, longitude, max_km=None) or _fallback_location(latitude, longitude)
+    return location_info
+
 def get_location_from_coordinates(latitude: float, longitude: float) -> dict:
     """Get location details from latitude and longitude"""
+    offline = _offline_location(latitude, longitude)
+    if offline is not None:
+        return offline
+
+    cached = geocode_cache.get_local(latitude, longitude)
+    if cached is not None:
+        return cached
+
     try:
-        geolocator = Nominatim(user_agent="disaster_predictor_v2")
-        location = geolocator.reverse(f"{latitude}, {longitude}", language='en', timeout=10)
+        geolocator = Nominatim(user_agent=GEOCODER_USER_AGENT)
+        location = geolocator.reverse(f"{latitude}, {longitude}", language='en', timeout=GEOCODER_TIMEOUT)
         
         if location:
-            address = location.raw.get('address', {})
-            return {
-                "location": address.get('city') or address.get('town') or address.get('village') or address.get('suburb', 'Unknown'),
-                "state": address.get('state', 'Unknown'),
-                "country": address.get('country', 'Unknown'),
-                "display_name": location.address
-            }
+            location_info = _location_from_address(location.raw.get('address', {}), location.address)
+            geocode_cache.set_local(latitude, longitude, location_info)
+            return location_info
     except GeocoderTimedOut:
         print("⚠️ Geocoding service timed out. Using coordinates only.")
     except Exception as e:
         print(f"⚠️ Geocoding error: {e}")
     
-    return {
-        "location": f"Coordinates: {latitude}, {longitude}",
-        "state": "Unknown",
-        "country": "Unknown",
-        "display_name": f"Location at {latitude}, {longitude}"
-    }
+    return _fallback_location(latitude, longitude)
+
+async def _areverse_geocode(latitude: float, longitude: float) -> dict | None:
+    """Single Nominatim reverse lookup; None when unresolved"""
+    try:
+        response = await get_async_http_client().get(
+            NOMINATIM_REVERSE_URL,
+            params={
+                "lat": latitude,
+                "lon": longitude,
+                "format": "jsonv2",
+                "accept-language": "en"
+            },
+            headers={"User-Agent": GEOCODER_USER_AGENT},
+            timeout=GEOCODER_TIMEOUT
+        )
+        response.raise_for_status()
+        data = response.json()
+
+        if data and "error" not in data:
+            return _location_from_address(data.get('address', {}), data.get('display_name'))
+    except httpx.TimeoutException:
+        print("⚠️ Geocoding service timed out. Using coordinates only.")
+    except Exception as e:
+        print(f"⚠️ Geocoding error: {e}")
+    return None
+
+async def aget_location_from_coordinates(latitude: float, longitude: float) -> dict:
+    """Async variant of get_location_from_coordinates, served from the geocode cache when possible"""
+    offline = _offline_location(latitude, longitude)
+    if offline is not None:
+        return offline
+
+    location_info = await geocode_cache.get(latitude, longitude)
+    if location_info is not None:
+        return location_info
+
+    # Respect Nominatim's rate limit; another coroutine may have resolved this cell while we waited
+    await nominatim_rate_limiter.wait()
+    location_info = geocode_cache.get_local(latitude, longitude)
+    if location_info is not None:
+        return location_info
+
+    location_info = await _areverse_geocode(latitude, longitude)
+    if location_info is None:
+        return _fallback_location(latitude, longitude)
+
+    await geocode_cache.set(latitude, longitude, location_info)
+    return location_info
 
 # --- BUILD LLM CHAIN ---
-def build_chain():
+def _llm(model: str, **overrides) -> ChatOpenAI:
+    """OpenRouter chat model on the shared pooled HTTP clients; overrides replace the defaults"""
+    settings = {
+        "base_url": OPENROUTER_BASE_URL,
+        "api_key": openrouter_apikey,
+        "temperature": 0.4,
+        "top_p": 0.3,
+        "http_client": get_http_client(),
+        "http_async_client": get_async_http_client(),
+        **overrides
+    }
+    return ChatOpenAI(model=model, **settings)
+
+def build_chain(model: str = PREDICTION_MODEL):
     prompt = ChatPromptTemplate.from_messages([
         ("system", SYSTEM_MSG.strip()),
         ("user", """Current Date and Time: {current_datetime}
@@ -132,18 +321,94 @@ Location Details:
 - Country: {country}
 - Full Address: {display_name}
 
+Recorded Historical Events (EM-DAT):
+{historical_context}
+
 [Rest of your exact same user prompt here]""")
     ])
 
-    llm = ChatOpenAI(
-        model="z-ai/glm-4.5-air:free",
-        base_url="https://openrouter.ai/api/v1",
-        api_key=openrouter_apikey,
-        temperature=0.4,
-        top_p=0.3
-    )
+    return prompt | _llm(model) | StrOutputParser()
+
+def build_batch_chain():
+    """Chain that predicts several locations in a single LLM call"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", BATCH_SYSTEM_MSG.strip()),
+        ("user", """Current Date and Time: {current_datetime}
+
+Predict the next likely disaster for each of these {count} locations:
+{locations}""")
+    ])
+
+    return prompt | _llm(PREDICTION_MODEL) | StrOutputParser()
+
+def build_narrative_chain():
+    """Chain that writes only the narrative fields around a baseline prediction"""
+    prompt = ChatPromptTemplate.from_messages([
+        ("system", NARRATIVE_SYSTEM_MSG.strip()),
+        ("user", """Current Date and Time: {current_datetime}
+
+Location Details:
+- Coordinates: {latitude}, {longitude}
+- Location: {location_name}
+- State: {state}
+- Country: {country}
+- Full Address: {display_name}
+
+Predicted Disaster (fixed):
+{baseline_summary}
+
+Recorded Historical Events (EM-DAT):
+{historical_context}""")
+    ])
+
+    return prompt | _llm(PREDICTION_MODEL) | StrOutputParser()
 
-    return prompt | llm | StrOutputParser()
+_chain = None
+_hedge_chain = None
+_batch_chain = None
+_narrative_chain = None
+
+def get_chain():
+    """Return the process-wide prediction chain, building it on first use"""
+    global _chain
+    if _chain is None:
+        _chain = build_chain()
+    return _chain
+
+def get_hedge_chain():
+    """Return the chain for PREDICTION_HEDGE_MODEL, building it on first use"""
+    global _hedge_chain
+    if _hedge_chain is None:
+        _hedge_chain = build_chain(PREDICTION_HEDGE_MODEL)
+    return _hedge_chain
+
+def get_batch_chain():
+    """Return the process-wide batch prediction chain, building it on first use"""
+    global _batch_chain
+    if _batch_chain is None:
+        _batch_chain = build_batch_chain()
+    return _batch_chain
+
+def get_narrative_chain():
+    """Return the process-wide hybrid-mode narrative chain, building it on first use"""
+    global _narrative_chain
+    if _narrative_chain is None:
+        _narrative_chain = build_narrative_chain()
+    return _narrative_chain
+
+async def warm_up():
+    """Build the chain and open a pooled connection to the LLM provider ahead of the first request"""
+    get_chain()
+    if PREDICTION_HEDGE_MODEL:
+        get_hedge_chain()
+    if PREDICTION_BATCH_SIZE > 1:
+        get_batch_chain()
+    await geocode_cache.ensure_indexes()
+    try:
+        await get_async_http_client().head(OPENROUTER_BASE_URL, timeout=5)
+        print("🔥 Prediction service warmed up")
+    except Exception as e:
+        print(f"⚠️ Warm-up request failed: {e}")
 
 # --- GET CURRENT DATETIME ---
 def get_current_datetime():
@@ -152,92 +417,313 @@ def get_current_datetime():
     return now.strftime("%Y-%m-%d %H:%M:%S UTC")
 
 # --- GET PREDICTION ---
+def _chain_inputs(latitude: float, longitude: float, location_info: dict) -> dict:
+    """Variables for the prompt template"""
+    return {
+        "latitude": latitude,
+        "longitude": longitude,
+        "location_name": location_info['location'],
+        "state": location_info['state'],
+        "country": location_info['country'],
+        "display_name": location_info['display_name'],
+        "historical_context": historical_retriever.context(latitude, longitude, location_info),
+        "current_datetime": get_current_datetime()
+    }
+
+def _unparsed_prediction(latitude: float, longitude: float, location_info: dict, error: str) -> dict:
+    """Template returned by the synchronous API when the LLM reply can't be parsed"""
+    return {
+        "disaster_name": "Unable to predict",
+        "severity": "Unknown",
+        "country": location_info['country'],
+        "state": location_info['state'],
+        "location": location_info['location'],
+        "latitude": latitude,
+        "longitude": longitude,
+        "start_day": None,
+        "end_day": None,
+        "evacuations": 0,
+        "affected_population": 0,
+        "error": error,
+        "disaster_details": {},
+        "evacuation_plan": {}
+    }
+
 def predict_disaster(latitude: float, longitude: float):
     # Get location details from coordinates
     print(f"🔍 Identifying location for coordinates: {latitude}, {longitude}")
     location_info = get_location_from_coordinates(latitude, longitude)
     print(f"📍 Location identified: {location_info['display_name']}\n")
     
-    chain = build_chain()
-    current_dt = get_current_datetime()
+    chain = get_chain()
+    raw_output = chain.invoke(_chain_inputs(latitude, longitude, location_info))
 
-    raw_output = chain.invoke({
-        "latitude": latitude,
-        "longitude": longitude,
-        "location_name": location_info['location'],
-        "state": location_info['state'],
-        "country": location_info['country'],
-        "display_name": location_info['display_name'],
-        "current_datetime": current_dt
-    })
+    try:
+        response = to_prediction_response(extract_json_object(raw_output), latitude, longitude)
+        return response.model_dump()
+    except PredictionParseError as e:
+        record_failure(e)
+        print(f"⚠️ Failed to parse LLM response ({e}):\n{raw_output}")
+        return _unparsed_prediction(latitude, longitude, location_info, f"Failed to parse LLM response: {e}")
+
+async def _astream_json(chain, inputs: dict) -> dict:
+    """Stream one LLM reply, stopping as soon as the first complete JSON object arrives"""
+    scanner = JSONObjectScanner()
+    data = None
+    stream = chain.astream(inputs)
+    try:
+        async for chunk in stream:
+            data = scanner.feed(chunk)
+            if data is not None:
+                break
+    finally:
+        await stream.aclose()
+
+    if data is None:
+        data = scanner.finish()
+    return data
+
+async def _astream_prediction(chain, inputs: dict, latitude: float, longitude: float) -> DisasterPredictionResponse:
+    data = await _astream_json(chain, inputs)
+    return validate_prediction_response(to_prediction_response(data, latitude, longitude))
+
+async def _llm_attempt(inputs: dict, latitude: float, longitude: float) -> DisasterPredictionResponse:
+    """One LLM attempt under a per-call timeout, hedged to a second model when configured"""
+    async def call(chain):
+        return await with_timeout(_astream_prediction(chain, inputs, latitude, longitude), LLM_CALL_TIMEOUT)
+
+    if not PREDICTION_HEDGE_MODEL:
+        return await call(get_chain())
+    return await hedged(
+        lambda: call(get_chain()),
+        lambda: call(get_hedge_chain()),
+        PREDICTION_HEDGE_DELAY,
+        on_hedge=lambda: resilience_counters.update(["hedged_requests"])
+    )
 
-    print(f"\n🔍 Raw LLM Output:\n{raw_output}\n")
-    print("-" * 80)
+async def _resilient_llm_call(attempt):
+    """LLM attempt behind the circuit breaker, retried with jittered backoff on transient errors"""
+    return await retry_async(
+        lambda: llm_breaker.call(attempt),
+        LLM_MAX_ATTEMPTS,
+        LLM_RETRY_BASE_DELAY,
+        LLM_RETRY_MAX_DELAY,
+        on_retry=lambda e: resilience_counters.update(["retries", type(e).__name__])
+    )
+
+def resilience_stats() -> dict:
+    return {
+        "llm_breaker": llm_breaker.stats(),
+        **resilience_counters
+    }
+
+async def apredict_disaster(latitude: float, longitude: float) -> DisasterPredictionResponse:
+    """Async variant of predict_disaster: non-blocking geocoding and a streamed, validated LLM reply"""
+    print(f"🔍 Identifying location for coordinates: {latitude}, {longitude}")
+    location_info = await with_timeout(aget_location_from_coordinates(latitude, longitude), None)
+    print(f"📍 Location identified: {location_info['display_name']}\n")
+
+    inputs = _chain_inputs(latitude, longitude, location_info)
+    for attempt in range(PREDICTION_PARSE_RETRIES + 1):
+        try:
+            return await _resilient_llm_call(lambda: _llm_attempt(inputs, latitude, longitude))
+        except PredictionParseError as e:
+            record_failure(e)
+            print(f"⚠️ Unusable LLM output for ({latitude}, {longitude}), attempt {attempt + 1}: {e}")
+            if attempt == PREDICTION_PARSE_RETRIES:
+                raise
+
+# --- BASELINE AND HYBRID PREDICTION ---
+class BaselineUnavailable(Exception):
+    """Too little historical data near the coordinate for the statistical baseline"""
 
-    # Parse JSON safely
+
+async def apredict_disaster_fast(latitude: float, longitude: float) -> DisasterPredictionResponse:
+    """Statistical baseline only; no LLM call"""
+    location_info = await with_timeout(aget_location_from_coordinates(latitude, longitude), None)
+    prediction = baseline_model.predict(latitude, longitude, location_info)
+    if prediction is None:
+        raise BaselineUnavailable("not enough historical records near this location for a baseline prediction")
+    return validate_prediction_response(prediction)
+
+def _baseline_summary(prediction: DisasterPredictionResponse) -> str:
+    return "\n".join([
+        f"- Disaster: {prediction.disaster_name}",
+        f"- Severity: {prediction.severity}",
+        f"- Expected window: {prediction.start_day} to {prediction.end_day}",
+        f"- Affected population: {prediction.affected_population}",
+        f"- Evacuations: {prediction.evacuations}",
+        f"- Basis: {prediction.disaster_details.description}"
+    ])
+
+async def _narrative_attempt(inputs: dict, baseline: DisasterPredictionResponse) -> DisasterPredictionResponse:
+    data = await with_timeout(_astream_json(get_narrative_chain(), inputs), LLM_CALL_TIMEOUT)
+    merged = {
+        **baseline.model_dump(),
+        "disaster_details": data.get("disaster_details"),
+        "evacuation_plan": data.get("evacuation_plan"),
+        "source": "hybrid"
+    }
+    return validate_prediction_response(to_prediction_response(merged, baseline.latitude, baseline.longitude))
+
+async def apredict_disaster_hybrid(latitude: float, longitude: float) -> DisasterPredictionResponse:
+    """Baseline figures with LLM-written narrative fields; full LLM prediction when the baseline declines"""
+    location_info = await with_timeout(aget_location_from_coordinates(latitude, longitude), None)
+    baseline = baseline_model.predict(latitude, longitude, location_info)
+    if baseline is None:
+        return await apredict_disaster(latitude, longitude)
+
+    inputs = {
+        **_chain_inputs(latitude, longitude, location_info),
+        "baseline_summary": _baseline_summary(baseline)
+    }
+    for attempt in range(PREDICTION_PARSE_RETRIES + 1):
+        try:
+            return await _resilient_llm_call(lambda: _narrative_attempt(inputs, baseline))
+        except PredictionParseError as e:
+            record_failure(e)
+            print(f"⚠️ Unusable narrative output for ({latitude}, {longitude}), attempt {attempt + 1}: {e}")
+            if attempt == PREDICTION_PARSE_RETRIES:
+                raise
+
+# --- BATCHED PREDICTION ---
+def _format_batch_locations(coordinates: list, locations: list) -> str:
+    lines = []
+    for index, ((latitude, longitude), info) in enumerate(zip(coordinates, locations)):
+        lines.append(
+            f"[{index}] Coordinates: {latitude}, {longitude} | Location: {info['location']} | "
+            f"State: {info['state']} | Country: {info['country']} | Full Address: {info['display_name']}\n"
+            f"    Recorded events:\n"
+            + "\n".join(f"    {line}" for line in historical_retriever.context(latitude, longitude, info).splitlines())
+        )
+    return "\n".join(lines)
+
+def _parse_batch_output(raw_output: str, count: int) -> dict:
+    """Parse a JSON array of predictions into {index: prediction}"""
     try:
-        prediction = json.loads(raw_output)
-        # Ensure coordinates are included
-        prediction['latitude'] = latitude
-        prediction['longitude'] = longitude
-        return prediction
-    except json.JSONDecodeError:
-        # fallback: extract JSON block
-        m = re.search(r"\{[\s\S]*\}", raw_output)
-        if m:
-            try:
-                prediction = json.loads(m.group(0))
-                prediction['latitude'] = latitude
-                prediction['longitude'] = longitude
-                return prediction
-            except:
-                pass
-
-        # Return template with location info
-        return {
-            "disaster_name": "Unable to predict",
-            "severity": "Unknown",
-            "country": location_info['country'],
-            "state": location_info['state'],
-            "location": location_info['location'],
-            "latitude": latitude,
-            "longitude": longitude,
-            "start_day": None,
-            "end_day": None,
-            "evacuations": 0,
-            "affected_population": 0,
-            "error": "Failed to parse LLM response",
-            "disaster_details": {},
-            "evacuation_plan": {}
+        items = extract_json_array(raw_output)
+    except PredictionParseError:
+        # Every item is then recorded as missing and retried on its own
+        return {}
+
+    by_index = {}
+    for position, item in enumerate(items):
+        if not isinstance(item, dict):
+            continue
+        index = item.pop("index", position)
+        # bool is an int subclass: "index": true must not land on item 1
+        if isinstance(index, int) and not isinstance(index, bool) and 0 <= index < count and index not in by_index:
+            by_index[index] = item
+    return by_index
+
+async def apredict_disaster_batch(coordinates: list, semaphore: asyncio.Semaphore | None = None) -> list:
+    """Predict several (latitude, longitude) pairs with one LLM call.
+
+    Items missing from the reply or failing validation are retried individually.
+    `semaphore`, when given, bounds the batch call and every fallback call alike.
+    Returns (prediction, used_fallback) pairs in input order; an item whose fallback
+    also failed carries the exception in place of its prediction.
+    """
+    limiter = semaphore or contextlib.nullcontext()
+    by_index = {}
+    async with limiter:
+        locations = await with_timeout(
+            asyncio.gather(*(aget_location_from_coordinates(lat, lon) for lat, lon in coordinates)),
+            None
+        )
+        inputs = {
+            "current_datetime": get_current_datetime(),
+            "count": len(coordinates),
+            "locations": _format_batch_locations(coordinates, locations)
         }
+        try:
+            # A batch reply is roughly N single replies long, so scale the per-call timeout up to a cap
+            timeout = min(LLM_CALL_TIMEOUT * len(coordinates), LLM_BATCH_TIMEOUT)
+            raw_output = await _resilient_llm_call(
+                lambda: with_timeout(get_batch_chain().ainvoke(inputs), timeout)
+            )
+            by_index = _parse_batch_output(raw_output, len(coordinates))
+        except Exception as e:
+            print(f"⚠️ Batch prediction call failed: {e}")
+
+    async def finalize(index: int):
+        latitude, longitude = coordinates[index]
+        prediction = by_index.get(index)
+        if prediction is not None:
+            try:
+                return validate_prediction_response(to_prediction_response(prediction, latitude, longitude)), False
+            except PredictionParseError as e:
+                record_failure(e)
+        else:
+            record_failure(PredictionParseError("batch_missing_item"))
+        # Per-item fallback to a single-location call; its failure is this item's alone
+        try:
+            async with limiter:
+                return await apredict_disaster(latitude, longitude), True
+        except Exception as e:
+            return e, True
+
+    return await asyncio.gather(*(finalize(i) for i in range(len(coordinates))))
 
 # --- VALIDATE PREDICTION ---
-def validate_prediction(prediction: dict) -> dict:
-    """Validate that predicted dates are in the future and data is complete"""
+def _prediction_warnings(start_day, end_day, evacuations) -> list:
+    """Checks shared by the dict and model validators"""
     current_date = datetime.now(timezone.utc).date()
     warnings = []
 
-    if prediction.get("start_day"):
+    if start_day:
         try:
-            start_date = datetime.strptime(prediction["start_day"], "%Y-%m-%d").date()
+            start_date = datetime.strptime(start_day, "%Y-%m-%d").date()
             if start_date <= current_date:
                 warnings.append("⚠️ Start date is not in the future!")
         except:
             warnings.append("⚠️ Invalid start date format!")
 
-    if prediction.get("end_day"):
+    if end_day:
         try:
-            end_date = datetime.strptime(prediction["end_day"], "%Y-%m-%d").date()
-            start_date = datetime.strptime(prediction["start_day"], "%Y-%m-%d").date()
+            end_date = datetime.strptime(end_day, "%Y-%m-%d").date()
+            start_date = datetime.strptime(start_day, "%Y-%m-%d").date()
             if end_date < start_date:
                 warnings.append("⚠️ End date is before start date!")
         except:
             warnings.append("⚠️ Invalid end date format!")
 
-    if not isinstance(prediction.get("evacuations"), int) or prediction.get("evacuations", 0) <= 0:
+    if not isinstance(evacuations, int) or evacuations <= 0:
         warnings.append("⚠️ Evacuation number should be a positive integer!")
 
+    return warnings
+
+def _exposure_check(latitude, longitude, severity, affected, evacuations):
+    """Population living in the hazard zone and warnings for figures that diverge wildly from it"""
+    if latitude is None or longitude is None or not isinstance(affected, int) or not isinstance(evacuations, int):
+        return None
+    return population_exposure.check(latitude, longitude, EvacuationRouter.hazard_radius(severity), affected, evacuations)
+
+def validate_prediction(prediction: dict) -> dict:
+    """Validate that predicted dates are in the future, data is complete and figures fit the local population"""
+    warnings = _prediction_warnings(prediction.get("start_day"), prediction.get("end_day"), prediction.get("evacuations", 0))
+    checked = _exposure_check(prediction.get("latitude"), prediction.get("longitude"), prediction.get("severity"),
+                              prediction.get("affected_population"), prediction.get("evacuations"))
+    if checked:
+        prediction["population_exposure"], exposure_warnings = checked
+        warnings += exposure_warnings
+
     if warnings:
         prediction["warnings"] = warnings
 
-    return prediction
\ No newline at end of file
+    return prediction
+
+def validate_prediction_response(prediction: DisasterPredictionResponse) -> DisasterPredictionResponse:
+    """validate_prediction for an already-validated response model"""
+    warnings = _prediction_warnings(prediction.start_day, prediction.end_day, prediction.evacuations)
+    update = {}
+    checked = _exposure_check(prediction.latitude, prediction.longitude, prediction.severity,
+                              prediction.affected_population, prediction.evacuations)
+    if checked:
+        update["population_exposure"], exposure_warnings = checked
+        warnings += exposure_warnings
+    if warnings:
+        update["warnings"] = warnings
+    if update:
+        return prediction.model_copy(update=update)
+    return prediction
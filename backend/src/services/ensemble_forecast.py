@@ -0,0 +1,180 @@
+import os
+import json
+import math
+import time
+import zlib
+from datetime import date
+from typing import List, Optional
+
+import numpy as np
+
+from src.schemas.prediction_schema import DisasterPredictionResponse, EnsembleForecast
+from src.services.baseline_model import baseline_model, DEFAULT_DURATION_DAYS
+from src.services.hazard_spread import SEVERITY_LEVELS, SpreadSimulator, hazard_model, severity_index, spread_simulator
+from src.services.ttl_cache import TTLCache
+
+# --- CONFIGURATION ---
+ENSEMBLE_MEMBERS = int(os.getenv("ENSEMBLE_MEMBERS", "1000"))
+# Base seed; each location and hazard derives its own stream from it, so runs are reproducible
+ENSEMBLE_SEED = int(os.getenv("ENSEMBLE_SEED", "0"))
+# Perturbed hazard spread runs per ensemble when the hazard has a spread model (0 disables)
+ENSEMBLE_SIMULATIONS = int(os.getenv("ENSEMBLE_SIMULATIONS", "16"))
+ENSEMBLE_GRID = int(os.getenv("ENSEMBLE_GRID", "128"))
+ENSEMBLE_HOURS = float(os.getenv("ENSEMBLE_HOURS", "24"))
+# Half-width of the simulated area around the prediction
+ENSEMBLE_SPAN_KM = float(os.getenv("ENSEMBLE_SPAN_KM", "20"))
+# Log-normal spreads used when local history is too thin to fit them
+ENSEMBLE_DEFAULT_SIGMA = float(os.getenv("ENSEMBLE_DEFAULT_SIGMA", "0.8"))
+ENSEMBLE_DEFAULT_DURATION_SIGMA = float(os.getenv("ENSEMBLE_DEFAULT_DURATION_SIGMA", "0.4"))
+# Correlation between a member's affected and evacuated draws
+ENSEMBLE_IMPACT_CORRELATION = float(os.getenv("ENSEMBLE_IMPACT_CORRELATION", "0.8"))
+# Ensembles computed at once per worker; each may run ENSEMBLE_SIMULATIONS spread simulations
+ENSEMBLE_CONCURRENCY = int(os.getenv("ENSEMBLE_CONCURRENCY", "2"))
+ENSEMBLE_CACHE_SIZE = int(os.getenv("ENSEMBLE_CACHE_SIZE", "512"))
+ENSEMBLE_CACHE_TTL = int(os.getenv("ENSEMBLE_CACHE_TTL", str(24 * 3600)))
+
+# Severity shift of a perturbed spread run: one level down, unchanged, one level up
+SEVERITY_SHIFTS = [-1, 0, 1]
+SEVERITY_SHIFT_WEIGHTS = [0.25, 0.5, 0.25]
+NOMINAL_WIND_KMH = 15.0
+
+
+def _duration_days(response: DisasterPredictionResponse) -> Optional[float]:
+    try:
+        days = (date.fromisoformat(response.end_day) - date.fromisoformat(response.start_day)).days + 1
+    except (TypeError, ValueError):
+        return None
+    return float(days) if days > 0 else None
+
+def _band(values: np.ndarray, digits: int) -> dict:
+    p10, p50, p90 = np.percentile(values, [10, 50, 90])
+    return {"p10": round(float(p10), digits), "p50": round(float(p50), digits), "p90": round(float(p90), digits)}
+
+
+class EnsembleForecaster:
+    """Monte Carlo uncertainty bands around a point prediction.
+
+    Each member scales the predicted affected population and evacuations by a log-normal
+    factor whose spread is fitted to how much local historical events of the same hazard
+    varied, and draws a duration the same way. Where the hazard has a spread model,
+    members are also spread across perturbed simulations (severity one level either way,
+    wind speed and direction) run in the simulator's process pool, scaling impact by the
+    simulated footprint relative to the median run. Draws come from a generator seeded
+    by ENSEMBLE_SEED and the location and hazard, so the same prediction always yields
+    the same bands.
+    """
+
+    def __init__(self, simulator: SpreadSimulator = spread_simulator, members: int = ENSEMBLE_MEMBERS,
+                 simulations: int = ENSEMBLE_SIMULATIONS, seed: int = ENSEMBLE_SEED):
+        self.simulator = simulator
+        self.members = members
+        self.simulations = simulations
+        self.seed = seed
+        self.cache = TTLCache(max_entries=ENSEMBLE_CACHE_SIZE, ttl=ENSEMBLE_CACHE_TTL)
+        self.runs = 0
+        self.total_ms = 0.0
+
+    def _key(self, response: DisasterPredictionResponse) -> str:
+        return json.dumps([
+            response.disaster_name, response.severity, round(response.latitude, 4), round(response.longitude, 4)
+        ])
+
+    def _scenarios(self, response: DisasterPredictionResponse, rng: np.random.Generator) -> List[dict]:
+        """Spread runs around the prediction with perturbed severity, wind and seed"""
+        half_lat = ENSEMBLE_SPAN_KM / 111.0
+        half_lon = ENSEMBLE_SPAN_KM / (111.0 * max(math.cos(math.radians(response.latitude)), 0.01))
+        base = {
+            "hazard": response.disaster_name, "latitude": response.latitude, "longitude": response.longitude,
+            "bbox": [max(response.latitude - half_lat, -90), max(response.longitude - half_lon, -180),
+                     min(response.latitude + half_lat, 90), min(response.longitude + half_lon, 180)],
+            "grid_size": ENSEMBLE_GRID, "hours": ENSEMBLE_HOURS, "slices": 1, "images": False
+        }
+        level = severity_index(response.severity)
+        shifts = rng.choice(SEVERITY_SHIFTS, size=self.simulations, p=SEVERITY_SHIFT_WEIGHTS)
+        winds = NOMINAL_WIND_KMH * np.exp(0.5 * rng.standard_normal(self.simulations))
+        directions = rng.uniform(0, 360, self.simulations)
+        seeds = rng.integers(0, 2 ** 31, self.simulations)
+        return [
+            {**base, "severity": SEVERITY_LEVELS[int(np.clip(level + shift, 0, len(SEVERITY_LEVELS) - 1))],
+             "wind_speed_kmh": float(wind), "wind_direction_deg": float(direction), "seed": int(seed)}
+            for shift, wind, direction, seed in zip(shifts, winds, directions, seeds)
+        ]
+
+    def _footprint_ratios(self, response: DisasterPredictionResponse, rng: np.random.Generator) -> Optional[np.ndarray]:
+        """Final footprint of each perturbed spread run relative to the median run.
+
+        Normalising by the median keeps the point prediction as the central scenario;
+        the simulations only widen or skew the spread around it.
+        """
+        if self.simulations <= 0 or hazard_model(response.disaster_name) is None:
+            return None
+        results = self.simulator.run_many(self._scenarios(response, rng))
+        areas = np.array([r["slices"][-1]["area_km2"] for r in results if "error" not in r])
+        if not len(areas) or not np.median(areas) > 0:
+            return None
+        return areas / np.median(areas)
+
+    def forecast(self, response: DisasterPredictionResponse) -> EnsembleForecast:
+        key = self._key(response)
+        cache_key = json.dumps([key, response.affected_population, response.evacuations, response.start_day,
+                                response.end_day, self.members, self.simulations, self.seed])
+        cached = self.cache.get(cache_key)
+        if cached is not None:
+            return cached
+
+        started = time.perf_counter()
+        rng = np.random.default_rng([self.seed, zlib.crc32(key.encode("utf-8"))])
+        location_info = {"country": response.country, "state": response.state, "location": response.location}
+        history = baseline_model.dispersion(response.latitude, response.longitude, location_info, response.disaster_name) or {}
+
+        affected_sigma = history.get("affected_sigma") or ENSEMBLE_DEFAULT_SIGMA
+        evacuations_sigma = history.get("evacuations_sigma") or affected_sigma
+        duration_sigma = history.get("duration_sigma") or ENSEMBLE_DEFAULT_DURATION_SIGMA
+        duration = _duration_days(response) or history.get("duration_days") or DEFAULT_DURATION_DAYS
+
+        n = self.members
+        z_affected, z_other, z_duration = rng.standard_normal((3, n))
+        rho = ENSEMBLE_IMPACT_CORRELATION
+        z_evacuations = rho * z_affected + math.sqrt(1 - rho * rho) * z_other
+        # Median-centred factors: P50 stays at the point prediction unless the simulations shift it
+        affected = response.affected_population * np.exp(affected_sigma * z_affected)
+        evacuations = response.evacuations * np.exp(evacuations_sigma * z_evacuations)
+        durations = duration * np.exp(duration_sigma * z_duration)
+
+        ratios = self._footprint_ratios(response, rng)
+        if ratios is not None:
+            scale = ratios[np.arange(n) % len(ratios)]
+            affected *= scale
+            evacuations *= scale
+
+        forecast = EnsembleForecast(
+            members=n,
+            seed=self.seed,
+            affected_population=_band(affected, 0),
+            evacuations=_band(evacuations, 0),
+            duration_days=_band(durations, 1),
+            spread_simulations=0 if ratios is None else len(ratios),
+            history_events=history.get("events", 0)
+        )
+        self.cache.set(cache_key, forecast)
+        self.runs += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return forecast
+
+    def attach(self, response: DisasterPredictionResponse) -> DisasterPredictionResponse:
+        """Copy of the prediction with ensemble percentiles; failed predictions pass through"""
+        if response.error:
+            return response
+        return response.model_copy(update={"ensemble": self.forecast(response)})
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "avg_ms": round(self.total_ms / self.runs, 1) if self.runs else 0.0,
+            "members": self.members,
+            "simulations": self.simulations,
+            "cache": self.cache.stats()
+        }
+
+
+ensemble_forecaster = EnsembleForecaster()
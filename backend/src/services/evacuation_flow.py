@@ -0,0 +1,656 @@
+import os
+import math
+import time
+import heapq
+import uuid
+import threading
+from array import array
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from datetime import datetime, timezone
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.schemas.prediction_schema import DisasterPredictionResponse, EvacuationClearance
+from src.services.geo_utils import haversine_km, haversine_km_array
+from src.services.road_graph import RoadGraph, road_graph, HIGHWAY_CLASSES, load_road_graph
+from src.services.worker_pool import worker_context
+from src.services.evacuation_router import (
+    EvacuationRouter,
+    population_cells,
+    source_spacing,
+    ROUTE_HAZARD_PENALTY,
+    ROUTE_UNSHELTERED_PENALTY_MIN
+)
+
+# --- CONFIGURATION ---
+# Method-of-successive-averages iterations for a full solve, a closure re-solve and a prediction
+FLOW_ITERATIONS = int(os.getenv("FLOW_ITERATIONS", "12"))
+FLOW_RESOLVE_ITERATIONS = int(os.getenv("FLOW_RESOLVE_ITERATIONS", "6"))
+FLOW_PREDICTION_ITERATIONS = int(os.getenv("FLOW_PREDICTION_ITERATIONS", "4"))
+# Attach a clearance estimate to predictions covered by the road graph
+FLOW_ON_PREDICTION = os.getenv("FLOW_ON_PREDICTION", "true").lower() == "true"
+# BPR volume-delay curve; the evacuation is assumed to load the roads over FLOW_HORIZON_HOURS
+FLOW_BPR_ALPHA = float(os.getenv("FLOW_BPR_ALPHA", "0.15"))
+FLOW_BPR_BETA = float(os.getenv("FLOW_BPR_BETA", "4"))
+FLOW_HORIZON_HOURS = float(os.getenv("FLOW_HORIZON_HOURS", "2"))
+# Volume/capacity is capped in the delay curve; queueing beyond it is reported as clearance time
+FLOW_MAX_VC_RATIO = float(os.getenv("FLOW_MAX_VC_RATIO", "3"))
+FLOW_PERSONS_PER_VEHICLE = float(os.getenv("FLOW_PERSONS_PER_VEHICLE", "2.5"))
+# Price (seconds) added to a shelter per iteration for each 100% of overload, while iterating
+FLOW_PRICE_STEP_S = float(os.getenv("FLOW_PRICE_STEP_S", "600"))
+# Shelters are searched up to this far beyond a hazard zone; the window's outer band is the fallback
+FLOW_WINDOW_MARGIN_KM = float(os.getenv("FLOW_WINDOW_MARGIN_KM", "5"))
+FLOW_PERIMETER_BAND_KM = float(os.getenv("FLOW_PERIMETER_BAND_KM", "0.5"))
+# Independent groups of hazards are solved in parallel worker processes
+FLOW_WORKERS = int(os.getenv("FLOW_WORKERS", str(os.cpu_count() or 1)))
+FLOW_TOP_BOTTLENECKS = int(os.getenv("FLOW_TOP_BOTTLENECKS", "10"))
+# A closure looks for segments among nodes up to this far beyond its radius (longest expected segment)
+FLOW_CLOSURE_SEARCH_KM = float(os.getenv("FLOW_CLOSURE_SEARCH_KM", "0.5"))
+# Solved plans kept in memory for incremental re-solves
+FLOW_MAX_PLANS = int(os.getenv("FLOW_MAX_PLANS", "32"))
+
+
+def _snap(graph: RoadGraph, window: np.ndarray, lats: np.ndarray, lons: np.ndarray, bucket_km: float = 0.5) -> np.ndarray:
+    """Nearest window node for each point, bucketing nodes on a local grid"""
+    ref = float(np.mean(lats)) if len(lats) else 0.0
+    kx = 111.0 * max(math.cos(math.radians(ref)), 0.01)
+
+    def keys(plat, plon):
+        return (np.floor(plat * 111.0 / bucket_km).astype(np.int64) << 32) + np.floor(plon * kx / bucket_km).astype(np.int64)
+
+    node_keys = keys(graph.lat[window], graph.lon[window])
+    order = np.argsort(node_keys, kind="stable")
+    sorted_keys = node_keys[order]
+    cell_keys = keys(lats, lons)
+    starts = np.searchsorted(sorted_keys, cell_keys, side="left")
+    counts = np.searchsorted(sorted_keys, cell_keys, side="right") - starts
+
+    snapped = np.full(len(lats), -1, dtype=np.int64)
+    total = int(counts.sum())
+    if total:
+        owner = np.repeat(np.arange(len(lats)), counts)
+        positions = np.arange(total) - np.repeat(np.cumsum(counts) - counts, counts) + np.repeat(starts, counts)
+        candidates = window[order[positions]]
+        distance = (graph.lat[candidates] - lats[owner]) ** 2 + ((graph.lon[candidates] - lons[owner]) * kx / 111.0) ** 2
+        best = np.lexsort((distance, owner))
+        first_owner, first = np.unique(owner[best], return_index=True)
+        snapped[first_owner] = candidates[best[first]]
+    for i in np.nonzero(snapped < 0)[0]:
+        node = graph.nearest_node(float(lats[i]), float(lons[i]), max_km=2.0)
+        if node is not None:
+            snapped[i] = node
+    return snapped
+
+
+class FlowProblem:
+    """Road window around a group of hazard zones, compiled for repeated shortest-path trees.
+
+    Only edges an evacuee may use are kept: inside a zone an edge must lower the node's
+    depth into the zone, so roads into (or deeper into) the hazard are dropped, as are
+    closed roads. Sinks are shelters outside every zone, plus the nodes of the window's
+    outer band as an unbounded fallback at a fixed penalty.
+    """
+
+    def __init__(self, graph: RoadGraph, hazards: List[dict], closed: np.ndarray):
+        self.graph = graph
+        self.window = np.unique(np.concatenate([
+            graph.nodes_within(h["latitude"], h["longitude"], h["radius_km"] + FLOW_WINDOW_MARGIN_KM)
+            for h in hazards
+        ]))
+        k = self.k = len(self.window)
+        lat, lon = graph.lat[self.window], graph.lon[self.window]
+        depth = np.full(k, -np.inf)
+        slack = np.full(k, np.inf)
+        for h in hazards:
+            distance = haversine_km_array(h["latitude"], h["longitude"], lat, lon)
+            depth = np.maximum(depth, h["radius_km"] - distance)
+            slack = np.minimum(slack, h["radius_km"] + FLOW_WINDOW_MARGIN_KM - distance)
+        self.depth = depth
+
+        local = np.full(graph.n, -1, dtype=np.int64)
+        local[self.window] = np.arange(k)
+        self.local = local
+        sources, targets = local[graph.edge_source], local[graph.edge_target]
+        edge_ids = np.nonzero((sources >= 0) & (targets >= 0))[0]
+        if len(closed):
+            edge_ids = edge_ids[~np.isin(edge_ids, closed)]
+        s, t = sources[edge_ids], targets[edge_ids]
+        usable = (depth[t] <= 0) | (depth[t] < depth[s])
+        self.edge_ids, s, t = edge_ids[usable], s[usable], t[usable]
+        self.m = len(self.edge_ids)
+        self.base_s = graph.time_s[self.edge_ids] * np.where(depth[t] > 0, ROUTE_HAZARD_PENALTY, 1.0)
+        self.capacity_vph = graph.capacity_vph[self.edge_ids]
+
+        order = np.argsort(t, kind="stable")
+        indptr = np.zeros(k + 1, dtype=np.int64)
+        np.cumsum(np.bincount(t, minlength=k), out=indptr[1:])
+        self.rev_indptr = array("q", indptr.tobytes())
+        self.rev_sources = array("i", s[order].astype(np.int32).tobytes())
+        self.rev_edges = array("i", order.astype(np.int32).tobytes())
+
+        # Sinks: (local node, capacity in people, assembly point index or -1 for the perimeter)
+        self.sinks: List[Tuple[int, float, int]] = []
+        for index, point in enumerate(graph.assembly_points):
+            node = int(local[point["node"]])
+            if node >= 0 and depth[node] <= 0:
+                self.sinks.append((node, float(point["capacity"]), index))
+        for node in np.nonzero((slack < FLOW_PERIMETER_BAND_KM) & (depth <= 0))[0].tolist():
+            self.sinks.append((node, math.inf, -1))
+        self.base_price = np.asarray(
+            [0.0 if point >= 0 else ROUTE_UNSHELTERED_PENALTY_MIN * 60 for _, _, point in self.sinks], dtype=np.float64
+        )
+        self.capacity = np.asarray([capacity for _, capacity, _ in self.sinks], dtype=np.float64)
+
+    def local_edges(self, global_ids: np.ndarray) -> np.ndarray:
+        """Local indices of global edge ids; -1 where the edge is not usable in this window"""
+        if self.m == 0:
+            return np.full(len(global_ids), -1, dtype=np.int64)
+        positions = np.minimum(np.searchsorted(self.edge_ids, global_ids), self.m - 1)
+        return np.where(self.edge_ids[positions] == global_ids, positions, -1)
+
+    def costs(self, flow: np.ndarray) -> np.ndarray:
+        ratio = np.minimum(flow / (self.capacity_vph * FLOW_HORIZON_HOURS), FLOW_MAX_VC_RATIO)
+        return self.base_s * (1 + FLOW_BPR_ALPHA * ratio ** FLOW_BPR_BETA)
+
+    def tree(self, cost: np.ndarray, price: np.ndarray, goals: List[int]) -> Tuple[List[int], List[int], List[int], List[int]]:
+        """Reverse multi-source Dijkstra from every sink (seeded with its price) until all goals settle"""
+        indptr, sources, slots = self.rev_indptr, self.rev_sources, self.rev_edges
+        cost = array("d", cost.tobytes())
+        following = [-1] * self.k
+        via = [-1] * self.k
+        root = [-1] * self.k
+        settled: List[int] = []
+        heap = [(float(price[i]), node, -1, -1, i) for i, (node, _, _) in enumerate(self.sinks) if math.isfinite(price[i])]
+        heapq.heapify(heap)
+        remaining = set(goals)
+        while heap and remaining:
+            current, node, hop, edge, sink = heapq.heappop(heap)
+            if root[node] >= 0:
+                continue
+            root[node], following[node], via[node] = sink, hop, edge
+            settled.append(node)
+            remaining.discard(node)
+            for slot in range(indptr[node], indptr[node + 1]):
+                neighbour = sources[slot]
+                if root[neighbour] < 0:
+                    heapq.heappush(heap, (current + cost[slots[slot]], neighbour, node, slots[slot], sink))
+        return settled, following, via, root
+
+    def load(self, tree, demand: Dict[int, float]) -> Tuple[np.ndarray, np.ndarray]:
+        """All-or-nothing loading of vehicles onto the tree: (edge volumes, vehicles per sink)"""
+        settled, following, via, root = tree
+        carried = [0.0] * self.k
+        for node, vehicles in demand.items():
+            carried[node] += vehicles
+        volumes = [0.0] * self.m
+        arrivals = [0.0] * len(self.sinks)
+        for node in reversed(settled):
+            vehicles = carried[node]
+            if not vehicles:
+                continue
+            edge = via[node]
+            if edge >= 0:
+                volumes[edge] += vehicles
+                carried[following[node]] += vehicles
+            else:
+                arrivals[root[node]] += vehicles
+        return np.asarray(volumes, dtype=np.float64), np.asarray(arrivals, dtype=np.float64)
+
+    @staticmethod
+    def path(tree, node: int) -> Tuple[List[int], int]:
+        """Local edges from a node to its sink, and the sink index (-1 when unreached)"""
+        _, following, via, root = tree
+        if root[node] < 0:
+            return [], -1
+        edges = []
+        while via[node] >= 0:
+            edges.append(via[node])
+            node = following[node]
+        return edges, root[node]
+
+
+def people_at_capacity(problem: FlowProblem, vehicles: np.ndarray) -> np.ndarray:
+    return vehicles * FLOW_PERSONS_PER_VEHICLE >= problem.capacity
+
+
+def _solve_component(spec: dict, graph: Optional[RoadGraph] = None) -> dict:
+    """Solve (or incrementally re-solve) one independent group of hazard zones.
+
+    Runs in a worker process for multi-group plans; each worker loads the module road graph.
+    The state it returns uses global node and edge ids so a later closure re-solve can
+    rebuild the window and carry flows over.
+    """
+    started = time.perf_counter()
+    graph = graph or road_graph
+    closed = np.asarray(spec["closed"], dtype=np.int64)
+    problem = FlowProblem(graph, spec["hazards"], closed)
+    state = spec.get("state")
+
+    if state is None:
+        cells = spec["cells"]
+        nodes = _snap(graph, problem.window, cells["lat"], cells["lon"]) if len(cells["lat"]) else np.empty(0, dtype=np.int64)
+        cells = dict(cells, node=nodes)
+        paths: Dict[int, np.ndarray] = {}
+        sink_of: Dict[int, tuple] = {}
+        flow_global = np.empty(0, dtype=np.int64), np.empty(0, dtype=np.float64)
+        prices: Dict[tuple, float] = {}
+    else:
+        cells, paths, sink_of, flow_global, prices = state["cells"], state["paths"], state["sink_of"], state["flow"], state["prices"]
+
+    # Vehicles per demand node
+    demand: Dict[int, float] = {}
+    for node, population in zip(cells["node"].tolist(), cells["population"].tolist()):
+        if node >= 0 and problem.local[node] >= 0 and population > 0:
+            local = int(problem.local[node])
+            demand[local] = demand.get(local, 0.0) + population / FLOW_PERSONS_PER_VEHICLE
+
+    # Carry the previous flows over; demand whose route lost an edge is rerouted, the rest stays put
+    flow = np.zeros(problem.m)
+    if len(flow_global[0]):
+        positions = problem.local_edges(flow_global[0])
+        flow[positions[positions >= 0]] = flow_global[1][positions >= 0]
+    sink_keys = [(point, int(problem.window[node])) if point < 0 else (point, -1) for node, _, point in problem.sinks]
+    sink_index = {key: i for i, key in enumerate(sink_keys)}
+    fixed_arrivals = np.zeros(len(problem.sinks))
+    rerouted: Dict[int, float] = {}
+    for local, vehicles in demand.items():
+        global_node = int(problem.window[local])
+        previous = paths.get(global_node)
+        sink = sink_index.get(sink_of.get(global_node)) if global_node in sink_of else None
+        if previous is None or sink is None:
+            rerouted[local] = vehicles
+            continue
+        positions = problem.local_edges(previous)
+        if (positions < 0).any():
+            rerouted[local] = vehicles
+            flow[positions[positions >= 0]] -= vehicles
+        else:
+            fixed_arrivals[sink] += vehicles
+    fixed = np.maximum(flow, 0.0) if state is not None else np.zeros(problem.m)
+
+    price = np.asarray([prices.get(key, 0.0) for key in sink_keys], dtype=np.float64)
+    iterations = spec["iterations"]
+    moving = np.zeros(problem.m)
+    arrivals = np.zeros(len(problem.sinks))
+    goals = list(rerouted)
+    bounded = np.isfinite(problem.capacity)
+    tree = None
+    for iteration in range(iterations if goals else 0):
+        tree = problem.tree(problem.costs(fixed + moving), problem.base_price + price, goals)
+        volumes, loaded = problem.load(tree, rerouted)
+        step = 1.0 / (iteration + 1)
+        moving += step * (volumes - moving)
+        arrivals += step * (loaded - arrivals)
+        people = (fixed_arrivals + arrivals) * FLOW_PERSONS_PER_VEHICLE
+        overload = np.where(bounded, people / np.where(bounded, problem.capacity, 1.0) - 1.0, 0.0)
+        price = np.clip(price + FLOW_PRICE_STEP_S * np.clip(overload, -1.0, 1.0), 0.0, ROUTE_UNSHELTERED_PENALTY_MIN * 60)
+
+    # Final whole-cell routes on the converged costs. Capacity is now enforced directly: cells
+    # are placed in order of cost, and once a shelter fills it is closed and the cells still
+    # heading there are re-routed.
+    flow = fixed.copy()
+    if goals:
+        cost = problem.costs(fixed + moving)
+        open_price = problem.base_price + np.where(people_at_capacity(problem, fixed_arrivals), math.inf, 0.0)
+        people = fixed_arrivals * FLOW_PERSONS_PER_VEHICLE
+        pending = dict(rerouted)
+        while pending:
+            tree = problem.tree(cost, open_price, list(pending))
+            deferred = {}
+            for local in [node for node in tree[0] if node in pending]:
+                vehicles = pending.pop(local)
+                edges, sink = problem.path(tree, local)
+                if not math.isfinite(open_price[sink]):
+                    deferred[local] = vehicles
+                    continue
+                global_node = int(problem.window[local])
+                paths[global_node] = problem.edge_ids[edges] if edges else np.empty(0, dtype=np.int64)
+                sink_of[global_node] = sink_keys[sink]
+                np.add.at(flow, edges, vehicles)
+                people[sink] += vehicles * FLOW_PERSONS_PER_VEHICLE
+                if people[sink] >= problem.capacity[sink]:
+                    open_price[sink] = math.inf
+            for local in pending:
+                # Unreachable from every open sink
+                global_node = int(problem.window[local])
+                paths.pop(global_node, None)
+                sink_of.pop(global_node, None)
+            pending = deferred
+
+    cost = problem.costs(flow)
+    queue_h = np.divide(flow, problem.capacity_vph, out=np.zeros(problem.m), where=problem.capacity_vph > 0)
+    node_metrics: Dict[int, Tuple[float, float, int]] = {}
+    for local in demand:
+        global_node = int(problem.window[local])
+        if global_node not in paths or sink_of.get(global_node) not in sink_index:
+            continue
+        positions = problem.local_edges(paths[global_node])
+        travel = float(cost[positions].sum()) if len(positions) else 0.0
+        queue = float(queue_h[positions].max()) * 3600 if len(positions) else 0.0
+        node_metrics[global_node] = (travel, travel + queue, sink_index[sink_of[global_node]])
+
+    used = np.nonzero(flow > 0)[0]
+    worst = used[np.argsort(-queue_h[used])[:FLOW_TOP_BOTTLENECKS]]
+    bottlenecks = []
+    for local in worst.tolist():
+        edge = int(problem.edge_ids[local])
+        a, b = graph.edge_source[edge], graph.edge_target[edge]
+        bottlenecks.append({
+            "latitude": round(float(graph.lat[a] + graph.lat[b]) / 2, 6),
+            "longitude": round(float(graph.lon[a] + graph.lon[b]) / 2, 6),
+            "highway": HIGHWAY_CLASSES[int(graph.edge_highway[edge])],
+            "lanes": int(graph.edge_lanes[edge]),
+            "vehicles": round(float(flow[local]), 1),
+            "capacity_vph": float(problem.capacity_vph[local]),
+            "clearance_min": round(float(queue_h[local]) * 60, 1)
+        })
+
+    return {
+        "sinks": [(int(problem.window[node]), capacity, point) for node, capacity, point in problem.sinks],
+        "sink_keys": sink_keys,
+        "node_metrics": node_metrics,
+        "bottlenecks": bottlenecks,
+        "rerouted_cells": len(rerouted) if state is not None else 0,
+        "iterations": iterations if goals else 0,
+        "state": {
+            "cells": cells,
+            "paths": paths,
+            "sink_of": sink_of,
+            "flow": (problem.edge_ids[flow > 0], flow[flow > 0]),
+            "prices": dict(zip(sink_keys, price.tolist()))
+        },
+        "solve_ms": (time.perf_counter() - started) * 1000
+    }
+
+
+class EvacuationFlowSolver:
+    """Capacity-aware assignment of evacuating population cells to shelters and roads.
+
+    Static traffic assignment by the method of successive averages: each iteration routes
+    all remaining demand over a shortest-path tree on congested (BPR) travel times, and
+    shelters over capacity get a rising price so demand spills to the next one. Hazard
+    zones far enough apart to share no roads are solved in parallel processes. A road
+    closure re-solves only the cells whose route used a closed edge, over the flows of
+    everyone else.
+    """
+
+    def __init__(self, graph: RoadGraph):
+        self.graph = graph
+        self.plans: "OrderedDict[str, dict]" = OrderedDict()
+        # Solves run on request threads: this guards `plans` and the counters, and each plan
+        # carries its own lock so closures on one plan apply one after another
+        self._lock = threading.Lock()
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.solves = 0
+        self.resolves = 0
+        self.total_ms = 0.0
+
+    # --- PROBLEM SETUP ---
+    @staticmethod
+    def _components(hazards: List[dict]) -> List[List[int]]:
+        """Group hazards whose road windows could overlap (union-find)"""
+        parent = list(range(len(hazards)))
+
+        def find(i):
+            while parent[i] != i:
+                parent[i] = parent[parent[i]]
+                i = parent[i]
+            return i
+
+        for i in range(len(hazards)):
+            for j in range(i + 1, len(hazards)):
+                a, b = hazards[i], hazards[j]
+                reach = a["radius_km"] + b["radius_km"] + 2 * FLOW_WINDOW_MARGIN_KM
+                if haversine_km(a["latitude"], a["longitude"], b["latitude"], b["longitude"]) < reach:
+                    parent[find(i)] = find(j)
+        groups: Dict[int, List[int]] = {}
+        for i in range(len(hazards)):
+            groups.setdefault(find(i), []).append(i)
+        return list(groups.values())
+
+    def _zone_cells(self, hazard: dict) -> Dict[str, np.ndarray]:
+        """Evacuees spread over the zone's population cells in proportion to the people living
+        there, or evenly where no population raster covers the zone"""
+        zone = self.graph.nodes_within(hazard["latitude"], hazard["longitude"], hazard["radius_km"])
+        nodes, people = population_cells(self.graph, hazard["latitude"], hazard["longitude"], zone,
+                                         source_spacing(hazard["radius_km"])) if len(zone) else ([], None)
+        nodes = np.asarray(nodes, dtype=np.int64)
+        if people is not None and people.sum() > 0:
+            population = hazard["evacuees"] * people / people.sum()
+        else:
+            population = np.full(len(nodes), hazard["evacuees"] / len(nodes) if len(nodes) else 0.0)
+        return {"lat": self.graph.lat[nodes], "lon": self.graph.lon[nodes], "population": population}
+
+    def _specs(self, hazards: List[dict], cells: Optional[List[dict]], iterations: int) -> List[dict]:
+        specs = []
+        explicit = None
+        if cells is not None:
+            explicit = {
+                "lat": np.asarray([c["latitude"] for c in cells], dtype=np.float64),
+                "lon": np.asarray([c["longitude"] for c in cells], dtype=np.float64),
+                "population": np.asarray([c["population"] for c in cells], dtype=np.float64)
+            }
+            claimed = np.zeros(len(cells), dtype=bool)
+        for group in self._components(hazards):
+            members = [hazards[i] for i in group]
+            if explicit is not None:
+                inside = np.zeros(len(cells), dtype=bool)
+                for h in members:
+                    inside |= haversine_km_array(h["latitude"], h["longitude"], explicit["lat"], explicit["lon"]) <= h["radius_km"]
+                inside &= ~claimed
+                claimed |= inside
+                group_cells = {key: values[inside] for key, values in explicit.items()}
+            else:
+                parts = [self._zone_cells(h) for h in members if h["evacuees"]]
+                group_cells = {
+                    key: np.concatenate([part[key] for part in parts]) if parts else np.empty(0)
+                    for key in ("lat", "lon", "population")
+                }
+            specs.append({"hazards": members, "cells": group_cells, "closed": [], "iterations": iterations})
+        return specs
+
+    def start(self):
+        """Create the worker pool; until then (or with one worker) components are solved inline"""
+        if FLOW_WORKERS > 1 and self._pool is None and self.graph is road_graph and road_graph.loaded:
+            self._pool = ProcessPoolExecutor(FLOW_WORKERS, mp_context=worker_context(), initializer=load_road_graph)
+
+    def _run(self, specs: List[dict]) -> List[dict]:
+        # Workers load the module's road graph themselves, so only that graph can be solved out of process
+        if len(specs) > 1 and self._pool is not None and self.graph is road_graph:
+            return list(self._pool.map(_solve_component, specs))
+        return [_solve_component(spec, self.graph) for spec in specs]
+
+    # --- RESULTS ---
+    def _result(self, plan_id: str, plan: dict, outcomes: List[dict], solve_ms: float) -> dict:
+        """Merge group outcomes into one plan: shelter loads, per-cell assignments and bottlenecks"""
+        graph = self.graph
+        shelters: List[dict] = []
+        shelter_of: Dict[tuple, int] = {}
+        cell_rows = []
+        clearance = 0.0
+        for outcome in outcomes:
+            perimeter = None
+            for (node, capacity, point), key in zip(outcome["sinks"], outcome["sink_keys"]):
+                if point >= 0:
+                    assembly = graph.assembly_points[point]
+                    shelter_of[key] = len(shelters)
+                    shelters.append({
+                        "name": assembly["name"], "kind": assembly["kind"],
+                        "latitude": round(float(graph.lat[node]), 6), "longitude": round(float(graph.lon[node]), 6),
+                        "capacity": int(capacity), "assigned": 0
+                    })
+                else:
+                    # Perimeter sinks of one group are reported together
+                    if perimeter is None:
+                        perimeter = len(shelters)
+                        shelters.append({"name": "Hazard zone perimeter", "kind": "perimeter", "capacity": None, "assigned": 0})
+                    shelter_of[key] = perimeter
+
+            cells = outcome["state"]["cells"]
+            sink_keys = outcome["sink_keys"]
+            for lat, lon, population, node in zip(cells["lat"].tolist(), cells["lon"].tolist(),
+                                                  cells["population"].tolist(), cells["node"].tolist()):
+                metrics = outcome["node_metrics"].get(node)
+                row = {"latitude": lat, "longitude": lon, "population": int(round(population)), "shelter": None,
+                       "travel_time_min": None, "clearance_time_min": None}
+                if metrics is not None:
+                    travel, cleared, sink = metrics
+                    shelter = shelter_of[sink_keys[sink]]
+                    shelters[shelter]["assigned"] += row["population"]
+                    row.update(shelter=shelter, travel_time_min=round(travel / 60, 1), clearance_time_min=round(cleared / 60, 1))
+                    if row["population"]:
+                        clearance = max(clearance, cleared)
+                cell_rows.append(row)
+
+        evacuees = sum(row["population"] for row in cell_rows)
+        assigned = sum(row["population"] for row in cell_rows if row["shelter"] is not None)
+        bottlenecks = sorted(
+            (b for outcome in outcomes for b in outcome["bottlenecks"]), key=lambda b: -b["clearance_min"]
+        )[:FLOW_TOP_BOTTLENECKS]
+        return {
+            "plan_id": plan_id,
+            "timestamp": datetime.now(timezone.utc).isoformat(),
+            "evacuees": evacuees,
+            "assigned_evacuees": assigned,
+            "unassigned_evacuees": evacuees - assigned,
+            "clearance_time_min": round(clearance / 60, 1),
+            "iterations": max((o["iterations"] for o in outcomes), default=0),
+            "components": len(outcomes),
+            "closed_edges": len(plan["closed"]),
+            "rerouted_cells": sum(o["rerouted_cells"] for o in outcomes),
+            "solve_ms": round(solve_ms, 1),
+            "shelters": shelters,
+            "bottlenecks": bottlenecks,
+            "cells": cell_rows
+        }
+
+    def _remember(self, plan_id: str, plan: dict):
+        with self._lock:
+            self.plans[plan_id] = plan
+            self.plans.move_to_end(plan_id)
+            while len(self.plans) > FLOW_MAX_PLANS:
+                self.plans.popitem(last=False)
+
+    def _plan(self, plan_id: str) -> Optional[dict]:
+        with self._lock:
+            return self.plans.get(plan_id)
+
+    # --- PUBLIC API ---
+    def solve(self, hazards: List[dict], cells: Optional[List[dict]] = None, iterations: int = FLOW_ITERATIONS,
+              keep: bool = True) -> Optional[dict]:
+        """Full solve; hazards need latitude, longitude, evacuees and a radius_km or severity"""
+        if not self.graph.loaded:
+            return None
+        hazards = [
+            dict(h, radius_km=h.get("radius_km") or EvacuationRouter.hazard_radius(h.get("severity") or ""))
+            for h in hazards
+        ]
+        started = time.perf_counter()
+        specs = self._specs(hazards, cells, iterations)
+        outcomes = self._run(specs)
+        solve_ms = (time.perf_counter() - started) * 1000
+        with self._lock:
+            self.solves += 1
+            self.total_ms += solve_ms
+
+        plan_id = uuid.uuid4().hex[:16]
+        plan = {"specs": specs, "closed": np.empty(0, dtype=np.int64), "outcomes": outcomes, "lock": threading.Lock()}
+        if keep:
+            self._remember(plan_id, plan)
+        return self._result(plan_id, plan, outcomes, solve_ms)
+
+    def _edges_near(self, latitude: float, longitude: float, radius_m: float) -> np.ndarray:
+        """Edges whose segment passes within radius_m of a point (local planar approximation)"""
+        graph = self.graph
+        nodes = graph.nodes_within(latitude, longitude, radius_m / 1000 + FLOW_CLOSURE_SEARCH_KM)
+        if len(nodes) == 0:
+            return np.empty(0, dtype=np.int64)
+        edges = np.nonzero(np.isin(graph.edge_source, nodes) | np.isin(graph.edge_target, nodes))[0]
+        kx = 111_000 * math.cos(math.radians(latitude))
+        ax = (graph.lon[graph.edge_source[edges]] - longitude) * kx
+        ay = (graph.lat[graph.edge_source[edges]] - latitude) * 111_000
+        bx = (graph.lon[graph.edge_target[edges]] - longitude) * kx
+        by = (graph.lat[graph.edge_target[edges]] - latitude) * 111_000
+        dx, dy = bx - ax, by - ay
+        along = np.clip(-(ax * dx + ay * dy) / np.maximum(dx * dx + dy * dy, 1e-9), 0.0, 1.0)
+        distance = np.hypot(ax + along * dx, ay + along * dy)
+        return edges[distance <= radius_m]
+
+    def close_roads(self, plan_id: str, closures: List[dict]) -> Optional[dict]:
+        """Close every edge touching the given circles and re-solve only the affected cells"""
+        plan = self._plan(plan_id)
+        if plan is None:
+            return None
+        closed = [self._edges_near(closure["latitude"], closure["longitude"], closure["radius_m"]) for closure in closures]
+        # Concurrent closures on the same plan would otherwise each start from the same
+        # closed set and the last to finish would drop the other's roads
+        with plan["lock"]:
+            plan["closed"] = np.unique(np.concatenate([plan["closed"], *closed]))
+            started = time.perf_counter()
+            specs = [
+                dict(spec, closed=plan["closed"], iterations=FLOW_RESOLVE_ITERATIONS, state=outcome["state"])
+                for spec, outcome in zip(plan["specs"], plan["outcomes"])
+            ]
+            outcomes = self._run(specs)
+            solve_ms = (time.perf_counter() - started) * 1000
+            plan["outcomes"] = outcomes
+            result = self._result(plan_id, plan, outcomes, solve_ms)
+        with self._lock:
+            self.resolves += 1
+            self.total_ms += solve_ms
+
+        self._remember(plan_id, plan)
+        return result
+
+    def result(self, plan_id: str) -> Optional[dict]:
+        plan = self._plan(plan_id)
+        if plan is None:
+            return None
+        with plan["lock"]:
+            return self._result(plan_id, plan, plan["outcomes"], 0.0)
+
+    def attach(self, response: DisasterPredictionResponse) -> DisasterPredictionResponse:
+        """Copy of the prediction with a clearance estimate for its evacuation count"""
+        if response.error or not response.evacuations or not self.graph.covers(response.latitude, response.longitude):
+            return response
+        hazard = {"latitude": response.latitude, "longitude": response.longitude,
+                  "severity": response.severity, "evacuees": response.evacuations}
+        result = self.solve([hazard], iterations=FLOW_PREDICTION_ITERATIONS, keep=False)
+        if result is None or not result["cells"]:
+            return response
+
+        sheltered = sum(s["assigned"] for s in result["shelters"] if s["capacity"] is not None)
+        capacity = sum(s["capacity"] for s in result["shelters"] if s["capacity"] is not None)
+        clearance = EvacuationClearance(
+            clearance_time_min=result["clearance_time_min"] if result["assigned_evacuees"] else None,
+            assigned_evacuees=result["assigned_evacuees"],
+            sheltered_evacuees=sheltered,
+            shelter_capacity=capacity,
+            bottleneck=result["bottlenecks"][0] if result["bottlenecks"] else None
+        )
+        update = {"evacuation_clearance": clearance}
+        if capacity < response.evacuations:
+            update["warnings"] = list(response.warnings or []) + [
+                f"⚠️ Shelters within reach hold {capacity} of {response.evacuations} evacuees"
+            ]
+        return response.model_copy(update=update)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        runs = self.solves + self.resolves
+        return {
+            "solves": self.solves,
+            "resolves": self.resolves,
+            "plans": len(self.plans),
+            "avg_ms": round(self.total_ms / runs, 1) if runs else 0.0,
+            "workers": FLOW_WORKERS
+        }
+
+
+evacuation_flow = EvacuationFlowSolver(road_graph)
@@ -0,0 +1,260 @@
+import os
+import math
+import time
+import heapq
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.schemas.prediction_schema import DisasterPredictionResponse, EvacuationRoute
+from src.services.geo_utils import haversine_km_array
+from src.services.road_graph import RoadGraph, road_graph
+from src.services.population_exposure import population_exposure
+
+# --- CONFIGURATION ---
+# Radius of the hazard zone around the predicted location, by severity
+ROUTE_HAZARD_RADII_KM = {
+    severity: float(radius)
+    for severity, radius in (
+        item.split(":", 1)
+        for item in os.getenv("ROUTE_HAZARD_RADII_KM", "Low:1,Moderate:2,High:4,Severe:7,Catastrophic:12").split(",")
+        if ":" in item
+    )
+}
+ROUTE_DEFAULT_RADIUS_KM = float(os.getenv("ROUTE_DEFAULT_RADIUS_KM", "3"))
+# Travel time multiplier for edges inside the hazard zone
+ROUTE_HAZARD_PENALTY = float(os.getenv("ROUTE_HAZARD_PENALTY", "3"))
+# Further multiplier for zone edges heading back towards the hazard (e.g. out of a cul-de-sac)
+ROUTE_INWARD_PENALTY = float(os.getenv("ROUTE_INWARD_PENALTY", "2"))
+# Cost (minutes) of leaving the zone where no assembly point is reachable without re-entering it
+ROUTE_UNSHELTERED_PENALTY_MIN = float(os.getenv("ROUTE_UNSHELTERED_PENALTY_MIN", "30"))
+# Population cells are grid squares over the zone, at most ROUTE_MAX_SOURCES of them, weighted
+# by the population raster where one covers the zone
+ROUTE_SOURCE_SPACING_KM = float(os.getenv("ROUTE_SOURCE_SPACING_KM", "0.5"))
+ROUTE_MAX_SOURCES = int(os.getenv("ROUTE_MAX_SOURCES", "400"))
+ROUTE_TOP_K = int(os.getenv("ROUTE_TOP_K", "5"))
+ROUTE_MAX_PATH_POINTS = int(os.getenv("ROUTE_MAX_PATH_POINTS", "200"))
+
+
+def population_cells(graph: RoadGraph, latitude: float, longitude: float, nodes: np.ndarray,
+                     spacing_km: float) -> Tuple[List[int], Optional[np.ndarray]]:
+    """One road node per grid square around a point (the node closest to the square's centre)
+    and the people living in each square, or None when no population raster covers the point"""
+    cos_lat = max(math.cos(math.radians(latitude)), 0.01)
+    y = (graph.lat[nodes] - latitude) * 111.0 / spacing_km
+    x = (graph.lon[nodes] - longitude) * 111.0 * cos_lat / spacing_km
+    rows, cols = np.floor(y), np.floor(x)
+    offset = (y - rows - 0.5) ** 2 + (x - cols - 0.5) ** 2
+    cells = (rows.astype(np.int64) << 32) + cols.astype(np.int64)
+    order = np.lexsort((offset, cells))
+    _, first = np.unique(cells[order], return_index=True)
+    picked = order[first]
+
+    people = None
+    if population_exposure.covers(latitude, longitude):
+        lat_step, lon_step = spacing_km / 111.0, spacing_km / (111.0 * cos_lat)
+        south, west = latitude + rows[picked] * lat_step, longitude + cols[picked] * lon_step
+        people = population_exposure.rect_sums(south, west, south + lat_step, west + lon_step)
+    return nodes[picked].tolist(), people
+
+def source_spacing(radius_km: float) -> float:
+    return max(ROUTE_SOURCE_SPACING_KM, 2 * radius_km / math.sqrt(ROUTE_MAX_SOURCES))
+
+
+class EvacuationRouter:
+    """Routes population cells in a hazard zone to safe assembly points.
+
+    Zone edges are penalised, and more so when they head back towards the hazard, and a
+    Dijkstra search backwards from the zone's exits gives every zone node its cheapest way
+    out, including dead ends that must first turn inwards. Leaving the zone, routes
+    continue along the graph's precomputed safe field, provided that path never re-enters
+    the zone; otherwise the zone edge itself is the destination, at a fixed penalty. A
+    query only touches zone nodes, whatever the size of the city.
+    """
+
+    def __init__(self, graph: RoadGraph):
+        self.graph = graph
+        self.queries = 0
+        self.total_ms = 0.0
+
+    @staticmethod
+    def hazard_radius(severity: str) -> float:
+        return ROUTE_HAZARD_RADII_KM.get(severity, ROUTE_DEFAULT_RADIUS_KM)
+
+    def _exit_is_safe(self, node: int, hazard: Dict[int, float], verdicts: Dict[int, bool]) -> bool:
+        """Whether the safe-field route from an exit node stays out of the zone (memoised)"""
+        safe_next = self.graph.py_safe_next
+        walked = []
+        verdict = True
+        while node >= 0:
+            if node in verdicts:
+                verdict = verdicts[node]
+                break
+            if node in hazard:
+                verdict = False
+                break
+            walked.append(node)
+            node = safe_next[node]
+        for visited in walked:
+            verdicts[visited] = verdict
+        return verdict
+
+    def _sweep(self, zone: List[int], hazard: Dict[int, float]) -> Dict[int, Tuple[float, int, int, bool]]:
+        """Best route out of the zone for every zone node that has one: node -> (cost, next node, edge id, sheltered)"""
+        graph = self.graph
+        indptr, indices, edges = graph.forward["py_indptr"], graph.forward["py_indices"], graph.forward["py_edge"]
+        back_indptr, back_indices, back_edges = graph.reverse["py_indptr"], graph.reverse["py_indices"], graph.reverse["py_edge"]
+        time_s = graph.py_time_s
+        safe_cost = graph.py_safe_cost
+        penalty, inward = ROUTE_HAZARD_PENALTY, ROUTE_HAZARD_PENALTY * ROUTE_INWARD_PENALTY
+        unsheltered = ROUTE_UNSHELTERED_PENALTY_MIN * 60
+        verdicts: Dict[int, bool] = {}
+
+        # Seed every zone node that has an edge straight out of the zone with its cheapest exit
+        best: Dict[int, Tuple[float, int, int, bool]] = {}
+        heap = []
+        for node in zone:
+            cost, hop, via, sheltered = math.inf, -1, -1, False
+            for slot in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[slot]
+                if neighbour in hazard:
+                    continue
+                exit_sheltered = safe_cost[neighbour] < math.inf and self._exit_is_safe(neighbour, hazard, verdicts)
+                candidate = time_s[edges[slot]] + (safe_cost[neighbour] if exit_sheltered else unsheltered)
+                if candidate < cost:
+                    cost, hop, via, sheltered = candidate, neighbour, edges[slot], exit_sheltered
+            if hop >= 0:
+                best[node] = (cost, hop, via, sheltered)
+                heap.append((cost, node))
+        heapq.heapify(heap)
+
+        # Then grow routes backwards over the zone's own edges
+        while heap:
+            cost, node = heapq.heappop(heap)
+            if cost > best[node][0]:
+                continue
+            depth, sheltered = hazard[node], best[node][3]
+            for slot in range(back_indptr[node], back_indptr[node + 1]):
+                previous = back_indices[slot]
+                previous_depth = hazard.get(previous)
+                if previous_depth is None:
+                    continue
+                edge = back_edges[slot]
+                candidate = cost + time_s[edge] * (inward if depth < previous_depth else penalty)
+                current = best.get(previous)
+                if current is None or candidate < current[0]:
+                    best[previous] = (candidate, node, edge, sheltered)
+                    heapq.heappush(heap, (candidate, previous))
+        return best
+
+    def _route(self, source: int, best: Dict[int, Tuple[float, int, int, bool]]) -> Tuple[List[int], float, float]:
+        """Node path from a zone node to its destination, with free-flow length and time"""
+        graph = self.graph
+        path, walked = [source], []
+        node = source
+        sheltered = best[source][3]
+        while node in best:
+            _, node, edge, _ = best[node]
+            walked.append(edge)
+            path.append(node)
+        if sheltered:
+            safe_next, safe_edge = graph.py_safe_next, graph.py_safe_edge
+            while safe_next[node] >= 0:
+                walked.append(safe_edge[node])
+                node = safe_next[node]
+                path.append(node)
+        return path, float(graph.length_m[walked].sum()), float(graph.time_s[walked].sum())
+
+    def _path_points(self, path: List[int]) -> List[List[float]]:
+        if len(path) > ROUTE_MAX_PATH_POINTS:
+            stride = math.ceil(len(path) / ROUTE_MAX_PATH_POINTS)
+            path = path[::stride] + ([path[-1]] if (len(path) - 1) % stride else [])
+        return [[round(float(self.graph.lat[n]), 6), round(float(self.graph.lon[n]), 6)] for n in path]
+
+    def plan(self, latitude: float, longitude: float, severity: str) -> Optional[Tuple[List[EvacuationRoute], int]]:
+        """Ranked routes out of the hazard zone and the number of population cells left without one"""
+        if not self.graph.covers(latitude, longitude):
+            return None
+        started = time.perf_counter()
+        graph = self.graph
+        radius_km = self.hazard_radius(severity)
+
+        zone = graph.nodes_within(latitude, longitude, radius_km)
+        if len(zone) == 0:
+            return None
+        distances = haversine_km_array(latitude, longitude, graph.lat[zone], graph.lon[zone])
+        hazard = dict(zip(zone.tolist(), distances.tolist()))
+
+        best = self._sweep(zone.tolist(), hazard)
+
+        sources, people = population_cells(graph, latitude, longitude, zone, source_spacing(radius_km))
+        if people is not None:
+            # Nobody to move out of empty squares
+            sources = [source for source, count in zip(sources, people.tolist()) if count > 0]
+            people = people[people > 0].tolist()
+        weights = dict(zip(sources, people)) if people is not None else None
+
+        # Group cells by the place they reach; the cell nearest the hazard represents each group
+        groups: Dict[int, dict] = {}
+        stranded = 0
+        for source in sorted(sources, key=hazard.get):
+            if source not in best:
+                stranded += 1
+                continue
+            path, length_m, time_s = self._route(source, best)
+            group = groups.setdefault(path[-1], {
+                "cells": 0, "people": 0.0, "path": path, "length_m": length_m, "time_s": time_s,
+                "sheltered": best[source][3]
+            })
+            group["cells"] += 1
+            group["people"] += weights[source] if weights is not None else 0.0
+
+        # Routes serving the most people (or cells, without a population raster) come first
+        size = "people" if weights is not None else "cells"
+        ranked = sorted(groups.items(), key=lambda item: (-item[1][size], item[1]["time_s"]))[:ROUTE_TOP_K]
+        routes = []
+        for rank, (target, group) in enumerate(ranked, start=1):
+            if group["sheltered"]:
+                point = graph.assembly_points[graph.safe_point[target]]
+            else:
+                point = {"name": "Hazard zone perimeter", "kind": "perimeter"}
+            routes.append(EvacuationRoute(
+                rank=rank,
+                assembly_point=point["name"],
+                assembly_kind=point["kind"],
+                assembly_latitude=round(float(graph.lat[target]), 6),
+                assembly_longitude=round(float(graph.lon[target]), 6),
+                distance_km=round(group["length_m"] / 1000, 2),
+                travel_time_min=round(group["time_s"] / 60, 1),
+                population_cells=group["cells"],
+                population=round(group["people"]) if weights is not None else None,
+                path=self._path_points(group["path"])
+            ))
+
+        self.queries += 1
+        self.total_ms += (time.perf_counter() - started) * 1000
+        return routes, stranded
+
+    def attach(self, response: DisasterPredictionResponse) -> DisasterPredictionResponse:
+        """Copy of the prediction with routed evacuation paths, when the road graph covers it"""
+        if response.error:
+            return response
+        planned = self.plan(response.latitude, response.longitude, response.severity)
+        if planned is None:
+            return response
+        routes, stranded = planned
+        update = {"optimized_routes": routes}
+        if stranded:
+            update["warnings"] = list(response.warnings or []) + [
+                f"⚠️ {stranded} population cell(s) have no road route out of the hazard zone"
+            ]
+        return response.model_copy(update=update)
+
+    def stats(self) -> dict:
+        return {
+            "queries": self.queries,
+            "avg_ms": round(self.total_ms / self.queries, 2) if self.queries else 0.0
+        }
+
+
+evacuation_router = EvacuationRouter(road_graph)
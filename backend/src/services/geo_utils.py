@@ -0,0 +1,56 @@
+import math
+import numpy as np
+
+EARTH_RADIUS_KM = 6371.0088
+
+def quantize(latitude: float, longitude: float, precision: int) -> tuple:
+    """Snap a coordinate to a grid of `precision` decimal places (2 ≈ 1.1 km)"""
+    return round(latitude, precision), round(longitude, precision)
+
+def quantized_key(latitude: float, longitude: float, precision: int) -> str:
+    """Stable string key for the grid cell containing a coordinate"""
+    lat, lon = quantize(latitude, longitude, precision)
+    return f"{lat:.{precision}f},{lon:.{precision}f}"
+
+def haversine_km(lat1: float, lon1: float, lat2: float, lon2: float) -> float:
+    """Great-circle distance between two points in kilometres"""
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlmb = math.radians(lon2 - lon1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+_GEOHASH_BASE32 = "0123456789bcdefghjkmnpqrstuvwxyz"
+
+def geohash_encode(latitude: float, longitude: float, precision: int = 6) -> str:
+    """Standard base32 geohash; 5 chars ≈ 4.9 km, 6 chars ≈ 1.2 km, 7 chars ≈ 150 m cells"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits, bit_count, even = 0, 0, True
+
+    while len(chars) < precision:
+        value, interval = (longitude, lon_range) if even else (latitude, lat_range)
+        mid = (interval[0] + interval[1]) / 2
+        bits <<= 1
+        if value >= mid:
+            bits |= 1
+            interval[0] = mid
+        else:
+            interval[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(_GEOHASH_BASE32[bits])
+            bits, bit_count = 0, 0
+
+    return "".join(chars)
+
+def haversine_km_array(latitude: float, longitude: float, lats: np.ndarray, lons: np.ndarray) -> np.ndarray:
+    """Vectorized great-circle distance from one point to arrays of points"""
+    phi1 = np.radians(latitude)
+    phi2 = np.radians(lats)
+    dphi = phi2 - phi1
+    dlmb = np.radians(lons - longitude)
+    a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * np.arcsin(np.minimum(1.0, np.sqrt(a)))
@@ -0,0 +1,116 @@
+import os
+import time
+import asyncio
+from datetime import datetime, timezone
+from typing import Optional
+
+from src.config.db import db
+from src.services.ttl_cache import TTLCache
+from src.services.geo_utils import quantized_key
+
+# --- CONFIGURATION ---
+# Decimal places coordinates are snapped to before lookup (2 ≈ 1.1 km grid)
+GEOCODE_CACHE_PRECISION = int(os.getenv("GEOCODE_CACHE_PRECISION", "2"))
+GEOCODE_CACHE_SIZE = int(os.getenv("GEOCODE_CACHE_SIZE", "10000"))
+GEOCODE_CACHE_TTL = int(os.getenv("GEOCODE_CACHE_TTL", str(30 * 24 * 3600)))
+GEOCODE_CACHE_PERSIST = os.getenv("GEOCODE_CACHE_PERSIST", "true").lower() == "true"
+# Nominatim's usage policy allows at most one request per second
+NOMINATIM_MIN_INTERVAL = float(os.getenv("NOMINATIM_MIN_INTERVAL", "1.0"))
+# Upper bound on a single MongoDB cache operation so a slow database never stalls geocoding
+MONGO_CACHE_TIMEOUT = float(os.getenv("MONGO_CACHE_TIMEOUT", "2.0"))
+
+
+class RateLimiter:
+    """Spaces calls at least `min_interval` seconds apart across all coroutines"""
+
+    def __init__(self, min_interval: float):
+        self.min_interval = min_interval
+        self._lock = asyncio.Lock()
+        self._last_call = 0.0
+
+    async def wait(self):
+        async with self._lock:
+            delay = self._last_call + self.min_interval - time.monotonic()
+            if delay > 0:
+                await asyncio.sleep(delay)
+            self._last_call = time.monotonic()
+
+
+class GeocodeCache:
+    """Two-tier reverse-geocoding cache: in-memory LRU backed by a MongoDB TTL collection"""
+
+    def __init__(self):
+        self.precision = GEOCODE_CACHE_PRECISION
+        self.memory = TTLCache(max_entries=GEOCODE_CACHE_SIZE, ttl=GEOCODE_CACHE_TTL)
+        self.collection = db.get_collection("geocode_cache") if GEOCODE_CACHE_PERSIST else None
+        self.persistent_hits = 0
+
+    def key(self, latitude: float, longitude: float) -> str:
+        return quantized_key(latitude, longitude, self.precision)
+
+    async def ensure_indexes(self):
+        """Create the TTL index that lets MongoDB evict stale entries"""
+        if self.collection is None:
+            return
+        try:
+            await asyncio.wait_for(
+                self.collection.create_index("created_at", expireAfterSeconds=GEOCODE_CACHE_TTL),
+                MONGO_CACHE_TIMEOUT
+            )
+        except Exception as e:
+            print(f"⚠️ Geocode cache index creation failed: {e}")
+
+    def get_local(self, latitude: float, longitude: float) -> Optional[dict]:
+        """Memory-tier lookup only (safe from synchronous code)"""
+        return self.memory.get(self.key(latitude, longitude))
+
+    def set_local(self, latitude: float, longitude: float, location: dict):
+        self.memory.set(self.key(latitude, longitude), location)
+
+    async def get(self, latitude: float, longitude: float) -> Optional[dict]:
+        key = self.key(latitude, longitude)
+        location = self.memory.get(key)
+        if location is not None or self.collection is None:
+            return location
+
+        try:
+            doc = await asyncio.wait_for(self.collection.find_one({"_id": key}), MONGO_CACHE_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Geocode cache read failed: {e}")
+            return None
+
+        if doc:
+            self.persistent_hits += 1
+            self.memory.set(key, doc["location"])
+            return doc["location"]
+        return None
+
+    async def set(self, latitude: float, longitude: float, location: dict):
+        key = self.key(latitude, longitude)
+        self.memory.set(key, location)
+        if self.collection is None:
+            return
+
+        try:
+            await asyncio.wait_for(
+                self.collection.replace_one(
+                    {"_id": key},
+                    {"_id": key, "location": location, "created_at": datetime.now(timezone.utc)},
+                    upsert=True
+                ),
+                MONGO_CACHE_TIMEOUT
+            )
+        except Exception as e:
+            print(f"⚠️ Geocode cache write failed: {e}")
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "precision": self.precision,
+            "persistent": self.collection is not None,
+            "persistent_hits": self.persistent_hits
+        }
+
+
+geocode_cache = GeocodeCache()
+nominatim_rate_limiter = RateLimiter(NOMINATIM_MIN_INTERVAL)
@@ -0,0 +1,451 @@
+import os
+import json
+import math
+import time
+import zlib
+import base64
+from concurrent.futures import ProcessPoolExecutor
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.risk_grid import encode_png
+from src.services.population_exposure import population_exposure
+from src.services.worker_pool import worker_context
+
+# --- CONFIGURATION ---
+# Optional georeferenced rasters: <name>.npy (row 0 = north) with <name>.json holding
+# min_lat/min_lon/max_lat/max_lon. Missing or non-covering rasters fall back to synthetic terrain.
+SPREAD_RASTER_DIR = os.getenv("SPREAD_RASTER_DIR", "")
+SPREAD_MAX_GRID = int(os.getenv("SPREAD_MAX_GRID", "4096"))
+# Scenarios in a batch run in this many worker processes
+SPREAD_WORKERS = int(os.getenv("SPREAD_WORKERS", str(os.cpu_count() or 1)))
+# Heat-wave footprint: cells whose temperature anomaly reaches this many degrees C
+SPREAD_HEAT_THRESHOLD_C = float(os.getenv("SPREAD_HEAT_THRESHOLD_C", "2"))
+# Floods start from the lowest ground this close to the predicted location
+SPREAD_FLOOD_SEED_RADIUS_M = float(os.getenv("SPREAD_FLOOD_SEED_RADIUS_M", "1000"))
+SPREAD_FLOOD_INITIAL_DEPTH_M = float(os.getenv("SPREAD_FLOOD_INITIAL_DEPTH_M", "0.5"))
+# Fires ignite on every burnable cell this close to the predicted location
+SPREAD_FIRE_IGNITION_RADIUS_M = float(os.getenv("SPREAD_FIRE_IGNITION_RADIUS_M", "100"))
+
+SEVERITY_LEVELS = ["Low", "Moderate", "High", "Severe", "Catastrophic"]
+# Per-severity model parameters, indexed like SEVERITY_LEVELS
+FLOOD_RISE_M_PER_H = [0.05, 0.1, 0.2, 0.35, 0.5]
+FLOOD_FRONT_M_PER_S = [0.1, 0.2, 0.35, 0.5, 0.8]
+FIRE_SPREAD_M_PER_MIN = [3, 8, 15, 25, 40]
+FIRE_IGNITION_PROBABILITY = [0.35, 0.45, 0.58, 0.66, 0.75]
+HEAT_PEAK_ANOMALY_C = [2.5, 4, 6, 8, 10]
+HEAT_EXPANSION_KM_PER_H = [5, 8, 12, 16, 20]
+
+# Alexandridis et al. (2008) wind and slope coefficients for the fire automaton
+FIRE_WIND_C1, FIRE_WIND_C2, FIRE_SLOPE_A = 0.045, 0.131, 0.078
+LAPSE_RATE_C_PER_M = 0.0065
+
+HAZARD_KEYWORDS = {
+    "flood": ["flood", "inundation", "deluge", "storm surge", "flash"],
+    "wildfire": ["fire", "blaze", "bushfire"],
+    "heatwave": ["heat", "extreme temperature"],
+}
+
+# Neighbour offsets (row, col) and the compass bearing of the move; row 0 is north
+DIRECTIONS = [(-1, 0, 0), (-1, 1, 45), (0, 1, 90), (1, 1, 135), (1, 0, 180), (1, -1, 225), (0, -1, 270), (-1, -1, 315)]
+FOUR_NEIGHBOURS = [(-1, 0), (0, 1), (1, 0), (0, -1)]
+
+
+def hazard_model(hazard: str) -> Optional[str]:
+    """Spread model for a predicted disaster name, or None when no model applies"""
+    text = (hazard or "").lower()
+    for model, keywords in HAZARD_KEYWORDS.items():
+        if any(keyword in text for keyword in keywords):
+            return model
+    return None
+
+def severity_index(severity: str) -> int:
+    return SEVERITY_LEVELS.index(severity) if severity in SEVERITY_LEVELS else 2
+
+
+class TerrainRasters:
+    """Memory-mapped elevation (m) and fuel (0-1) rasters, sampled onto simulation grids"""
+
+    def __init__(self):
+        self.rasters: Dict[str, Tuple[np.ndarray, dict]] = {}
+        self.loaded = False
+
+    def load(self, directory: str = SPREAD_RASTER_DIR):
+        self.loaded = True
+        if not directory:
+            return
+        for name in ("elevation", "fuel"):
+            path = os.path.join(directory, f"{name}.npy")
+            try:
+                with open(os.path.join(directory, f"{name}.json"), "r", encoding="utf-8") as f:
+                    bounds = json.load(f)
+                self.rasters[name] = (np.load(path, mmap_mode="r"), bounds)
+                print(f"✓ Mapped {name} raster {self.rasters[name][0].shape} from {path}")
+            except FileNotFoundError:
+                continue
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable {name} raster: {e}")
+
+    def sample(self, name: str, lats: np.ndarray, lons: np.ndarray) -> Optional[np.ndarray]:
+        """Nearest-neighbour sample on the grid lats (rows) x lons (cols); None unless fully covered"""
+        if name not in self.rasters:
+            return None
+        raster, bounds = self.rasters[name]
+        if lats.min() < bounds["min_lat"] or lats.max() > bounds["max_lat"] or lons.min() < bounds["min_lon"] or lons.max() > bounds["max_lon"]:
+            return None
+        height, width = raster.shape
+        rows = np.clip(((bounds["max_lat"] - lats) / (bounds["max_lat"] - bounds["min_lat"]) * height).astype(np.int64), 0, height - 1)
+        cols = np.clip(((lons - bounds["min_lon"]) / (bounds["max_lon"] - bounds["min_lon"]) * width).astype(np.int64), 0, width - 1)
+        return np.asarray(raster[np.ix_(rows, cols)], dtype=np.float32)
+
+    def stats(self) -> dict:
+        return {name: list(raster.shape) for name, (raster, _) in self.rasters.items()}
+
+
+terrain_rasters = TerrainRasters()
+
+def load_terrain_rasters():
+    terrain_rasters.load()
+
+
+def _value_noise(shape: Tuple[int, int], rng: np.random.Generator, octaves: int = 5) -> np.ndarray:
+    """Fractal value noise in [0, 1]: bilinearly upsampled random lattices, halving amplitude per octave"""
+    rows, cols = shape
+    field = np.zeros(shape, dtype=np.float32)
+    amplitude, total = 1.0, 0.0
+    for octave in range(octaves):
+        cells = 2 ** (octave + 2)
+        lattice = rng.random((cells + 1, cells + 1), dtype=np.float32)
+        # Bilinear interpolation is separable: along columns on the small lattice, then along rows
+        x = np.linspace(0, cells, cols, dtype=np.float32)
+        x0 = np.minimum(x.astype(np.int64), cells - 1)
+        fx = x - x0
+        across = lattice[:, x0] * (1 - fx) + lattice[:, x0 + 1] * fx
+        y = np.linspace(0, cells, rows, dtype=np.float32)
+        y0 = np.minimum(y.astype(np.int64), cells - 1)
+        fy = (y - y0)[:, None]
+        field += amplitude * (across[y0] + (across[y0 + 1] - across[y0]) * fy)
+        total += amplitude
+        amplitude /= 2
+    return field / total
+
+
+def _grid(scenario: dict) -> dict:
+    """Cell centres, cell size and the origin cell of a scenario's bounding box"""
+    min_lat, min_lon, max_lat, max_lon = scenario["bbox"]
+    rows = cols = int(scenario["grid_size"])
+    lats = max_lat - (np.arange(rows) + 0.5) * (max_lat - min_lat) / rows
+    lons = min_lon + (np.arange(cols) + 0.5) * (max_lon - min_lon) / cols
+    dy = (max_lat - min_lat) * 111_000 / rows
+    dx = (max_lon - min_lon) * 111_000 * math.cos(math.radians((min_lat + max_lat) / 2)) / cols
+    origin = (
+        int(np.clip((max_lat - scenario["latitude"]) / (max_lat - min_lat) * rows, 0, rows - 1)),
+        int(np.clip((scenario["longitude"] - min_lon) / (max_lon - min_lon) * cols, 0, cols - 1))
+    )
+    return {"bbox": scenario["bbox"], "lats": lats, "lons": lons, "rows": rows, "cols": cols, "dy": dy, "dx": dx, "origin": origin}
+
+def _terrain(grid: dict, rng: np.random.Generator, with_fuel: bool) -> Tuple[np.ndarray, Optional[np.ndarray], str]:
+    """Elevation, and fuel when the model needs it, from rasters or synthesised from the scenario seed"""
+    if not terrain_rasters.loaded:
+        terrain_rasters.load()
+    if not population_exposure.loaded:
+        population_exposure.load()
+    shape = (grid["rows"], grid["cols"])
+    elevation = terrain_rasters.sample("elevation", grid["lats"], grid["lons"])
+    fuel = terrain_rasters.sample("fuel", grid["lats"], grid["lons"]) if with_fuel else None
+    source = "raster" if elevation is not None else "synthetic"
+    if elevation is None:
+        # Rolling terrain up to ~150 m with a gentle regional slope
+        elevation = 150 * _value_noise(shape, rng) + np.linspace(0, 20, shape[1], dtype=np.float32)[None, :]
+    if with_fuel and fuel is None:
+        fuel = _value_noise(shape, rng, octaves=4)
+        fuel[fuel < 0.3] = 0.0  # patches of bare ground and water that cannot burn
+    return elevation.astype(np.float32), fuel, source
+
+def _active_window(mask: np.ndarray, margin: int) -> Tuple[slice, slice]:
+    """Bounding rows/cols of a mask, grown by margin and clipped to the grid"""
+    rows = np.flatnonzero(mask.any(axis=1))
+    cols = np.flatnonzero(mask.any(axis=0))
+    if len(rows) == 0:
+        return slice(0, 0), slice(0, 0)
+    return (slice(max(rows[0] - margin, 0), min(rows[-1] + margin + 1, mask.shape[0])),
+            slice(max(cols[0] - margin, 0), min(cols[-1] + margin + 1, mask.shape[1])))
+
+def _neighbour_pairs(cells: np.ndarray, shape: Tuple[int, int], offsets) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """(cell, in-grid neighbour, offset index) for every flat cell index and (dr, dc) offset"""
+    rows, cols = np.divmod(cells, shape[1])
+    sources, targets, kinds = [], [], []
+    for kind, (dr, dc) in enumerate(offsets):
+        r, c = rows + dr, cols + dc
+        inside = (r >= 0) & (r < shape[0]) & (c >= 0) & (c < shape[1])
+        sources.append(cells[inside])
+        targets.append(r[inside] * shape[1] + c[inside])
+        kinds.append(np.full(int(inside.sum()), kind, dtype=np.int8))
+    return np.concatenate(sources), np.concatenate(targets), np.concatenate(kinds)
+
+
+def _simulate_flood(scenario: dict, grid: dict, elevation: np.ndarray, slice_hours: List[float]):
+    """Connected-bathtub flood: water rises from the lowest ground near the origin and
+    spreads over connected cells below the level, one cell per front-crossing time.
+
+    Only the shoreline (dry cells touching water) is examined each step, so a step costs
+    the flood's perimeter rather than the grid.
+    """
+    level_index = severity_index(scenario["severity"])
+    rise, front = FLOOD_RISE_M_PER_H[level_index], FLOOD_FRONT_M_PER_S[level_index]
+    r, c = grid["origin"]
+    reach_r = int(SPREAD_FLOOD_SEED_RADIUS_M // grid["dy"])
+    reach_c = int(SPREAD_FLOOD_SEED_RADIUS_M // grid["dx"])
+    r0, c0 = max(r - reach_r, 0), max(c - reach_c, 0)
+    nearby = elevation[r0:r + reach_r + 1, c0:c + reach_c + 1]
+    low_r, low_c = np.unravel_index(int(np.argmin(nearby)), nearby.shape)
+    seed = (r0 + int(low_r)) * grid["cols"] + c0 + int(low_c)
+    base = float(elevation.flat[seed]) + SPREAD_FLOOD_INITIAL_DEPTH_M
+
+    height = elevation.ravel()
+    state = np.zeros(height.size, dtype=np.uint8)  # 0 dry, 1 shoreline, 2 wet
+    state[seed] = 2
+    shore = _neighbour_pairs(np.array([seed]), elevation.shape, FOUR_NEIGHBOURS)[1]
+    state[shore] = 1
+
+    step_h = min(grid["dx"], grid["dy"]) / front / 3600
+    hour, frames = 0.0, []
+    for target in slice_hours:
+        while hour < target and len(shore):
+            hour = min(hour + step_h, target)
+            flooding = shore[height[shore] < base + rise * hour]
+            if not len(flooding):
+                continue
+            state[flooding] = 2
+            _, reached, _ = _neighbour_pairs(flooding, elevation.shape, FOUR_NEIGHBOURS)
+            reached = np.unique(reached[state[reached] == 0])
+            state[reached] = 1
+            shore = np.concatenate([shore[state[shore] == 1], reached])
+        wet = (state == 2).reshape(elevation.shape)
+        level = base + rise * target
+        frames.append((target, wet, np.where(wet, np.maximum(level - elevation, 0), 0).astype(np.float32)))
+    return frames
+
+def _simulate_wildfire(scenario: dict, grid: dict, elevation: np.ndarray, fuel: np.ndarray,
+                       slice_hours: List[float], rng: np.random.Generator):
+    """Probabilistic cellular automaton with wind- and slope-biased spread to 8-neighbours.
+
+    Each step every burning cell may ignite unburnt neighbours, then burns out. Work is
+    done on the burning cells' flat indices only, so a step costs the fire front.
+    """
+    level_index = severity_index(scenario["severity"])
+    ros = FIRE_SPREAD_M_PER_MIN[level_index]
+    p_base = FIRE_IGNITION_PROBABILITY[level_index]
+    wind_ms = scenario.get("wind_speed_kmh", 15.0) / 3.6
+    wind_to = scenario.get("wind_direction_deg", 90.0)
+
+    offsets, probability, distance = [], [], []
+    for dr, dc, bearing in DIRECTIONS:
+        theta = math.radians(bearing - wind_to)
+        wind = math.exp(FIRE_WIND_C1 * wind_ms) * math.exp(FIRE_WIND_C2 * wind_ms * (math.cos(theta) - 1))
+        offsets.append((dr, dc))
+        probability.append(p_base * wind)
+        distance.append(math.hypot(dr * grid["dy"], dc * grid["dx"]))
+    probability = np.array(probability, dtype=np.float32)
+    distance = np.array(distance, dtype=np.float32)
+
+    height, fuel_flat = elevation.ravel(), fuel.ravel()
+    state = np.zeros(height.size, dtype=np.uint8)  # 0 unburnt, 1 burning, 2 burnt
+    # Ignite every burnable cell near the origin, or else the nearest burnable cell
+    r, c = grid["origin"]
+    reach_r = max(1, int(SPREAD_FIRE_IGNITION_RADIUS_M // grid["dy"]))
+    reach_c = max(1, int(SPREAD_FIRE_IGNITION_RADIUS_M // grid["dx"]))
+    rows, cols = np.meshgrid(np.arange(max(r - reach_r, 0), min(r + reach_r + 1, grid["rows"])),
+                             np.arange(max(c - reach_c, 0), min(c + reach_c + 1, grid["cols"])), indexing="ij")
+    burning = (rows * grid["cols"] + cols).ravel()
+    burning = burning[fuel_flat[burning] > 0]
+    if not len(burning) and fuel_flat.any():
+        fuel_r, fuel_c = np.nonzero(fuel)
+        nearest = np.argmin(((fuel_r - r) * grid["dy"]) ** 2 + ((fuel_c - c) * grid["dx"]) ** 2)
+        burning = np.array([fuel_r[nearest] * grid["cols"] + fuel_c[nearest]])
+    state[burning] = 1
+
+    step_h = min(grid["dx"], grid["dy"]) / ros / 60
+    hour, frames = 0.0, []
+    for target in slice_hours:
+        while hour < target and len(burning):
+            hour = min(hour + step_h, target)
+            sources, targets, kinds = _neighbour_pairs(burning, elevation.shape, offsets)
+            open_ = (state[targets] == 0) & (fuel_flat[targets] > 0)
+            sources, targets, kinds = sources[open_], targets[open_], kinds[open_]
+            state[burning] = 2
+            if not len(targets):
+                burning = targets
+                continue
+            slope = np.degrees(np.arctan((height[targets] - height[sources]) / distance[kinds]))
+            # Sparse fuel halves the odds, dense fuel raises them by half
+            p = np.minimum(probability[kinds] * (0.5 + fuel_flat[targets]) * np.exp(FIRE_SLOPE_A * slope), 1.0)
+            # A cell escapes only if every burning neighbour fails to ignite it
+            candidates, inverse = np.unique(targets, return_inverse=True)
+            with np.errstate(divide="ignore"):
+                escape = np.exp(np.bincount(inverse, weights=np.log1p(-p)))
+            burning = candidates[rng.random(len(candidates)) >= escape]
+            state[burning] = 1
+        grid_state = state.reshape(elevation.shape)
+        frames.append((target, grid_state > 0, np.select([grid_state == 1, grid_state == 2], [1.0, 0.5], 0.0).astype(np.float32)))
+    return frames
+
+def _simulate_heatwave(scenario: dict, grid: dict, elevation: np.ndarray, slice_hours: List[float]):
+    """Expanding temperature anomaly around the origin, cooled with height by the lapse rate"""
+    level_index = severity_index(scenario["severity"])
+    peak, expansion = HEAT_PEAK_ANOMALY_C[level_index], HEAT_EXPANSION_KM_PER_H[level_index]
+    r, c = grid["origin"]
+    y = ((np.arange(grid["rows"]) - r) * grid["dy"] / 1000)[:, None]
+    x = ((np.arange(grid["cols"]) - c) * grid["dx"] / 1000)[None, :]
+    distance_sq = (y * y + x * x).astype(np.float32)
+    cooling = LAPSE_RATE_C_PER_M * (elevation - elevation[r, c])
+    frames = []
+    for target in slice_hours:
+        radius = 10 + expansion * target
+        ramp = min(1.0, target / 12)
+        anomaly = peak * ramp * np.exp(-distance_sq / (radius * radius)) - cooling
+        footprint = anomaly >= SPREAD_HEAT_THRESHOLD_C
+        frames.append((target, footprint, np.where(footprint, anomaly, 0).astype(np.float32)))
+    return frames
+
+
+def _frame_summary(hour: float, footprint: np.ndarray, intensity: np.ndarray, grid: dict, images: bool, scale: float) -> dict:
+    cells = int(footprint.sum())
+    summary = {
+        "hour": round(hour, 2),
+        "cells": cells,
+        "area_km2": round(cells * grid["dx"] * grid["dy"] / 1e6, 3),
+        "max_intensity": round(float(intensity.max()), 3) if cells else 0.0,
+        "mean_intensity": round(float(intensity[footprint].mean()), 3) if cells else 0.0,
+        "population": None,
+        "bounds": None,
+        "image": None
+    }
+    if population_exposure.covers_box(*grid["bbox"]):
+        summary["population"] = int(round(population_exposure.footprint(footprint, grid["bbox"])))
+    if cells:
+        rs, cs = _active_window(footprint, 0)
+        lats, lons = grid["lats"], grid["lons"]
+        half_lat = abs(lats[0] - lats[1]) / 2 if len(lats) > 1 else 0
+        half_lon = abs(lons[1] - lons[0]) / 2 if len(lons) > 1 else 0
+        summary["bounds"] = [
+            round(float(lats[rs.stop - 1] - half_lat), 6), round(float(lons[cs.start] - half_lon), 6),
+            round(float(lats[rs.start] + half_lat), 6), round(float(lons[cs.stop - 1] + half_lon), 6)
+        ]
+    if images:
+        pixels = np.where(footprint, 1 + np.clip(intensity / scale, 0, 1) * 254, 0).astype(np.uint8)
+        summary["image"] = base64.b64encode(encode_png(pixels)).decode("ascii")
+    return summary
+
+def simulate(scenario: dict) -> dict:
+    """Run one spread scenario; module-level so it can run in a worker process.
+
+    scenario: hazard, severity, latitude, longitude, bbox (min_lat, min_lon, max_lat, max_lon),
+    grid_size, hours, slices, and optionally wind_speed_kmh, wind_direction_deg, seed, images.
+    """
+    started = time.perf_counter()
+    model = hazard_model(scenario["hazard"])
+    if model is None:
+        raise ValueError(f"No spread model for hazard '{scenario['hazard']}'")
+    grid_size = int(scenario["grid_size"])
+    if not 2 <= grid_size <= SPREAD_MAX_GRID:
+        raise ValueError(f"grid_size must be between 2 and {SPREAD_MAX_GRID}")
+
+    key = json.dumps([round(v, 4) for v in scenario["bbox"]] + [scenario.get("seed", 0)])
+    rng = np.random.default_rng(zlib.crc32(key.encode("utf-8")))
+    grid = _grid(scenario)
+    elevation, fuel, terrain = _terrain(grid, rng, with_fuel=model == "wildfire")
+    slices = max(1, int(scenario.get("slices", 6)))
+    slice_hours = [scenario["hours"] * (i + 1) / slices for i in range(slices)]
+
+    if model == "flood":
+        frames = _simulate_flood(scenario, grid, elevation, slice_hours)
+        unit = "water depth (m)"
+    elif model == "wildfire":
+        frames = _simulate_wildfire(scenario, grid, elevation, fuel, slice_hours, rng)
+        unit = "fire state (1 burning, 0.5 burnt)"
+    else:
+        frames = _simulate_heatwave(scenario, grid, elevation, slice_hours)
+        unit = "temperature anomaly (C)"
+
+    images = scenario.get("images", True)
+    scale = max((float(intensity.max()) for _, _, intensity in frames), default=1.0) or 1.0
+    return {
+        "hazard": scenario["hazard"],
+        "model": model,
+        "severity": scenario["severity"],
+        "terrain_source": terrain,
+        "grid_size": grid_size,
+        "cell_size_m": round(float((grid["dx"] + grid["dy"]) / 2), 2),
+        "intensity_unit": unit,
+        "slices": [_frame_summary(hour, footprint, intensity, grid, images, scale) for hour, footprint, intensity in frames],
+        "elapsed_ms": round((time.perf_counter() - started) * 1000, 1)
+    }
+
+
+def _init_worker():
+    """Map the rasters once per worker; workers start from a fresh interpreter, not a fork"""
+    load_terrain_rasters()
+    if not population_exposure.loaded:
+        population_exposure.load()
+
+
+class SpreadSimulator:
+    """Runs spread scenarios inline, or many at once across worker processes"""
+
+    def __init__(self, workers: int = SPREAD_WORKERS):
+        self.workers = workers
+        self._pool: Optional[ProcessPoolExecutor] = None
+        self.runs = 0
+        self.total_ms = 0.0
+
+    def start(self):
+        """Create the worker pool; until then (or with one worker) batches run inline"""
+        if self.workers > 1 and self._pool is None:
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=worker_context(), initializer=_init_worker)
+
+    def run(self, scenario: dict) -> dict:
+        result = simulate(scenario)
+        self._record([result])
+        return result
+
+    def run_many(self, scenarios: List[dict]) -> List[dict]:
+        """Scenarios in parallel; a failed scenario yields {"error": ...} in its place"""
+        if len(scenarios) > 1 and self._pool is not None:
+            futures = [self._pool.submit(simulate, scenario) for scenario in scenarios]
+            results = []
+            for future in futures:
+                try:
+                    results.append(future.result())
+                except Exception as e:
+                    results.append({"error": str(e)})
+        else:
+            results = []
+            for scenario in scenarios:
+                try:
+                    results.append(simulate(scenario))
+                except Exception as e:
+                    results.append({"error": str(e)})
+        self._record([r for r in results if "error" not in r])
+        return results
+
+    def _record(self, results: List[dict]):
+        self.runs += len(results)
+        self.total_ms += sum(r["elapsed_ms"] for r in results)
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.shutdown(cancel_futures=True)
+            self._pool = None
+
+    def stats(self) -> dict:
+        return {
+            "runs": self.runs,
+            "avg_ms": round(self.total_ms / self.runs, 1) if self.runs else 0.0,
+            "workers": self.workers,
+            "rasters": terrain_rasters.stats()
+        }
+
+
+spread_simulator = SpreadSimulator()
@@ -0,0 +1,504 @@
+import os
+import re
+import csv
+import json
+import math
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.services.geo_utils import haversine_km_array
+
+# --- CONFIGURATION ---
+# EM-DAT export shared with the Node service (mern-backend loads ./disaster_data.csv)
+HISTORICAL_DATA_PATH = os.getenv("HISTORICAL_DATA_PATH", "../mern-backend/disaster_data.csv")
+HISTORICAL_GRID_DEGREES = float(os.getenv("HISTORICAL_GRID_DEGREES", "1.0"))
+# Directory holding the memory-mapped columnar snapshot; defaults to "<csv>.snapshot"
+HISTORICAL_SNAPSHOT_DIR = os.getenv("HISTORICAL_SNAPSHOT_DIR", "")
+HISTORICAL_SNAPSHOT_ENABLED = os.getenv("HISTORICAL_SNAPSHOT_ENABLED", "true").lower() == "true"
+# Bump when the column layout changes so old snapshots are rebuilt
+SNAPSHOT_VERSION = 1
+
+# Column name -> EM-DAT CSV header (same mapping as DisasterDataProcessor.normalizeRecord)
+STRING_COLUMNS = {
+    "id": "DisNo.",
+    "classification": "Historic Classification",
+    "disaster_group": "Disaster Group",
+    "disaster_subgroup": "Disaster Subgroup",
+    "disaster_type": "Disaster Type",
+    "disaster_subtype": "Disaster Subtype",
+    "event_name": "Event Name",
+    "country": "ISO",
+    "region": "Region",
+    "subregion": "Subregion",
+    "location": "Location",
+    "magnitude": "Magnitude",
+    "magnitude_scale": "Magnitude Scale",
+    "river_basin": "River Basin",
+}
+INT_COLUMNS = {
+    "start_year": "Start Year",
+    "start_month": "Start Month",
+    "start_day": "Start Day",
+    "end_year": "End Year",
+    "end_month": "End Month",
+    "end_day": "End Day",
+    "total_deaths": "Total Deaths",
+    "injured": "No. Injured",
+    "affected": "No. Affected",
+    "homeless": "No. Homeless",
+    "total_affected": "Total Affected",
+    "total_damage": "Total Damage ('000 US$)",
+    "total_damage_adjusted": "Total Damage, Adjusted ('000 US$)",
+    "insured_damage": "Insured Damage ('000 US$)",
+    "reconstruction_costs": "Reconstruction Costs ('000 US$)",
+}
+FLOAT_COLUMNS = {
+    "latitude": "Latitude",
+    "longitude": "Longitude",
+}
+
+TYPE_SYNONYMS = {
+    "flood": ["flooding", "inundation", "deluge"],
+    "earthquake": ["quake", "seismic", "tremor"],
+    "cyclone": ["hurricane", "typhoon", "storm"],
+    "fire": ["wildfire", "forest fire", "blaze"],
+    "drought": ["water scarcity", "dry spell"],
+    "landslide": ["mudslide", "rockslide", "slope failure"],
+}
+
+_LEADING_INT = re.compile(r"^\s*([+-]?\d+)")
+
+
+def _parse_int(value: Optional[str]) -> int:
+    """JS parseInt semantics: leading integer, 0 when absent"""
+    match = _LEADING_INT.match(value or "")
+    return int(match.group(1)) if match else 0
+
+def _parse_float(value: Optional[str]) -> float:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return math.nan
+
+def file_checksum(path: str) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+def _js_round(values):
+    """Math.round (half away from zero for positives) rather than banker's rounding"""
+    return np.floor(np.asarray(values, dtype=np.float64) + 0.5).astype(np.int64)
+
+def match_disaster_type(record_type: str, query_type: str) -> bool:
+    """Same rules as DisasterDataProcessor.matchDisasterType"""
+    if not record_type or not query_type:
+        return False
+    type1, type2 = record_type.lower(), query_type.lower()
+    if type1 == type2 or type2 in type1 or type1 in type2:
+        return True
+    for key, values in TYPE_SYNONYMS.items():
+        if key in type2 or type2 in key:
+            return any(synonym in type1 for synonym in values) or key in type1
+    return False
+
+
+class HistoricalDataStore:
+    """Columnar, NumPy-backed store of historical disaster records.
+
+    String columns are dictionary-encoded (int32 codes into a vocabulary), so text
+    matching runs once per distinct value and is broadcast to rows with np.isin.
+    Rows are indexed by disaster type, country, region, start year and a lat/lon grid.
+    """
+
+    def __init__(self, grid_degrees: float = HISTORICAL_GRID_DEGREES):
+        self.grid_degrees = grid_degrees
+        self.columns: Dict[str, np.ndarray] = {}
+        self.vocab: Dict[str, List[str]] = {}
+        self.by_type: Dict[int, np.ndarray] = {}
+        self.by_country: Dict[int, np.ndarray] = {}
+        self.by_region: Dict[int, np.ndarray] = {}
+        self.by_year: Dict[int, np.ndarray] = {}
+        self.by_cell: Dict[tuple, np.ndarray] = {}
+        # SHA-256 of the source CSV, when known; derived artefacts are keyed on it
+        self.checksum: Optional[str] = None
+        self.loaded = False
+
+    def __len__(self) -> int:
+        return len(self.columns.get("start_year", ()))
+
+    # --- LOADING ---
+    def load(self, path: str, snapshot_dir: Optional[str] = None):
+        """Memory-map the snapshot for `path` if it is current, otherwise parse the CSV and write one"""
+        if not HISTORICAL_SNAPSHOT_ENABLED:
+            self.load_csv(path)
+            return
+
+        snapshot_dir = snapshot_dir or f"{path}.snapshot"
+        checksum = file_checksum(path)
+        self.checksum = checksum
+        if self.load_snapshot(snapshot_dir, checksum):
+            print(f"✓ Mapped {len(self)} disaster records from snapshot {snapshot_dir}")
+            return
+
+        self.load_csv(path)
+        try:
+            self.save_snapshot(snapshot_dir, checksum)
+            print(f"✓ Wrote historical snapshot to {snapshot_dir}")
+        except OSError as e:
+            print(f"⚠️ Could not write historical snapshot: {e}")
+
+    def load_snapshot(self, snapshot_dir: str, checksum: str) -> bool:
+        """Map a snapshot written by save_snapshot; False if it is missing, stale or unreadable.
+
+        Columns are opened with mmap_mode="r", so every worker process shares the same
+        page-cache copy instead of holding its own parsed rows.
+        """
+        try:
+            with open(os.path.join(snapshot_dir, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta.get("version") != SNAPSHOT_VERSION or meta.get("checksum") != checksum:
+                return False
+            columns = {
+                name: np.load(os.path.join(snapshot_dir, f"{name}.npy"), mmap_mode="r")
+                for name in [*STRING_COLUMNS, *INT_COLUMNS, *FLOAT_COLUMNS]
+            }
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable historical snapshot: {e}")
+            return False
+
+        self.set_columns(columns, meta["vocab"])
+        return True
+
+    def save_snapshot(self, snapshot_dir: str, checksum: str):
+        """Write one .npy file per column plus the string dictionaries, then swap the directory in"""
+        parent = os.path.dirname(os.path.abspath(snapshot_dir))
+        staging = tempfile.mkdtemp(prefix=".snapshot-", dir=parent)
+        try:
+            for name, values in self.columns.items():
+                np.save(os.path.join(staging, f"{name}.npy"), np.ascontiguousarray(values))
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({"version": SNAPSHOT_VERSION, "checksum": checksum, "rows": len(self), "vocab": self.vocab}, f)
+
+            # Another worker may have finished first; its snapshot is equally valid
+            if os.path.isdir(snapshot_dir):
+                shutil.rmtree(snapshot_dir, ignore_errors=True)
+            os.replace(staging, snapshot_dir)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(snapshot_dir):
+                raise
+
+    def load_csv(self, path: str):
+        """Parse an EM-DAT CSV into column arrays and build the indexes"""
+        codes = {name: [] for name in STRING_COLUMNS}
+        lookups = {name: {"": 0} for name in STRING_COLUMNS}
+        ints = {name: [] for name in INT_COLUMNS}
+        floats = {name: [] for name in FLOAT_COLUMNS}
+
+        with open(path, encoding="utf-8-sig", newline="") as f:
+            for row in csv.DictReader(f):
+                for name, header in STRING_COLUMNS.items():
+                    value = (row.get(header) or "").strip()
+                    lookup = lookups[name]
+                    code = lookup.get(value)
+                    if code is None:
+                        code = lookup[value] = len(lookup)
+                    codes[name].append(code)
+                for name, header in INT_COLUMNS.items():
+                    ints[name].append(_parse_int(row.get(header)))
+                for name, header in FLOAT_COLUMNS.items():
+                    floats[name].append(_parse_float(row.get(header)))
+
+        columns = {}
+        for name in STRING_COLUMNS:
+            columns[name] = np.asarray(codes[name], dtype=np.int32)
+        for name in INT_COLUMNS:
+            columns[name] = np.asarray(ints[name], dtype=np.int64)
+        for name in FLOAT_COLUMNS:
+            columns[name] = np.asarray(floats[name], dtype=np.float64)
+        vocab = {name: list(lookup) for name, lookup in lookups.items()}
+
+        self.set_columns(columns, vocab)
+        print(f"✓ Loaded {len(self)} disaster records")
+        print(f"✓ Indexed {len(self.by_type)} disaster types")
+        print(f"✓ Indexed {len(self.vocab['location'])} locations")
+
+    def set_columns(self, columns: Dict[str, np.ndarray], vocab: Dict[str, List[str]]):
+        self.columns = columns
+        self.vocab = vocab
+        self._build_indexes()
+        self.loaded = True
+
+    @staticmethod
+    def _group(keys: np.ndarray) -> Dict[int, np.ndarray]:
+        """{key: row indices} for an integer key column, via one stable argsort"""
+        if len(keys) == 0:
+            return {}
+        order = np.argsort(keys, kind="stable")
+        sorted_keys = keys[order]
+        boundaries = np.flatnonzero(np.diff(sorted_keys)) + 1
+        starts = np.concatenate(([0], boundaries))
+        ends = np.concatenate((boundaries, [len(keys)]))
+        return {int(sorted_keys[s]): order[s:e] for s, e in zip(starts, ends)}
+
+    @property
+    def n_cols(self) -> int:
+        return int(math.ceil(360 / self.grid_degrees))
+
+    def _cell_ids(self, lats: np.ndarray, lons: np.ndarray) -> tuple:
+        rows = np.floor((lats + 90) / self.grid_degrees).astype(np.int64)
+        # lon=180 is the same meridian as -180, so it folds into column 0
+        cols = np.floor((lons + 180) / self.grid_degrees).astype(np.int64) % self.n_cols
+        return rows, cols
+
+    def _build_indexes(self):
+        c = self.columns
+        self.by_type = self._group(c["disaster_type"])
+        self.by_country = self._group(c["country"])
+        self.by_region = self._group(c["region"])
+        self.by_year = {year: rows for year, rows in self._group(c["start_year"]).items() if year}
+
+        lats, lons = c["latitude"], c["longitude"]
+        located = np.flatnonzero(~np.isnan(lats) & ~np.isnan(lons))
+        rows, cols = self._cell_ids(lats[located], lons[located])
+        n_cols = self.n_cols
+        cells = self._group(rows * n_cols + cols)
+        self.by_cell = {(key // n_cols, key % n_cols): located[idx] for key, idx in cells.items()}
+
+    # --- VOCABULARY MATCHING ---
+    def _codes_where(self, column: str, predicate) -> np.ndarray:
+        """Codes of the distinct values of a string column that satisfy `predicate`"""
+        return np.asarray([code for code, value in enumerate(self.vocab[column]) if predicate(value)], dtype=np.int32)
+
+    def _mask(self, column: str, predicate) -> np.ndarray:
+        return np.isin(self.columns[column], self._codes_where(column, predicate))
+
+    def type_mask(self, disaster_type: str) -> np.ndarray:
+        return self._mask("disaster_type", lambda value: match_disaster_type(value, disaster_type))
+
+    def location_mask(self, location: dict) -> np.ndarray:
+        terms = [str(location.get(key) or "") for key in ("location", "state", "country")]
+        terms = [term.lower() for term in terms if term and term != "Unknown" and not term.startswith("Coordinates:")]
+        return self._mask("location", lambda value: bool(value) and any(term in value.lower() for term in terms))
+
+    def region_mask(self, location: dict) -> np.ndarray:
+        state = str(location.get("state") or "").lower()
+        if not state:
+            return np.zeros(len(self), dtype=bool)
+        matches = lambda value: bool(value) and state in value.lower()
+        return self._mask("region", matches) | self._mask("subregion", matches)
+
+    def code_of(self, column: str, value: str) -> int:
+        try:
+            return self.vocab[column].index(value)
+        except ValueError:
+            return -1
+
+    # --- QUERIES ---
+    def record(self, index: int) -> dict:
+        record = {}
+        for name in STRING_COLUMNS:
+            value = self.vocab[name][self.columns[name][index]]
+            record[name] = value or None
+        for name in INT_COLUMNS:
+            record[name] = int(self.columns[name][index])
+        for name in FLOAT_COLUMNS:
+            value = float(self.columns[name][index])
+            record[name] = None if math.isnan(value) else value
+        return record
+
+    def records(self, indices: np.ndarray) -> List[dict]:
+        return [self.record(int(i)) for i in indices]
+
+    def find_similar(self, location: dict, disaster_type: str, limit: int = 10,
+                     year_range: int = 50, country: str = "IND") -> np.ndarray:
+        """Row indices ranked like DisasterDataProcessor.findSimilar:
+        location match, then region match, then country match, newest and most severe first
+        """
+        min_year = datetime.now(timezone.utc).year - year_range
+        base = self.type_mask(disaster_type) & (self.columns["start_year"] >= min_year)
+
+        selected = base & self.location_mask(location)
+        if selected.sum() < limit:
+            selected |= base & self.region_mask(location)
+        if selected.sum() < limit:
+            selected |= base & (self.columns["country"] == self.code_of("country", country))
+
+        indices = np.flatnonzero(selected)
+        severity = self.columns["total_deaths"][indices] + self.columns["affected"][indices] / 1000
+        order = np.lexsort((-severity, -self.columns["start_year"][indices]))
+        return indices[order][:limit]
+
+    def calculate_stats(self, indices: np.ndarray) -> dict:
+        """Aggregate impact statistics over a set of rows"""
+        count = len(indices)
+        if count == 0:
+            return self.default_stats()
+
+        deaths = self.columns["total_deaths"][indices]
+        injured = self.columns["injured"][indices]
+        affected = self.columns["affected"][indices]
+        homeless = self.columns["homeless"][indices]
+        damage = self.columns["total_damage"][indices]
+        avg = _js_round([deaths.sum() / count, injured.sum() / count, affected.sum() / count,
+                         homeless.sum() / count, damage.sum() / count])
+
+        return {
+            "total_incidents": count,
+            "avg_deaths": int(avg[0]),
+            "avg_injured": int(avg[1]),
+            "avg_affected": int(avg[2]),
+            "avg_homeless": int(avg[3]),
+            "avg_damage": int(avg[4]),
+            "max_deaths": int(deaths.max()),
+            "max_affected": int(affected.max()),
+            "max_damage": int(damage.max()),
+            "fatality_rate": round(float((deaths > 0).sum()) / count * 100, 1),
+            "economic_impact_rate": round(float((damage > 0).sum()) / count * 100, 1),
+            "total_deaths": int(deaths.sum()),
+            "total_affected": int(affected.sum()),
+            "total_damage": int(damage.sum())
+        }
+
+    @staticmethod
+    def default_stats() -> dict:
+        return {
+            "total_incidents": 0,
+            "avg_deaths": 0,
+            "avg_injured": 0,
+            "avg_affected": 0,
+            "avg_homeless": 0,
+            "avg_damage": 0,
+            "max_deaths": 0,
+            "max_affected": 0,
+            "max_damage": 0,
+            "fatality_rate": 0.0,
+            "economic_impact_rate": 0.0,
+            "total_deaths": 0,
+            "total_affected": 0,
+            "total_damage": 0
+        }
+
+    def get_risk_assessment(self, location: dict, disaster_type: str, country: str = "IND") -> dict:
+        """Risk level and score from the 20 most similar historical events"""
+        similar = self.find_similar(location, disaster_type, limit=20, country=country)
+        stats = self.calculate_stats(similar)
+
+        risk_score = 0.0
+        if stats["total_incidents"] > 0:
+            risk_score += min(stats["total_incidents"] * 2, 30)
+            risk_score += min(stats["avg_deaths"] / 10, 25)
+            risk_score += min(stats["max_deaths"] / 100, 25)
+            risk_score += min(stats["avg_affected"] / 10000, 20)
+
+        risk_level = "Low"
+        if risk_score >= 70:
+            risk_level = "High"
+        elif risk_score >= 40:
+            risk_level = "Medium"
+
+        recent_year = datetime.now(timezone.utc).year - 10
+        return {
+            "risk_level": risk_level,
+            "risk_score": int(_js_round(risk_score)),
+            "has_historical_data": len(similar) > 0,
+            "recent_incidents": int((self.columns["start_year"][similar] >= recent_year).sum()),
+            "stats": stats
+        }
+
+    def get_trends(self, disaster_type: str, year_range: int = 20) -> Dict[int, dict]:
+        """Per-year counts, deaths, affected and damage for a disaster type"""
+        start_year = datetime.now(timezone.utc).year - year_range
+        years = self.columns["start_year"]
+        indices = np.flatnonzero(self.type_mask(disaster_type) & (years >= start_year))
+        if len(indices) == 0:
+            return {}
+
+        offsets = years[indices] - start_year
+        size = int(offsets.max()) + 1
+        counts = np.bincount(offsets, minlength=size)
+        deaths = np.bincount(offsets, weights=self.columns["total_deaths"][indices], minlength=size)
+        affected = np.bincount(offsets, weights=self.columns["affected"][indices], minlength=size)
+        damage = np.bincount(offsets, weights=self.columns["total_damage"][indices], minlength=size)
+
+        return {
+            start_year + int(offset): {
+                "count": int(counts[offset]),
+                "deaths": int(deaths[offset]),
+                "affected": int(affected[offset]),
+                "damage": int(damage[offset])
+            }
+            for offset in np.flatnonzero(counts)
+        }
+
+    def nearby(self, latitude: float, longitude: float, radius_km: float, limit: Optional[int] = None) -> tuple:
+        """(row indices, distances in km) of geolocated events within `radius_km`, nearest first"""
+        row, col = self._cell_ids(np.asarray(latitude), np.asarray(longitude))
+        row, col = int(row), int(col)
+        lat_span = int(math.ceil(radius_km / 111.0 / self.grid_degrees))
+        cos_lat = max(math.cos(math.radians(min(89.0, abs(latitude) + lat_span * self.grid_degrees))), 0.01)
+        lon_span = min(int(math.ceil(radius_km / (111.0 * cos_lat) / self.grid_degrees)), int(180 / self.grid_degrees))
+        n_cols = self.n_cols
+
+        candidates = [
+            self.by_cell[(r, c % n_cols)]
+            for r in range(row - lat_span, row + lat_span + 1)
+            for c in range(col - lon_span, col + lon_span + 1)
+            if (r, c % n_cols) in self.by_cell
+        ]
+        if not candidates:
+            return np.empty(0, dtype=np.int64), np.empty(0)
+
+        indices = np.unique(np.concatenate(candidates))
+        distances = haversine_km_array(latitude, longitude, self.columns["latitude"][indices], self.columns["longitude"][indices])
+        keep = distances <= radius_km
+        indices, distances = indices[keep], distances[keep]
+        order = np.argsort(distances, kind="stable")[:limit]
+        return indices[order], distances[order]
+
+    def get_summary(self) -> dict:
+        type_counts = sorted(
+            ({"type": self.vocab["disaster_type"][code] or "Unknown", "count": len(rows)} for code, rows in self.by_type.items()),
+            key=lambda item: item["count"],
+            reverse=True
+        )
+        years = self.columns["start_year"]
+        known_years = years[years > 0]
+        return {
+            "total_records": len(self),
+            "disaster_types": type_counts,
+            "locations": len(np.unique(self.columns["location"])),
+            "year_range": {
+                "earliest": int(known_years.min()) if len(known_years) else None,
+                "latest": int(known_years.max()) if len(known_years) else None
+            },
+            "countries": [self.vocab["country"][code] for code in self.by_country if self.vocab["country"][code]]
+        }
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "records": len(self),
+            "disaster_types": len(self.by_type),
+            "grid_cells": len(self.by_cell),
+            "memory_mapped": isinstance(self.columns.get("start_year"), np.memmap)
+        }
+
+
+historical_store = HistoricalDataStore()
+
+def load_historical_data():
+    """Load the historical CSV at startup if it is present"""
+    if not os.path.exists(HISTORICAL_DATA_PATH):
+        print(f"⚠️ Historical disaster data not found at {HISTORICAL_DATA_PATH}; continuing without it")
+        return
+    historical_store.load(HISTORICAL_DATA_PATH, HISTORICAL_SNAPSHOT_DIR or None)
@@ -0,0 +1,159 @@
+import os
+import re
+import time
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from src.services.historical_data import HistoricalDataStore, historical_store
+
+# --- CONFIGURATION ---
+# Historical events injected into each prediction prompt
+HISTORICAL_RETRIEVAL_K = int(os.getenv("HISTORICAL_RETRIEVAL_K", "5"))
+HISTORICAL_RETRIEVAL_RADIUS_KM = float(os.getenv("HISTORICAL_RETRIEVAL_RADIUS_KM", "150"))
+HISTORICAL_RETRIEVAL_ENABLED = os.getenv("HISTORICAL_RETRIEVAL_ENABLED", "true").lower() == "true"
+
+NO_HISTORY = "No recorded events found for this area."
+
+_TOKEN = re.compile(r"[a-z0-9]+")
+
+
+def _tokens(text: str) -> List[str]:
+    return _TOKEN.findall(text.lower())
+
+def _compact_number(value: int) -> str:
+    if value >= 1_000_000:
+        return f"{value / 1_000_000:.1f}M"
+    if value >= 10_000:
+        return f"{value / 1_000:.0f}k"
+    return str(value)
+
+
+class HistoricalRetriever:
+    """Finds the historical events most relevant to a coordinate for the prompt.
+
+    Geolocated events come from the historical store's grid cell index. Events
+    without coordinates are found through an inverted index of the words in their
+    location text, which is matched against the geocoded place and state.
+    """
+
+    def __init__(self, store: HistoricalDataStore = historical_store):
+        self.store = store
+        self.ready = False
+        self.queries = 0
+        self.empty = 0
+        self.total_seconds = 0.0
+
+    def build(self):
+        store = self.store
+        c = store.columns
+
+        # word -> rows whose location text contains it
+        postings: Dict[str, List[int]] = {}
+        for code, text in enumerate(store.vocab["location"]):
+            for token in set(_tokens(text)):
+                postings.setdefault(token, []).append(code)
+        codes = np.asarray(c["location"])
+        by_code = store._group(codes)
+        self.postings = {
+            token: np.concatenate([by_code[code] for code in code_list if code in by_code])
+            for token, code_list in postings.items()
+        }
+
+        # Newest, most severe first: the order text matches are taken in
+        severity = np.asarray(c["total_deaths"]) + np.asarray(c["affected"]) / 1000
+        self.rank = np.empty(len(store), dtype=np.int64)
+        self.rank[np.lexsort((-severity, -np.asarray(c["start_year"])))] = np.arange(len(store))
+        self.ready = True
+        print(f"✓ Historical retrieval index: {len(store.by_cell)} grid cells, {len(self.postings)} place terms")
+
+    # --- QUERIES ---
+    def nearest(self, latitude: float, longitude: float, k: int, radius_km: float) -> tuple:
+        """(row indices, distances in km) of up to k geolocated events within radius_km"""
+        return self.store.nearby(latitude, longitude, radius_km, limit=k)
+
+    def by_place(self, location_info: dict, k: int, exclude: np.ndarray) -> np.ndarray:
+        """Up to k events whose location text names the geocoded place or state"""
+        matches = []
+        for key in ("location", "state"):
+            value = str(location_info.get(key) or "")
+            words = _tokens(value)
+            if not words or value == "Unknown" or value.startswith("Coordinates:"):
+                continue
+            rows = self.postings.get(words[0])
+            for word in words[1:]:
+                if rows is None:
+                    break
+                other = self.postings.get(word)
+                rows = None if other is None else np.intersect1d(rows, other, assume_unique=True)
+            if rows is not None and len(rows):
+                matches.append(rows)
+        if not matches:
+            return np.empty(0, dtype=np.int64)
+
+        candidates = np.setdiff1d(np.unique(np.concatenate(matches)), exclude, assume_unique=True)
+        if len(candidates) > k:
+            candidates = candidates[np.argpartition(self.rank[candidates], k)[:k]]
+        return candidates[np.argsort(self.rank[candidates], kind="stable")]
+
+    def retrieve(self, latitude: float, longitude: float, location_info: Optional[dict] = None,
+                 k: int = HISTORICAL_RETRIEVAL_K, radius_km: float = HISTORICAL_RETRIEVAL_RADIUS_KM) -> List[dict]:
+        """Nearest geolocated events first, topped up with events recorded for the same place"""
+        if not self.ready:
+            return []
+        started = time.perf_counter()
+        rows, distances = self.nearest(latitude, longitude, k, radius_km)
+        events = [{**self._event(row), "distance_km": round(float(d))} for row, d in zip(rows, distances)]
+        if len(events) < k and location_info:
+            events += [self._event(row) for row in self.by_place(location_info, k - len(events), rows)]
+
+        self.queries += 1
+        self.empty += not events
+        self.total_seconds += time.perf_counter() - started
+        return events
+
+    def _event(self, row) -> dict:
+        c, vocab = self.store.columns, self.store.vocab
+        return {
+            "year": int(c["start_year"][row]),
+            "month": int(c["start_month"][row]),
+            "type": vocab["disaster_type"][c["disaster_type"][row]] or "Unknown",
+            "subtype": vocab["disaster_subtype"][c["disaster_subtype"][row]],
+            "location": vocab["location"][c["location"][row]],
+            "deaths": int(c["total_deaths"][row]),
+            "affected": int(c["affected"][row])
+        }
+
+    def context(self, latitude: float, longitude: float, location_info: Optional[dict] = None) -> str:
+        """Compact, one-line-per-event summary for the prompt"""
+        if not HISTORICAL_RETRIEVAL_ENABLED:
+            return NO_HISTORY
+        events = self.retrieve(latitude, longitude, location_info)
+        if not events:
+            return NO_HISTORY
+
+        lines = []
+        for event in events:
+            when = f"{event['year']}-{event['month']:02d}" if event["month"] else str(event["year"] or "Unknown year")
+            kind = event["type"] + (f" ({event['subtype']})" if event["subtype"] and event["subtype"] != event["type"] else "")
+            where = (event["location"] or "location not recorded")[:80]
+            impact = f"{_compact_number(event['deaths'])} deaths, {_compact_number(event['affected'])} affected"
+            distance = f", {event['distance_km']} km away" if "distance_km" in event else ""
+            lines.append(f"- {when} {kind} at {where}: {impact}{distance}")
+        return "\n".join(lines)
+
+    def stats(self) -> dict:
+        return {
+            "ready": self.ready,
+            "queries": self.queries,
+            "empty": self.empty,
+            "avg_query_ms": round(self.total_seconds / self.queries * 1000, 3) if self.queries else 0.0
+        }
+
+
+historical_retriever = HistoricalRetriever()
+
+def build_historical_retrieval():
+    """Build the retrieval index once the historical store has been loaded"""
+    if historical_store.loaded:
+        historical_retriever.build()
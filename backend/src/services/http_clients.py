@@ -0,0 +1,44 @@
+import os
+import httpx
+
+# --- SHARED HTTP CONNECTION POOLS ---
+# One keep-alive pool per process, reused by the LLM client and the geocoder
+# so repeated calls skip the TCP/TLS handshake.
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "100"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "20"))
+HTTP_KEEPALIVE_EXPIRY = float(os.getenv("HTTP_KEEPALIVE_EXPIRY", "60"))
+HTTP_TIMEOUT = float(os.getenv("HTTP_TIMEOUT", "120"))
+
+_sync_client = None
+_async_client = None
+
+def _limits() -> httpx.Limits:
+    return httpx.Limits(
+        max_connections=HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+        keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+    )
+
+def get_http_client() -> httpx.Client:
+    """Process-wide synchronous HTTP client"""
+    global _sync_client
+    if _sync_client is None or _sync_client.is_closed:
+        _sync_client = httpx.Client(limits=_limits(), timeout=HTTP_TIMEOUT)
+    return _sync_client
+
+def get_async_http_client() -> httpx.AsyncClient:
+    """Process-wide asynchronous HTTP client"""
+    global _async_client
+    if _async_client is None or _async_client.is_closed:
+        _async_client = httpx.AsyncClient(limits=_limits(), timeout=HTTP_TIMEOUT)
+    return _async_client
+
+async def close_http_clients():
+    """Close the shared pools (called on application shutdown)"""
+    global _sync_client, _async_client
+    if _async_client is not None:
+        await _async_client.aclose()
+        _async_client = None
+    if _sync_client is not None:
+        _sync_client.close()
+        _sync_client = None
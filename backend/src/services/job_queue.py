@@ -0,0 +1,226 @@
+import os
+import uuid
+import asyncio
+from datetime import datetime, timedelta, timezone
+from typing import Awaitable, Callable, List, Optional
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from src.config.db import db
+from src.schemas.prediction_schema import CoordinateRequest, DisasterPredictionResponse, PredictionResult
+
+# --- CONFIGURATION ---
+JOB_WORKER_CONCURRENCY = int(os.getenv("JOB_WORKER_CONCURRENCY", "4"))
+JOB_MAX_RETRIES = int(os.getenv("JOB_MAX_RETRIES", "2"))
+JOB_RETRY_BACKOFF = float(os.getenv("JOB_RETRY_BACKOFF", "2.0"))
+# Bound on job-store calls made while serving an HTTP request
+JOB_STORE_TIMEOUT = float(os.getenv("JOB_STORE_TIMEOUT", "5.0"))
+# How long a worker's claim on an item holds before another worker may take it over
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "600"))
+
+ACTIVE_STATUSES = ["queued", "running"]
+
+Processor = Callable[[float, float, str, bool], Awaitable[DisasterPredictionResponse]]
+ErrorBuilder = Callable[[CoordinateRequest, Exception], DisasterPredictionResponse]
+
+
+class JobQueue:
+    """MongoDB-backed queue that predicts large coordinate batches in the background.
+
+    A job document tracks status and counters; each finished coordinate is written to
+    its own item document so progress survives restarts and partial results are pollable.
+    Every worker process resumes unfinished jobs, so an item is leased atomically before it
+    runs and only the leaseholder predicts and records it.
+    """
+
+    def __init__(self, processor: Processor, error_builder: ErrorBuilder, on_complete=None):
+        self.processor = processor
+        self.error_builder = error_builder
+        self.on_complete = on_complete
+        self.jobs = db.get_collection("prediction_jobs")
+        self.items = db.get_collection("prediction_job_items")
+        self.owner = uuid.uuid4().hex
+        self.queue: Optional[asyncio.Queue] = None
+        self.workers: List[asyncio.Task] = []
+
+    async def start(self):
+        """Spawn the worker pool and re-enqueue unfinished work from previous runs"""
+        self.queue = asyncio.Queue()
+        self.workers = [asyncio.create_task(self._worker()) for _ in range(JOB_WORKER_CONCURRENCY)]
+        # Resume in the background so an unreachable database doesn't delay startup
+        self.workers.append(asyncio.create_task(self._resume()))
+
+    async def stop(self):
+        for worker in self.workers:
+            worker.cancel()
+        await asyncio.gather(*self.workers, return_exceptions=True)
+        self.workers = []
+
+    async def submit(self, coordinates: List[CoordinateRequest], mode: str = "llm", ensemble: bool = False) -> dict:
+        job_id = uuid.uuid4().hex
+        now = datetime.now(timezone.utc)
+        job = {
+            "_id": job_id,
+            "status": "queued",
+            "coordinates": [[c.latitude, c.longitude] for c in coordinates],
+            "mode": mode,
+            "ensemble": ensemble,
+            "total": len(coordinates),
+            "completed": 0,
+            "failed": 0,
+            "created_at": now,
+            "updated_at": now
+        }
+        await asyncio.wait_for(self.jobs.insert_one(job), JOB_STORE_TIMEOUT)
+        for index in range(len(coordinates)):
+            self.queue.put_nowait((job_id, index))
+        print(f"📥 Queued prediction job {job_id} with {len(coordinates)} coordinates")
+        return {"job_id": job_id, "status": "queued", "total_locations": len(coordinates)}
+
+    async def _resume(self):
+        try:
+            await self.items.create_index([("job_id", 1), ("index", 1)])
+            async for job in self.jobs.find({"status": {"$in": ACTIVE_STATUSES}}):
+                done = {item["index"] async for item in self.items.find(
+                    {"job_id": job["_id"], "prediction": {"$exists": True}}, {"index": 1}
+                )}
+                pending = [i for i in range(job["total"]) if i not in done]
+                for index in pending:
+                    self.queue.put_nowait((job["_id"], index))
+                if not pending:
+                    await self._finish(job["_id"])
+                print(f"🔁 Resumed prediction job {job['_id']}: {len(pending)} coordinates remaining")
+        except Exception as e:
+            print(f"⚠️ Could not resume prediction jobs: {e}")
+
+    async def _worker(self):
+        while True:
+            job_id, index = await self.queue.get()
+            try:
+                await self._run_item(job_id, index)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"⚠️ Job {job_id} item {index} could not be recorded: {e}")
+            finally:
+                self.queue.task_done()
+
+    async def _claim(self, item_id: str, job_id: str, index: int) -> bool:
+        """Lease an unfinished item to this worker; False when it is done or leased elsewhere"""
+        now = datetime.now(timezone.utc)
+        try:
+            # Matches an unfinished item whose lease ran out; otherwise the upsert inserts a
+            # fresh claim, which fails on the duplicate _id if the item already exists
+            await self.items.update_one(
+                {"_id": item_id, "prediction": {"$exists": False}, "lease_until": {"$lt": now}},
+                {"$set": {
+                    "job_id": job_id,
+                    "index": index,
+                    "owner": self.owner,
+                    "lease_until": now + timedelta(seconds=JOB_LEASE_SECONDS)
+                }},
+                upsert=True
+            )
+        except DuplicateKeyError:
+            return False
+        return True
+
+    async def _renew_lease(self, item_id: str):
+        """Keep extending this worker's lease while the item runs, however long its retries take"""
+        while True:
+            await asyncio.sleep(JOB_LEASE_SECONDS / 3)
+            try:
+                await self.items.update_one(
+                    {"_id": item_id, "owner": self.owner, "prediction": {"$exists": False}},
+                    {"$set": {"lease_until": datetime.now(timezone.utc) + timedelta(seconds=JOB_LEASE_SECONDS)}}
+                )
+            except Exception as e:
+                print(f"⚠️ Could not renew the lease on job item {item_id}: {e}")
+
+    async def _run_item(self, job_id: str, index: int):
+        item_id = f"{job_id}:{index}"
+        # Completed jobs never match, so a late resume can't flip them back to running
+        job = await self.jobs.find_one_and_update(
+            {"_id": job_id, "status": {"$in": ACTIVE_STATUSES}},
+            {"$set": {"status": "running", "updated_at": datetime.now(timezone.utc)}},
+            projection={"coordinates": {"$slice": [index, 1]}, "mode": 1, "ensemble": 1}
+        )
+        if job is None:
+            return
+        if not await self._claim(item_id, job_id, index):
+            return
+
+        latitude, longitude = job["coordinates"][0]
+        failed = False
+        heartbeat = asyncio.create_task(self._renew_lease(item_id))
+        try:
+            for attempt in range(JOB_MAX_RETRIES + 1):
+                try:
+                    prediction = await self.processor(latitude, longitude, job.get("mode", "llm"), job.get("ensemble", False))
+                    break
+                except Exception as e:
+                    if attempt == JOB_MAX_RETRIES:
+                        prediction = self.error_builder(CoordinateRequest(latitude=latitude, longitude=longitude), e)
+                        failed = True
+                    else:
+                        await asyncio.sleep(JOB_RETRY_BACKOFF * (2 ** attempt))
+        finally:
+            heartbeat.cancel()
+
+        # Only the current leaseholder records the item, so it is never counted twice
+        write = await self.items.update_one(
+            {"_id": item_id, "owner": self.owner, "prediction": {"$exists": False}},
+            {"$set": {"prediction": prediction.model_dump()}, "$unset": {"lease_until": ""}}
+        )
+        if write.modified_count == 0:
+            return
+
+        job = await self.jobs.find_one_and_update(
+            {"_id": job_id},
+            {
+                "$inc": {"failed" if failed else "completed": 1},
+                "$set": {"updated_at": datetime.now(timezone.utc)}
+            },
+            projection={"total": 1, "completed": 1, "failed": 1},
+            return_document=ReturnDocument.AFTER
+        )
+        if job and job["completed"] + job["failed"] >= job["total"]:
+            await self._finish(job_id)
+
+    async def _finish(self, job_id: str):
+        await self.jobs.update_one(
+            {"_id": job_id},
+            {"$set": {"status": "completed", "updated_at": datetime.now(timezone.utc)}}
+        )
+        print(f"✅ Prediction job {job_id} completed")
+        if self.on_complete:
+            result = await self.get_result(job_id)
+            if result is not None:
+                await self.on_complete(result)
+
+    async def get_result(self, job_id: str) -> Optional[PredictionResult]:
+        """Current state of a job, including whatever predictions have finished so far"""
+        job = await asyncio.wait_for(self.jobs.find_one({"_id": job_id}, {"coordinates": 0}), JOB_STORE_TIMEOUT)
+        if not job:
+            return None
+
+        items = await asyncio.wait_for(
+            self.items.find({"job_id": job_id, "prediction": {"$exists": True}}).sort("index", 1).to_list(length=None),
+            JOB_STORE_TIMEOUT
+        )
+        predictions = [DisasterPredictionResponse(**item["prediction"]) for item in items]
+        return PredictionResult(
+            predictions=predictions,
+            timestamp=job["updated_at"].isoformat(),
+            total_locations=job["total"],
+            result_id=job_id,
+            status=job["status"],
+            completed_locations=job["completed"] + job["failed"]
+        )
+
+    def stats(self) -> dict:
+        return {
+            "workers": JOB_WORKER_CONCURRENCY if self.workers else 0,
+            "queued_items": self.queue.qsize() if self.queue else 0
+        }
@@ -0,0 +1,159 @@
+import os
+import csv
+import math
+from typing import Optional
+
+from src.services.geo_utils import haversine_km, EARTH_RADIUS_KM
+
+# --- CONFIGURATION ---
+# "online" uses Nominatim (with the geocode cache); "offline" answers from a local gazetteer first
+GEOCODER_MODE = os.getenv("GEOCODER_MODE", "online").lower()
+# GeoNames-format gazetteer (e.g. cities1000.txt) plus optional admin1/country name tables
+OFFLINE_GAZETTEER_PATH = os.getenv("OFFLINE_GAZETTEER_PATH", "data/geonames/cities1000.txt")
+OFFLINE_ADMIN1_PATH = os.getenv("OFFLINE_ADMIN1_PATH", "data/geonames/admin1CodesASCII.txt")
+OFFLINE_COUNTRY_INFO_PATH = os.getenv("OFFLINE_COUNTRY_INFO_PATH", "data/geonames/countryInfo.txt")
+# Nearest place further away than this is treated as a miss
+OFFLINE_GEOCODER_MAX_KM = float(os.getenv("OFFLINE_GEOCODER_MAX_KM", "25"))
+# Whether misses may fall back to Nominatim (disable for air-gapped deployments)
+OFFLINE_GEOCODER_FALLBACK = os.getenv("OFFLINE_GEOCODER_FALLBACK", "true").lower() == "true"
+OFFLINE_GRID_DEGREES = float(os.getenv("OFFLINE_GRID_DEGREES", "0.5"))
+
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+class OfflineGeocoder:
+    """Nearest-place reverse geocoder over a local gazetteer, indexed on a lat/lon grid"""
+
+    def __init__(self, grid_degrees: float = OFFLINE_GRID_DEGREES):
+        self.grid_degrees = grid_degrees
+        self.lon_cells = int(math.ceil(360 / grid_degrees))
+        self.lat_cells = int(math.ceil(180 / grid_degrees))
+        self.cells = {}
+        self.lats = []
+        self.lons = []
+        self.names = []
+        self.states = []
+        self.countries = []
+        self.loaded = False
+
+    def _cell(self, latitude: float, longitude: float) -> tuple:
+        row = min(int((latitude + 90) / self.grid_degrees), self.lat_cells - 1)
+        col = int((longitude + 180) / self.grid_degrees) % self.lon_cells
+        return row, col
+
+    def add(self, latitude: float, longitude: float, name: str, state: str, country: str):
+        index = len(self.lats)
+        self.lats.append(latitude)
+        self.lons.append(longitude)
+        self.names.append(name)
+        self.states.append(state)
+        self.countries.append(country)
+        self.cells.setdefault(self._cell(latitude, longitude), []).append(index)
+
+    def load(self, gazetteer_path: str, admin1_path: Optional[str] = None, country_info_path: Optional[str] = None):
+        """Load a GeoNames-format gazetteer (tab-separated, lat/lon in columns 4/5)"""
+        admin1 = _read_admin1(admin1_path) if admin1_path and os.path.exists(admin1_path) else {}
+        countries = _read_country_info(country_info_path) if country_info_path and os.path.exists(country_info_path) else {}
+
+        with open(gazetteer_path, encoding="utf-8", newline="") as f:
+            for row in csv.reader(f, delimiter="\t", quoting=csv.QUOTE_NONE):
+                if len(row) < 11:
+                    continue
+                try:
+                    latitude, longitude = float(row[4]), float(row[5])
+                except ValueError:
+                    continue
+                country_code = row[8]
+                self.add(
+                    latitude,
+                    longitude,
+                    row[1],
+                    admin1.get(f"{country_code}.{row[10]}", "Unknown"),
+                    countries.get(country_code, country_code or "Unknown")
+                )
+
+        self.loaded = True
+        print(f"✓ Offline geocoder loaded {len(self.lats)} places into {len(self.cells)} grid cells")
+
+    def nearest(self, latitude: float, longitude: float, max_km: Optional[float] = None) -> Optional[tuple]:
+        """Return (index, distance_km) of the closest place, searching outward ring by ring"""
+        if not self.lats:
+            return None
+
+        row, col = self._cell(latitude, longitude)
+        best_index, best_km = None, math.inf
+        max_ring = max(self.lat_cells, self.lon_cells // 2)
+
+        for ring in range(max_ring + 1):
+            # Every point in this ring is at least (ring - 1) cells away along one axis
+            if ring > 1:
+                edge_lat = min(89.9, abs(latitude) + ring * self.grid_degrees)
+                lower_bound = (ring - 1) * self.grid_degrees * KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+                if lower_bound > best_km or (max_km is not None and lower_bound > max_km):
+                    break
+
+            for r in range(row - ring, row + ring + 1):
+                if r < 0 or r >= self.lat_cells:
+                    continue
+                edge_row = r in (row - ring, row + ring)
+                for c in range(col - ring, col + ring + 1):
+                    if not edge_row and c not in (col - ring, col + ring):
+                        continue
+                    for index in self.cells.get((r, c % self.lon_cells), ()):
+                        km = haversine_km(latitude, longitude, self.lats[index], self.lons[index])
+                        if km < best_km:
+                            best_index, best_km = index, km
+
+        if best_index is None or (max_km is not None and best_km > max_km):
+            return None
+        return best_index, best_km
+
+    def lookup(self, latitude: float, longitude: float, max_km: Optional[float] = OFFLINE_GEOCODER_MAX_KM) -> Optional[dict]:
+        """Location fields for the nearest place within `max_km`, or None on a miss"""
+        match = self.nearest(latitude, longitude, max_km)
+        if match is None:
+            return None
+
+        index, _ = match
+        name, state, country = self.names[index], self.states[index], self.countries[index]
+        return {
+            "location": name,
+            "state": state,
+            "country": country,
+            "display_name": ", ".join(part for part in (name, state, country) if part and part != "Unknown")
+        }
+
+
+def _read_admin1(path: str) -> dict:
+    """admin1CodesASCII.txt: '<CC>.<code>\\t<name>\\t<ascii name>\\t<geonameid>'"""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 2:
+                names[parts[0]] = parts[1]
+    return names
+
+def _read_country_info(path: str) -> dict:
+    """countryInfo.txt: ISO code in column 0, country name in column 4; '#' lines are comments"""
+    names = {}
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            if line.startswith("#"):
+                continue
+            parts = line.rstrip("\n").split("\t")
+            if len(parts) >= 5:
+                names[parts[0]] = parts[4]
+    return names
+
+
+offline_geocoder = OfflineGeocoder()
+
+def load_offline_geocoder():
+    """Load the gazetteer at startup when GEOCODER_MODE=offline"""
+    if GEOCODER_MODE != "offline":
+        return
+    if not os.path.exists(OFFLINE_GAZETTEER_PATH):
+        print(f"⚠️ Offline geocoder enabled but gazetteer not found at {OFFLINE_GAZETTEER_PATH}")
+        return
+    offline_geocoder.load(OFFLINE_GAZETTEER_PATH, OFFLINE_ADMIN1_PATH, OFFLINE_COUNTRY_INFO_PATH)
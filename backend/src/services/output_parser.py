@@ -0,0 +1,151 @@
+import json
+import os
+from collections import Counter
+from typing import Optional
+
+from pydantic import ValidationError
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+
+# --- CONFIGURATION ---
+# Give up on a streamed reply if this many characters arrive without an opening brace
+PARSE_PROSE_LIMIT = int(os.getenv("PARSE_PROSE_LIMIT", "2000"))
+
+# Failure reasons seen so far, exposed through /disaster/stats
+parse_failures = Counter()
+
+_decoder = json.JSONDecoder()
+
+
+class PredictionParseError(Exception):
+    """LLM output that could not be turned into a DisasterPredictionResponse"""
+
+    def __init__(self, reason: str, detail: str = ""):
+        super().__init__(f"{reason}: {detail}" if detail else reason)
+        self.reason = reason
+
+
+class JSONObjectScanner:
+    """Incrementally scans streamed text for the first balanced top-level JSON object.
+
+    Braces inside JSON strings are ignored. A balanced span that is not valid JSON
+    (e.g. prose like "{see below}") is skipped and scanning continues after it.
+    """
+
+    def __init__(self, prose_limit: int = PARSE_PROSE_LIMIT):
+        self.prose_limit = prose_limit
+        self.buffer = []
+        self.length = 0
+        self.prose_from = 0
+        self.start = None
+        self.depth = 0
+        self.in_string = False
+        self.escape = False
+        self.result = None
+
+    def feed(self, chunk: str) -> Optional[dict]:
+        """Consume a chunk; returns the parsed object as soon as it closes"""
+        if self.result is not None:
+            return self.result
+
+        for char in chunk:
+            position = self.length
+            self.buffer.append(char)
+            self.length += 1
+
+            if self.start is None:
+                if char == "{":
+                    self.start, self.depth = position, 1
+                elif self.length - self.prose_from > self.prose_limit:
+                    raise PredictionParseError("no_json", f"no JSON object in first {self.prose_limit} characters")
+                continue
+
+            if self.in_string:
+                if self.escape:
+                    self.escape = False
+                elif char == "\\":
+                    self.escape = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == "{":
+                self.depth += 1
+            elif char == "}":
+                self.depth -= 1
+                if self.depth == 0:
+                    candidate = "".join(self.buffer[self.start:])
+                    try:
+                        value = json.loads(candidate)
+                    except json.JSONDecodeError:
+                        value = None
+                    if isinstance(value, dict):
+                        self.result = value
+                        return value
+                    # Not JSON after all: keep looking after this span
+                    self.start = None
+                    self.in_string = False
+                    self.prose_from = self.length
+        return None
+
+    def finish(self) -> dict:
+        """Called at end of stream; falls back to trying every opening brace"""
+        if self.result is not None:
+            return self.result
+
+        text = "".join(self.buffer)
+        position = text.find("{")
+        while position != -1:
+            try:
+                value, _ = _decoder.raw_decode(text, position)
+                if isinstance(value, dict):
+                    return value
+            except json.JSONDecodeError:
+                pass
+            position = text.find("{", position + 1)
+
+        if self.start is not None:
+            raise PredictionParseError("truncated", "reply ended inside a JSON object")
+        raise PredictionParseError("no_json", "no JSON object in reply")
+
+
+def extract_json_object(text: str) -> dict:
+    """First JSON object in a complete reply"""
+    scanner = JSONObjectScanner(prose_limit=len(text) + 1)
+    scanner.feed(text)
+    return scanner.finish()
+
+
+def extract_json_array(text: str) -> list:
+    """First JSON array in a complete reply, decoded at each opening bracket in turn so that
+    brackets in surrounding prose ("[0] is the coastal site...") don't swallow the reply"""
+    position = text.find("[")
+    while position != -1:
+        try:
+            value, _ = _decoder.raw_decode(text, position)
+            if isinstance(value, list) and any(isinstance(item, dict) for item in value):
+                return value
+        except json.JSONDecodeError:
+            pass
+        position = text.find("[", position + 1)
+    raise PredictionParseError("no_json", "no JSON array of objects in reply")
+
+
+def to_prediction_response(data: dict, latitude: float, longitude: float) -> DisasterPredictionResponse:
+    """Validate a parsed object straight into the response model, stamping the request coordinates"""
+    data["latitude"] = latitude
+    data["longitude"] = longitude
+    try:
+        return DisasterPredictionResponse.model_validate(data)
+    except ValidationError as e:
+        first = e.errors()[0]
+        field = ".".join(str(part) for part in first["loc"])
+        raise PredictionParseError("schema", f"{field}: {first['msg']}")
+
+
+def record_failure(error: PredictionParseError):
+    parse_failures[error.reason] += 1
+
+
+def parse_stats() -> dict:
+    return dict(parse_failures)
@@ -0,0 +1,252 @@
+import os
+import json
+import math
+import glob
+import tempfile
+from typing import List, Optional, Tuple
+
+import numpy as np
+
+# --- CONFIGURATION ---
+# Population tiles: <name>.npy (people per cell, row 0 = north) with <name>.json holding
+# min_lat/min_lon/max_lat/max_lon, or north-up EPSG:4326 GeoTIFFs (read with rasterio if installed)
+POPULATION_RASTER_DIR = os.getenv("POPULATION_RASTER_DIR", "")
+# Summed-area tables are written here; defaults to "<raster dir>/.sat"
+POPULATION_SAT_DIR = os.getenv("POPULATION_SAT_DIR", "")
+# Rows per block while building a summed-area table, bounding memory for large tiles
+POPULATION_BUILD_ROWS = int(os.getenv("POPULATION_BUILD_ROWS", "1024"))
+# Strips a circle is cut into per raster row it spans (at least POPULATION_MIN_STRIPS overall)
+POPULATION_STRIPS_PER_ROW = int(os.getenv("POPULATION_STRIPS_PER_ROW", "4"))
+POPULATION_MIN_STRIPS = int(os.getenv("POPULATION_MIN_STRIPS", "64"))
+# Predicted figures more than this many times above (or affected below) the exposure are flagged
+POPULATION_DIVERGENCE_FACTOR = float(os.getenv("POPULATION_DIVERGENCE_FACTOR", "10"))
+
+# Bump when the table layout changes so stored tables are rebuilt
+POPULATION_SAT_VERSION = 1
+
+
+def _read_geotiff(path: str) -> Optional[Tuple[np.ndarray, dict]]:
+    try:
+        import rasterio
+    except ImportError:
+        print(f"⚠️ Skipping {path}: GeoTIFF population tiles need rasterio")
+        return None
+    with rasterio.open(path) as dataset:
+        if dataset.crs is not None and dataset.crs.to_epsg() != 4326:
+            print(f"⚠️ Skipping {path}: population tiles must be EPSG:4326, got {dataset.crs}")
+            return None
+        band = dataset.read(1, masked=True)
+        bounds = {"min_lat": dataset.bounds.bottom, "min_lon": dataset.bounds.left,
+                  "max_lat": dataset.bounds.top, "max_lon": dataset.bounds.right}
+        return np.ma.filled(band.astype(np.float32), 0), bounds
+
+def _read_npy(path: str) -> Optional[Tuple[np.ndarray, dict]]:
+    try:
+        with open(os.path.splitext(path)[0] + ".json", "r", encoding="utf-8") as f:
+            bounds = json.load(f)
+    except FileNotFoundError:
+        print(f"⚠️ Skipping {path}: no bounds sidecar")
+        return None
+    return np.load(path, mmap_mode="r"), bounds
+
+
+class PopulationTile:
+    """One tile's summed-area table: sat[r, c] = people in rows < r and columns < c"""
+
+    def __init__(self, name: str, sat: np.ndarray, bounds: dict):
+        self.name = name
+        self.sat = sat
+        self.rows, self.cols = sat.shape[0] - 1, sat.shape[1] - 1
+        self.min_lat, self.min_lon = bounds["min_lat"], bounds["min_lon"]
+        self.max_lat, self.max_lon = bounds["max_lat"], bounds["max_lon"]
+        self.lat_step = (self.max_lat - self.min_lat) / self.rows
+        self.lon_step = (self.max_lon - self.min_lon) / self.cols
+        self.total = float(sat[-1, -1])
+
+    @staticmethod
+    def build(raster: np.ndarray, path: str):
+        """Write the summed-area table of a (possibly memory-mapped) raster, a block of rows at a time"""
+        rows, cols = raster.shape
+        sat = np.lib.format.open_memmap(path, mode="w+", dtype=np.float64, shape=(rows + 1, cols + 1))
+        sat[0, :] = 0
+        sat[:, 0] = 0
+        carry = np.zeros(cols, dtype=np.float64)
+        for start in range(0, rows, POPULATION_BUILD_ROWS):
+            block = np.nan_to_num(np.asarray(raster[start:start + POPULATION_BUILD_ROWS], dtype=np.float64))
+            np.maximum(block, 0, out=block)  # nodata sentinels are negative in most products
+            block = block.cumsum(axis=1).cumsum(axis=0) + carry
+            sat[start + 1:start + 1 + len(block), 1:] = block
+            carry = block[-1]
+        sat.flush()
+        del sat
+
+    def overlaps(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> bool:
+        return min_lat < self.max_lat and max_lat > self.min_lat and min_lon < self.max_lon and max_lon > self.min_lon
+
+    def _sat_at(self, y: np.ndarray, x: np.ndarray) -> np.ndarray:
+        """Summed-area table at fractional (row, col) positions.
+
+        People are spread evenly within a cell, so the table is exactly bilinear between
+        its grid points and any rectangle's sum is exact, not just whole-cell ones.
+        """
+        i = np.minimum(np.floor(y).astype(np.int64), self.rows - 1)
+        j = np.minimum(np.floor(x).astype(np.int64), self.cols - 1)
+        a, b = y - i, x - j
+        s00, s01 = self.sat[i, j], self.sat[i, j + 1]
+        s10, s11 = self.sat[i + 1, j], self.sat[i + 1, j + 1]
+        return s00 + a * (s10 - s00) + b * (s01 - s00) + a * b * (s11 - s10 - s01 + s00)
+
+    def rect_sums(self, south: np.ndarray, west: np.ndarray, north: np.ndarray, east: np.ndarray) -> np.ndarray:
+        """People in each lat/lon rectangle, clipped to the tile"""
+        y0 = np.clip((self.max_lat - north) / self.lat_step, 0, self.rows)
+        y1 = np.clip((self.max_lat - south) / self.lat_step, 0, self.rows)
+        x0 = np.clip((west - self.min_lon) / self.lon_step, 0, self.cols)
+        x1 = np.clip((east - self.min_lon) / self.lon_step, 0, self.cols)
+        valid = (y1 > y0) & (x1 > x0)
+        sums = self._sat_at(y1, x1) - self._sat_at(y0, x1) - self._sat_at(y1, x0) + self._sat_at(y0, x0)
+        return np.where(valid, sums, 0.0)
+
+
+class PopulationExposure:
+    """Population within a radius, box or hazard footprint, from memory-mapped summed-area tables.
+
+    Each tile's table is built once, stored next to the tiles and memory-mapped; a query
+    reads four table entries per rectangle, so it only touches the pages it needs and
+    costs the same whatever the area. Circles are summed as thin horizontal strips and
+    footprints as runs of cells along each row.
+    """
+
+    def __init__(self):
+        self.tiles: List[PopulationTile] = []
+        self.loaded = False
+        self.queries = 0
+
+    def load(self, directory: str = POPULATION_RASTER_DIR, sat_dir: str = POPULATION_SAT_DIR):
+        self.loaded = True
+        if not directory:
+            return
+        sat_dir = sat_dir or os.path.join(directory, ".sat")
+        os.makedirs(sat_dir, exist_ok=True)
+        paths = sorted(glob.glob(os.path.join(directory, "*.npy")) + glob.glob(os.path.join(directory, "*.tif"))
+                       + glob.glob(os.path.join(directory, "*.tiff")))
+        for path in paths:
+            try:
+                tile = self._load_tile(path, sat_dir)
+            except (OSError, ValueError, KeyError) as e:
+                print(f"⚠️ Ignoring unreadable population tile {path}: {e}")
+                continue
+            if tile is not None:
+                self.tiles.append(tile)
+        if self.tiles:
+            print(f"✓ Population exposure: {len(self.tiles)} tile(s), {sum(t.total for t in self.tiles):,.0f} people")
+
+    def _load_tile(self, path: str, sat_dir: str) -> Optional[PopulationTile]:
+        name = os.path.splitext(os.path.basename(path))[0]
+        stat = os.stat(path)
+        signature = {"version": POPULATION_SAT_VERSION, "size": stat.st_size, "mtime_ns": stat.st_mtime_ns}
+        sat_path = os.path.join(sat_dir, f"{name}.sat.npy")
+        meta_path = os.path.join(sat_dir, f"{name}.sat.json")
+        try:
+            with open(meta_path, "r", encoding="utf-8") as f:
+                meta = json.load(f)
+            if meta["signature"] == signature:
+                return PopulationTile(name, np.load(sat_path, mmap_mode="r"), meta["bounds"])
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
+
+        loaded = _read_npy(path) if path.endswith(".npy") else _read_geotiff(path)
+        if loaded is None:
+            return None
+        raster, bounds = loaded
+        fd, tmp_path = tempfile.mkstemp(dir=sat_dir, suffix=".npy")
+        os.close(fd)
+        try:
+            PopulationTile.build(raster, tmp_path)
+            os.replace(tmp_path, sat_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        with open(meta_path, "w", encoding="utf-8") as f:
+            json.dump({"signature": signature, "bounds": bounds}, f)
+        print(f"✓ Built population summed-area table for {name} {raster.shape}")
+        return PopulationTile(name, np.load(sat_path, mmap_mode="r"), bounds)
+
+    def covers(self, latitude: float, longitude: float) -> bool:
+        return any(t.min_lat <= latitude <= t.max_lat and t.min_lon <= longitude <= t.max_lon for t in self.tiles)
+
+    def covers_box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> bool:
+        return all(self.covers(lat, lon) for lat in (min_lat, max_lat) for lon in (min_lon, max_lon))
+
+    def rect_sums(self, south: np.ndarray, west: np.ndarray, north: np.ndarray, east: np.ndarray) -> np.ndarray:
+        """People in each of a set of rectangles, across every tile they touch"""
+        self.queries += 1
+        sums = np.zeros(len(south))
+        bounds = (float(south.min()), float(west.min()), float(north.max()), float(east.max())) if len(south) else None
+        for tile in self.tiles:
+            if bounds is not None and tile.overlaps(*bounds):
+                sums += tile.rect_sums(south, west, north, east)
+        return sums
+
+    def rect_sum(self, south: np.ndarray, west: np.ndarray, north: np.ndarray, east: np.ndarray) -> float:
+        """People in a set of non-overlapping rectangles"""
+        return float(self.rect_sums(south, west, north, east).sum())
+
+    def box(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> float:
+        return self.rect_sum(*(np.array([v], dtype=np.float64) for v in (min_lat, min_lon, max_lat, max_lon)))
+
+    def circle(self, latitude: float, longitude: float, radius_km: float) -> float:
+        """People within radius_km, summing horizontal strips as wide as the circle at their middle"""
+        half_lat = radius_km / 111.0
+        steps = [t.lat_step for t in self.tiles if t.overlaps(latitude - half_lat, longitude - 180, latitude + half_lat, longitude + 180)]
+        if not steps:
+            return 0.0
+        strips = max(POPULATION_MIN_STRIPS, int(math.ceil(2 * half_lat / min(steps) * POPULATION_STRIPS_PER_ROW)))
+        edges = np.linspace(latitude - half_lat, latitude + half_lat, strips + 1)
+        middle = (edges[:-1] + edges[1:]) / 2
+        half_km = np.sqrt(np.maximum(radius_km ** 2 - ((middle - latitude) * 111.0) ** 2, 0))
+        half_lon = half_km / (111.0 * max(math.cos(math.radians(latitude)), 0.01))
+        return self.rect_sum(edges[:-1], longitude - half_lon, edges[1:], longitude + half_lon)
+
+    def footprint(self, mask: np.ndarray, bbox) -> float:
+        """People under the True cells of a north-up mask spanning bbox (min_lat, min_lon, max_lat, max_lon)"""
+        min_lat, min_lon, max_lat, max_lon = bbox
+        rows, cols = mask.shape
+        # Runs of True along each row become one rectangle each
+        padded = np.zeros((rows, cols + 2), dtype=np.int8)
+        padded[:, 1:-1] = mask
+        change = np.diff(padded, axis=1)
+        start_r, start_c = np.nonzero(change == 1)
+        _, end_c = np.nonzero(change == -1)
+        if not len(start_r):
+            return 0.0
+        lat_step, lon_step = (max_lat - min_lat) / rows, (max_lon - min_lon) / cols
+        return self.rect_sum(max_lat - (start_r + 1) * lat_step, min_lon + start_c * lon_step,
+                             max_lat - start_r * lat_step, min_lon + end_c * lon_step)
+
+    def check(self, latitude: float, longitude: float, radius_km: float, affected: int, evacuations: int) -> Optional[Tuple[dict, List[str]]]:
+        """Exposure around a prediction and warnings for figures that diverge wildly from it"""
+        if not self.covers(latitude, longitude):
+            return None
+        population = int(round(self.circle(latitude, longitude, radius_km)))
+        factor = POPULATION_DIVERGENCE_FACTOR
+        warnings = []
+        if affected > factor * max(population, 1):
+            warnings.append(f"⚠️ Affected population ({affected:,}) is over {factor:g}x the {population:,} people living within {radius_km:g} km")
+        elif population and affected * factor < population:
+            warnings.append(f"⚠️ Affected population ({affected:,}) is under 1/{factor:g} of the {population:,} people living within {radius_km:g} km")
+        if evacuations > factor * max(population, 1):
+            warnings.append(f"⚠️ Evacuations ({evacuations:,}) are over {factor:g}x the {population:,} people living within {radius_km:g} km")
+        return {"radius_km": radius_km, "population": population}, warnings
+
+    def stats(self) -> dict:
+        return {
+            "tiles": len(self.tiles),
+            "people": round(sum(t.total for t in self.tiles)),
+            "queries": self.queries
+        }
+
+
+population_exposure = PopulationExposure()
+
+def load_population_exposure():
+    population_exposure.load()
@@ -0,0 +1,83 @@
+import os
+import asyncio
+from typing import List, Optional, Tuple
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.disaster_prediction import apredict_disaster_batch, PREDICTION_BATCH_SIZE, PREDICTION_CONCURRENCY
+
+# How long a partially filled batch waits for more coordinates before it is sent
+PREDICTION_BATCH_WINDOW = float(os.getenv("PREDICTION_BATCH_WINDOW", "0.05"))
+
+
+class PredictionBatcher:
+    """Groups concurrently requested coordinates into multi-location LLM calls"""
+
+    def __init__(self, batch_size: int = PREDICTION_BATCH_SIZE, window: float = PREDICTION_BATCH_WINDOW):
+        self.batch_size = batch_size
+        self.window = window
+        self.semaphore = asyncio.Semaphore(PREDICTION_CONCURRENCY)
+        self._pending: List[Tuple[float, float, asyncio.Future]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self.batches = 0
+        self.items = 0
+        self.fallbacks = 0
+
+    @property
+    def enabled(self) -> bool:
+        return self.batch_size > 1
+
+    async def submit(self, latitude: float, longitude: float) -> DisasterPredictionResponse:
+        """Queue a coordinate and wait for its validated prediction"""
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        self._pending.append((latitude, longitude, future))
+
+        if len(self._pending) >= self.batch_size:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+
+        return await future
+
+    def _flush(self):
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        while self._pending:
+            batch = self._pending[:self.batch_size]
+            self._pending = self._pending[self.batch_size:]
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[float, float, asyncio.Future]]):
+        try:
+            results = await apredict_disaster_batch([(lat, lon) for lat, lon, _ in batch], self.semaphore)
+        except Exception as e:
+            for _, _, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        self.batches += 1
+        self.items += len(batch)
+        for (_, _, future), (prediction, used_fallback) in zip(batch, results):
+            self.fallbacks += int(used_fallback)
+            if future.done():
+                continue
+            # A failed fallback only fails its own caller
+            if isinstance(prediction, Exception):
+                future.set_exception(prediction)
+            else:
+                future.set_result(prediction)
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "batch_size": self.batch_size,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": round(self.items / self.batches, 2) if self.batches else 0.0,
+            "fallbacks": self.fallbacks
+        }
+
+
+prediction_batcher = PredictionBatcher()
@@ -0,0 +1,95 @@
+import os
+from datetime import datetime, timezone
+from typing import Dict, Optional
+
+from src.schemas.prediction_schema import DisasterPredictionResponse
+from src.services.ttl_cache import TTLCache
+from src.services.geo_utils import geohash_encode
+
+# --- CONFIGURATION ---
+# Geohash length of a cache cell (5 ≈ 4.9 km, 6 ≈ 1.2 km, 7 ≈ 150 m)
+PREDICTION_CACHE_PRECISION = int(os.getenv("PREDICTION_CACHE_PRECISION", "6"))
+# Predictions made within the same N-day window are considered interchangeable
+PREDICTION_CACHE_WINDOW_DAYS = int(os.getenv("PREDICTION_CACHE_WINDOW_DAYS", "1"))
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "5000"))
+PREDICTION_CACHE_TTL = int(os.getenv("PREDICTION_CACHE_TTL", str(24 * 3600)))
+# Older predictions kept per cell as a fallback while the LLM provider is degraded
+PREDICTION_STALE_TTL = int(os.getenv("PREDICTION_STALE_TTL", str(7 * 24 * 3600)))
+PREDICTION_CACHE_ENABLED = os.getenv("PREDICTION_CACHE_ENABLED", "true").lower() == "true"
+
+
+class PredictionCache:
+    """Reuses predictions for coordinates in the same spatial cell and date window"""
+
+    def __init__(self):
+        self.precision = PREDICTION_CACHE_PRECISION
+        self.window_days = PREDICTION_CACHE_WINDOW_DAYS
+        self.memory = TTLCache(max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_CACHE_TTL)
+        self.stale = TTLCache(max_entries=PREDICTION_CACHE_SIZE, ttl=PREDICTION_STALE_TTL)
+        self.skipped = 0
+        # cell_key -> times invalidated; a prediction started before an invalidation is not cached
+        self.generations: Dict[str, int] = {}
+
+    def cell(self, latitude: float, longitude: float) -> str:
+        return geohash_encode(latitude, longitude, self.precision)
+
+    def cell_key(self, latitude: float, longitude: float, mode: str = "llm") -> str:
+        cell = self.cell(latitude, longitude)
+        return cell if mode == "llm" else f"{cell}:{mode}"
+
+    def key(self, latitude: float, longitude: float, mode: str = "llm") -> str:
+        bucket = datetime.now(timezone.utc).date().toordinal() // self.window_days
+        return f"{self.cell_key(latitude, longitude, mode)}:{bucket}"
+
+    def get(self, latitude: float, longitude: float, mode: str = "llm") -> Optional[DisasterPredictionResponse]:
+        """Cached prediction for this cell and mode, re-stamped with the caller's coordinates"""
+        if not PREDICTION_CACHE_ENABLED:
+            return None
+        cached = self.memory.get(self.key(latitude, longitude, mode))
+        if cached is None:
+            return None
+        return cached.model_copy(update={"latitude": latitude, "longitude": longitude})
+
+    def generation(self, latitude: float, longitude: float, mode: str = "llm") -> int:
+        return self.generations.get(self.cell_key(latitude, longitude, mode), 0)
+
+    def set(self, latitude: float, longitude: float, prediction: DisasterPredictionResponse, mode: str = "llm",
+            generation: Optional[int] = None):
+        """Cache a prediction; pass the generation read before predicting so a stale one can't overwrite a refresh"""
+        # Failed or unparseable predictions are never reused
+        if not PREDICTION_CACHE_ENABLED or prediction.error:
+            self.skipped += 1
+            return
+        if generation is not None and generation != self.generation(latitude, longitude, mode):
+            self.skipped += 1
+            return
+        self.memory.set(self.key(latitude, longitude, mode), prediction)
+        self.stale.set(self.cell_key(latitude, longitude, mode), prediction)
+
+    def get_stale(self, latitude: float, longitude: float, reason: str, mode: str = "llm") -> Optional[DisasterPredictionResponse]:
+        """Most recent prediction for this cell regardless of date window, flagged as a fallback"""
+        cached = self.stale.get(self.cell_key(latitude, longitude, mode))
+        if cached is None:
+            return None
+        warnings = list(cached.warnings or []) + [f"⚠️ Served from an earlier prediction: {reason}"]
+        return cached.model_copy(update={"latitude": latitude, "longitude": longitude, "warnings": warnings})
+
+    def invalidate(self, latitude: float, longitude: float, mode: str = "llm"):
+        """Drop the cell's predictions from every date window, including the stale fallback"""
+        cell_key = self.cell_key(latitude, longitude, mode)
+        self.generations[cell_key] = self.generations.get(cell_key, 0) + 1
+        self.memory.delete_where(lambda key: key.rsplit(":", 1)[0] == cell_key)
+        self.stale.delete(cell_key)
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "enabled": PREDICTION_CACHE_ENABLED,
+            "geohash_precision": self.precision,
+            "window_days": self.window_days,
+            "skipped": self.skipped,
+            "stale_fallback": self.stale.stats()
+        }
+
+
+prediction_cache = PredictionCache()
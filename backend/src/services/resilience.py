@@ -0,0 +1,193 @@
+import time
+import random
+import asyncio
+import contextvars
+from contextlib import contextmanager
+from typing import Awaitable, Callable, Optional, Tuple, Type
+
+import httpx
+import openai
+
+
+class DeadlineExceeded(asyncio.TimeoutError):
+    """The request-level time budget ran out before the call could finish"""
+
+
+class CircuitOpenError(Exception):
+    """The downstream provider is marked degraded; calls are short-circuited"""
+
+
+# --- REQUEST DEADLINES ---
+# Absolute monotonic deadline of the current request, inherited by every task it spawns
+_deadline: contextvars.ContextVar[Optional[float]] = contextvars.ContextVar("deadline", default=None)
+
+@contextmanager
+def deadline_scope(budget: Optional[float]):
+    """Run the enclosed block (and tasks created in it) under a time budget in seconds"""
+    if not budget:
+        yield
+        return
+    deadline = time.monotonic() + budget
+    current = _deadline.get()
+    token = _deadline.set(deadline if current is None else min(current, deadline))
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+def remaining_budget() -> Optional[float]:
+    deadline = _deadline.get()
+    return None if deadline is None else deadline - time.monotonic()
+
+async def with_timeout(awaitable: Awaitable, timeout: Optional[float]):
+    """Await with a per-call timeout, clipped to whatever is left of the request budget"""
+    remaining = remaining_budget()
+    if remaining is not None:
+        if remaining <= 0:
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded("request deadline exceeded")
+        timeout = remaining if timeout is None else min(timeout, remaining)
+    try:
+        return await asyncio.wait_for(awaitable, timeout)
+    except asyncio.TimeoutError:
+        remaining = remaining_budget()
+        if remaining is not None and remaining <= 0:
+            raise DeadlineExceeded("request deadline exceeded")
+        raise
+
+
+# --- RETRIES ---
+TRANSIENT_ERRORS: Tuple[Type[BaseException], ...] = (
+    asyncio.TimeoutError,
+    httpx.TransportError,
+    openai.APIConnectionError,
+    openai.RateLimitError,
+    openai.InternalServerError
+)
+
+def is_transient(error: BaseException) -> bool:
+    if isinstance(error, DeadlineExceeded):
+        return False
+    return isinstance(error, TRANSIENT_ERRORS)
+
+def is_provider_failure(error: BaseException) -> bool:
+    """Errors that say the provider itself is unhealthy: transport failures, timeouts, 429s and 5xx"""
+    if is_transient(error):
+        return True
+    return isinstance(error, openai.APIStatusError) and error.status_code >= 500
+
+async def retry_async(fn: Callable[[], Awaitable], attempts: int, base_delay: float, max_delay: float,
+                      on_retry: Optional[Callable[[BaseException], None]] = None):
+    """Retry transient failures with full-jitter exponential backoff, never sleeping past the deadline"""
+    for attempt in range(attempts):
+        try:
+            return await fn()
+        except Exception as e:
+            if attempt == attempts - 1 or not is_transient(e):
+                raise
+            delay = random.uniform(0, min(max_delay, base_delay * (2 ** attempt)))
+            remaining = remaining_budget()
+            if remaining is not None and remaining <= delay:
+                raise
+            if on_retry:
+                on_retry(e)
+            await asyncio.sleep(delay)
+
+
+# --- CIRCUIT BREAKER ---
+class CircuitBreaker:
+    """Opens after `failure_threshold` consecutive failures; lets one probe through after `reset_timeout`"""
+
+    def __init__(self, name: str, failure_threshold: int, reset_timeout: float):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self.short_circuited = 0
+        self.trips = 0
+
+    def before_call(self):
+        if self.state == "open":
+            if time.monotonic() - self.opened_at >= self.reset_timeout:
+                self.state = "half_open"
+            else:
+                self.short_circuited += 1
+                raise CircuitOpenError(f"{self.name} circuit is open")
+        elif self.state == "half_open":
+            # A probe is already in flight
+            self.short_circuited += 1
+            raise CircuitOpenError(f"{self.name} circuit is half-open")
+
+    def record_success(self):
+        self.state = "closed"
+        self.failures = 0
+
+    def record_failure(self):
+        self.failures += 1
+        if self.state == "half_open" or self.failures >= self.failure_threshold:
+            if self.state != "open":
+                self.trips += 1
+                print(f"⚠️ {self.name} circuit opened after {self.failures} failures")
+            self.state = "open"
+            self.opened_at = time.monotonic()
+
+    async def call(self, fn: Callable[[], Awaitable]):
+        self.before_call()
+        try:
+            result = await fn()
+        except Exception as e:
+            if is_provider_failure(e):
+                self.record_failure()
+            elif self.state == "half_open":
+                # The probe reached the provider, so it is up again
+                self.record_success()
+            raise
+        except BaseException:
+            # Cancelled probe: reopen so the next caller is let through as the probe instead
+            if self.state == "half_open":
+                self.state = "open"
+            raise
+        self.record_success()
+        return result
+
+    def stats(self) -> dict:
+        return {
+            "state": self.state,
+            "consecutive_failures": self.failures,
+            "trips": self.trips,
+            "short_circuited": self.short_circuited
+        }
+
+
+# --- HEDGED REQUESTS ---
+async def hedged(primary: Callable[[], Awaitable], secondary: Callable[[], Awaitable], delay: float,
+                 on_hedge: Optional[Callable[[], None]] = None):
+    """Start `secondary` if `primary` hasn't finished after `delay` seconds; first success wins"""
+    tasks = [asyncio.ensure_future(primary())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if done:
+            return tasks[0].result()
+
+        if on_hedge:
+            on_hedge()
+        tasks.append(asyncio.ensure_future(secondary()))
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.cancelled():
+                    continue
+                if task.exception() is None:
+                    return task.result()
+                error = task.exception()
+        raise error or asyncio.CancelledError()
+    finally:
+        # Also reached when the caller is cancelled mid-hedge: never leave an LLM call running
+        for task in tasks:
+            if not task.done():
+                task.cancel()
@@ -0,0 +1,102 @@
+import os
+import json
+import asyncio
+import hashlib
+from datetime import datetime, timezone
+from typing import List, Optional
+
+from src.config.db import db
+from src.schemas.prediction_schema import PredictionResult, CoordinateRequest
+from src.services.ttl_cache import TTLCache
+
+# --- CONFIGURATION ---
+RESULT_STORE_SIZE = int(os.getenv("RESULT_STORE_SIZE", "500"))
+RESULT_STORE_MAX_BYTES = int(os.getenv("RESULT_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+RESULT_STORE_TTL = int(os.getenv("RESULT_STORE_TTL", str(24 * 3600)))
+# "memory" keeps results per worker; "mongo" also shares them across workers
+RESULT_STORE_BACKEND = os.getenv("RESULT_STORE_BACKEND", "memory").lower()
+MONGO_STORE_TIMEOUT = float(os.getenv("MONGO_STORE_TIMEOUT", "2.0"))
+
+
+def make_result_id(coordinates: List[CoordinateRequest], mode: str = "llm", ensemble: bool = False) -> str:
+    """Deterministic content-addressed ID for a list of coordinates predicted in one mode"""
+    canonical = json.dumps(
+        {"coordinates": [[c.latitude, c.longitude] for c in coordinates], "mode": mode, "ensemble": ensemble},
+        separators=(",", ":"),
+        sort_keys=True
+    )
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()[:24]
+
+
+class ResultStore:
+    """Prediction results kept as serialized JSON in a bounded LRU, optionally mirrored to MongoDB"""
+
+    def __init__(self):
+        self.memory = TTLCache(
+            max_entries=RESULT_STORE_SIZE,
+            ttl=RESULT_STORE_TTL,
+            max_bytes=RESULT_STORE_MAX_BYTES,
+            sizeof=len
+        )
+        self.collection = db.get_collection("prediction_results") if RESULT_STORE_BACKEND == "mongo" else None
+        self.persistent_hits = 0
+
+    async def ensure_indexes(self):
+        """Create the TTL index that lets MongoDB evict stale results"""
+        if self.collection is None:
+            return
+        try:
+            await asyncio.wait_for(
+                self.collection.create_index("created_at", expireAfterSeconds=RESULT_STORE_TTL),
+                MONGO_STORE_TIMEOUT
+            )
+        except Exception as e:
+            print(f"⚠️ Result store index creation failed: {e}")
+
+    async def put(self, result_id: str, result: PredictionResult):
+        payload = result.model_dump_json().encode("utf-8")
+        self.memory.set(result_id, payload)
+        if self.collection is None:
+            return
+
+        try:
+            await asyncio.wait_for(
+                self.collection.replace_one(
+                    {"_id": result_id},
+                    {"_id": result_id, "result": result.model_dump(), "created_at": datetime.now(timezone.utc)},
+                    upsert=True
+                ),
+                MONGO_STORE_TIMEOUT
+            )
+        except Exception as e:
+            print(f"⚠️ Result store write failed: {e}")
+
+    async def get(self, result_id: str) -> Optional[PredictionResult]:
+        payload = self.memory.get(result_id)
+        if payload is not None:
+            return PredictionResult.model_validate_json(payload)
+        if self.collection is None:
+            return None
+
+        try:
+            doc = await asyncio.wait_for(self.collection.find_one({"_id": result_id}), MONGO_STORE_TIMEOUT)
+        except Exception as e:
+            print(f"⚠️ Result store read failed: {e}")
+            return None
+
+        if not doc:
+            return None
+        self.persistent_hits += 1
+        result = PredictionResult.model_validate(doc["result"])
+        self.memory.set(result_id, result.model_dump_json().encode("utf-8"))
+        return result
+
+    def stats(self) -> dict:
+        return {
+            **self.memory.stats(),
+            "backend": RESULT_STORE_BACKEND,
+            "persistent_hits": self.persistent_hits
+        }
+
+
+result_store = ResultStore()
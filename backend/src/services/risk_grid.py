@@ -0,0 +1,307 @@
+import os
+import json
+import math
+import zlib
+import struct
+import shutil
+import hashlib
+import tempfile
+from datetime import datetime, timezone
+from typing import Optional
+
+import numpy as np
+
+from src.services.ttl_cache import TTLCache
+from src.services.historical_data import HistoricalDataStore, historical_store, HISTORICAL_DATA_PATH, load_historical_data
+
+# --- CONFIGURATION ---
+RISK_GRID_DEGREES = float(os.getenv("RISK_GRID_DEGREES", "0.25"))
+# Events within roughly this distance of a cell contribute to its risk
+RISK_GRID_RADIUS_KM = float(os.getenv("RISK_GRID_RADIUS_KM", "100"))
+# Cells per stored block; each block is contiguous on disk so a tile touches few pages
+RISK_GRID_BLOCK = int(os.getenv("RISK_GRID_BLOCK", "64"))
+# Where the raster is written; defaults to "<historical csv>.risk_grid"
+RISK_GRID_DIR = os.getenv("RISK_GRID_DIR", "")
+RISK_TILE_SIZE = 256
+RISK_TILE_CACHE_SIZE = int(os.getenv("RISK_TILE_CACHE_SIZE", "2000"))
+RISK_TILE_MAX_AGE = int(os.getenv("RISK_TILE_MAX_AGE", str(24 * 3600)))
+RISK_TILE_MAX_ZOOM = int(os.getenv("RISK_TILE_MAX_ZOOM", "12"))
+RISK_BBOX_MAX_CELLS = int(os.getenv("RISK_BBOX_MAX_CELLS", "250000"))
+
+# Bump when the raster layout or scoring changes so stored grids are rebuilt
+RISK_GRID_VERSION = 1
+
+
+def _palette() -> tuple:
+    """256-entry yellow -> red ramp; index 0 (no recorded risk) is fully transparent"""
+    t = np.linspace(0, 1, 256)
+    red = np.full(256, 255)
+    green = np.round(230 * (1 - t)).astype(int)
+    blue = np.round(60 * (1 - t)).astype(int)
+    alpha = np.round(60 + 180 * t).astype(int)
+    alpha[0] = 0
+    plte = bytes(np.stack([red, green, blue], axis=1).astype(np.uint8).ravel())
+    return plte, bytes(alpha.astype(np.uint8))
+
+_PLTE, _TRNS = _palette()
+
+def _png_chunk(kind: bytes, data: bytes) -> bytes:
+    return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data) & 0xFFFFFFFF)
+
+def encode_png(pixels: np.ndarray) -> bytes:
+    """Encode a 2-D uint8 array as an indexed-colour PNG using the risk palette"""
+    height, width = pixels.shape
+    raw = np.zeros((height, width + 1), dtype=np.uint8)
+    raw[:, 1:] = pixels  # filter byte 0 (None) per scanline
+    return b"".join([
+        b"\x89PNG\r\n\x1a\n",
+        _png_chunk(b"IHDR", struct.pack(">IIBBBBB", width, height, 8, 3, 0, 0, 0)),
+        _png_chunk(b"PLTE", _PLTE),
+        _png_chunk(b"tRNS", _TRNS),
+        _png_chunk(b"IDAT", zlib.compress(raw.tobytes(), 6)),
+        _png_chunk(b"IEND", b"")
+    ])
+
+
+class RiskGrid:
+    """Global hazard-risk raster precomputed from the historical store.
+
+    Each cell holds an 8-bit risk score (0 = nothing recorded nearby, 255 = near-certain
+    yearly occurrence) and the code of the dominant hazard type. Scores come from the
+    same frequency and severity figures as the baseline model: geolocated events are
+    binned onto the grid, weighted by 1 + log10(1 + deaths + affected / 1000), summed
+    over a window of about RISK_GRID_RADIUS_KM using a summed-area table, turned into a
+    yearly rate and mapped through 1 - exp(-rate). Arrays are stored in square blocks
+    and memory-mapped, so serving a tile reads only the blocks it covers.
+    """
+
+    def __init__(self, degrees: float = RISK_GRID_DEGREES, radius_km: float = RISK_GRID_RADIUS_KM,
+                 block: int = RISK_GRID_BLOCK):
+        self.degrees = degrees
+        self.radius_km = radius_km
+        self.block = block
+        self.rows = int(round(180 / degrees))
+        self.cols = int(round(360 / degrees))
+        self.risk: Optional[np.ndarray] = None
+        self.hazard: Optional[np.ndarray] = None
+        self.hazards = []
+        self.version = ""
+        self.generated_at = None
+        self.tiles = TTLCache(max_entries=RISK_TILE_CACHE_SIZE, ttl=RISK_TILE_MAX_AGE)
+        self.loaded = False
+
+    # --- BUILD ---
+    def _version_for(self, checksum: Optional[str]) -> str:
+        key = f"{RISK_GRID_VERSION}:{checksum}:{self.degrees}:{self.radius_km}:{self.block}"
+        return hashlib.sha256(key.encode("utf-8")).hexdigest()[:16]
+
+    def _window_sum(self, sat: np.ndarray, half_rows: int, half_cols: np.ndarray) -> np.ndarray:
+        """Sum over a (2*half_rows+1) x (2*half_cols[r]+1) window around every cell"""
+        r = np.arange(self.rows)[:, None]
+        c = np.arange(self.cols)[None, :]
+        r0 = np.clip(r - half_rows, 0, self.rows)
+        r1 = np.clip(r + half_rows + 1, 0, self.rows)
+        c0 = np.clip(c - half_cols[:, None], 0, self.cols)
+        c1 = np.clip(c + half_cols[:, None] + 1, 0, self.cols)
+        return sat[r1, c1] - sat[r0, c1] - sat[r1, c0] + sat[r0, c0]
+
+    def _sat(self, grid: np.ndarray) -> np.ndarray:
+        sat = np.zeros((self.rows + 1, self.cols + 1), dtype=np.float64)
+        sat[1:, 1:] = grid.cumsum(axis=0).cumsum(axis=1)
+        return sat
+
+    def build(self, store: HistoricalDataStore):
+        c = store.columns
+        lats = np.asarray(c["latitude"], dtype=np.float64)
+        lons = np.asarray(c["longitude"], dtype=np.float64)
+        located = np.flatnonzero(~np.isnan(lats) & ~np.isnan(lons))
+        rows = np.clip(np.floor((90 - lats[located]) / self.degrees).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor((lons[located] + 180) / self.degrees).astype(np.int64), 0, self.cols - 1)
+        flat = rows * self.cols + cols
+
+        severity = np.asarray(c["total_deaths"])[located] + np.asarray(c["affected"])[located] / 1000
+        weights = 1 + np.log10(1 + severity)
+        types = np.asarray(c["disaster_type"])[located]
+
+        years = np.asarray(c["start_year"])
+        known_years = years[years > 0]
+        now = datetime.now(timezone.utc).year
+        span_years = max(1, now - int(known_years.min()) + 1) if len(known_years) else 1
+
+        # Window size in cells; east-west extent widens with latitude
+        half_rows = int(math.ceil(self.radius_km / (111.0 * self.degrees)))
+        centre_lats = 90 - (np.arange(self.rows) + 0.5) * self.degrees
+        cos_lat = np.maximum(np.cos(np.radians(centre_lats)), 0.01)
+        half_cols = np.minimum(np.ceil(half_rows / cos_lat), self.cols // 2).astype(np.int64)
+
+        size = self.rows * self.cols
+        weighted = np.bincount(flat, weights=weights, minlength=size).reshape(self.rows, self.cols)
+        rate = self._window_sum(self._sat(weighted), half_rows, half_cols) / span_years
+        risk = np.round(255 * (1 - np.exp(-rate))).astype(np.uint8)
+
+        # Dominant hazard: the type with the most events in each window
+        best = np.zeros((self.rows, self.cols), dtype=np.float64)
+        hazard = np.zeros((self.rows, self.cols), dtype=np.uint16)
+        for code in np.unique(types):
+            if code == 0:
+                continue
+            counts = np.bincount(flat[types == code], minlength=size).reshape(self.rows, self.cols).astype(np.float64)
+            windowed = self._window_sum(self._sat(counts), half_rows, half_cols)
+            better = windowed > best
+            best[better] = windowed[better]
+            hazard[better] = code
+
+        self.risk = self._to_blocks(risk)
+        self.hazard = self._to_blocks(hazard)
+        self.hazards = list(store.vocab["disaster_type"])
+        self.version = self._version_for(store.checksum)
+        self.generated_at = datetime.now(timezone.utc).isoformat()
+        self.tiles.clear()
+        self.loaded = True
+        print(f"✓ Risk grid built: {self.rows}x{self.cols} cells from {len(located)} geolocated events")
+
+    def _to_blocks(self, grid: np.ndarray) -> np.ndarray:
+        """(rows, cols) -> (row blocks, col blocks, block, block), zero padded"""
+        b = self.block
+        padded = np.zeros((-(-self.rows // b) * b, -(-self.cols // b) * b), dtype=grid.dtype)
+        padded[:self.rows, :self.cols] = grid
+        return np.ascontiguousarray(
+            padded.reshape(padded.shape[0] // b, b, padded.shape[1] // b, b).transpose(0, 2, 1, 3)
+        )
+
+    # --- STORAGE ---
+    def save(self, directory: str):
+        parent = os.path.dirname(os.path.abspath(directory))
+        staging = tempfile.mkdtemp(prefix=".risk_grid-", dir=parent)
+        try:
+            np.save(os.path.join(staging, "risk.npy"), self.risk)
+            np.save(os.path.join(staging, "hazard.npy"), self.hazard)
+            with open(os.path.join(staging, "meta.json"), "w", encoding="utf-8") as f:
+                json.dump({
+                    "version": self.version,
+                    "degrees": self.degrees,
+                    "radius_km": self.radius_km,
+                    "block": self.block,
+                    "hazards": self.hazards,
+                    "generated_at": self.generated_at
+                }, f)
+            if os.path.isdir(directory):
+                shutil.rmtree(directory, ignore_errors=True)
+            os.replace(staging, directory)
+        except OSError:
+            shutil.rmtree(staging, ignore_errors=True)
+            if not os.path.isdir(directory):
+                raise
+
+    def load(self, directory: str, checksum: Optional[str]) -> bool:
+        """Memory-map a stored grid; False when it is missing or was built from other data or settings"""
+        try:
+            with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+                meta = json.load(f)
+            if checksum is None or meta.get("version") != self._version_for(checksum):
+                return False
+            risk = np.load(os.path.join(directory, "risk.npy"), mmap_mode="r")
+            hazard = np.load(os.path.join(directory, "hazard.npy"), mmap_mode="r")
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError) as e:
+            print(f"⚠️ Ignoring unreadable risk grid: {e}")
+            return False
+
+        self.risk, self.hazard = risk, hazard
+        self.hazards = meta["hazards"]
+        self.version = meta["version"]
+        self.generated_at = meta["generated_at"]
+        self.tiles.clear()
+        self.loaded = True
+        return True
+
+    # --- QUERIES ---
+    def _sample(self, blocks: np.ndarray, rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        b = self.block
+        return blocks[rows // b, cols // b, rows % b, cols % b]
+
+    def tile(self, z: int, x: int, y: int) -> bytes:
+        """256x256 Web Mercator (XYZ) PNG tile of the risk score"""
+        cached = self.tiles.get((z, x, y))
+        if cached is not None:
+            return cached
+
+        n = 2 ** z
+        offsets = (np.arange(RISK_TILE_SIZE) + 0.5) / RISK_TILE_SIZE
+        lons = (x + offsets) / n * 360 - 180
+        lats = np.degrees(np.arctan(np.sinh(np.pi * (1 - 2 * (y + offsets) / n))))
+        rows = np.clip(np.floor((90 - lats) / self.degrees).astype(np.int64), 0, self.rows - 1)
+        cols = np.clip(np.floor((lons + 180) / self.degrees).astype(np.int64), 0, self.cols - 1)
+        pixels = self._sample(self.risk, rows[:, None], cols[None, :])
+
+        png = encode_png(np.asarray(pixels, dtype=np.uint8))
+        self.tiles.set((z, x, y), png)
+        return png
+
+    def bbox(self, min_lat: float, min_lon: float, max_lat: float, max_lon: float) -> dict:
+        """Raw cells covering a bounding box, north-west corner first"""
+        row0 = int(np.clip(math.floor((90 - max_lat) / self.degrees), 0, self.rows - 1))
+        row1 = int(np.clip(math.ceil((90 - min_lat) / self.degrees), row0 + 1, self.rows))
+        col0 = int(np.clip(math.floor((min_lon + 180) / self.degrees), 0, self.cols - 1))
+        col1 = int(np.clip(math.ceil((max_lon + 180) / self.degrees), col0 + 1, self.cols))
+        if (row1 - row0) * (col1 - col0) > RISK_BBOX_MAX_CELLS:
+            raise ValueError(f"bounding box covers more than {RISK_BBOX_MAX_CELLS} cells")
+
+        rows = np.arange(row0, row1)[:, None]
+        cols = np.arange(col0, col1)[None, :]
+        return {
+            "version": self.version,
+            "degrees": self.degrees,
+            "north": 90 - row0 * self.degrees,
+            "west": col0 * self.degrees - 180,
+            "rows": row1 - row0,
+            "cols": col1 - col0,
+            "risk": self._sample(self.risk, rows, cols).tolist(),
+            "hazard": self._sample(self.hazard, rows, cols).tolist(),
+            "hazards": self.hazards
+        }
+
+    def metadata(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "generated_at": self.generated_at,
+            "degrees": self.degrees,
+            "radius_km": self.radius_km,
+            "shape": [self.rows, self.cols],
+            "max_zoom": RISK_TILE_MAX_ZOOM,
+            "hazards": self.hazards
+        }
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "version": self.version,
+            "tile_cache": self.tiles.stats()
+        }
+
+
+risk_grid = RiskGrid()
+
+def load_risk_grid(directory: Optional[str] = None):
+    """Map the stored risk grid, rebuilding it when the historical data or grid settings changed"""
+    if not historical_store.loaded:
+        return
+    directory = directory or RISK_GRID_DIR or f"{HISTORICAL_DATA_PATH}.risk_grid"
+    if risk_grid.load(directory, historical_store.checksum):
+        print(f"✓ Mapped risk grid {risk_grid.version} from {directory}")
+        return
+
+    risk_grid.build(historical_store)
+    try:
+        risk_grid.save(directory)
+        print(f"✓ Wrote risk grid to {directory}")
+    except OSError as e:
+        print(f"⚠️ Could not write risk grid: {e}")
+
+
+if __name__ == "__main__":
+    # Batch precompute: python -m src.services.risk_grid
+    load_historical_data()
+    load_risk_grid()
@@ -0,0 +1,374 @@
+import os
+import math
+import heapq
+import tempfile
+import xml.etree.ElementTree as ET
+from array import array
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+from src.services.geo_utils import haversine_km_array, EARTH_RADIUS_KM
+from src.services.historical_data import file_checksum
+
+# --- CONFIGURATION ---
+# OSM XML extract (.osm) of the served area; empty disables evacuation routing
+ROAD_GRAPH_PATH = os.getenv("ROAD_GRAPH_PATH", "")
+# Compiled CSR arrays are cached next to the extract as "<path>.graph.npz"
+ROAD_GRAPH_CACHE = os.getenv("ROAD_GRAPH_CACHE", "")
+# Bucket size of the nearest-node index
+ROAD_GRID_DEGREES = float(os.getenv("ROAD_GRID_DEGREES", "0.01"))
+# Tags that mark safe assembly points (nodes, or the centroid of tagged ways)
+ROAD_ASSEMBLY_TAGS = [
+    tuple(tag.split("=", 1))
+    for tag in os.getenv(
+        "ROAD_ASSEMBLY_TAGS",
+        "emergency=assembly_point,amenity=shelter,amenity=hospital,amenity=school,leisure=park"
+    ).split(",")
+    if "=" in tag
+]
+
+# Free-flow speeds used for travel time, km/h
+ROAD_SPEEDS_KMH = {
+    "motorway": 90, "trunk": 70, "primary": 55, "secondary": 45, "tertiary": 35,
+    "motorway_link": 50, "trunk_link": 40, "primary_link": 35, "secondary_link": 30, "tertiary_link": 25,
+    "unclassified": 25, "residential": 20, "living_street": 10, "service": 15, "road": 20
+}
+# Lanes per direction when the way has no lanes tag, and sustained flow per lane (vehicles/hour)
+ROAD_DEFAULT_LANES = {"motorway": 2, "trunk": 2, "primary": 2, "motorway_link": 1, "trunk_link": 1}
+ROAD_LANE_CAPACITY_VPH = {
+    "motorway": 1900, "trunk": 1700, "primary": 1400, "secondary": 1200, "tertiary": 1000,
+    "motorway_link": 1400, "trunk_link": 1200, "primary_link": 1100, "secondary_link": 1000, "tertiary_link": 900,
+    "unclassified": 800, "residential": 600, "living_street": 300, "service": 400, "road": 600
+}
+# People an assembly point holds when the OSM capacity tag is missing, by kind
+ROAD_ASSEMBLY_CAPACITY = {
+    kind: int(capacity)
+    for kind, capacity in (
+        item.split(":", 1)
+        for item in os.getenv(
+            "ROAD_ASSEMBLY_CAPACITY", "assembly_point:2000,shelter:500,hospital:300,school:800,park:3000"
+        ).split(",")
+        if ":" in item
+    )
+}
+GRAPH_VERSION = 2
+
+HIGHWAY_CLASSES = list(ROAD_SPEEDS_KMH)
+
+
+class RoadGraph:
+    """Directed road network in compressed sparse row form.
+
+    Node i's outgoing neighbours are indices[indptr[i]:indptr[i + 1]], and `edge` maps each
+    slot to an edge id indexing `length_m`, `time_s` and `edge_highway`. The reversed graph
+    is kept the same way so shortest paths *to* a set of destinations are one search.
+    Adjacency is also mirrored into array.array buffers, which index far faster than
+    NumPy scalars inside the pure-Python search loop.
+
+    Each node also carries its free-flow travel time to the nearest assembly point and the
+    next hop on that route (the "safe field"), so a query only has to search the hazard zone.
+    """
+
+    def __init__(self):
+        self.loaded = False
+        self.assembly_points: List[dict] = []
+
+    # --- CONSTRUCTION ---
+    def set_arrays(self, lat, lon, sources, targets, highway, assembly_points: List[dict],
+                   safe_field: Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]] = None, lanes=None):
+        self.lat = np.asarray(lat, dtype=np.float64)
+        self.lon = np.asarray(lon, dtype=np.float64)
+        sources = np.asarray(sources, dtype=np.int64)
+        targets = np.asarray(targets, dtype=np.int64)
+        self.edge_highway = np.asarray(highway, dtype=np.int8)
+        self.n = len(self.lat)
+
+        self.edge_source, self.edge_target = sources, targets
+        self.length_m = self._lengths(sources, targets)
+        speeds = np.asarray([ROAD_SPEEDS_KMH[h] for h in HIGHWAY_CLASSES], dtype=np.float64)[self.edge_highway]
+        self.time_s = self.length_m / (speeds / 3.6)
+        self.py_time_s = array("d", self.time_s.tobytes())
+        if lanes is None:
+            lanes = np.asarray([ROAD_DEFAULT_LANES.get(h, 1) for h in HIGHWAY_CLASSES], dtype=np.int8)[self.edge_highway]
+        self.edge_lanes = np.asarray(lanes, dtype=np.int8)
+        lane_capacity = np.asarray([ROAD_LANE_CAPACITY_VPH[h] for h in HIGHWAY_CLASSES], dtype=np.float64)
+        self.capacity_vph = self.edge_lanes * lane_capacity[self.edge_highway]
+
+        self.forward = self._csr(sources, targets)
+        self.reverse = self._csr(targets, sources)
+        self._build_node_index()
+        self.bounds = (float(self.lat.min()), float(self.lon.min()), float(self.lat.max()), float(self.lon.max())) if self.n else (0.0, 0.0, 0.0, 0.0)
+        self.set_assembly_points(assembly_points, safe_field)
+        self.loaded = True
+
+    def set_assembly_points(self, assembly_points: List[dict], safe_field=None):
+        for point in assembly_points:
+            point.setdefault("capacity", ROAD_ASSEMBLY_CAPACITY.get(point["kind"], 500))
+        self.assembly_points = assembly_points
+        if safe_field is None:
+            safe_field = self._safe_field()
+        self.safe_cost, self.safe_next, self.safe_edge, self.safe_point = safe_field
+        self.py_safe_cost = array("d", self.safe_cost.tobytes())
+        self.py_safe_next = array("i", self.safe_next.tobytes())
+        self.py_safe_edge = array("i", self.safe_edge.tobytes())
+
+    def _safe_field(self) -> Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]:
+        """Multi-source Dijkstra over the reversed graph from every assembly point at once"""
+        indptr, indices, edges = self.reverse["py_indptr"], self.reverse["py_indices"], self.reverse["py_edge"]
+        time_s = self.py_time_s
+        cost = [math.inf] * self.n
+        following = [-1] * self.n
+        via = [-1] * self.n
+        point = [-1] * self.n
+        heap = [(0.0, p["node"], -1, -1, i) for i, p in enumerate(self.assembly_points)]
+        heapq.heapify(heap)
+        while heap:
+            current, node, hop, edge, index = heapq.heappop(heap)
+            if point[node] >= 0:
+                continue
+            cost[node], following[node], via[node], point[node] = current, hop, edge, index
+            for slot in range(indptr[node], indptr[node + 1]):
+                neighbour = indices[slot]
+                if point[neighbour] < 0:
+                    heapq.heappush(heap, (current + time_s[edges[slot]], neighbour, node, edges[slot], index))
+        return (
+            np.asarray(cost, dtype=np.float64),
+            np.asarray(following, dtype=np.int32),
+            np.asarray(via, dtype=np.int32),
+            np.asarray(point, dtype=np.int32)
+        )
+
+    def _lengths(self, sources: np.ndarray, targets: np.ndarray) -> np.ndarray:
+        phi1, phi2 = np.radians(self.lat[sources]), np.radians(self.lat[targets])
+        dphi = phi2 - phi1
+        dlmb = np.radians(self.lon[targets] - self.lon[sources])
+        a = np.sin(dphi / 2) ** 2 + np.cos(phi1) * np.cos(phi2) * np.sin(dlmb / 2) ** 2
+        return 2 * EARTH_RADIUS_KM * 1000 * np.arcsin(np.minimum(1.0, np.sqrt(a)))
+
+    def _csr(self, sources: np.ndarray, targets: np.ndarray) -> dict:
+        """CSR adjacency; `edge` maps each CSR slot back to the original edge id"""
+        order = np.argsort(sources, kind="stable")
+        indptr = np.zeros(self.n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(sources, minlength=self.n), out=indptr[1:])
+        return {
+            "indptr": indptr,
+            "indices": targets[order].astype(np.int32),
+            "edge": order.astype(np.int32),
+            "py_indptr": array("q", indptr.tobytes()),
+            "py_indices": array("i", targets[order].astype(np.int32).tobytes()),
+            "py_edge": array("i", order.astype(np.int32).tobytes())
+        }
+
+    def _build_node_index(self):
+        rows = np.floor((self.lat + 90) / ROAD_GRID_DEGREES).astype(np.int64)
+        cols = np.floor((self.lon + 180) / ROAD_GRID_DEGREES).astype(np.int64)
+        self._n_cols = int(math.ceil(360 / ROAD_GRID_DEGREES))
+        keys = rows * self._n_cols + cols
+        order = np.argsort(keys, kind="stable")
+        unique_keys, starts = np.unique(keys[order], return_index=True)
+        ends = np.append(starts[1:], len(order))
+        self._node_order = order
+        self._node_cells: Dict[int, Tuple[int, int]] = {int(k): (int(s), int(e)) for k, s, e in zip(unique_keys, starts, ends)}
+
+    # --- LOOKUPS ---
+    def nodes_within(self, latitude: float, longitude: float, radius_km: float) -> np.ndarray:
+        row = int(math.floor((latitude + 90) / ROAD_GRID_DEGREES))
+        col = int(math.floor((longitude + 180) / ROAD_GRID_DEGREES))
+        lat_span = int(math.ceil(radius_km / 111.0 / ROAD_GRID_DEGREES))
+        cos_lat = max(math.cos(math.radians(min(89.0, abs(latitude)))), 0.01)
+        lon_span = int(math.ceil(radius_km / (111.0 * cos_lat) / ROAD_GRID_DEGREES))
+        spans = [
+            self._node_cells[key]
+            for r in range(row - lat_span, row + lat_span + 1)
+            for c in range(col - lon_span, col + lon_span + 1)
+            if (key := r * self._n_cols + c) in self._node_cells
+        ]
+        if not spans:
+            return np.empty(0, dtype=np.int64)
+        candidates = self._node_order[np.concatenate([np.arange(s, e) for s, e in spans])]
+        distances = haversine_km_array(latitude, longitude, self.lat[candidates], self.lon[candidates])
+        return candidates[distances <= radius_km]
+
+    def nearest_node(self, latitude: float, longitude: float, max_km: float = 1.0) -> Optional[int]:
+        candidates = self.nodes_within(latitude, longitude, max_km)
+        if len(candidates) == 0:
+            return None
+        distances = haversine_km_array(latitude, longitude, self.lat[candidates], self.lon[candidates])
+        return int(candidates[np.argmin(distances)])
+
+    def covers(self, latitude: float, longitude: float) -> bool:
+        return self.loaded and self.bounds[0] <= latitude <= self.bounds[2] and self.bounds[1] <= longitude <= self.bounds[3]
+
+    # --- PERSISTENCE ---
+    def save(self, path: str, checksum: str):
+        parent = os.path.dirname(os.path.abspath(path))
+        handle, staging = tempfile.mkstemp(prefix=".graph-", suffix=".npz", dir=parent)
+        os.close(handle)
+        try:
+            np.savez(
+                staging,
+                version=GRAPH_VERSION,
+                checksum=checksum,
+                lat=self.lat,
+                lon=self.lon,
+                sources=self.edge_source,
+                targets=self.edge_target,
+                highway=self.edge_highway,
+                lanes=self.edge_lanes,
+                assembly_names=np.asarray([p["name"] for p in self.assembly_points], dtype=str),
+                assembly_kinds=np.asarray([p["kind"] for p in self.assembly_points], dtype=str),
+                assembly_nodes=np.asarray([p["node"] for p in self.assembly_points], dtype=np.int64),
+                assembly_capacity=np.asarray([p["capacity"] for p in self.assembly_points], dtype=np.int64),
+                safe_cost=self.safe_cost,
+                safe_next=self.safe_next,
+                safe_edge=self.safe_edge,
+                safe_point=self.safe_point
+            )
+            os.replace(staging, path)
+        except OSError:
+            if os.path.exists(staging):
+                os.remove(staging)
+            raise
+
+    def load_cached(self, path: str, checksum: str) -> bool:
+        try:
+            with np.load(path) as data:
+                if int(data["version"]) != GRAPH_VERSION or str(data["checksum"]) != checksum:
+                    return False
+                assembly = [
+                    {"name": str(name), "kind": str(kind), "node": int(node), "capacity": int(capacity)}
+                    for name, kind, node, capacity in zip(
+                        data["assembly_names"], data["assembly_kinds"], data["assembly_nodes"], data["assembly_capacity"]
+                    )
+                ]
+                field = (data["safe_cost"], data["safe_next"], data["safe_edge"], data["safe_point"])
+                self.set_arrays(data["lat"], data["lon"], data["sources"], data["targets"],
+                                data["highway"], assembly, field, lanes=data["lanes"])
+        except FileNotFoundError:
+            return False
+        except (OSError, ValueError, KeyError) as e:
+            print(f"⚠️ Ignoring unreadable road graph cache: {e}")
+            return False
+        return True
+
+    def load_osm(self, path: str):
+        """Parse an OSM XML extract: drivable ways become edges, tagged places become assembly points"""
+        coordinates: Dict[str, Tuple[float, float]] = {}
+        tagged_nodes: List[Tuple[str, str, str, Optional[int]]] = []
+        ways: List[Tuple[List[str], str, bool, int]] = []
+        tagged_ways: List[Tuple[List[str], str, str, Optional[int]]] = []
+
+        for _, element in ET.iterparse(path, events=("end",)):
+            if element.tag == "node":
+                node_id = element.get("id")
+                coordinates[node_id] = (float(element.get("lat")), float(element.get("lon")))
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                kind = self._assembly_kind(tags)
+                if kind:
+                    tagged_nodes.append((node_id, tags.get("name") or kind, kind, self._int_tag(tags, "capacity")))
+                element.clear()
+            elif element.tag == "way":
+                refs = [nd.get("ref") for nd in element.iter("nd")]
+                tags = {tag.get("k"): tag.get("v") for tag in element.iter("tag")}
+                highway = tags.get("highway")
+                if highway in ROAD_SPEEDS_KMH and len(refs) > 1:
+                    oneway = tags.get("oneway") in ("yes", "1", "true", "-1")
+                    if tags.get("oneway") == "-1":
+                        refs = refs[::-1]
+                    # The lanes tag counts both directions on two-way roads
+                    lanes = self._int_tag(tags, "lanes")
+                    if lanes is None:
+                        lanes = ROAD_DEFAULT_LANES.get(highway, 1)
+                    elif not oneway:
+                        lanes = max(1, lanes // 2)
+                    ways.append((refs, highway, oneway, min(lanes, 8)))
+                kind = self._assembly_kind(tags)
+                if kind:
+                    tagged_ways.append((refs, tags.get("name") or kind, kind, self._int_tag(tags, "capacity")))
+                element.clear()
+
+        ids: Dict[str, int] = {}
+        lat, lon, sources, targets, highway, lane_counts = [], [], [], [], [], []
+        for refs, road, oneway, lanes in ways:
+            previous = None
+            for ref in refs:
+                if ref not in coordinates:
+                    previous = None
+                    continue
+                index = ids.get(ref)
+                if index is None:
+                    index = ids[ref] = len(lat)
+                    lat.append(coordinates[ref][0])
+                    lon.append(coordinates[ref][1])
+                if previous is not None and previous != index:
+                    for a, b in ((previous, index),) if oneway else ((previous, index), (index, previous)):
+                        sources.append(a)
+                        targets.append(b)
+                        highway.append(HIGHWAY_CLASSES.index(road))
+                        lane_counts.append(lanes)
+                previous = index
+
+        self.set_arrays(lat, lon, sources, targets, highway, [], lanes=lane_counts)
+
+        assembly = []
+        places = [(coordinates[node_id], name, kind, capacity) for node_id, name, kind, capacity in tagged_nodes if node_id in coordinates]
+        for refs, name, kind, capacity in tagged_ways:
+            points = [coordinates[r] for r in refs if r in coordinates]
+            if points:
+                centroid = (sum(p[0] for p in points) / len(points), sum(p[1] for p in points) / len(points))
+                places.append((centroid, name, kind, capacity))
+        for (plat, plon), name, kind, capacity in places:
+            node = self.nearest_node(plat, plon, max_km=0.5)
+            if node is not None:
+                point = {"name": name, "kind": kind, "node": node}
+                if capacity:
+                    point["capacity"] = capacity
+                assembly.append(point)
+        self.set_assembly_points(assembly)
+        print(f"✓ Road graph: {self.n} nodes, {len(self.edge_source)} edges, {len(assembly)} assembly points")
+
+    @staticmethod
+    def _int_tag(tags: dict, key: str) -> Optional[int]:
+        try:
+            return int(str(tags.get(key, "")).split(";")[0])
+        except ValueError:
+            return None
+
+    @staticmethod
+    def _assembly_kind(tags: dict) -> Optional[str]:
+        for key, value in ROAD_ASSEMBLY_TAGS:
+            if tags.get(key) == value:
+                return value
+        return None
+
+    def stats(self) -> dict:
+        return {
+            "loaded": self.loaded,
+            "nodes": self.n if self.loaded else 0,
+            "edges": len(self.edge_source) if self.loaded else 0,
+            "assembly_points": len(self.assembly_points)
+        }
+
+
+road_graph = RoadGraph()
+
+def load_road_graph(path: str = ROAD_GRAPH_PATH):
+    """Load the road network at startup, reusing the compiled CSR cache when the extract is unchanged"""
+    if not path:
+        return
+    if not os.path.exists(path):
+        print(f"⚠️ Road graph not found at {path}; evacuation routing disabled")
+        return
+
+    cache = ROAD_GRAPH_CACHE or f"{path}.graph.npz"
+    checksum = file_checksum(path)
+    if road_graph.load_cached(cache, checksum):
+        print(f"✓ Loaded road graph from cache {cache}: {road_graph.n} nodes")
+        return
+
+    road_graph.load_osm(path)
+    try:
+        road_graph.save(cache, checksum)
+    except OSError as e:
+        print(f"⚠️ Could not write road graph cache: {e}")
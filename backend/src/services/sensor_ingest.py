@@ -0,0 +1,461 @@
+import os
+import math
+import time
+import asyncio
+from collections import deque
+from datetime import datetime, timezone
+from typing import Awaitable, Callable, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+
+from src.config.db import db
+from src.services.prediction_cache import prediction_cache
+from src.services.alert_hub import alert_hub
+
+# --- CONFIGURATION ---
+# Readings kept per sensor; rolling aggregates cover the last SENSOR_WINDOW readings
+SENSOR_WINDOW = int(os.getenv("SENSOR_WINDOW", "60"))
+SENSOR_MAX_SENSORS = int(os.getenv("SENSOR_MAX_SENSORS", "100000"))
+# Alert thresholds on each kind's rolling aggregate; a reading may override its sensor's threshold
+SENSOR_RAIN_THRESHOLD_MM = float(os.getenv("SENSOR_RAIN_THRESHOLD_MM", "50"))
+SENSOR_RIVER_THRESHOLD_M = float(os.getenv("SENSOR_RIVER_THRESHOLD_M", "5"))
+SENSOR_TEMPERATURE_THRESHOLD_C = float(os.getenv("SENSOR_TEMPERATURE_THRESHOLD_C", "42"))
+# A sensor re-arms once its aggregate falls this fraction of the threshold below it
+SENSOR_HYSTERESIS = float(os.getenv("SENSOR_HYSTERESIS", "0.1"))
+# Re-prediction of a cell after a crossing: mode used, per-cell cooldown and concurrency
+SENSOR_REPREDICT_MODE = os.getenv("SENSOR_REPREDICT_MODE", "fast")
+SENSOR_REPREDICT_COOLDOWN = float(os.getenv("SENSOR_REPREDICT_COOLDOWN", "300"))
+SENSOR_REPREDICT_CONCURRENCY = int(os.getenv("SENSOR_REPREDICT_CONCURRENCY", "2"))
+# "mongo" bulk-writes raw readings to a time-series collection; "none" keeps them in memory only
+SENSOR_STORE_BACKEND = os.getenv("SENSOR_STORE_BACKEND", "mongo").lower()
+SENSOR_FLUSH_SIZE = int(os.getenv("SENSOR_FLUSH_SIZE", "5000"))
+SENSOR_FLUSH_INTERVAL = float(os.getenv("SENSOR_FLUSH_INTERVAL", "1.0"))
+# Oldest unwritten readings are dropped beyond this backlog (database down or too slow)
+SENSOR_MAX_PENDING = int(os.getenv("SENSOR_MAX_PENDING", "1000000"))
+SENSOR_STORE_TIMEOUT = float(os.getenv("SENSOR_STORE_TIMEOUT", "5.0"))
+# Reading timestamps are epoch seconds; later than this far ahead of the server clock is rejected
+SENSOR_MAX_FUTURE_S = float(os.getenv("SENSOR_MAX_FUTURE_S", "86400"))
+
+# kind -> rolling aggregate compared with the threshold, unit
+SENSOR_KINDS = {
+    "rain_gauge": {"aggregate": "sum", "threshold": SENSOR_RAIN_THRESHOLD_MM, "unit": "mm"},
+    "river_level": {"aggregate": "mean", "threshold": SENSOR_RIVER_THRESHOLD_M, "unit": "m"},
+    "temperature": {"aggregate": "mean", "threshold": SENSOR_TEMPERATURE_THRESHOLD_C, "unit": "°C"}
+}
+KIND_NAMES = list(SENSOR_KINDS)
+KIND_SUMS = np.array([SENSOR_KINDS[kind]["aggregate"] == "sum" for kind in KIND_NAMES])
+READING_FIELDS = ("sensor_id", "value", "ts", "kind", "latitude", "longitude", "threshold")
+
+# (latitude, longitude, notes) -> prediction refreshed for that cell
+Repredictor = Callable[[float, float, List[str]], Awaitable[object]]
+
+
+class SensorIngestor:
+    """Array-backed rolling windows for live sensor readings.
+
+    Every sensor owns one row of a (sensors x SENSOR_WINDOW) ring buffer. A batch is
+    applied with a handful of vectorised operations: running sums are updated by the
+    difference between each new reading and the one it overwrites, so aggregates
+    cost O(batch) rather than O(window). Sensors whose aggregate crosses its threshold
+    invalidate and re-predict their prediction cache cell, at most once per cooldown.
+    Raw readings are queued for bulk MongoDB writes by a background flusher.
+    """
+
+    def __init__(self, window: int = SENSOR_WINDOW, capacity: int = 1024):
+        self.window = window
+        self.index: Dict[str, int] = {}
+        self.names: List[str] = []
+        self.n = 0
+        self._allocate(capacity)
+        self.collection = db.get_collection("sensor_readings") if SENSOR_STORE_BACKEND == "mongo" else None
+        self.repredict: Optional[Repredictor] = None
+        self.semaphore = asyncio.Semaphore(SENSOR_REPREDICT_CONCURRENCY)
+        self.pending: deque = deque()
+        self.pending_count = 0
+        self.flusher: Optional[asyncio.Task] = None
+        self.tasks: Set[asyncio.Task] = set()
+        self.cooldown: Dict[str, float] = {}
+        self.in_flight: Set[str] = set()
+        self.recent = deque(maxlen=100)
+        self.readings = 0
+        self.rejected = 0
+        self.batches = 0
+        self.ingest_seconds = 0.0
+        self.crossings = 0
+        self.repredictions = 0
+        self.repredict_failures = 0
+        self.suppressed = 0
+        self.written = 0
+        self.write_failures = 0
+        self.dropped = 0
+
+    def _allocate(self, capacity: int):
+        self.capacity = capacity
+        self.values = np.zeros((capacity, self.window))
+        self.times = np.zeros((capacity, self.window))
+        self.head = np.zeros(capacity, dtype=np.int64)
+        self.count = np.zeros(capacity, dtype=np.int64)
+        self.sums = np.zeros(capacity)
+        self.sumsq = np.zeros(capacity)
+        self.kind = np.zeros(capacity, dtype=np.int8)
+        self.threshold = np.zeros(capacity)
+        self.alerting = np.zeros(capacity, dtype=bool)
+        self.lat = np.zeros(capacity)
+        self.lon = np.zeros(capacity)
+
+    def _grow(self):
+        arrays = {name: getattr(self, name) for name in (
+            "values", "times", "head", "count", "sums", "sumsq", "kind", "threshold", "alerting", "lat", "lon"
+        )}
+        self._allocate(self.capacity * 2)
+        for name, old in arrays.items():
+            getattr(self, name)[:len(old)] = old
+
+    def _register(self, name: str, kind, latitude, longitude) -> int:
+        """Index of a new sensor, or -1 when it lacks a known kind and a valid location"""
+        if not isinstance(kind, str) or kind not in SENSOR_KINDS or self.n >= SENSOR_MAX_SENSORS:
+            return -1
+        try:
+            latitude, longitude = float(latitude), float(longitude)
+        except (TypeError, ValueError):
+            return -1
+        if not (-90 <= latitude <= 90 and -180 <= longitude <= 180):
+            return -1
+        if self.n == self.capacity:
+            self._grow()
+        i = self.n
+        self.kind[i] = KIND_NAMES.index(kind)
+        self.threshold[i] = SENSOR_KINDS[kind]["threshold"]
+        self.lat[i], self.lon[i] = latitude, longitude
+        self.index[name] = i
+        self.names.append(name)
+        self.n += 1
+        return i
+
+    @staticmethod
+    def columns(frame) -> dict:
+        """Normalise a reading object, a list of them or a columnar frame into column lists.
+
+        A reading is {"sensor_id", "value", "ts"?, "kind"?, "latitude"?, "longitude"?,
+        "threshold"?}; kind and location are only needed the first time a sensor reports.
+        A columnar frame holds the same keys mapped to equal-length lists.
+        """
+        if isinstance(frame, dict) and isinstance(frame.get("sensor_id"), list):
+            n = len(frame["sensor_id"])
+            columns = {}
+            for key in READING_FIELDS:
+                column = frame.get(key)
+                if column is None:
+                    column = [None] * n
+                elif not isinstance(column, list) or len(column) != n:
+                    raise ValueError(f"column '{key}' must be a list of {n} entries")
+                columns[key] = column
+            return columns
+        rows = [frame] if isinstance(frame, dict) else frame
+        if not isinstance(rows, list) or not all(isinstance(row, dict) for row in rows):
+            raise ValueError("expected a reading object, a list of readings or a columnar frame")
+        return {key: [row.get(key) for row in rows]
+                for key in READING_FIELDS}
+
+    def ingest(self, frame) -> dict:
+        """Apply one frame of readings and fire re-predictions for cells whose sensors crossed"""
+        columns = self.columns(frame)
+        started = time.perf_counter()
+        now = time.time()
+
+        index = self.index
+        ids = np.empty(len(columns["sensor_id"]), dtype=np.int64)
+        for k, name in enumerate(columns["sensor_id"]):
+            # Non-string ids (objects, lists) are rejected readings, not lookup errors
+            i = index.get(name) if isinstance(name, str) else -1
+            if i is None:
+                i = self._register(name, columns["kind"][k], columns["latitude"][k], columns["longitude"][k])
+            ids[k] = i
+        values = np.array([v if isinstance(v, (int, float)) else np.nan for v in columns["value"]], dtype=float)
+        stamps = np.array([t if isinstance(t, (int, float)) else now for t in columns["ts"]], dtype=float)
+        for k, threshold in enumerate(columns["threshold"]):
+            if isinstance(threshold, (int, float)) and ids[k] >= 0:
+                self.threshold[ids[k]] = threshold
+
+        # Also catches millisecond epochs, which datetime can't represent
+        valid = (ids >= 0) & np.isfinite(values) & (stamps >= 0) & (stamps <= now + SENSOR_MAX_FUTURE_S)
+        rejected = int(len(ids) - valid.sum())
+        ids, values, stamps = ids[valid], values[valid], stamps[valid]
+        crossed = self._apply(ids, values, stamps) if len(ids) else np.empty(0, dtype=np.int64)
+
+        self.readings += len(ids)
+        self.rejected += rejected
+        self.batches += 1
+        self.ingest_seconds += time.perf_counter() - started
+        if self.collection is not None and len(ids):
+            self._enqueue(ids, values, stamps)
+        cells = self._trigger(crossed) if len(crossed) else []
+        return {"accepted": len(ids), "rejected": rejected, "crossed": len(crossed), "cells": cells}
+
+    def _apply(self, ids: np.ndarray, values: np.ndarray, stamps: np.ndarray) -> np.ndarray:
+        """Write a validated batch into the rings; return sensors that newly crossed their threshold"""
+        W = self.window
+        order = np.argsort(ids, kind="stable")
+        ids, values, stamps = ids[order], values[order], stamps[order]
+        starts = np.flatnonzero(np.r_[True, ids[1:] != ids[:-1]])
+        sizes = np.diff(np.r_[starts, len(ids)])
+        rank = np.arange(len(ids)) - np.repeat(starts, sizes)
+
+        # Only a sensor's last W readings of the batch can survive it
+        skip = np.maximum(sizes - W, 0)
+        keep = rank >= np.repeat(skip, sizes)
+        if not keep.all():
+            ids, values, stamps = ids[keep], values[keep], stamps[keep]
+            rank = rank[keep] - np.repeat(skip, sizes)[keep]
+            sizes = sizes - skip
+            starts = np.r_[0, np.cumsum(sizes)[:-1]]
+        sensors = ids[starts]
+
+        count = self.count[ids]
+        slot = (self.head[ids] + rank) % W
+        old = np.where(count + rank >= W, self.values[ids, slot], 0.0)
+        self.sums[sensors] += np.add.reduceat(values - old, starts)
+        self.sumsq[sensors] += np.add.reduceat(values * values - old * old, starts)
+        self.values[ids, slot] = values
+        self.times[ids, slot] = stamps
+        self.head[sensors] = (self.head[sensors] + sizes) % W
+        self.count[sensors] = np.minimum(self.count[sensors] + sizes, W)
+
+        metric = self._metric(sensors)
+        threshold = self.threshold[sensors]
+        above = metric >= threshold
+        rearmed = metric < threshold - SENSOR_HYSTERESIS * np.abs(threshold)
+        was = self.alerting[sensors]
+        self.alerting[sensors] = (was | above) & ~rearmed
+        return sensors[above & ~was]
+
+    def _metric(self, sensors: np.ndarray) -> np.ndarray:
+        """Rolling aggregate each sensor's threshold applies to"""
+        sums = self.sums[sensors]
+        means = sums / np.maximum(self.count[sensors], 1)
+        return np.where(KIND_SUMS[self.kind[sensors]], sums, means)
+
+    def _note(self, i: int) -> str:
+        kind = KIND_NAMES[self.kind[i]]
+        spec = SENSOR_KINDS[kind]
+        label = "total" if spec["aggregate"] == "sum" else "mean"
+        metric = float(self._metric(np.array([i]))[0])
+        return (f"⚠️ Live {kind.replace('_', ' ')} sensor {self.names[i]}: {label} of the last "
+                f"{int(self.count[i])} readings is {metric:.1f} {spec['unit']}, "
+                f"above the {self.threshold[i]:g} {spec['unit']} threshold")
+
+    def _trigger(self, crossed: np.ndarray) -> List[str]:
+        """Group crossings by prediction cache cell and schedule one re-prediction per cell"""
+        self.crossings += len(crossed)
+        grouped: Dict[str, List[int]] = {}
+        for i in crossed.tolist():
+            grouped.setdefault(prediction_cache.cell(self.lat[i], self.lon[i]), []).append(i)
+
+        now = time.monotonic()
+        scheduled = []
+        for cell, sensors in grouped.items():
+            notes = [self._note(i) for i in sensors]
+            alert = {
+                "cell": cell,
+                "sensors": [self.names[i] for i in sensors],
+                "notes": notes,
+                "at": datetime.now(timezone.utc).isoformat()
+            }
+            self.recent.append(alert)
+            alert_hub.publish(float(self.lat[sensors[0]]), float(self.lon[sensors[0]]), {"type": "sensor_alert", **alert})
+            if self.repredict is None:
+                continue
+            if cell in self.in_flight or now - self.cooldown.get(cell, -math.inf) < SENSOR_REPREDICT_COOLDOWN:
+                self.suppressed += 1
+                continue
+            self.cooldown[cell] = now
+            self.in_flight.add(cell)
+            task = asyncio.create_task(self._repredict(cell, float(self.lat[sensors[0]]), float(self.lon[sensors[0]]), notes))
+            self.tasks.add(task)
+            task.add_done_callback(self.tasks.discard)
+            scheduled.append(cell)
+        return scheduled
+
+    async def _repredict(self, cell: str, latitude: float, longitude: float, notes: List[str]):
+        try:
+            async with self.semaphore:
+                await self.repredict(latitude, longitude, notes)
+            self.repredictions += 1
+        except Exception as e:
+            self.repredict_failures += 1
+            print(f"⚠️ Sensor-triggered re-prediction failed for cell {cell}: {e}")
+        finally:
+            self.in_flight.discard(cell)
+
+    def sensor(self, name: str) -> Optional[dict]:
+        """Current window and aggregates of one sensor"""
+        i = self.index.get(name)
+        if i is None:
+            return None
+        count = int(self.count[i])
+        order = (self.head[i] - count + np.arange(count)) % self.window
+        values = self.values[i, order]
+        kind = KIND_NAMES[self.kind[i]]
+        return {
+            "sensor_id": name,
+            "kind": kind,
+            "unit": SENSOR_KINDS[kind]["unit"],
+            "latitude": float(self.lat[i]),
+            "longitude": float(self.lon[i]),
+            "cell": prediction_cache.cell(self.lat[i], self.lon[i]),
+            "readings": count,
+            "last_value": float(values[-1]) if count else None,
+            "last_ts": float(self.times[i, order[-1]]) if count else None,
+            # Exact recomputation over the window rather than the running sums
+            "sum": float(values.sum()),
+            "mean": float(values.mean()) if count else None,
+            "std": float(values.std()) if count else None,
+            "min": float(values.min()) if count else None,
+            "max": float(values.max()) if count else None,
+            "aggregate": SENSOR_KINDS[kind]["aggregate"],
+            "threshold": float(self.threshold[i]),
+            "alerting": bool(self.alerting[i])
+        }
+
+    def _enqueue(self, ids: np.ndarray, values: np.ndarray, stamps: np.ndarray):
+        self.pending.append((ids, values, stamps))
+        self.pending_count += len(ids)
+        while self.pending_count > SENSOR_MAX_PENDING and len(self.pending) > 1:
+            dropped = self.pending.popleft()
+            self.pending_count -= len(dropped[0])
+            self.dropped += len(dropped[0])
+
+    def _take(self, limit: int) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+        """Pop up to limit queued readings as one block"""
+        parts, taken = [], 0
+        while self.pending and taken < limit:
+            ids, values, stamps = self.pending.popleft()
+            room = limit - taken
+            if len(ids) > room:
+                self.pending.appendleft((ids[room:], values[room:], stamps[room:]))
+                ids, values, stamps = ids[:room], values[:room], stamps[:room]
+            parts.append((ids, values, stamps))
+            taken += len(ids)
+        self.pending_count -= taken
+        if not parts:
+            return None
+        return tuple(np.concatenate(column) for column in zip(*parts))
+
+    def _documents(self, ids: np.ndarray, values: np.ndarray, stamps: np.ndarray) -> List[dict]:
+        names, kinds = self.names, self.kind
+        fromtimestamp, utc = datetime.fromtimestamp, timezone.utc
+        return [
+            {"ts": fromtimestamp(t, utc), "sensor": {"id": names[i], "kind": KIND_NAMES[kinds[i]]}, "value": v}
+            for i, v, t in zip(ids.tolist(), values.tolist(), stamps.tolist())
+        ]
+
+    async def _flush_loop(self):
+        while True:
+            if self.pending_count < SENSOR_FLUSH_SIZE:
+                await asyncio.sleep(SENSOR_FLUSH_INTERVAL)
+            block = self._take(SENSOR_FLUSH_SIZE)
+            if block is None:
+                continue
+            await self._write(block)
+
+    async def _insert(self, documents: List[dict]):
+        await asyncio.wait_for(self.collection.insert_many(documents, ordered=False), SENSOR_STORE_TIMEOUT)
+        self.written += len(documents)
+
+    def _build(self, block) -> Optional[List[dict]]:
+        """Documents for a block, or None (block dropped) when they can't be built; retrying wouldn't help"""
+        try:
+            return self._documents(*block)
+        except Exception as e:
+            self.dropped += len(block[0])
+            print(f"⚠️ Dropping {len(block[0])} sensor readings that can't be stored: {e}")
+            return None
+
+    async def _write(self, block) -> bool:
+        documents = self._build(block)
+        if documents is None:
+            return False
+        try:
+            await self._insert(documents)
+            return True
+        except asyncio.CancelledError:
+            self._requeue(block)
+            raise
+        except Exception as e:
+            self.write_failures += 1
+            print(f"⚠️ Sensor reading write failed ({len(block[0])} readings): {e}")
+            # Put the block back for the next attempt; the backlog cap bounds what is kept
+            self._requeue(block)
+            await asyncio.sleep(SENSOR_FLUSH_INTERVAL)
+            return False
+
+    def _requeue(self, block):
+        self.pending.appendleft(block)
+        self.pending_count += len(block[0])
+
+    async def _ensure_collection(self):
+        """Create the time-series collection readings are bulk-written to"""
+        try:
+            await asyncio.wait_for(
+                db.create_collection(
+                    "sensor_readings",
+                    timeseries={"timeField": "ts", "metaField": "sensor", "granularity": "seconds"}
+                ),
+                SENSOR_STORE_TIMEOUT
+            )
+        except Exception as e:
+            if "already exists" not in str(e):
+                print(f"⚠️ Sensor collection creation failed: {e}")
+
+    async def start(self, repredict: Repredictor):
+        self.repredict = repredict
+        if self.collection is not None:
+            # Runs in the background so an unreachable database doesn't delay startup
+            self.flusher = asyncio.create_task(self._ensure_then_flush())
+
+    async def _ensure_then_flush(self):
+        await self._ensure_collection()
+        await self._flush_loop()
+
+    async def stop(self):
+        if self.flusher is not None:
+            self.flusher.cancel()
+            await asyncio.gather(self.flusher, return_exceptions=True)
+            self.flusher = None
+            # One last bounded attempt at what is still queued
+            while self.pending:
+                block = self._take(SENSOR_FLUSH_SIZE)
+                documents = self._build(block)
+                if documents is None:
+                    continue
+                try:
+                    await self._insert(documents)
+                except Exception as e:
+                    print(f"⚠️ Dropping {self.pending_count + len(block[0])} unwritten sensor readings: {e}")
+                    break
+        for task in list(self.tasks):
+            task.cancel()
+        await asyncio.gather(*self.tasks, return_exceptions=True)
+
+    def stats(self) -> dict:
+        return {
+            "sensors": self.n,
+            "window": self.window,
+            "alerting": int(self.alerting[:self.n].sum()),
+            "readings": self.readings,
+            "rejected": self.rejected,
+            "batches": self.batches,
+            "readings_per_s": round(self.readings / self.ingest_seconds) if self.ingest_seconds else None,
+            "crossings": self.crossings,
+            "repredictions": self.repredictions,
+            "repredict_failures": self.repredict_failures,
+            "suppressed": self.suppressed,
+            "store": SENSOR_STORE_BACKEND,
+            "pending_writes": self.pending_count,
+            "written": self.written,
+            "write_failures": self.write_failures,
+            "dropped": self.dropped
+        }
+
+
+sensor_ingestor = SensorIngestor()
@@ -0,0 +1,12 @@
+import multiprocessing
+
+
+def worker_context():
+    """Start method for process pools created inside the running server.
+
+    Forking a process that already runs the event loop, the thread pool and the database
+    driver's threads can deadlock the child on a lock one of those threads held, so workers
+    come from a forkserver (spawn where that is unavailable) and load their own data.
+    """
+    methods = multiprocessing.get_all_start_methods()
+    return multiprocessing.get_context("forkserver" if "forkserver" in methods else "spawn")
@@ -0,0 +1,40 @@
+import os
+import sys
+
+import pytest
+
+# Importing src.* reads settings at import time; tests never reach the real providers
+os.environ.setdefault("OPENROUTER_API_KEY", "test")
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), ".."))
+
+
+@pytest.fixture
+def make_prediction():
+    """Builds a minimal DisasterPredictionResponse for a coordinate"""
+    from src.schemas.prediction_schema import DisasterPredictionResponse
+
+    def build(latitude: float, longitude: float, **fields) -> DisasterPredictionResponse:
+        values = {
+            "disaster_name": "Flood",
+            "severity": "Moderate",
+            "country": "India",
+            "state": "Maharashtra",
+            "location": "Pune",
+            "latitude": latitude,
+            "longitude": longitude,
+            "start_day": None,
+            "end_day": None,
+            "evacuations": 0,
+            "affected_population": 0,
+            "disaster_details": {
+                "description": "", "primary_risks": [], "vulnerable_areas": [], "expected_impact": "",
+                "historical_context": "", "contributing_factors": []
+            },
+            "evacuation_plan": {
+                "preparation_phase": [], "immediate_actions": [], "during_disaster": [], "evacuation_routes": [],
+                "post_disaster": [], "emergency_contacts": [], "essential_supplies": []
+            }
+        }
+        return DisasterPredictionResponse(**{**values, **fields})
+
+    return build
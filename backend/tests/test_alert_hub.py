@@ -0,0 +1,175 @@
+import json
+import random
+import asyncio
+
+import pytest
+
+import src.services.alert_hub as alert_hub_module
+from src.services.alert_hub import AlertHub, CLOSE_TRY_AGAIN
+
+
+class FakeSocket:
+    def __init__(self, stall: bool = False):
+        self.stall = stall
+        self.sent = []
+        self.closed = None
+
+    async def accept(self):
+        pass
+
+    async def send_text(self, text: str):
+        if self.stall:
+            await asyncio.Event().wait()
+        self.sent.append(json.loads(text))
+
+    async def close(self, code: int = 1000):
+        self.closed = code
+
+
+TRIANGLE = {"type": "Polygon", "coordinates": [[[73.0, 18.0], [75.0, 18.0], [73.0, 20.0], [73.0, 18.0]]]}
+
+
+def test_routing_matches_brute_force():
+    async def run():
+        hub = AlertHub()
+        subscribers = [await hub.connect(FakeSocket()) for _ in range(4)]
+        hub.subscribe(subscribers[0], "pune", [18.0, 73.0, 19.0, 74.5])
+        hub.subscribe(subscribers[1], "pacific", [-20.0, 178.0, -10.0, -178.0])
+        hub.subscribe(subscribers[2], "triangle", polygon=TRIANGLE)
+        hub.subscribe(subscribers[3], "asia", [-10.0, 40.0, 60.0, 150.0])
+        rng = random.Random(7)
+        points = [(18.4, 73.8), (19.9, 74.9), (-15.0, 179.5), (-15.0, -179.5), (-15.0, 177.0)]
+        points += [(rng.uniform(-25, 25), rng.uniform(-180, 180)) for _ in range(500)]
+        for latitude, longitude in points:
+            expected = {s for s in subscribers if any(r.contains(latitude, longitude) for r in s.regions.values())}
+            assert hub.subscribers_at(latitude, longitude) == expected
+        assert hub.subscribers_at(-15.0, 179.5) == {subscribers[1]}
+        assert hub.subscribers_at(19.9, 74.9) == {subscribers[3]}
+        assert hub.stats()["wide_regions"] == 1
+        await hub.close()
+
+    asyncio.run(run())
+
+
+def test_unsubscribe_removes_every_bucket():
+    async def run():
+        hub = AlertHub()
+        subscriber = await hub.connect(FakeSocket())
+        hub.subscribe(subscriber, "a", [18.0, 73.0, 21.0, 76.0])
+        hub.subscribe(subscriber, "a", [10.0, 70.0, 10.5, 70.5])
+        assert hub.subscribers_at(19.0, 74.0) == set()
+        assert hub.unsubscribe(subscriber, "a")
+        assert hub.buckets == {}
+        await hub.close()
+
+    asyncio.run(run())
+
+
+def test_details_are_built_once_for_full_subscribers_only():
+    built = []
+
+    async def run():
+        hub = AlertHub()
+        summary, full, full_too = [await hub.connect(FakeSocket(), detail) for detail in ("summary", "full", "full")]
+        for subscriber in (summary, full, full_too):
+            hub.subscribe(subscriber, "pune", [18.0, 73.0, 19.0, 74.0])
+        recipients = hub.publish(18.5, 73.5, {"type": "prediction"}, lambda: built.append(1) or {"prediction": {"x": 1}})
+        await asyncio.sleep(0.01)
+        await hub.close()
+        return recipients, summary.websocket.sent, full.websocket.sent
+
+    recipients, summary_sent, full_sent = asyncio.run(run())
+    assert recipients == 3
+    assert built == [1]
+    assert summary_sent == [{"type": "prediction"}]
+    assert full_sent == [{"type": "prediction", "prediction": {"x": 1}}]
+
+
+def test_overflowing_consumer_is_evicted_without_holding_up_others(monkeypatch):
+    monkeypatch.setattr(alert_hub_module, "ALERT_QUEUE_SIZE", 2)
+    monkeypatch.setattr(alert_hub_module, "ALERT_MAX_DROPPED", 3)
+
+    async def run():
+        hub = AlertHub()
+        stalled = await hub.connect(FakeSocket(stall=True))
+        healthy = await hub.connect(FakeSocket())
+        for subscriber in (stalled, healthy):
+            hub.subscribe(subscriber, "pune", [18.0, 73.0, 19.0, 74.0])
+        for n in range(8):
+            hub.publish(18.5, 73.5, {"n": n})
+            # Let the healthy writer drain between updates
+            await asyncio.sleep(0.001)
+        await asyncio.sleep(0.01)
+        close_code = stalled.websocket.closed
+        await hub.close()
+        return hub, stalled, healthy, close_code
+
+    hub, stalled, healthy, close_code = asyncio.run(run())
+    assert stalled.closing and close_code == CLOSE_TRY_AGAIN
+    assert hub.stats()["evicted"] == 1
+    assert [m["n"] for m in healthy.websocket.sent] == list(range(8))
+
+
+def test_stalled_send_times_out(monkeypatch):
+    monkeypatch.setattr(alert_hub_module, "ALERT_SEND_TIMEOUT", 0.02)
+
+    async def run():
+        hub = AlertHub()
+        subscriber = await hub.connect(FakeSocket(stall=True))
+        hub.subscribe(subscriber, "pune", [18.0, 73.0, 19.0, 74.0])
+        hub.publish(18.5, 73.5, {"n": 0})
+        await asyncio.sleep(0.1)
+        return hub, subscriber
+
+    hub, subscriber = asyncio.run(run())
+    assert hub.timeouts == 1
+    assert subscriber.websocket.closed == CLOSE_TRY_AGAIN
+
+
+def test_connections_beyond_capacity_are_refused(monkeypatch):
+    monkeypatch.setattr(alert_hub_module, "ALERT_MAX_CONNECTIONS", 1)
+
+    async def run():
+        hub = AlertHub()
+        first = await hub.connect(FakeSocket())
+        refused = FakeSocket()
+        second = await hub.connect(refused)
+        await hub.close()
+        return first, second, refused
+
+    first, second, refused = asyncio.run(run())
+    assert first is not None and second is None
+    assert refused.closed == CLOSE_TRY_AGAIN
+
+
+def test_predictions_are_pushed_only_when_they_change(make_prediction):
+    async def run():
+        hub = AlertHub()
+        subscriber = await hub.connect(FakeSocket())
+        hub.subscribe(subscriber, "pune", [18.0, 73.0, 19.0, 74.0])
+        pushed = [
+            hub.publish_prediction(make_prediction(18.5, 73.8), "fast"),
+            hub.publish_prediction(make_prediction(18.5, 73.8), "fast"),
+            hub.publish_prediction(make_prediction(18.5, 73.8, severity="High"), "fast"),
+            hub.publish_prediction(make_prediction(18.5, 73.8, severity="High"), "fast", ["sensor note"]),
+        ]
+        await asyncio.sleep(0.01)
+        await hub.close()
+        return pushed, subscriber.websocket.sent
+
+    pushed, sent = asyncio.run(run())
+    assert pushed == [1, 0, 1, 1]
+    assert [m["change"] for m in sent] == ["new", "severity", "sensor"]
+    assert sent[1]["previous"] == {"disaster_name": "Flood", "severity": "Moderate"}
+
+
+@pytest.mark.parametrize("bbox", [[19.0, 73.0, 18.0, 74.0], [18.0, 73.0, 19.0, 73.0], [18.0, 73.0, 95.0, 74.0]])
+def test_invalid_boxes_are_refused(bbox):
+    async def run():
+        hub = AlertHub()
+        subscriber = await hub.connect(FakeSocket())
+        with pytest.raises(ValueError):
+            hub.subscribe(subscriber, "bad", bbox)
+        await hub.close()
+
+    asyncio.run(run())
@@ -0,0 +1,104 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+import src.services.evacuation_router as router_module
+from src.services.road_graph import RoadGraph, HIGHWAY_CLASSES
+from src.services.evacuation_router import EvacuationRouter
+from src.services.evacuation_flow import EvacuationFlowSolver
+
+HAZARD = (19.0, 72.96)
+# West to east along one street: shelter, outside the zone, inside, hazard centre, and a
+# dead end east of the hazard whose only way out is back past the centre
+LONGITUDES = [72.90, 72.93, 72.95, 72.96, 72.975]
+DEAD_END = 4
+
+
+def street() -> RoadGraph:
+    pairs = [(i, i + 1) for i in range(len(LONGITUDES) - 1)]
+    sources = [a for a, b in pairs] + [b for a, b in pairs]
+    targets = [b for a, b in pairs] + [a for a, b in pairs]
+    graph = RoadGraph()
+    graph.set_arrays(np.full(len(LONGITUDES), HAZARD[0]), LONGITUDES, sources, targets,
+                     [HIGHWAY_CLASSES.index("residential")] * len(sources),
+                     [{"name": "School", "kind": "school", "node": 0}])
+    return graph
+
+
+class FakeExposure:
+    """Only the dead end's grid square is inhabited"""
+
+    def covers(self, latitude, longitude):
+        return True
+
+    def rect_sums(self, south, west, north, east):
+        return np.where((west <= LONGITUDES[DEAD_END]) & (LONGITUDES[DEAD_END] < east), 120.0, 0.0)
+
+
+def test_dead_end_inside_the_zone_turns_inwards_to_escape():
+    routes, stranded = EvacuationRouter(street()).plan(*HAZARD, "Moderate")
+    assert stranded == 0
+    assert len(routes) == 1
+    route = routes[0]
+    assert route.assembly_point == "School"
+    assert route.population_cells == 3
+    assert route.population is None
+
+
+def test_route_from_dead_end_follows_the_street(monkeypatch):
+    monkeypatch.setattr(router_module, "population_exposure", FakeExposure())
+    routes, stranded = EvacuationRouter(street()).plan(*HAZARD, "Moderate")
+    assert stranded == 0
+    route = routes[0]
+    # Empty squares are dropped; only the dead end's residents are routed
+    assert (route.population_cells, route.population) == (1, 120)
+    assert [lon for _, lon in route.path] == LONGITUDES[::-1]
+
+
+def test_inward_edges_cost_more_than_outward_ones():
+    graph = street()
+    router = EvacuationRouter(graph)
+    zone = graph.nodes_within(*HAZARD, router.hazard_radius("Moderate")).tolist()
+    hazard = {node: abs(LONGITUDES[node] - HAZARD[1]) for node in zone}
+    best = router._sweep(zone, hazard)
+    # centre -> west neighbour -> out, and the dead end pays the inward penalty to reach the centre
+    assert best[3][1] == 2
+    assert best[DEAD_END][1] == 3
+    inward = best[DEAD_END][0] - best[3][0]
+    step = graph.time_s[best[DEAD_END][2]] * router_module.ROUTE_HAZARD_PENALTY
+    assert inward == pytest.approx(step * router_module.ROUTE_INWARD_PENALTY)
+
+
+def test_flow_spreads_evacuees_by_population(monkeypatch):
+    solver = EvacuationFlowSolver(street())
+    hazard = {"latitude": HAZARD[0], "longitude": HAZARD[1], "radius_km": 2.0, "evacuees": 300}
+    even = solver._zone_cells(hazard)["population"]
+    assert even.tolist() == [100.0, 100.0, 100.0]
+
+    monkeypatch.setattr(router_module, "population_exposure", FakeExposure())
+    cells = solver._zone_cells(hazard)
+    assert cells["population"].sum() == pytest.approx(300)
+    assert cells["population"][cells["lon"] == LONGITUDES[DEAD_END]].tolist() == [300.0]
+
+
+def test_concurrent_closures_on_one_plan_are_both_kept():
+    solver = EvacuationFlowSolver(street())
+    plan = solver.solve([{"latitude": HAZARD[0], "longitude": HAZARD[1], "radius_km": 2.0, "evacuees": 300}])
+    run = solver._run
+
+    def slow_run(specs):
+        time.sleep(0.05)
+        return run(specs)
+
+    solver._run = slow_run
+    closures = [{"latitude": HAZARD[0], "longitude": lon, "radius_m": 50} for lon in (LONGITUDES[1], LONGITUDES[4])]
+    threads = [threading.Thread(target=solver.close_roads, args=(plan["plan_id"], [closure])) for closure in closures]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    expected = np.union1d(*[solver._edges_near(**closure) for closure in closures])
+    assert solver.plans[plan["plan_id"]]["closed"].tolist() == expected.tolist()
+    assert solver.resolves == 2
@@ -0,0 +1,68 @@
+import csv
+
+import pytest
+
+from src.services.historical_data import HistoricalDataStore
+
+HEADER = [
+    "DisNo.", "Historic Classification", "Disaster Group", "Disaster Subgroup", "Disaster Type", "Disaster Subtype",
+    "Event Name", "ISO", "Region", "Subregion", "Location", "Magnitude", "Magnitude Scale", "River Basin",
+    "Start Year", "Start Month", "Start Day", "End Year", "End Month", "End Day", "Total Deaths", "No. Injured",
+    "No. Affected", "No. Homeless", "Total Affected", "Total Damage ('000 US$)",
+    "Total Damage, Adjusted ('000 US$)", "Insured Damage ('000 US$)", "Reconstruction Costs ('000 US$)",
+    "Latitude", "Longitude"
+]
+
+EVENTS = [
+    # (type, location, latitude, longitude)
+    ("Storm", "Taveuni (Fiji)", -16.8, 179.9),
+    ("Storm", "Samoa", -16.8, -179.95),
+    ("Flood", "Pune (Maharashtra)", 18.52, 73.85),
+    ("Flood", "Mumbai (Maharashtra)", 19.07, 72.88),
+    ("Flood", "Unlocated village (Maharashtra)", "", ""),
+    ("Earthquake", "Date line", 0.0, 180.0),
+]
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / "events.csv"
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=HEADER)
+        writer.writeheader()
+        for i, (kind, location, lat, lon) in enumerate(EVENTS):
+            writer.writerow({"DisNo.": f"2020-{i:04d}-IND", "Disaster Type": kind, "ISO": "IND", "Location": location,
+                             "Start Year": 2020, "Start Month": 7, "Total Deaths": i, "Latitude": lat, "Longitude": lon})
+    store = HistoricalDataStore(grid_degrees=1.0)
+    store.load_csv(str(path))
+    return store
+
+
+def test_nearby_is_sorted_and_bounded(store):
+    rows, distances = store.nearby(18.6, 73.8, 150)
+    assert rows.tolist() == [2, 3]
+    assert distances[0] < distances[1] <= 150
+    assert store.nearby(18.6, 73.8, 100)[0].tolist() == [2]
+    assert store.nearby(18.6, 73.8, 150, limit=1)[0].tolist() == [2]
+
+
+@pytest.mark.parametrize("latitude, longitude, expected", [
+    (-16.8, -179.95, {0, 1}),
+    (-16.8, 179.95, {0, 1}),
+    (0.0, -179.99, {5}),
+    (0.0, 179.99, {5}),
+])
+def test_nearby_crosses_the_antimeridian(store, latitude, longitude, expected):
+    rows, _ = store.nearby(latitude, longitude, 50)
+    assert set(rows.tolist()) == expected
+
+
+def test_unlocated_events_are_not_indexed(store):
+    assert sum(len(rows) for rows in store.by_cell.values()) == len(EVENTS) - 1
+
+
+def test_location_mask_uses_geocoder_fields(store):
+    mask = store.location_mask({"location": "Pune", "state": "Unknown", "country": None})
+    assert mask.nonzero()[0].tolist() == [2]
+    # Placeholder values would otherwise match every location text
+    assert not store.location_mask({"location": "Coordinates: 1, 2", "state": "Unknown"}).any()
@@ -0,0 +1,96 @@
+import asyncio
+
+import pytest
+
+mongomock_motor = pytest.importorskip("mongomock_motor")
+
+import src.services.job_queue as job_queue_module
+from src.services.job_queue import JobQueue
+from src.schemas.prediction_schema import CoordinateRequest
+
+
+def make_queues(count: int, processor):
+    db = mongomock_motor.AsyncMongoMockClient().get_database("jobs")
+    queues = []
+    for _ in range(count):
+        queue = JobQueue(processor, lambda coord, error: None)
+        queue.jobs, queue.items = db.prediction_jobs, db.prediction_job_items
+        queues.append(queue)
+    return queues
+
+
+def coordinates(n: int):
+    return [CoordinateRequest(latitude=19 + i * 0.1, longitude=72.8) for i in range(n)]
+
+
+def test_workers_resuming_one_job_predict_each_item_once(make_prediction):
+    calls = []
+
+    async def processor(latitude, longitude, mode, ensemble):
+        calls.append((latitude, mode, ensemble))
+        await asyncio.sleep(0.01)
+        return make_prediction(latitude, longitude)
+
+    async def run():
+        queues = make_queues(3, processor)
+        await queues[0].start()
+        submitted = await queues[0].submit(coordinates(5), "fast", True)
+        # Other processes start up and resume the same unfinished job
+        for queue in queues[1:]:
+            await queue.start()
+        for _ in range(200):
+            result = await queues[0].get_result(submitted["job_id"])
+            if result.status == "completed":
+                break
+            await asyncio.sleep(0.01)
+        for queue in queues:
+            await queue.stop()
+        return result
+
+    result = asyncio.run(run())
+    assert result.status == "completed"
+    assert len(result.predictions) == result.completed_locations == 5
+    assert sorted(c[0] for c in calls) == [19 + i * 0.1 for i in range(5)]
+    assert {(c[1], c[2]) for c in calls} == {("fast", True)}
+
+
+def test_late_resume_leaves_completed_job_alone(make_prediction):
+    async def processor(latitude, longitude, mode, ensemble):
+        return make_prediction(latitude, longitude)
+
+    async def run():
+        first, second = make_queues(2, processor)
+        first.queue = asyncio.Queue()
+        submitted = await first.submit(coordinates(1))
+        await first._run_item(submitted["job_id"], 0)
+        await second._run_item(submitted["job_id"], 0)
+        return await first.jobs.find_one({"_id": submitted["job_id"]})
+
+    job = asyncio.run(run())
+    assert job["status"] == "completed"
+    assert job["completed"] == 1
+
+
+def test_lease_is_renewed_while_item_runs(monkeypatch, make_prediction):
+    monkeypatch.setattr(job_queue_module, "JOB_LEASE_SECONDS", 0.06)
+    release = None
+
+    async def processor(latitude, longitude, mode, ensemble):
+        await release.wait()
+        return make_prediction(latitude, longitude)
+
+    async def run():
+        nonlocal release
+        release = asyncio.Event()
+        first, second = make_queues(2, processor)
+        first.queue = asyncio.Queue()
+        submitted = await first.submit(coordinates(1))
+        running = asyncio.ensure_future(first._run_item(submitted["job_id"], 0))
+        # Well past the original lease: the heartbeat must have extended it
+        await asyncio.sleep(0.2)
+        taken_over = await second._claim(f"{submitted['job_id']}:0", submitted["job_id"], 0)
+        release.set()
+        await running
+        return taken_over
+
+    assert asyncio.run(run()) is False
@@ -0,0 +1,52 @@
+import pytest
+
+from src.services.output_parser import JSONObjectScanner, PredictionParseError, extract_json_object
+
+
+def feed_all(scanner: JSONObjectScanner, chunks):
+    for chunk in chunks:
+        result = scanner.feed(chunk)
+        if result is not None:
+            return result
+    return scanner.finish()
+
+
+def test_braces_inside_strings_are_ignored():
+    text = 'Here you go: {"narrative": "a } brace and a { brace \\" quote", "n": 1} trailing'
+    assert extract_json_object(text) == {"narrative": 'a } brace and a { brace " quote', "n": 1}
+
+
+def test_prose_braces_are_skipped():
+    assert extract_json_object('{see below} {"ok": true}') == {"ok": True}
+
+
+def test_object_split_across_chunks():
+    text = '{"a": {"b": "x}y"}, "c": [1, 2]}'
+    chunks = [text[i:i + 3] for i in range(0, len(text), 3)]
+    assert feed_all(JSONObjectScanner(), chunks) == {"a": {"b": "x}y"}, "c": [1, 2]}
+
+
+def test_returns_as_soon_as_object_closes():
+    scanner = JSONObjectScanner()
+    assert scanner.feed('{"a": 1') is None
+    assert scanner.feed('} and then more prose') == {"a": 1}
+
+
+def test_prose_limit():
+    scanner = JSONObjectScanner(prose_limit=10)
+    with pytest.raises(PredictionParseError) as error:
+        scanner.feed("x" * 11)
+    assert error.value.reason == "no_json"
+
+
+def test_prose_limit_restarts_after_skipped_span():
+    scanner = JSONObjectScanner(prose_limit=10)
+    assert feed_all(scanner, ["{not json}", "x" * 8, '{"a": 1}']) == {"a": 1}
+
+
+def test_truncated_reply():
+    scanner = JSONObjectScanner()
+    scanner.feed('{"a": "unterminated')
+    with pytest.raises(PredictionParseError) as error:
+        scanner.finish()
+    assert error.value.reason == "truncated"
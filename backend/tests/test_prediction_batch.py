@@ -0,0 +1,91 @@
+import json
+import asyncio
+
+import pytest
+
+import src.services.disaster_prediction as disaster_prediction
+from src.services.disaster_prediction import _parse_batch_output, apredict_disaster_batch
+from src.services.prediction_batcher import PredictionBatcher
+
+COORDINATES = [(18.5, 73.8), (19.0, 72.8), (28.6, 77.2)]
+
+
+class FakeChain:
+    def __init__(self, reply: str):
+        self.reply = reply
+
+    async def ainvoke(self, inputs):
+        return self.reply
+
+
+@pytest.fixture
+def batch_reply(monkeypatch, make_prediction):
+    """Item 0 answered properly, item 1 failing the schema, item 2 missing from the reply"""
+    async def locate(latitude, longitude):
+        return {"location": "Pune", "state": "Maharashtra", "country": "India", "display_name": "Pune"}
+
+    good = make_prediction(0, 0).model_dump(exclude={"latitude", "longitude"})
+    reply = "Here are the predictions:\n" + json.dumps([{"index": 0, **good}, {"index": 1, "severity": "High"}])
+    monkeypatch.setattr(disaster_prediction, "aget_location_from_coordinates", locate)
+    monkeypatch.setattr(disaster_prediction, "get_batch_chain", lambda: FakeChain(reply))
+
+
+def test_parse_batch_output_keys_items_by_index():
+    raw = 'prose [1, 2] then [{"index": 1, "a": 1}, {"a": 0}, {"index": true, "b": 2}, {"index": 9}] done'
+    assert _parse_batch_output(raw, 3) == {1: {"a": 1}}
+    assert _parse_batch_output('[{"a": 0}, {"a": 1}]', 2) == {0: {"a": 0}, 1: {"a": 1}}
+    assert _parse_batch_output("no array here", 2) == {}
+
+
+def test_failed_items_fall_back_individually(monkeypatch, batch_reply, make_prediction):
+    async def single(latitude, longitude):
+        if latitude == 28.6:
+            raise RuntimeError("circuit open")
+        return make_prediction(latitude, longitude, disaster_name="Cyclone")
+
+    monkeypatch.setattr(disaster_prediction, "apredict_disaster", single)
+    results = asyncio.run(apredict_disaster_batch(COORDINATES))
+
+    (first, first_fallback), (second, second_fallback), (third, third_fallback) = results
+    assert (first.latitude, first.disaster_name, first_fallback) == (18.5, "Flood", False)
+    assert (second.latitude, second.disaster_name, second_fallback) == (19.0, "Cyclone", True)
+    assert isinstance(third, RuntimeError) and third_fallback
+
+
+def test_fallbacks_share_the_semaphore(monkeypatch, batch_reply, make_prediction):
+    active = peak = 0
+
+    async def single(latitude, longitude):
+        nonlocal active, peak
+        active += 1
+        peak = max(peak, active)
+        await asyncio.sleep(0.01)
+        active -= 1
+        return make_prediction(latitude, longitude)
+
+    monkeypatch.setattr(disaster_prediction, "apredict_disaster", single)
+
+    async def run():
+        return await apredict_disaster_batch(COORDINATES, asyncio.Semaphore(1))
+
+    assert [used for _, used in asyncio.run(run())] == [False, True, True]
+    assert peak == 1
+
+
+def test_batcher_fails_only_the_caller_whose_fallback_failed(monkeypatch, batch_reply, make_prediction):
+    async def single(latitude, longitude):
+        if latitude == 28.6:
+            raise RuntimeError("deadline")
+        return make_prediction(latitude, longitude)
+
+    monkeypatch.setattr(disaster_prediction, "apredict_disaster", single)
+
+    async def run():
+        batcher = PredictionBatcher(batch_size=3, window=1)
+        results = await asyncio.gather(*(batcher.submit(lat, lon) for lat, lon in COORDINATES), return_exceptions=True)
+        return batcher, results
+
+    batcher, results = asyncio.run(run())
+    assert [r.latitude for r in results[:2]] == [18.5, 19.0]
+    assert isinstance(results[2], RuntimeError)
+    assert batcher.stats()["fallbacks"] == 2
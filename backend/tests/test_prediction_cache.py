@@ -0,0 +1,28 @@
+from src.services.prediction_cache import PredictionCache
+
+PUNE = (18.52, 73.85)
+
+
+def test_invalidate_clears_every_window_and_the_stale_copy(make_prediction):
+    cache = PredictionCache()
+    cell_key = cache.cell_key(*PUNE)
+    cache.memory.set(f"{cell_key}:1", make_prediction(*PUNE))
+    cache.set(*PUNE, make_prediction(*PUNE))
+    cache.set(*PUNE, make_prediction(*PUNE), "fast")
+
+    cache.invalidate(*PUNE)
+    assert cache.get(*PUNE) is None
+    assert cache.get_stale(*PUNE, "down") is None
+    assert len(cache.memory) == 1
+    assert cache.get(*PUNE, "fast") is not None
+
+
+def test_prediction_started_before_invalidation_is_not_cached(make_prediction):
+    cache = PredictionCache()
+    generation = cache.generation(*PUNE, "fast")
+    cache.invalidate(*PUNE, "fast")
+    cache.set(*PUNE, make_prediction(*PUNE, disaster_name="Before"), "fast", generation)
+    assert cache.get(*PUNE, "fast") is None
+
+    cache.set(*PUNE, make_prediction(*PUNE, disaster_name="After"), "fast", cache.generation(*PUNE, "fast"))
+    assert cache.get(*PUNE, "fast").disaster_name == "After"
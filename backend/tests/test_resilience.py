@@ -0,0 +1,183 @@
+import asyncio
+
+import httpx
+import openai
+import pytest
+
+from src.services.resilience import CircuitBreaker, CircuitOpenError, hedged
+
+
+async def transient_failure():
+    raise asyncio.TimeoutError()
+
+
+def status_error(status: int) -> openai.APIStatusError:
+    response = httpx.Response(status, request=httpx.Request("POST", "https://provider.test/chat"))
+    return openai.APIStatusError(f"HTTP {status}", response=response, body=None)
+
+
+# --- CIRCUIT BREAKER ---
+def test_breaker_opens_after_threshold():
+    breaker = CircuitBreaker("test", failure_threshold=2, reset_timeout=60)
+
+    async def run():
+        for _ in range(2):
+            with pytest.raises(asyncio.TimeoutError):
+                await breaker.call(transient_failure)
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(lambda: asyncio.sleep(0, "ok"))
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+    assert breaker.trips == 1
+    assert breaker.short_circuited == 1
+
+
+def test_half_open_lets_one_probe_through():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(transient_failure)
+        assert breaker.state == "open"
+
+        gate = asyncio.Event()
+
+        async def probe():
+            await gate.wait()
+            return "ok"
+
+        first = asyncio.ensure_future(breaker.call(probe))
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open"
+        # A second caller arriving while the probe is in flight is short-circuited
+        with pytest.raises(CircuitOpenError):
+            await breaker.call(probe)
+        gate.set()
+        return await first
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == "closed"
+    assert breaker.failures == 0
+
+
+def test_failed_probe_reopens():
+    breaker = CircuitBreaker("test", failure_threshold=3, reset_timeout=0)
+    breaker.state, breaker.opened_at = "open", 0.0
+
+    async def run():
+        with pytest.raises(asyncio.TimeoutError):
+            await breaker.call(transient_failure)
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+
+
+def test_cancelled_probe_does_not_wedge_half_open():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=0)
+    breaker.state, breaker.opened_at = "open", 0.0
+
+    async def run():
+        probe = asyncio.ensure_future(breaker.call(lambda: asyncio.sleep(10)))
+        await asyncio.sleep(0)
+        assert breaker.state == "half_open"
+        probe.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await probe
+        return await breaker.call(lambda: asyncio.sleep(0, "ok"))
+
+    assert asyncio.run(run()) == "ok"
+    assert breaker.state == "closed"
+
+
+def test_only_server_errors_trip_the_breaker():
+    breaker = CircuitBreaker("test", failure_threshold=1, reset_timeout=60)
+
+    async def fail(status):
+        raise status_error(status)
+
+    async def run():
+        for status in (400, 401, 404):
+            with pytest.raises(openai.APIStatusError):
+                await breaker.call(lambda: fail(status))
+        assert breaker.state == "closed"
+        with pytest.raises(openai.APIStatusError):
+            await breaker.call(lambda: fail(503))
+
+    asyncio.run(run())
+    assert breaker.state == "open"
+
+
+# --- HEDGED REQUESTS ---
+def test_hedge_fires_and_first_success_wins():
+    hedges = []
+
+    async def run():
+        return await hedged(lambda: asyncio.sleep(1, "primary"), lambda: asyncio.sleep(0, "secondary"),
+                            delay=0.01, on_hedge=lambda: hedges.append(1))
+
+    assert asyncio.run(run()) == "secondary"
+    assert hedges == [1]
+
+
+def test_fast_primary_skips_hedge():
+    async def secondary():
+        raise AssertionError("secondary should not start")
+
+    assert asyncio.run(hedged(lambda: asyncio.sleep(0, "primary"), secondary, delay=1)) == "primary"
+
+
+def test_cancelled_caller_cancels_both_calls():
+    started, cancelled = [], []
+
+    def call(name):
+        async def run():
+            started.append(name)
+            try:
+                await asyncio.sleep(10)
+            except asyncio.CancelledError:
+                cancelled.append(name)
+                raise
+        return run
+
+    async def run():
+        caller = asyncio.ensure_future(hedged(call("primary"), call("secondary"), delay=0.01))
+        await asyncio.sleep(0.05)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert started == ["primary", "secondary"]
+    assert sorted(cancelled) == ["primary", "secondary"]
+
+
+def test_cancelled_before_hedge_cancels_primary():
+    cancelled = []
+
+    async def primary():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append("primary")
+            raise
+
+    async def run():
+        caller = asyncio.ensure_future(hedged(primary, primary, delay=5))
+        await asyncio.sleep(0.01)
+        caller.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await caller
+        await asyncio.sleep(0)
+
+    asyncio.run(run())
+    assert cancelled == ["primary"]
+
+
+def test_both_failing_raises_last_error():
+    async def fail():
+        await asyncio.sleep(0.02)
+        raise ValueError("down")
+
+    with pytest.raises(ValueError):
+        asyncio.run(hedged(fail, fail, delay=0.01))
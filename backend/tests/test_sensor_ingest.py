@@ -0,0 +1,78 @@
+import time
+
+import numpy as np
+import pytest
+
+from src.services.sensor_ingest import SensorIngestor, SENSOR_MAX_FUTURE_S
+
+
+@pytest.fixture
+def ingestor():
+    ingestor = SensorIngestor(window=5, capacity=2)
+    ingestor.collection = None
+    return ingestor
+
+
+def reading(sensor_id, value, **fields):
+    return {"sensor_id": sensor_id, "value": value, "kind": "rain_gauge", "latitude": 18.5, "longitude": 73.8, **fields}
+
+
+def test_running_sums_match_the_window(ingestor):
+    rng = np.random.default_rng(1)
+    history = {f"s{i}": [] for i in range(4)}
+    # Several batches, some holding more than a window's worth of one sensor, forcing two regrowths
+    for size in (3, 7, 1, 12, 5):
+        names = rng.choice(list(history), size).tolist()
+        values = rng.uniform(0, 5, size).round(3).tolist()
+        ingestor.ingest([reading(name, value, threshold=1e9) for name, value in zip(names, values)])
+        for name, value in zip(names, values):
+            history[name].append(value)
+
+    for name, values in history.items():
+        if not values:
+            continue
+        state = ingestor.sensor(name)
+        window = values[-5:]
+        assert state["readings"] == len(window)
+        assert state["last_value"] == window[-1]
+        assert state["sum"] == pytest.approx(sum(window))
+        i = ingestor.index[name]
+        assert ingestor.sums[i] == pytest.approx(sum(window))
+        assert ingestor.sumsq[i] == pytest.approx(sum(v * v for v in window))
+
+
+def test_columnar_frames_match_reading_objects(ingestor):
+    ingestor.ingest({"sensor_id": ["a", "b", "a"], "value": [1.0, 2.0, 3.0], "kind": ["rain_gauge"] * 3,
+                     "latitude": [18.5] * 3, "longitude": [73.8] * 3})
+    assert ingestor.sensor("a")["sum"] == 4.0
+    assert ingestor.sensor("b")["sum"] == 2.0
+
+
+def test_crossing_fires_once_until_rearmed(ingestor):
+    results = [ingestor.ingest(reading("r", value, threshold=10)) for value in (4, 7, 1, 0, 0, 0, 0, 0, 12)]
+    assert [r["crossed"] for r in results] == [0, 1, 0, 0, 0, 0, 0, 0, 1]
+    assert ingestor.sensor("r")["alerting"]
+    assert ingestor.crossings == 2
+    assert len(ingestor.recent) == 2
+
+
+def test_mean_aggregate_for_river_levels(ingestor):
+    ingestor.ingest([reading("river", v, kind="river_level") for v in (4.0, 6.0)])
+    assert ingestor.sensor("river")["mean"] == 5.0
+    assert ingestor.sensor("river")["alerting"]
+
+
+@pytest.mark.parametrize("bad", [
+    {"sensor_id": {"a": 1}, "value": 1},
+    {"sensor_id": ["x"], "value": 1},
+    reading("k1", 1, kind=["rain_gauge"]),
+    reading("k2", 1, kind={"rain": 1}),
+    reading("loc", 1, latitude="north"),
+    reading("ts", 1, ts=time.time() + SENSOR_MAX_FUTURE_S + 60),
+    reading("ms", 1, ts=time.time() * 1000),
+    reading("nan", "high"),
+])
+def test_malformed_readings_are_rejected(ingestor, bad):
+    result = ingestor.ingest([bad, reading("ok", 1.0)])
+    assert (result["accepted"], result["rejected"]) == (1, 1)
+    assert ingestor.sensor("ok")["readings"] == 1
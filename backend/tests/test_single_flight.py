@@ -0,0 +1,84 @@
+import asyncio
+
+from src.services.single_flight import SingleFlight
+
+
+def test_concurrent_calls_share_one_execution():
+    flight = SingleFlight()
+    calls = 0
+
+    async def work():
+        nonlocal calls
+        calls += 1
+        await asyncio.sleep(0.01)
+        return calls
+
+    async def run():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    assert asyncio.run(run()) == [1] * 5
+    assert calls == 1
+    assert flight.stats() == {"in_flight": 0, "leaders": 1, "followers": 4}
+
+
+def test_distinct_keys_run_separately():
+    flight = SingleFlight()
+
+    async def run():
+        return await asyncio.gather(flight.do("a", lambda: asyncio.sleep(0, "a")),
+                                    flight.do("b", lambda: asyncio.sleep(0, "b")))
+
+    assert asyncio.run(run()) == ["a", "b"]
+    assert flight.leaders == 2
+
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def run():
+        first = asyncio.ensure_future(flight.do("k", lambda: asyncio.sleep(0.02, "done")))
+        second = asyncio.ensure_future(flight.do("k", lambda: asyncio.sleep(0.02, "other")))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(run()) == "done"
+
+
+def test_failure_is_shared_and_key_released():
+    flight = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    async def run():
+        results = await asyncio.gather(flight.do("k", fail), flight.do("k", fail), return_exceptions=True)
+        return results, await flight.do("k", lambda: asyncio.sleep(0, "retry"))
+
+    results, retry = asyncio.run(run())
+    assert all(isinstance(result, ValueError) for result in results)
+    assert retry == "retry"
+
+
+def test_last_cancelled_caller_cancels_the_flight():
+    flight = SingleFlight()
+    started = asyncio.Event()
+
+    async def work():
+        started.set()
+        await asyncio.sleep(10)
+
+    async def run():
+        callers = [asyncio.ensure_future(flight.do("k", work)) for _ in range(2)]
+        await started.wait()
+        task = flight._inflight["k"]
+        callers[0].cancel()
+        await asyncio.sleep(0)
+        still_running = not task.cancelled()
+        callers[1].cancel()
+        await asyncio.gather(*callers, return_exceptions=True)
+        await asyncio.sleep(0)
+        return still_running, task.cancelled(), flight.stats()["in_flight"]
+
+    assert asyncio.run(run()) == (True, True, 0)
@@ -0,0 +1,73 @@
+import time
+
+from src.services.ttl_cache import TTLCache
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = TTLCache(max_entries=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1
+    cache.set("c", 3)
+    assert "b" not in cache
+    assert cache.get("a") == 1 and cache.get("c") == 3
+    assert cache.evictions == 1
+
+
+def test_entries_expire():
+    cache = TTLCache(ttl=0.01)
+    cache.set("a", 1)
+    cache.set("b", 2, ttl=60)
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.get("b") == 2
+    assert cache.expirations == 1
+    assert cache.stats()["hit_rate"] == 0.5
+
+
+def test_byte_accounting_through_replace_delete_and_evict():
+    cache = TTLCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.set("a", "xxxx")
+    cache.set("b", "yyyy")
+    assert cache.bytes == 8
+
+    cache.set("a", "zz")
+    assert cache.bytes == 6
+
+    cache.set("c", "wwwww")
+    # "b" is least recently used and goes first
+    assert "b" not in cache
+    assert cache.bytes == 7
+    assert cache.evictions == 1
+
+    cache.delete("a")
+    assert cache.bytes == 5
+    cache.clear()
+    assert cache.bytes == 0
+
+
+def test_oversized_entry_is_kept_alone():
+    cache = TTLCache(max_bytes=4, sizeof=len)
+    cache.set("a", "xx")
+    cache.set("b", "yyyyyyyy")
+    assert "a" not in cache
+    assert cache.get("b") == "yyyyyyyy"
+    assert cache.bytes == 8
+
+
+def test_expired_entry_releases_bytes():
+    cache = TTLCache(ttl=0.01, sizeof=len)
+    cache.set("a", "xxx")
+    time.sleep(0.02)
+    assert cache.get("a") is None
+    assert cache.bytes == 0
+    assert cache.expirations == 1
+
+
+def test_delete_where():
+    cache = TTLCache(sizeof=len)
+    for key in ("cell:1", "cell:2", "cell:fast:2", "other:1"):
+        cache.set(key, "x")
+    assert cache.delete_where(lambda key: key.rsplit(":", 1)[0] == "cell") == 2
+    assert len(cache) == 2
+    assert cache.bytes == 2